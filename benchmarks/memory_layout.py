@@ -0,0 +1,112 @@
+"""
+Compares the memory used per utterance by the columnar storage of MemMapper with the layout it replaced, in which
+every utterance had a dict of its own properties, and reports the memory used per utterance by a whole in-memory
+Corpus. Memory is measured with tracemalloc, as the memory still held after building each layout from rows
+loaded from JSON.
+
+Usage: python benchmarks/memory_layout.py [--n-utterances N]
+"""
+
+import argparse
+import json
+import tracemalloc
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.model.backendMapper import MemMapper
+
+
+def utterance_rows(n: int):
+    # round-trip through JSON, so that (as when loading a corpus) every row has its own copy of each id string
+    return json.loads(
+        json.dumps(
+            [
+                {
+                    "id": "utt_{}".format(i),
+                    "speaker": "speaker_{}".format(i % 500),
+                    "conversation_id": "utt_{}".format(i - i % 10),
+                    "reply_to": None if i % 10 == 0 else "utt_{}".format(i - 1),
+                    "timestamp": i,
+                    "text": "hello",
+                }
+                for i in range(n)
+            ]
+        )
+    )
+
+
+def utterance_properties(row):
+    return {
+        "speaker_id": row["speaker"],
+        "conversation_id": row["conversation_id"],
+        "reply_to": row["reply_to"],
+        "timestamp": row["timestamp"],
+        "text": row["text"],
+    }
+
+
+def build_dicts(rows):
+    # the layout MemMapper used to have: a dict of properties per utterance
+    return {row["id"]: utterance_properties(row) for row in rows}
+
+
+def build_mapper(rows):
+    mapper = MemMapper()
+    for row in rows:
+        mapper.initialize_data_for_component(
+            "utterance", row["id"], initial_value=utterance_properties(row)
+        )
+    return mapper
+
+
+def build_corpus(rows):
+    speakers = dict()
+    utts = []
+    for row in rows:
+        speaker = speakers.setdefault(row["speaker"], Speaker(id=row["speaker"]))
+        utts.append(
+            Utterance(
+                id=row["id"],
+                speaker=speaker,
+                conversation_id=row["conversation_id"],
+                reply_to=row["reply_to"],
+                timestamp=row["timestamp"],
+                text=row["text"],
+            )
+        )
+    return Corpus(utterances=utts)
+
+
+def measure(build, n_utterances: int) -> int:
+    """
+    Returns the memory held by the result of `build` on n_utterances fresh rows, in bytes. The rows are freed
+    before measuring, as they would be after loading a corpus, so strings that the layout shares across rows (e.g.,
+    interned ids) are only counted once.
+    """
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        result = build(utterance_rows(n_utterances))
+        size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--n-utterances", type=int, default=20000)
+    args = parser.parse_args()
+
+    print("bytes per utterance, over {} utterances:".format(args.n_utterances))
+    for name, build in [
+        ("dict per utterance (old layout)", build_dicts),
+        ("columnar storage (MemMapper)", build_mapper),
+        ("whole Corpus", build_corpus),
+    ]:
+        size = measure(build, args.n_utterances)
+        print("  {:<32} {:>8.0f}".format(name, size / args.n_utterances))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,119 @@
+import importlib as _importlib
+
 from .model import *
 from .util import *
-from .coordination import *
-from .politenessStrategies import *
 from .transformer import *
-from .convokitPipeline import *
-from .hyperconvo import *
-from .speakerConvoDiversity import *
-from .text_processing import *
-from .phrasing_motifs import *
-from .prompt_types import *
-from .classifier import *
-from .ranker import *
-from .forecaster import *
-from .fighting_words import *
-from .paired_prediction import *
-from .bag_of_words import *
-from .expected_context_framework import *
-from .surprise import *
 from .convokitConfig import *
 
+# Transformers and other tools are imported lazily, on first access, so that `import convokit` only loads the core
+# data model; many of them pull in heavy dependencies (spaCy, nltk, sklearn, matplotlib, torch, ...).
+# Maps each lazily imported subpackage to the public names it provides.
+_LAZY_SUBPACKAGES = {
+    "coordination": ["Coordination", "CoordinationScore", "CoordinationWordCategories"],
+    "politenessStrategies": [
+        "PolitenessStrategies",
+        "get_chinese_politeness_strategy_features",
+        "get_local_politeness_strategy_features",
+        "get_politeness_strategy_features",
+    ],
+    "convokitPipeline": ["ConvokitPipeline"],
+    "hyperconvo": ["CommunityEmbedder", "HyperConvo", "ThreadEmbedder"],
+    "speakerConvoDiversity": [
+        "SpeakerConvoAttrs",
+        "SpeakerConvoDiversity",
+        "SpeakerConvoDiversityWrapper",
+        "SpeakerConvoLifestage",
+        "compute_divergences",
+        "compute_speaker_convo_divergence",
+    ],
+    "text_processing": [
+        "TextCleaner",
+        "TextParser",
+        "TextProcessor",
+        "TextToArcs",
+        "get_arcs_per_message",
+        "process_text",
+    ],
+    "phrasing_motifs": [
+        "CensorNouns",
+        "NP_LABELS",
+        "PhrasingMotifs",
+        "QuestionSentences",
+        "censor_nouns",
+        "extract_phrasing_motifs",
+        "get_phrasing_motifs",
+    ],
+    "prompt_types": [
+        "PromptTypeWrapper",
+        "PromptTypes",
+        "assign_prompt_types",
+        "fit_prompt_embedding_model",
+        "fit_prompt_type_model",
+        "partial_fit_prompt_embedding_model",
+        "partial_fit_prompt_type_model",
+        "transform_embeddings",
+    ],
+    "classifier": [
+        "Classifier",
+        "VectorClassifier",
+        "extract_feats",
+        "extract_feats_and_label",
+        "extract_feats_dict",
+        "extract_feats_from_obj",
+        "extract_label_dict",
+        "extract_vector_feats_and_label",
+        "get_coefs_helper",
+    ],
+    "ranker": ["Ranker"],
+    "forecaster": ["ContextTuple", "CumulativeBoW", "Forecaster", "ForecasterModel"],
+    "forecaster.CRAFTModel": ["CRAFTModel"],
+    "fighting_words": ["FightingWords", "clean_str"],
+    "paired_prediction": [
+        "PairedPrediction",
+        "PairedVectorPrediction",
+        "Pairer",
+        "generate_pair_id_to_objs",
+        "generate_paired_X_y",
+        "generate_vectors_paired_X_y",
+    ],
+    "bag_of_words": ["BoWTransformer"],
+    "expected_context_framework": [
+        "ClusterWrapper",
+        "ColNormedTfidf",
+        "ColNormedTfidfTransformer",
+        "DualContextPipeline",
+        "DualContextWrapper",
+        "ExpectedContextModel",
+        "ExpectedContextModelPipeline",
+        "ExpectedContextModelTransformer",
+    ],
+    "surprise": ["Surprise", "sample"],
+}
+
+_LAZY_NAMES = {
+    name: subpackage for subpackage, names in _LAZY_SUBPACKAGES.items() for name in names
+}
+
+# `from convokit import *` still imports everything, except for the CRAFT model, which requires torch
+__all__ = [name for name in globals() if not name.startswith("_")] + [
+    name for name in _LAZY_NAMES if name != "CRAFTModel"
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        value = getattr(_importlib.import_module("." + _LAZY_NAMES[name], __name__), name)
+    elif name in _LAZY_SUBPACKAGES:
+        value = _importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    # cache the value, so that later accesses don't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_LAZY_SUBPACKAGES))
+
+
 # __path__ = __import__('pkgutil').extend_path(__path__, __name__)
@@ -1,9 +1,38 @@
 from convokit import Corpus, CorpusComponent, Transformer
-from typing import Callable
+from convokit.util import parallel_map, resolve_n_jobs
+from itertools import islice
+from typing import Callable, Optional
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import CountVectorizer as CV
 import numpy as np
 
 
+def _utterance_text(utt):
+    return utt.text
+
+
+def _joined_utterance_texts(obj):
+    return " ".join(utt.text for utt in obj.iter_utterances())
+
+
+# vectorizing state; set by the initializer of parallel_map, so that (with fork) the vectorizer is not pickled for
+# every chunk
+_worker_vectorizer = None
+_worker_text_cleaner = None
+
+
+def _init_vectorize_worker(vectorizer, text_cleaner):
+    global _worker_vectorizer, _worker_text_cleaner
+    _worker_vectorizer = vectorizer
+    _worker_text_cleaner = text_cleaner
+
+
+def _vectorize_chunk(texts):
+    if _worker_text_cleaner is not None:
+        texts = [_worker_text_cleaner(text) for text in texts]
+    return csr_matrix(_worker_vectorizer.transform(texts))
+
+
 class BoWTransformer(Transformer):
     """
     Bag-of-Words Transformer for annotating a Corpus's objects with the bag-of-words vectorization
@@ -26,6 +55,16 @@ class BoWTransformer(Transformer):
     :param vector_name: name for the vector matrix generated in the transform() step
     :param text_func: function for getting text from the Corpus component object. By default, this is configured
         based on the `obj_type`.
+    :param text_cleaner: optional function that takes in the string returned by `text_func` and returns a cleaned
+        version of it. Must be picklable (e.g., a module-level function) if `n_jobs` is not 1.
+    :param n_jobs: number of processes to run `text_cleaner` with; -1 to use all available CPUs. Default is 1.
+    :param cache_texts: whether to memoize the texts in the Corpus, so that fitting and transforming the same
+        Corpus objects does not recompute them. Default is False. Ignored in streaming mode.
+    :param chunk_size: if set, runs in streaming mode: objects are read and vectorized `chunk_size` at a time, and the
+        resulting sparse blocks are stacked into the final vector matrix, so that at most a few chunks of texts are
+        held in memory at once per process. In this mode, chunks are vectorized across `n_jobs` processes. Streaming is intended
+        for stateless vectorizers (e.g. sklearn's HashingVectorizer) or vectorizers with a fixed vocabulary; `fit`
+        streams chunks through the vectorizer's `partial_fit` if it has one, and otherwise fits it on all texts at once.
 
     """
 
@@ -35,6 +74,10 @@ class BoWTransformer(Transformer):
         vector_name="bow_vector",
         text_func: Callable[[CorpusComponent], str] = None,
         vectorizer=None,
+        text_cleaner: Callable[[str], str] = None,
+        n_jobs: int = 1,
+        cache_texts: bool = False,
+        chunk_size: Optional[int] = None,
     ):
         if vectorizer is None:
             print("Initializing default unigram CountVectorizer...", end="")
@@ -55,19 +98,68 @@ class BoWTransformer(Transformer):
 
         if text_func is None:
             if obj_type == "utterance":
-                self.text_func = lambda utt: utt.text
-            elif obj_type == "conversation":
-                self.text_func = lambda convo: " ".join(utt.text for utt in convo.iter_utterances())
-            elif obj_type == "speaker":
-                self.text_func = lambda speaker: " ".join(
-                    utt.text for utt in speaker.iter_utterances()
-                )
+                self.text_func = _utterance_text
+            elif obj_type in ["conversation", "speaker"]:
+                self.text_func = _joined_utterance_texts
             else:
                 raise ValueError(
                     "Invalid corpus object type. Use 'utterance', 'conversation', or 'speaker'"
                 )
         else:
             self.text_func = text_func
+        self.text_cleaner = text_cleaner
+        self.n_jobs = n_jobs
+        self.cache_texts = cache_texts
+        self.chunk_size = chunk_size
+
+    def _get_texts(self, corpus: Corpus, objs):
+        return corpus.get_texts(
+            objs,
+            self.text_func,
+            clean_func=self.text_cleaner,
+            n_jobs=self.n_jobs,
+            cache=self.cache_texts,
+        )
+
+    def _iter_chunks(self, objs):
+        objs = iter(objs)
+        while True:
+            chunk = list(islice(objs, self.chunk_size))
+            if len(chunk) == 0:
+                return
+            yield chunk
+
+    def _transform_chunks(self, corpus: Corpus, selector):
+        """
+        Vectorizes the selected objects chunk by chunk, returning the ids of the objects and the stacked matrix.
+        """
+        ids, blocks = [], []
+        # only hand the processes a bounded number of chunks at a time, so that memory stays bounded by chunk size
+        wave_size = 4 * resolve_n_jobs(self.n_jobs)
+        chunks = self._iter_chunks(corpus.iter_objs(self.obj_type, selector))
+        try:
+            while True:
+                wave = list(islice(chunks, wave_size))
+                if len(wave) == 0:
+                    break
+                texts = []
+                for chunk in wave:
+                    ids.extend(obj.id for obj in chunk)
+                    texts.append([self.text_func(obj) for obj in chunk])
+                blocks.extend(
+                    parallel_map(
+                        _vectorize_chunk,
+                        texts,
+                        self.n_jobs,
+                        initializer=_init_vectorize_worker,
+                        initargs=(self.vectorizer, self.text_cleaner),
+                    )
+                )
+        finally:
+            _init_vectorize_worker(None, None)
+        if len(blocks) == 0:
+            return ids, self.vectorizer.transform([])
+        return ids, vstack(blocks).tocsr()
 
     def fit(
         self, corpus: Corpus, y=None, selector: Callable[[CorpusComponent], bool] = lambda x: True
@@ -81,8 +173,16 @@ class BoWTransformer(Transformer):
             (i.e. include / exclude). By default, the selector includes all objects of the specified type in the Corpus.
         :return: the fitted BoWTransformer
         """
+        if self.chunk_size is not None and hasattr(self.vectorizer, "partial_fit"):
+            for chunk in self._iter_chunks(corpus.iter_objs(self.obj_type, selector)):
+                texts = corpus.get_texts(
+                    chunk, self.text_func, clean_func=self.text_cleaner, n_jobs=self.n_jobs
+                )
+                self.vectorizer.partial_fit(texts)
+            return self
+
         # collect texts for vectorization
-        docs = [self.text_func(obj) for obj in corpus.iter_objs(self.obj_type, selector)]
+        docs = self._get_texts(corpus, list(corpus.iter_objs(self.obj_type, selector)))
         self.vectorizer.fit(docs)
         return self
 
@@ -99,19 +199,22 @@ class BoWTransformer(Transformer):
 
         :return: the target Corpus annotated
         """
-        objs = list(corpus.iter_objs(self.obj_type, selector))
-        ids = [obj.id for obj in objs]
-        docs = [self.text_func(obj) for obj in objs]
+        if self.chunk_size is not None:
+            ids, matrix = self._transform_chunks(corpus, selector)
+        else:
+            objs = list(corpus.iter_objs(self.obj_type, selector))
+            ids = [obj.id for obj in objs]
+            docs = self._get_texts(corpus, objs)
+            matrix = self.vectorizer.transform(docs)
 
-        matrix = self.vectorizer.transform(docs)
         try:
             column_names = self.vectorizer.get_feature_names_out()
         except AttributeError:
             column_names = np.arange(matrix.shape[1])
         corpus.set_vector_matrix(self.vector_name, matrix=matrix, ids=ids, columns=column_names)
 
-        for obj in objs:
-            obj.add_vector(self.vector_name)
+        for obj_id in ids:
+            corpus.get_object(self.obj_type, obj_id).add_vector(self.vector_name)
 
         return corpus
 
@@ -2,7 +2,6 @@ import os
 from typing import Optional
 from yaml import load, Loader
 
-
 DEFAULT_CONFIG_CONTENTS = (
     "# Default Backend Parameters\n"
     "db_host: localhost:27017\n"
@@ -11,7 +10,11 @@ DEFAULT_CONFIG_CONTENTS = (
     "default_backend: mem"
 )
 
-ENV_VARS = {"db_host": "CONVOKIT_DB_HOST", "default_backend": "CONVOKIT_BACKEND"}
+ENV_VARS = {
+    "db_host": "CONVOKIT_DB_HOST",
+    "default_backend": "CONVOKIT_BACKEND",
+    "disk_directory": "CONVOKIT_DISK_DIRECTORY",
+}
 
 
 class ConvoKitConfig:
@@ -59,3 +62,8 @@ class ConvoKitConfig:
     @property
     def default_backend(self):
         return self._get_config_from_env_or_file("default_backend", "mem")
+
+    @property
+    def disk_directory(self):
+        # None means the system's temporary directory
+        return self._get_config_from_env_or_file("disk_directory", None)
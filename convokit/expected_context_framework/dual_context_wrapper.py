@@ -100,6 +100,23 @@ class DualContextWrapper(Transformer):
         self.ec_models[1].fit(corpus, selector=selector, context_selector=context_selector)
         self._compute_term_stats()
 
+    def partial_fit(self, corpus, y=None, selector=lambda x: True, context_selector=lambda x: True):
+        """
+        Updates the transformer with a new batch of training data, via `partial_fit` calls to the two `ExpectedContextModelTransformer` instances, and recomputes term-level orientation and shift. The representation of context-utterances is updated by the first instance and shared with the second.
+
+        :param corpus: Corpus containing the new batch of training data
+        :param selector: a boolean function of signature `filter(utterance)` that determines which utterances will be considered. defaults to using all utterances.
+        :param context_selector: a boolean function of signature `filter(utterance)` that determines which context-utterances will be considered. defaults to using all utterances.
+        :return: None
+        """
+        self.ec_models[0].partial_fit(corpus, selector=selector, context_selector=context_selector)
+        self.ec_models[1].ec_model.set_model(self.ec_models[0].ec_model)
+
+        self.ec_models[1].partial_fit(
+            corpus, selector=selector, context_selector=context_selector, refit_context=False
+        )
+        self._compute_term_stats()
+
     def transform(self, corpus, selector=lambda x: True):
         """
         Computes vector representations, ranges, and cluster assignments for utterances in a corpus, using the two `ExpectedContextModelTransformer` instances. Also computes utterance-level orientation and shift.
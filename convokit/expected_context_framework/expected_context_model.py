@@ -6,12 +6,13 @@ import numpy as np
 from sklearn.preprocessing import Normalizer, normalize
 from sklearn.decomposition import TruncatedSVD
 from sklearn.metrics.pairwise import cosine_distances, paired_distances
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.utils.extmath import randomized_svd
 from scipy import sparse
 import joblib
 import json
 
+from convokit.linalg_helpers import align_signs, safe_inverse, top_eigenvectors
 from convokit.transformer import Transformer
 
 
@@ -31,6 +32,7 @@ class ExpectedContextModelTransformer(Transformer):
     * a term-level statistic, "range", measuring the variation in context-utterances associated with a term. One interpretation of this statistic is that it quantifies the "strengths of our expectations" of what reply a term typically gets, or what predecessors it typically follows.
     * a clustering of utterance, term and context representations. The resultant clusters can help interpret the representations the model derives, by highlighting salient groupings that emerge. The number of clusters is specified via the `n_clusters` argument; the `print_clusters` function can be called to inspect this output. (see also the `cluster_on` and `cluster_random_state` arguments)
 
+    The transformer can also be fitted incrementally, via repeated calls to `partial_fit` on successive batches of training data (e.g., when new conversations arrive every week). In this mode, the model accumulates term co-occurrence statistics across batches, recomputes the LSA representations from these statistics rather than from the full data, and maintains a clustering via mini-batch k-means. This assumes that the input vector representations of all batches share the same columns, e.g., that they were computed with a fixed vocabulary.
 
 
     An instance of the transformer can be initialized with an instance of another, fitted transformer, via the `model` argument. This ensures that both
@@ -113,10 +115,71 @@ class ExpectedContextModelTransformer(Transformer):
             will be considered in the fit step. defaults to using all utterances.
         :return: None
         """
+        (
+            utt_vects,
+            context_utt_vects,
+            mapping_table,
+            terms,
+            context_terms,
+            ids,
+            context_ids,
+        ) = self._get_fit_input(corpus, selector, context_selector)
+        self.mapping_table = mapping_table
+        self.ec_model.fit(
+            utt_vects,
+            context_utt_vects,
+            mapping_table,
+            terms,
+            context_terms,
+            utt_ids=ids,
+            context_utt_ids=context_ids,
+        )
 
-        id_to_idx = corpus.get_vector_matrix(self.vect_field).ids_to_idx
-        context_id_to_idx = corpus.get_vector_matrix(self.context_vect_field).ids_to_idx
+    def partial_fit(
+        self,
+        corpus,
+        y=None,
+        selector=lambda x: True,
+        context_selector=lambda x: True,
+        refit_context=True,
+    ):
+        """
+        Updates an `ExpectedContextModelTransformer` with a new batch of training data, without revisiting batches passed
+        in previous calls: accumulates term co-occurrence statistics, recomputes representations of terms and range statistics,
+        and updates a mini-batch k-means clustering. Note that calling `fit` discards any statistics accumulated by `partial_fit`.
+        The representations and cluster assignments of training utterances are those of the latest batch.
 
+        :param corpus: Corpus containing the new batch of training data
+        :param selector: a boolean function of signature `filter(utterance)` that determines which utterances
+            will be considered. defaults to using all utterances.
+        :param context_selector: a boolean function of signature `filter(utterance)` that determines which context-utterances
+            will be considered. defaults to using all utterances.
+        :param refit_context: whether to also update the LSA representation of context-utterances. set to `False` if this
+            representation is shared with another model that is updated separately (as in `DualContextWrapper`).
+        :return: None
+        """
+        (
+            utt_vects,
+            context_utt_vects,
+            mapping_table,
+            terms,
+            context_terms,
+            ids,
+            context_ids,
+        ) = self._get_fit_input(corpus, selector, context_selector)
+        self.mapping_table = mapping_table
+        self.ec_model.partial_fit(
+            utt_vects,
+            context_utt_vects,
+            mapping_table,
+            terms,
+            context_terms,
+            refit_context=refit_context,
+            utt_ids=ids,
+            context_utt_ids=context_ids,
+        )
+
+    def _get_fit_input(self, corpus, selector, context_selector):
         ids = []
         context_ids = []
         mapping_ids = []
@@ -146,18 +209,9 @@ class ExpectedContextModelTransformer(Transformer):
         utt_vects = corpus.get_vectors(self.vect_field, ids)
         context_utt_vects = corpus.get_vectors(self.context_vect_field, context_ids)
         mapping_table = np.vstack([mapping_idxes, context_mapping_idxes]).T
-        self.mapping_table = mapping_table
         terms = corpus.get_vector_matrix(self.vect_field).columns
         context_terms = corpus.get_vector_matrix(self.context_vect_field).columns
-        self.ec_model.fit(
-            utt_vects,
-            context_utt_vects,
-            mapping_table,
-            terms,
-            context_terms,
-            utt_ids=ids,
-            context_utt_ids=context_ids,
-        )
+        return utt_vects, context_utt_vects, mapping_table, terms, context_terms, ids, context_ids
 
     def _get_matrix(self, corpus, field, selector):
         ids = [ut.id for ut in corpus.iter_utterances(selector=selector) if field in ut.vectors]
@@ -437,7 +491,7 @@ class ExpectedContextModelTransformer(Transformer):
         """
         Returns a dictionary containing various objects pertaining to the inferred clustering, with fields as follows:
 
-        * `km_obj`: the fitted KMeans object
+        * `km_obj`: the fitted KMeans object (MiniBatchKMeans if the transformer was fitted via `partial_fit`)
         * `utts`: a Pandas dataframe of cluster assignments for utterances from the training data
         * `terms`: a dataframe of cluster assignments for terms
         * `context_utts`: dataframe of cluster assignments for context-utterances from the training data
@@ -524,6 +578,7 @@ class ExpectedContextModel:
 
         self.terms = None
         self.clustering = {}
+        self.incremental_stats = None
 
     def set_model(self, model):
         self.fitted_context = True
@@ -561,6 +616,7 @@ class ExpectedContextModel:
         utt_ids=None,
         context_utt_ids=None,
     ):
+        self.incremental_stats = None
         if (not self.fitted_context) or refit_context:
             self.fit_context_utts(context_utt_vects, context_terms)
 
@@ -575,7 +631,7 @@ class ExpectedContextModel:
         full_dists = cosine_distances(
             self.term_reprs, self._snip(context_repr_subset, snip_first_dim=self.snip_first_dim)
         )
-        weights = normalize(np.array(utt_vect_subset > 0), norm="l1", axis=0)
+        weights = normalize(_to_dense(utt_vect_subset > 0), norm="l1", axis=0)
         clipped_dists = np.clip(full_dists, None, 1)
         self.term_ranges = (clipped_dists * weights.T).sum(axis=1)
         if fit_clusters:
@@ -590,6 +646,79 @@ class ExpectedContextModel:
                 context_utt_ids=context_utt_ids,
             )
 
+    def partial_fit(
+        self,
+        utt_vects,
+        context_utt_vects,
+        utt_context_pairs,
+        terms=None,
+        context_terms=None,
+        refit_context=True,
+        fit_clusters=True,
+        utt_ids=None,
+        context_utt_ids=None,
+    ):
+        if (not refit_context) and (not self.fitted_context):
+            raise ValueError(
+                "partial_fit with refit_context=False needs a fitted representation of context-utterances: "
+                "call partial_fit with refit_context=True, or fit or set_model first"
+            )
+        if self.incremental_stats is None:
+            self.incremental_stats = {
+                "cross_gram": np.zeros((utt_vects.shape[1], context_utt_vects.shape[1])),
+                "range_sums": np.zeros(utt_vects.shape[1]),
+                "range_counts": np.zeros(utt_vects.shape[1]),
+            }
+        stats = self.incremental_stats
+
+        if refit_context:
+            # the right singular vectors and squared singular values of the context-utterance matrix
+            # are the eigenpairs of its gram matrix, which can be accumulated across batches.
+            stats["context_gram"] = stats.get("context_gram", 0) + _to_dense(
+                context_utt_vects.T @ context_utt_vects
+            )
+            context_V, context_s_sq = top_eigenvectors(
+                stats["context_gram"], self.n_svd_dims, self.random_state
+            )
+            if self.fitted_context and (self.context_V.shape == context_V.shape):
+                context_V = align_signs(context_V, np.asarray(self.context_V))
+            self.context_V = context_V
+            self.context_s = np.sqrt(context_s_sq)
+            self.context_term_reprs = self._snip(self.context_V, self.snip_first_dim)
+            self.context_terms = self._get_default_ids(context_terms, len(self.context_V))
+            self.fitted_context = True
+        self.context_U = _to_dense(context_utt_vects @ self.context_V) * safe_inverse(
+            self.context_s
+        )
+        self.train_context_reprs = self._snip(self.context_U, self.snip_first_dim)
+
+        self.terms = self._get_default_ids(terms, utt_vects.shape[1])
+
+        utt_vect_subset = utt_vects[utt_context_pairs[:, 0]]
+        context_vect_subset = context_utt_vects[utt_context_pairs[:, 1]]
+        stats["cross_gram"] = stats["cross_gram"] + _to_dense(
+            utt_vect_subset.T @ context_vect_subset
+        )
+        self.term_reprs_full = (stats["cross_gram"] @ self.context_V) * safe_inverse(
+            self.context_s**2
+        )
+        self.term_reprs = self._snip(self.term_reprs_full, snip_first_dim=self.snip_first_dim)
+        self.train_utt_reprs = self.transform(utt_vects)
+
+        # ranges are running averages over batches, each batch scored against the model at the time.
+        context_repr_subset = self.context_U[utt_context_pairs[:, 1]]
+        full_dists = cosine_distances(
+            self.term_reprs, self._snip(context_repr_subset, snip_first_dim=self.snip_first_dim)
+        )
+        occurrences = (_to_dense(utt_vect_subset) > 0).astype(float)
+        stats["range_sums"] = stats["range_sums"] + (
+            np.clip(full_dists, None, 1) * occurrences.T
+        ).sum(axis=1)
+        stats["range_counts"] = stats["range_counts"] + occurrences.sum(axis=0)
+        self.term_ranges = stats["range_sums"] * safe_inverse(stats["range_counts"])
+        if fit_clusters:
+            self.partial_fit_clusters(utt_ids=utt_ids, context_utt_ids=context_utt_ids)
+
     def transform(self, utt_vects):
         return self._snip(utt_vects * self.term_reprs_full / self.context_s, self.snip_first_dim)
 
@@ -611,6 +740,21 @@ class ExpectedContextModel:
             km_obj.fit(self.term_reprs)
         elif self.cluster_on == "utts":
             km_obj.fit(self.train_utt_reprs)
+        self._assign_clusters(km_obj, utt_ids, context_utt_ids)
+
+    def partial_fit_clusters(self, utt_ids=None, context_utt_ids=None):
+        if "km_obj" not in self.clustering:
+            self.clustering["km_obj"] = ClusterWrapper(
+                n_clusters=self.n_clusters, random_state=self.cluster_random_state, minibatch=True
+            )
+        km_obj = self.clustering["km_obj"]
+        if self.cluster_on == "terms":
+            km_obj.partial_fit(self.term_reprs)
+        elif self.cluster_on == "utts":
+            km_obj.partial_fit(self.train_utt_reprs)
+        self._assign_clusters(km_obj, utt_ids, context_utt_ids)
+
+    def _assign_clusters(self, km_obj, utt_ids=None, context_utt_ids=None):
         self.clustering["km_obj"] = km_obj
         self.clustering["utts"] = km_obj.transform(self.train_utt_reprs, utt_ids)
         self.clustering["terms"] = km_obj.transform(self.term_reprs, self.terms)
@@ -704,6 +848,7 @@ class ExpectedContextModel:
         self.context_term_reprs = self._snip(self.context_V, self.snip_first_dim)
         self.context_s = np.load(os.path.join(dirname, "context_s.npy"), allow_pickle=True)
         self.context_terms = np.load(os.path.join(dirname, "context_terms.npy"), allow_pickle=True)
+        self.fitted_context = True
         self.terms = np.load(os.path.join(dirname, "terms.npy"), allow_pickle=True)
         self.term_reprs_full = np.matrix(
             np.load(os.path.join(dirname, "term_reprs.npy"), allow_pickle=True)
@@ -713,6 +858,11 @@ class ExpectedContextModel:
         self.train_utt_reprs = np.load(
             os.path.join(dirname, "train_utt_reprs.npy"), allow_pickle=True
         )
+        self.incremental_stats = None
+        stats_file = os.path.join(dirname, "incremental_stats.npz")
+        if os.path.exists(stats_file):
+            with np.load(stats_file) as stats:
+                self.incremental_stats = {k: stats[k] for k in stats.files}
 
         try:
             km_obj = ClusterWrapper(self.n_clusters)
@@ -751,6 +901,8 @@ class ExpectedContextModel:
             ("train_utt_reprs", self.train_utt_reprs),
         ]:
             np.save(os.path.join(dirname, name + ".npy"), obj)
+        if self.incremental_stats is not None:
+            np.savez(os.path.join(dirname, "incremental_stats.npz"), **self.incremental_stats)
         if dump_clustering and (len(self.clustering) > 0):
             self.clustering["km_obj"].dump(dirname)
             for k in ["utts", "terms", "context_utts", "context_terms"]:
@@ -768,27 +920,57 @@ class ExpectedContextModel:
         return normalize(np.array(vects[:, int(snip_first_dim) : dim]))
 
 
+def _to_dense(x):
+    if sparse.issparse(x):
+        return x.toarray()
+    return np.asarray(x)
+
+
 class ClusterWrapper:
     """
     Wrapper that performs K-Means clustering. Handles model loading and dumping,
     formats clustering output as dataframes for convenience, and keeps track of
-    names that an end-user can assign to clusters.
+    names that an end-user can assign to clusters. If `minibatch` is set, uses
+    mini-batch K-Means, which can be updated with new data via `partial_fit`.
     """
 
-    def __init__(self, n_clusters, cluster_names=None, random_state=None):
+    def __init__(self, n_clusters, cluster_names=None, random_state=None, minibatch=False):
         self.n_clusters = n_clusters
         self.random_state = random_state
 
         self.cluster_names = np.arange(n_clusters)
         if cluster_names is not None:
             self.cluster_names = cluster_names
-        self.km_model = KMeans(n_clusters=n_clusters, random_state=random_state)
+        if minibatch:
+            self.km_model = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state)
+        else:
+            self.km_model = KMeans(n_clusters=n_clusters, random_state=random_state)
         self.km_df = None
 
     def fit(self, vects, ids=None):
         self.km_model.fit(vects)
         self.km_df = self.transform(vects, ids)
 
+    def partial_fit(self, vects, ids=None):
+        fitted = hasattr(self.km_model, "cluster_centers_")
+        if fitted and isinstance(self.km_model, MiniBatchKMeans):
+            self.km_model.partial_fit(vects)
+        else:
+            if fitted:
+                # continue from the centroids of a previously fitted k-means model
+                self.km_model = MiniBatchKMeans(
+                    n_clusters=self.n_clusters,
+                    init=self.km_model.cluster_centers_,
+                    n_init=1,
+                    random_state=self.random_state,
+                )
+            elif not isinstance(self.km_model, MiniBatchKMeans):
+                self.km_model = MiniBatchKMeans(
+                    n_clusters=self.n_clusters, random_state=self.random_state
+                )
+            self.km_model.fit(vects)
+        self.km_df = self.transform(vects, ids)
+
     def set_cluster_names(self, names):
         self.cluster_names = np.array(names)
         if self.km_df is not None:
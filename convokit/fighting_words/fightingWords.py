@@ -34,6 +34,14 @@ clean_str = lambda s: clean(
 )
 
 
+def _utterance_text(utt):
+    return utt.text
+
+
+def _joined_utterance_texts(obj):
+    return " ".join([utt.text for utt in obj.iter_utterances()])
+
+
 class FightingWords(Transformer):
     """
     Based on Monroe et al.'s "Fightin’ Words: Lexical Feature Selection and Evaluation for Identifying the Content of
@@ -65,6 +73,12 @@ class FightingWords(Transformer):
         Default is 'fighting_words_class1'.
     :param class2_attribute_name: metadata attribute name to store class2 ngrams under during the `transform()` step.
         Default is 'fighting_words_class2'.
+    :param text_cleaner: optional function that takes in the string returned by `text_func` and returns a cleaned
+        version of it. By default, this is `FightingWords.clean_text` if `text_func` is not specified, and no
+        cleaning is done otherwise. Must be picklable (e.g., a module-level function) if `n_jobs` is not 1.
+    :param n_jobs: number of processes to clean texts with; -1 to use all available CPUs. Default is 1.
+    :param cache_texts: whether to memoize the cleaned texts in the Corpus, so that fitting again on the same
+        Corpus (e.g., with different class1/class2 selectors) does not recompute them. Default is False.
 
     :ivar cv: modifiable countvectorizer
 
@@ -79,23 +93,21 @@ class FightingWords(Transformer):
         prior=0.1,
         class1_attribute_name="fighting_words_class1",
         class2_attribute_name="fighting_words_class2",
+        text_cleaner=None,
+        n_jobs=1,
+        cache_texts=False,
     ):
         assert obj_type in ["speaker", "utterance", "conversation"]
         self.obj_type = obj_type
 
         if text_func is None:
-            if obj_type == "utterance":
-                self.text_func = lambda utt: FightingWords.clean_text(utt.text)
-            elif obj_type == "conversation":
-                self.text_func = lambda convo: FightingWords.clean_text(
-                    " ".join([utt.text for utt in convo.iter_utterances()])
-                )
-            else:
-                self.text_func = lambda spkr: FightingWords.clean_text(
-                    " ".join([utt.text for utt in spkr.iter_utterances()])
-                )
+            self.text_func = _utterance_text if obj_type == "utterance" else _joined_utterance_texts
+            self.text_cleaner = FightingWords.clean_text if text_cleaner is None else text_cleaner
         else:
             self.text_func = text_func
+            self.text_cleaner = text_cleaner
+        self.n_jobs = n_jobs
+        self.cache_texts = cache_texts
 
         self.ngram_range = ngram_range
         self.prior = prior
@@ -135,7 +147,16 @@ class FightingWords(Transformer):
         """
         return clean_str(in_string)
 
-    def _bayes_compare_language(self, class1: List[CorpusComponent], class2: List[CorpusComponent]):
+    def _get_texts(self, corpus: Corpus, objs: List[CorpusComponent]) -> List[str]:
+        return corpus.get_texts(
+            objs,
+            self.text_func,
+            clean_func=self.text_cleaner,
+            n_jobs=self.n_jobs,
+            cache=self.cache_texts,
+        )
+
+    def _bayes_compare_language(self, class1: List[str], class2: List[str]):
         """
         Arguments:
         - class1, class2; a list of strings from each language sample
@@ -144,42 +165,46 @@ class FightingWords(Transformer):
         - A dict of length |Vocab| with (n-gram, zscore) pairs.
         """
 
-        class1 = [self.text_func(obj) for obj in class1]
-        class2 = [self.text_func(obj) for obj in class2]
-
-        counts_mat = self.cv.fit_transform(class1 + class2).toarray()
+        counts_mat = self.cv.fit_transform(class1 + class2)
         # Now sum over languages...
         vocab_size = len(self.cv.vocabulary_)
         print("Vocab size is {}".format(vocab_size))
-        if type(self.prior) is float:
-            priors = np.array([self.prior for _ in range(vocab_size)])
-        else:
-            priors = self.prior
-        z_scores = np.empty(priors.shape[0])
         count_matrix = np.empty([2, vocab_size], dtype=np.float32)
-        count_matrix[0, :] = np.sum(counts_mat[: len(class1), :], axis=0)
-        count_matrix[1, :] = np.sum(counts_mat[len(class1) :, :], axis=0)
+        count_matrix[0, :] = self._sum_counts(counts_mat[: len(class1)])
+        count_matrix[1, :] = self._sum_counts(counts_mat[len(class1) :])
         self._count_matrix = count_matrix
+        print("Comparing language...")
+        return self._compute_ngram_zscores()
+
+    @staticmethod
+    def _sum_counts(counts_mat):
+        return np.asarray(counts_mat.sum(axis=0)).ravel()
+
+    def _compute_ngram_zscores(self):
+        """
+        Computes the z-scores of all ngrams from the per-class ngram counts in `self._count_matrix`.
+
+        :return: a dict of length |Vocab| with (n-gram, zscore) pairs, in ascending order of z-score.
+        """
+        count_matrix = self._count_matrix
+        if type(self.prior) is float:
+            priors = np.full(count_matrix.shape[1], self.prior)
+        else:
+            priors = np.asarray(self.prior)
         a0 = np.sum(priors)
         n1 = 1.0 * np.sum(count_matrix[0, :])
         n2 = 1.0 * np.sum(count_matrix[1, :])
-        print("Comparing language...")
-        for i in range(vocab_size):
-            # compute delta
-            term1 = np.log(
-                (count_matrix[0, i] + priors[i]) / (n1 + a0 - count_matrix[0, i] - priors[i])
-            )
-            term2 = np.log(
-                (count_matrix[1, i] + priors[i]) / (n2 + a0 - count_matrix[1, i] - priors[i])
-            )
-            delta = term1 - term2
-            # compute variance on delta
-            var = 1.0 / (count_matrix[0, i] + priors[i]) + 1.0 / (count_matrix[1, i] + priors[i])
-            # store final score
-            z_scores[i] = delta / np.sqrt(var)
-        index_to_term = {v: k for k, v in self.cv.vocabulary_.items()}
+        # compute delta
+        term1 = np.log((count_matrix[0] + priors) / (n1 + a0 - count_matrix[0] - priors))
+        term2 = np.log((count_matrix[1] + priors) / (n2 + a0 - count_matrix[1] - priors))
+        delta = term1 - term2
+        # compute variance on delta
+        var = 1.0 / (count_matrix[0] + priors) + 1.0 / (count_matrix[1] + priors)
+        z_scores = delta / np.sqrt(var)
+        terms = self.cv.get_feature_names_out()
         sorted_indices = np.argsort(z_scores)
-        return {index_to_term[i]: z_scores[i] for i in sorted_indices}
+        # feature names may be numpy strings, depending on the vectorizer
+        return dict(zip(map(str, terms[sorted_indices]), z_scores[sorted_indices]))
 
     def fit(
         self,
@@ -228,7 +253,63 @@ class FightingWords(Transformer):
             f"class2_func returned {len(class2)} valid corpus components."
         )
 
-        self.ngram_zscores = self._bayes_compare_language(class1, class2)
+        self.ngram_zscores = self._bayes_compare_language(
+            self._get_texts(corpus, class1), self._get_texts(corpus, class2)
+        )
+        print("ngram zscores computed.")
+        return self
+
+    def partial_fit(
+        self,
+        corpus: Corpus,
+        class1_func: Callable[[CorpusComponent], bool],
+        class2_func: Callable[[CorpusComponent], bool],
+        y=None,
+        selector: Callable[[CorpusComponent], bool] = lambda utt: True,
+    ):
+        """
+        Adds the ngram counts of the `class1` and `class2` components of a corpus (e.g., one chunk of a larger dataset)
+            to the per-class counts accumulated by previous `partial_fit` calls, and recomputes the fighting words
+            from all counts accumulated so far. This allows two very large groups of corpus components to be compared
+            chunk by chunk.
+
+        The vocabulary is fixed in the first call: if the CountVectorizer has not been fitted (and was not given a
+            vocabulary), it is fitted on the texts of the first corpus passed in. Calling `fit` discards the
+            accumulated counts.
+
+        :param corpus: target Corpus (or chunk of a Corpus)
+        :param class1_func: selector function for identifying corpus components that belong to class 1
+        :param class2_func: selector function for identifying corpus components that belong to class 2
+        :param selector: a (lambda) function that takes a CorpusComponent and returns True/False; this selects for
+            Corpus components that should be considered in this fitting step
+        :return: fitted FightingWords Transformer
+        """
+        class1, class2 = [], []
+        for obj in corpus.iter_objs(self.obj_type, selector):
+            if class1_func(obj):
+                class1.append(obj)
+            if class2_func(obj):
+                class2.append(obj)
+        class1 = self._get_texts(corpus, class1)
+        class2 = self._get_texts(corpus, class2)
+
+        if not hasattr(self.cv, "vocabulary_"):
+            self.cv.fit(class1 + class2)
+            self._count_matrix = None
+        vocab_size = len(self.cv.vocabulary_)
+        if self._count_matrix is None:
+            self._count_matrix = np.zeros([2, vocab_size], dtype=np.float32)
+
+        print(
+            f"class1_func returned {len(class1)} valid corpus components. "
+            f"class2_func returned {len(class2)} valid corpus components."
+        )
+        if len(class1) > 0:
+            self._count_matrix[0, :] += self._sum_counts(self.cv.transform(class1))
+        if len(class2) > 0:
+            self._count_matrix[1, :] += self._sum_counts(self.cv.transform(class2))
+
+        self.ngram_zscores = self._compute_ngram_zscores()
         print("ngram zscores computed.")
         return self
 
@@ -319,11 +400,12 @@ class FightingWords(Transformer):
             else self.get_ngrams_past_threshold(threshold=config["threshold"])
         )
 
-        for obj in corpus.iter_objs(
-            self.obj_type
-        ):  # improve the efficiency of this; tricky because ngrams #TODO
-            if selector(obj):
-                obj_text = self.text_func(obj)
+        objs = list(corpus.iter_objs(self.obj_type))
+        selected = [obj for obj in objs if selector(obj)]
+        obj_texts = dict(zip([obj.id for obj in selected], self._get_texts(corpus, selected)))
+        for obj in objs:  # improve the efficiency of this; tricky because ngrams #TODO
+            if obj.id in obj_texts:
+                obj_text = obj_texts[obj.id]
                 obj.meta[self.class1_attribute_name] = [
                     ngram for ngram in class1_ngrams if ngram in obj_text
                 ]
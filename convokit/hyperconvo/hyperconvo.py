@@ -1,13 +1,19 @@
-from typing import Dict, Optional, Callable
+from typing import Dict, Optional, Callable, Union
 
 import numpy as np
 import pandas as pd
-import scipy.stats
 from scipy.sparse import csr_matrix
 
 from convokit.model import Corpus, Conversation
 from convokit.transformer import Transformer
-from .hypergraph import Hypergraph
+from convokit.util import parallel_map
+from .hypergraph import Hypergraph, SparseHypergraph
+
+
+def _entropy(l):
+    # equivalent to scipy.stats.entropy(l), without its per-call input validation overhead
+    p = l[l > 0] / np.sum(l)
+    return -np.sum(p * np.log(p))
 
 
 def degree_stat_funcs(nan_val):
@@ -25,15 +31,49 @@ def degree_stat_funcs(nan_val):
         "mean-nonzero": lambda l: np.mean(l[l != 0]) if len(l[l != 0]) > 0 else 0,
         "prop-nonzero": lambda l: np.mean(l != 0),
         "prop-multiple": lambda l: np.mean(l[l != 0] > 1) if len(l[l != 0] > 1) > 0 else 0,
-        "entropy": lambda l: scipy.stats.entropy(l) if np.sum(l) > 0 else nan_val,
+        "entropy": lambda l: _entropy(l) if np.sum(l) > 0 else nan_val,
         "2nd-largest / max": lambda l: (
             np.partition(l, -2)[-2] / np.max(l) if (len(l) > 1 and np.sum(l) > 0) else nan_val
         ),
     }
 
 
+def degree_stats(l: np.ndarray, nan_val) -> Dict:
+    """
+    Computes all the statistics in `degree_stat_funcs` for a degree distribution at once, sharing the intermediate
+    sorts and sums between statistics.
+
+    :param l: array of degrees
+    :param nan_val: value to use for statistics that are undefined for this distribution
+    :return: a dictionary from statistic name to value, in the same order as `degree_stat_funcs`
+    """
+    total = l.sum()
+    max_val = l.max()
+    nonzero = l[l != 0]
+    has_second = len(l) > 1
+    if has_second:
+        order = (-l).argsort()
+        second = l[order[1]]
+    return {
+        "max": int(max_val),
+        "argmax": int(l.argmax()),
+        "norm.max": max_val / total if total > 0 else 0,
+        "2nd-largest": int(second) if has_second else nan_val,
+        "2nd-argmax": int(order[1]) if has_second else nan_val,
+        "norm.2nd-largest": second / total if (has_second and total > 0) else nan_val,
+        "mean": l.mean(),
+        "mean-nonzero": nonzero.mean() if len(nonzero) > 0 else 0,
+        "prop-nonzero": len(nonzero) / len(l),
+        "prop-multiple": np.mean(nonzero > 1) if len(nonzero) > 0 else 0,
+        "entropy": _entropy(l) if total > 0 else nan_val,
+        "2nd-largest / max": second / max_val if (has_second and total > 0) else nan_val,
+    }
+
+
 motif_stat_funcs = {"is-present": lambda l: len(l) > 0, "count": len}
 
+motif_count_stat_funcs = {"is-present": lambda n: n > 0, "count": lambda n: n}
+
 
 class HyperConvo(Transformer):
     """
@@ -64,6 +104,8 @@ class HyperConvo(Transformer):
     :param min_convo_len: Only consider conversations of at least this length
     :param vector_name: feature name to store hyperconvo features under
     :param invalid_val: value to use for invalid hyperconvo features, default is np.nan
+    :param n_jobs: number of processes to compute features for different conversations with; -1 to use all available
+        CPUs. Default is 1.
     """
 
     def __init__(
@@ -72,11 +114,13 @@ class HyperConvo(Transformer):
         min_convo_len: int = 10,
         vector_name: str = "hyperconvo",
         invalid_val: float = np.nan,
+        n_jobs: int = 1,
     ):
         self.prefix_len = prefix_len
         self.min_convo_len = min_convo_len
         self.vector_name = vector_name
         self.invalid_val = invalid_val
+        self.n_jobs = n_jobs
 
     def transform(
         self,
@@ -92,7 +136,7 @@ class HyperConvo(Transformer):
         :return: corpus with conversations having a new meta field with the specified feature name  containing the stats generated by retrieve_feats().
         """
 
-        convo_id_to_feats = self.retrieve_feats(corpus, selector)
+        convo_id_to_feats = self.retrieve_feats(corpus, selector, n_jobs=self.n_jobs)
         df = pd.DataFrame(convo_id_to_feats).T
         corpus.set_vector_matrix(
             name=self.vector_name,
@@ -115,7 +159,9 @@ class HyperConvo(Transformer):
         """
         return "C" if b else "c"
 
-    def _degree_feats(self, graph: Optional[Hypergraph] = None, name_ext: str = "") -> Dict:
+    def _degree_feats(
+        self, graph: Optional[Union[Hypergraph, SparseHypergraph]] = None, name_ext: str = ""
+    ) -> Dict:
         """
         Helper method for retrieve_feats().
         Generate statistics on degree-related features in a Hypergraph (G), or a Hypergraph
@@ -134,10 +180,14 @@ class HyperConvo(Transformer):
                 if not from_hyper and to_hyper:
                     continue  # skip c->C
                 if from_hyper:
-                    outdegrees = np.array(graph.outdegrees(from_hyper, to_hyper))
-                indegrees = np.array(graph.indegrees(from_hyper, to_hyper))
+                    out_stats = degree_stats(
+                        np.asarray(graph.outdegrees(from_hyper, to_hyper)), self.invalid_val
+                    )
+                in_stats = degree_stats(
+                    np.asarray(graph.indegrees(from_hyper, to_hyper)), self.invalid_val
+                )
 
-                for stat, stat_func in degree_stat_funcs(self.invalid_val).items():
+                for stat in in_stats:
                     if from_hyper:
                         stats[
                             "{}[outdegree over {}->{} {}responses]".format(
@@ -146,7 +196,7 @@ class HyperConvo(Transformer):
                                 HyperConvo._node_type_name(to_hyper),
                                 name_ext,
                             )
-                        ] = stat_func(outdegrees)
+                        ] = out_stats[stat]
 
                     stats[
                         "{}[indegree over {}->{} {}responses]".format(
@@ -155,11 +205,11 @@ class HyperConvo(Transformer):
                             HyperConvo._node_type_name(to_hyper),
                             name_ext,
                         )
-                    ] = stat_func(indegrees)
+                    ] = in_stats[stat]
         return stats
 
     @staticmethod
-    def _motif_feats(graph: Hypergraph = None, name_ext: str = "") -> Dict:
+    def _motif_feats(graph: Union[Hypergraph, SparseHypergraph] = None, name_ext: str = "") -> Dict:
         """
         Helper method for retrieve_feats().
         Generate statistics on degree-related features in a Hypergraph (G), or a Hypergraph
@@ -173,6 +223,18 @@ class HyperConvo(Transformer):
             to feature values. For motif-related features specifically.
         """
         stats = {}
+        if isinstance(graph, SparseHypergraph):
+            for motif, count_func in [
+                ("reciprocity motif", graph.reciprocity_motif_count),
+                ("external reciprocity motif", graph.external_reciprocity_motif_count),
+                ("dyadic interaction motif", graph.dyadic_interaction_motif_count),
+                ("incoming triads", graph.incoming_triad_motif_count),
+                ("outgoing triads", graph.outgoing_triad_motif_count),
+            ]:
+                count = count_func()
+                for stat, stat_func in motif_count_stat_funcs.items():
+                    stats["{}[{}{}]".format(stat, motif, name_ext)] = stat_func(count)
+            return stats
         for motif, motif_func in [
             ("reciprocity motif", graph.reciprocity_motifs),
             ("external reciprocity motif", graph.external_reciprocity_motifs),
@@ -186,7 +248,10 @@ class HyperConvo(Transformer):
         return stats
 
     def retrieve_feats(
-        self, corpus: Corpus, selector: Callable[[Conversation], bool] = lambda convo: True
+        self,
+        corpus: Corpus,
+        selector: Callable[[Conversation], bool] = lambda convo: True,
+        n_jobs: int = 1,
     ) -> Dict[str, Dict]:
         """
         Retrieve all hypergraph features for a given corpus (viewed as a set of conversation threads).
@@ -195,28 +260,51 @@ class HyperConvo(Transformer):
 
         :param corpus: target Corpus
         :param selector: (lambda) function selecting the Conversations that features should be computed for.
+        :param n_jobs: number of processes to spread conversations over; -1 to use all available CPUs. Default is 1.
         :return: A dictionary from a thread root id to its stats dictionary,
             which is a dictionary from feature names to feature values. For degree-related
             features specifically.
         """
 
-        threads_stats = dict()
-
+        convo_ids, threads = [], []
         for convo in corpus.iter_conversations(selector):
             ordered_utts = convo.get_chronological_utterance_list()
             if len(ordered_utts) < self.min_convo_len:
                 continue
-            utts = ordered_utts[: self.prefix_len]
-            stats = {}
-            G = Hypergraph.init_from_utterances(utterances=utts)
-            G_mid = Hypergraph.init_from_utterances(utterances=utts[1:])  # exclude root
-            for k, v in self._degree_feats(graph=G).items():
-                stats[k] = v
-            for k, v in HyperConvo._motif_feats(graph=G).items():
-                stats[k] = v
-            for k, v in self._degree_feats(graph=G_mid, name_ext="mid-thread ").items():
-                stats[k] = v
-            for k, v in HyperConvo._motif_feats(graph=G_mid, name_ext=" over mid-thread").items():
-                stats[k] = v
-            threads_stats[convo.id] = stats
-        return threads_stats
+            convo_ids.append(convo.id)
+            threads.append(
+                [
+                    (utt.id, utt.speaker.id, utt.reply_to, utt.timestamp)
+                    for utt in ordered_utts[: self.prefix_len]
+                ]
+            )
+        if n_jobs == 1:
+            threads_feats = [self._thread_feats(thread) for thread in threads]
+        else:
+            threads_feats = parallel_map(
+                _thread_feats, [(self, thread) for thread in threads], n_jobs
+            )
+        return dict(zip(convo_ids, threads_feats))
+
+    def _thread_feats(self, thread) -> Dict:
+        """
+        Helper method for retrieve_feats(). Computes the features of a single thread, given as a list of
+        (utterance id, speaker id, reply-to id, timestamp) tuples in chronological order.
+        """
+        stats = {}
+        G = SparseHypergraph.init_from_tuples(thread)
+        G_mid = SparseHypergraph.init_from_tuples(thread[1:])  # exclude root
+        for k, v in self._degree_feats(graph=G).items():
+            stats[k] = v
+        for k, v in HyperConvo._motif_feats(graph=G).items():
+            stats[k] = v
+        for k, v in self._degree_feats(graph=G_mid, name_ext="mid-thread ").items():
+            stats[k] = v
+        for k, v in HyperConvo._motif_feats(graph=G_mid, name_ext=" over mid-thread").items():
+            stats[k] = v
+        return stats
+
+
+def _thread_feats(args):
+    hyperconvo, thread = args
+    return hyperconvo._thread_feats(thread)
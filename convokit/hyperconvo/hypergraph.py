@@ -1,6 +1,8 @@
-from typing import Tuple, List, Dict, Collection
+from typing import Tuple, List, Dict, Collection, Optional
 from collections import defaultdict
 from convokit import Utterance, Speaker
+from scipy.sparse import csr_matrix
+import numpy as np
 import itertools
 
 
@@ -198,3 +200,153 @@ class Hypergraph:
             for C2, C3 in itertools.combinations(outgoing, 2):
                 motifs += [(C1, C2, C3, self.adj_out[C1][C2], self.adj_out[C1][C3])]
         return motifs
+
+
+class SparseHypergraph:
+    """
+    Array-backed counterpart of `Hypergraph`. Instead of nested dicts, the reply structure of a set of utterances is
+    stored as arrays of edge endpoints, from which the node-to-node (c->c), hypernode-to-node (C->c) and
+    hypernode-to-hypernode (C->C) adjacency matrices can be obtained in sparse (CSR) form. Nodes (utterances) and
+    hypernodes (speakers) are indexed by position, in the same order as in the corresponding `Hypergraph`, and
+    degree distributions and motif counts are computed with vectorized array operations.
+
+    Only motif counts (rather than the lists of motifs themselves) are available, which is all that HyperConvo
+    features need.
+
+    :param node_ids: ids of the nodes (utterances), in chronological order
+    :param hypernode_ids: ids of the hypernodes (speakers), in order of first appearance
+    :param node_to_hypernode: array mapping the index of each node to the index of its hypernode
+    :param reply_src: indices of the replying node of each reply edge
+    :param reply_tgt: indices of the node being replied to in each reply edge
+    """
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        hypernode_ids: List[str],
+        node_to_hypernode: np.ndarray,
+        reply_src: np.ndarray,
+        reply_tgt: np.ndarray,
+    ):
+        self.node_ids = node_ids
+        self.hypernode_ids = hypernode_ids
+        self.node_to_hypernode = node_to_hypernode
+        self.reply_src = reply_src
+        self.reply_tgt = reply_tgt
+
+    @staticmethod
+    def init_from_utterances(utterances: List[Utterance]):
+        return SparseHypergraph.init_from_tuples(
+            [(utt.id, utt.speaker.id, utt.reply_to, utt.timestamp) for utt in utterances]
+        )
+
+    @staticmethod
+    def init_from_tuples(utterances: List[Tuple[str, str, Optional[str], Optional[int]]]):
+        """
+        Builds the hypergraph from (utterance id, speaker id, reply-to id, timestamp) tuples, which (unlike Utterances)
+        are cheap to send to other processes.
+
+        :param utterances: list of (utterance id, speaker id, reply-to id, timestamp) tuples
+        :return: SparseHypergraph
+        """
+        utterances = sorted(utterances, key=lambda t: t[3])
+        node_ids = [t[0] for t in utterances]
+        node_idx = {node_id: idx for idx, node_id in enumerate(node_ids)}
+        hypernode_idx = dict()
+        node_to_hypernode = np.empty(len(utterances), dtype=np.int64)
+        reply_src, reply_tgt = [], []
+        for idx, (_, speaker_id, reply_to, _) in enumerate(utterances):
+            node_to_hypernode[idx] = hypernode_idx.setdefault(speaker_id, len(hypernode_idx))
+            if reply_to is not None and reply_to in node_idx:
+                reply_src.append(idx)
+                reply_tgt.append(node_idx[reply_to])
+        return SparseHypergraph(
+            node_ids,
+            list(hypernode_idx),
+            node_to_hypernode,
+            np.array(reply_src, dtype=np.int64),
+            np.array(reply_tgt, dtype=np.int64),
+        )
+
+    def _edges(self, from_hyper: bool, to_hyper: bool) -> Tuple[np.ndarray, np.ndarray, int, int]:
+        """
+        :return: the source and target indices of all (c->c, C->c or C->C) edges, one entry per underlying reply,
+            along with the number of possible sources and targets
+        """
+        n, m = len(self.node_ids), len(self.hypernode_ids)
+        if from_hyper:
+            src = self.node_to_hypernode[self.reply_src]
+            if to_hyper:
+                return src, self.node_to_hypernode[self.reply_tgt], m, m
+            return src, self.reply_tgt, m, n
+        if to_hyper:
+            raise ValueError("Hypergraph has no node-to-hypernode edges.")
+        return self.reply_src, self.reply_tgt, n, n
+
+    def _distinct_edges(self, from_hyper: bool, to_hyper: bool) -> Tuple[np.ndarray, np.ndarray]:
+        src, tgt, _, n_tgt = self._edges(from_hyper, to_hyper)
+        keys = np.unique(src * n_tgt + tgt)
+        return keys // n_tgt, keys % n_tgt
+
+    def adjacency_matrix(self, from_hyper: bool = False, to_hyper: bool = False) -> csr_matrix:
+        """
+        :return: CSR matrix where entry (u, v) counts the replies from u to v
+        """
+        src, tgt, n_src, n_tgt = self._edges(from_hyper, to_hyper)
+        return csr_matrix((np.ones(len(src), dtype=np.int64), (src, tgt)), shape=(n_src, n_tgt))
+
+    def outdegrees(self, from_hyper: bool = False, to_hyper: bool = False) -> np.ndarray:
+        src, _ = self._distinct_edges(from_hyper, to_hyper)
+        return np.bincount(src, minlength=len(self.hypernode_ids if from_hyper else self.node_ids))
+
+    def indegrees(self, from_hyper: bool = False, to_hyper: bool = False) -> np.ndarray:
+        _, tgt = self._distinct_edges(from_hyper, to_hyper)
+        return np.bincount(tgt, minlength=len(self.hypernode_ids if to_hyper else self.node_ids))
+
+    def reciprocity_motif_count(self) -> int:
+        """
+        :return: number of (C1, c1, c2, C1->c2, c2->c1) motifs, as in `Hypergraph.reciprocity_motifs`
+        """
+        n = len(self.node_ids)
+        # each C1->c2 edge (one per reply) forms a motif with each c2->c1 reply where c1 belongs to C1
+        hyper_to_node = np.sort(self.node_to_hypernode[self.reply_src] * n + self.reply_tgt)
+        replies_to_hyper = self.node_to_hypernode[self.reply_tgt] * n + self.reply_src
+        return int(
+            np.sum(
+                np.searchsorted(hyper_to_node, replies_to_hyper, side="right")
+                - np.searchsorted(hyper_to_node, replies_to_hyper, side="left")
+            )
+        )
+
+    def external_reciprocity_motif_count(self) -> int:
+        """
+        :return: number of (C3, c2, c1, C3->c2, c2->c1) motifs, as in `Hypergraph.external_reciprocity_motifs`
+        """
+        # each C3->c2 edge forms a motif with each reply of c2, except the replies to C3's own nodes
+        node_outdegrees = np.bincount(self.reply_src, minlength=len(self.node_ids))
+        return int(np.sum(node_outdegrees[self.reply_tgt])) - self.reciprocity_motif_count()
+
+    def dyadic_interaction_motif_count(self) -> int:
+        """
+        :return: number of (C1, C2, C1->C2, C2->C1) motifs, as in `Hypergraph.dyadic_interaction_motifs`
+        """
+        m = len(self.hypernode_ids)
+        src, tgt = self._distinct_edges(True, True)
+        not_loop = src != tgt
+        keys = src[not_loop] * m + tgt[not_loop]
+        reversed_keys = tgt[not_loop] * m + src[not_loop]
+        return int(np.sum(np.isin(reversed_keys, keys))) // 2
+
+    def incoming_triad_motif_count(self) -> int:
+        """
+        :return: number of (C1, C2, C3, C2->C1, C3->C1) motifs, as in `Hypergraph.incoming_triad_motifs`
+        """
+        degrees = self.indegrees(True, True)
+        return int(np.sum(degrees * (degrees - 1) // 2))
+
+    def outgoing_triad_motif_count(self) -> int:
+        """
+        :return: number of (C1, C2, C3, C1->C2, C1->C3) motifs, as in `Hypergraph.outgoing_triad_motifs`
+        """
+        degrees = self.outdegrees(True, True)
+        return int(np.sum(degrees * (degrees - 1) // 2))
@@ -0,0 +1,44 @@
+"""
+Linear algebra helpers shared by the models that can be updated incrementally with `partial_fit` (e.g.,
+ExpectedContextModel and PromptTypes), which compute their truncated SVDs from gram matrices accumulated over batches.
+"""
+
+import numpy as np
+from scipy.sparse.linalg import eigsh
+from sklearn.utils import check_random_state
+
+
+def top_eigenvectors(gram, k, random_state=None):
+    """
+    Computes the top eigenpairs of a symmetric matrix, e.g., the gram matrix X^T X of a matrix X, whose eigenvectors
+    and eigenvalues are the right singular vectors and squared singular values of X.
+
+    :param gram: symmetric matrix
+    :param k: number of eigenpairs to compute
+    :param random_state: seed of the starting vector of the eigensolver, for reproducibility
+    :return: matrix whose columns are the top k eigenvectors, and the corresponding eigenvalues, in decreasing order
+    """
+    v0 = check_random_state(random_state).uniform(-1, 1, gram.shape[0])
+    eigvals, eigvects = eigsh(gram, k=k, v0=v0)
+    order = np.argsort(eigvals)[::-1]
+    return eigvects[:, order], eigvals[order]
+
+
+def safe_inverse(x):
+    """
+    Computes the elementwise inverse of an array, with 0 in place of the inverse of non-positive entries.
+    """
+    inv = np.zeros_like(x, dtype=float)
+    np.divide(1, x, out=inv, where=x > 0)
+    return inv
+
+
+def align_signs(vects, ref_vects):
+    """
+    Flips the sign of each column of `vects` that points away from the corresponding column of `ref_vects`. Singular
+    vectors are only determined up to sign; this keeps the orientation of a previous basis, so that representations
+    (and models fit on them, such as k-means centroids) remain comparable across updates.
+    """
+    signs = np.sign(np.sum(vects * ref_vects, axis=0))
+    signs[signs == 0] = 1
+    return vects * signs
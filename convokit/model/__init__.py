@@ -4,6 +4,7 @@ from .convoKitMatrix import ConvoKitMatrix
 from .corpus import Corpus
 from .corpusComponent import CorpusComponent
 from .corpus_helpers import *
+from .shardedCorpus import ShardedCorpus
 from .speaker import Speaker
 from .utterance import Utterance
 from .utteranceNode import UtteranceNode
@@ -1,9 +1,31 @@
 from typing import Optional, List
 from abc import ABCMeta, abstractmethod
-from pymongo import MongoClient
-from pymongo.database import Database
-import bson
+from collections import OrderedDict, defaultdict
+import os
 import pickle
+import sqlite3
+import sys
+import tempfile
+import weakref
+
+
+class ChangeLog:
+    """
+    Records the changes made to the data of a Corpus since it was loaded from, or last fully dumped to, a directory,
+    so that Corpus.dump(incremental=True) can write only what changed.
+
+    :ivar meta_fields: for each object type, the metadata fields that were written to
+    :ivar component_vectors: the object types whose components' lists of vectors changed
+    :ivar vector_matrices: the names of the vector matrices that were set
+    :ivar full_dump_needed: whether there were other changes (e.g., components added or removed, or metadata
+        fields deleted), which only a full dump can write
+    """
+
+    def __init__(self):
+        self.meta_fields = defaultdict(set)
+        self.component_vectors = set()
+        self.vector_matrices = set()
+        self.full_dump_needed = False
 
 
 class BackendMapper(metaclass=ABCMeta):
@@ -20,6 +42,28 @@ class BackendMapper(metaclass=ABCMeta):
         # concrete data backend (i.e., collections) for each component type
         # this will be assigned in subclasses
         self.data = {"utterance": None, "conversation": None, "speaker": None, "meta": None}
+        # changes are only recorded once the owner Corpus has a dumped copy to compare against
+        self.change_log: Optional[ChangeLog] = None
+        # incremented on every change recorded by record_other_change (e.g., changes to component data such as
+        # utterance texts, or components added or removed), so that caches of derived data can tell they are stale
+        self.version = 0
+
+    def record_meta_change(self, obj_type: str, field: str):
+        if self.change_log is not None:
+            self.change_log.meta_fields[obj_type].add(field)
+
+    def record_vectors_change(self, obj_type: str):
+        if self.change_log is not None:
+            self.change_log.component_vectors.add(obj_type)
+
+    def record_matrix_change(self, name: str):
+        if self.change_log is not None:
+            self.change_log.vector_matrices.add(name)
+
+    def record_other_change(self):
+        self.version += 1
+        if self.change_log is not None:
+            self.change_log.full_dump_needed = True
 
     @abstractmethod
     def get_collection_ids(self, component_type: str):
@@ -80,6 +124,21 @@ class BackendMapper(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    def bulk_update_data(
+        self,
+        component_type: str,
+        property_name: str,
+        values: dict,
+        index=None,
+    ):
+        """
+        Set or update the property data for many components of type component_type
+        at once, where values maps each component id to its new value. Subclasses
+        may override this to write all the values in a single operation.
+        """
+        for component_id, new_value in values.items():
+            self.update_data(component_type, component_id, property_name, new_value, index)
+
     @abstractmethod
     def delete_data(
         self, component_type: str, component_id: str, property_name: Optional[str] = None
@@ -91,6 +150,16 @@ class BackendMapper(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    def bulk_delete_data(self, component_type: str, component_ids):
+        """
+        Delete the entire data entries of many components of type component_type
+        at once, skipping ids that have no entry. Subclasses may override this to
+        delete all the entries in a single operation.
+        """
+        for component_id in component_ids:
+            if self.has_data_for_component(component_type, component_id):
+                self.delete_data(component_type, component_id)
+
     @abstractmethod
     def clear_all_data(self):
         """
@@ -134,18 +203,152 @@ class BackendMapper(metaclass=ABCMeta):
                     self.delete_data(obj_type, obj_id)
 
 
+# marks the entries of a column that are not set
+_MISSING = object()
+
+
+class _DictCollection(dict):
+    """
+    MemMapper collection that stores each entry as a dict of its own (used for metadata, whose attributes differ
+    across object types). Empty entries are stored as None until they are first written to, since most
+    components never get metadata.
+    """
+
+    def get_entry(self, component_id: str) -> dict:
+        entry = self[component_id]
+        if entry is None:
+            entry = self[component_id] = {}
+        return entry
+
+    def get_value(self, component_id: str, property_name: str):
+        entry = self[component_id]
+        if entry is None:
+            raise KeyError(property_name)
+        return entry[property_name]
+
+    def set_entry(self, component_id: str, entry: dict):
+        self[component_id] = entry if len(entry) > 0 else None
+
+    def set_value(self, component_id: str, property_name: str, value):
+        self.get_entry(component_id)[property_name] = value
+
+    def delete_entry(self, component_id: str):
+        del self[component_id]
+
+    def delete_value(self, component_id: str, property_name: str):
+        del self.get_entry(component_id)[property_name]
+
+
+class _ColumnarCollection:
+    """
+    Compact MemMapper collection for the data of corpus components: each component is a row, and each property
+    (e.g., the text of utterances) is a column, i.e., a list holding the property's value for every row. A
+    component thus costs a slot per property instead of a dict of its own. Component ids, and the ids stored in
+    their properties (e.g., speaker_id), are interned, so that each distinct id string is only stored once.
+    """
+
+    _ID_PROPERTIES = {"speaker_id", "conversation_id", "reply_to"}
+
+    def __init__(self):
+        self.rows = dict()
+        self.ids = []
+        self.columns = dict()
+        self._free_rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, component_id):
+        return component_id in self.rows
+
+    def keys(self):
+        return self.rows.keys()
+
+    def _get_row(self, component_id: str) -> int:
+        return self.rows[component_id]
+
+    def get_entry(self, component_id: str) -> dict:
+        row = self._get_row(component_id)
+        return {
+            key: column[row] for key, column in self.columns.items() if column[row] is not _MISSING
+        }
+
+    def get_value(self, component_id: str, property_name: str):
+        column = self.columns.get(property_name)
+        value = column[self._get_row(component_id)] if column is not None else _MISSING
+        if value is _MISSING:
+            raise KeyError(property_name)
+        return value
+
+    def set_entry(self, component_id: str, entry: dict):
+        row = self.rows.get(component_id)
+        if row is None:
+            if type(component_id) is str:
+                component_id = sys.intern(component_id)
+            if len(self._free_rows) > 0:
+                row = self._free_rows.pop()
+                self.ids[row] = component_id
+            else:
+                row = len(self.ids)
+                self.ids.append(component_id)
+                for column in self.columns.values():
+                    column.append(_MISSING)
+            self.rows[component_id] = row
+        else:
+            for column in self.columns.values():
+                column[row] = _MISSING
+        for property_name, value in entry.items():
+            self._set(row, property_name, value)
+
+    def set_value(self, component_id: str, property_name: str, value):
+        self._set(self._get_row(component_id), property_name, value)
+
+    def _set(self, row: int, property_name: str, value):
+        column = self.columns.get(property_name)
+        if column is None:
+            column = self.columns[property_name] = [_MISSING] * len(self.ids)
+        if property_name in self._ID_PROPERTIES and type(value) is str:
+            value = sys.intern(value)
+        column[row] = value
+
+    def delete_entry(self, component_id: str):
+        row = self.rows.pop(component_id)
+        self.ids[row] = None
+        for column in self.columns.values():
+            column[row] = _MISSING
+        self._free_rows.append(row)
+
+    def delete_value(self, component_id: str, property_name: str):
+        # raises KeyError if the property is not set
+        self.get_value(component_id, property_name)
+        self.columns[property_name][self._get_row(component_id)] = _MISSING
+
+
 class MemMapper(BackendMapper):
     """
     Concrete BackendMapper implementation for in-memory data storage.
-    Collections are implemented as vanilla Python dicts.
+    The data of utterances, conversations, and speakers are stored in compact columnar
+    collections (a list per property, indexed by row); metadata are stored in vanilla
+    Python dicts.
     """
 
     def __init__(self):
         super().__init__()
+        self._initialize_collections()
 
-        # initialize component collections as dicts
+    def _initialize_collections(self):
         for key in self.data:
-            self.data[key] = {}
+            self.data[key] = _DictCollection() if key == "meta" else _ColumnarCollection()
+
+    def _get_existing_collection(self, component_type: str, component_id: str):
+        collection = self.get_collection(component_type)
+        # don't create new entries if the ID is not found; this is supposed to be handled in the
+        # CorpusComponent constructor so if the ID is missing that indicates something is wrong
+        if component_id not in collection:
+            raise KeyError(
+                f"This BackendMapper does not have an entry for the {component_type} with id {component_id}."
+            )
+        return collection
 
     def get_collection_ids(self, component_type: str):
         return list(self.get_collection(component_type).keys())
@@ -159,7 +362,7 @@ class MemMapper(BackendMapper):
     ):
         collection = self.get_collection(component_type)
         if overwrite or not self.has_data_for_component(component_type, component_id):
-            collection[component_id] = initial_value if initial_value is not None else {}
+            collection.set_entry(component_id, initial_value if initial_value is not None else {})
 
     def get_data(
         self,
@@ -168,15 +371,17 @@ class MemMapper(BackendMapper):
         property_name: Optional[str] = None,
         index=None,
     ):
-        collection = self.get_collection(component_type)
-        if component_id not in collection:
-            raise KeyError(
-                f"This BackendMapper does not have an entry for the {component_type} with id {component_id}."
-            )
+        """
+        As in BackendMapper.get_data. Without property_name, the dict returned for an utterance,
+        conversation, or speaker is a copy assembled from the columns of its collection (as
+        with DBMapper, where it is read from the DB), so changes to it are not stored; use
+        update_data instead. Metadata are returned as the stored dict.
+        """
+        collection = self._get_existing_collection(component_type, component_id)
         if property_name is None:
-            return collection[component_id]
+            return collection.get_entry(component_id)
         else:
-            return collection[component_id][property_name]
+            return collection.get_value(component_id, property_name)
 
     def update_data(
         self,
@@ -186,31 +391,37 @@ class MemMapper(BackendMapper):
         new_value,
         index=None,
     ):
-        collection = self.get_collection(component_type)
-        # don't create new collections if the ID is not found; this is supposed to be handled in the
-        # CorpusComponent constructor so if the ID is missing that indicates something is wrong
-        if component_id not in collection:
-            raise KeyError(
-                f"This BackendMapper does not have an entry for the {component_type} with id {component_id}."
-            )
-        collection[component_id][property_name] = new_value
+        collection = self._get_existing_collection(component_type, component_id)
+        collection.set_value(component_id, property_name, new_value)
+
+    def bulk_update_data(
+        self,
+        component_type: str,
+        property_name: str,
+        values: dict,
+        index=None,
+    ):
+        for component_id, new_value in values.items():
+            collection = self._get_existing_collection(component_type, component_id)
+            collection.set_value(component_id, property_name, new_value)
 
     def delete_data(
         self, component_type: str, component_id: str, property_name: Optional[str] = None
     ):
-        collection = self.get_collection(component_type)
-        if component_id not in collection:
-            raise KeyError(
-                f"This BackendMapper does not have an entry for the {component_type} with id {component_id}."
-            )
+        collection = self._get_existing_collection(component_type, component_id)
         if property_name is None:
-            del collection[component_id]
+            collection.delete_entry(component_id)
         else:
-            del collection[component_id][property_name]
+            collection.delete_value(component_id, property_name)
+
+    def bulk_delete_data(self, component_type: str, component_ids):
+        collection = self.get_collection(component_type)
+        for component_id in component_ids:
+            if component_id in collection:
+                collection.delete_entry(component_id)
 
     def clear_all_data(self):
-        for key in self.data:
-            self.data[key] = {}
+        self._initialize_collections()
 
     def count_entries(self, component_type: str):
         return len(self.get_collection(component_type))
@@ -224,6 +435,8 @@ class DBMapper(BackendMapper):
 
     def __init__(self, collection_prefix, db_host: Optional[str] = None):
         super().__init__()
+        # imported here so that pymongo is only loaded when a database-backed corpus is used
+        from pymongo import MongoClient
 
         self.collection_prefix = collection_prefix
         self.client = MongoClient(db_host)
@@ -302,11 +515,40 @@ class DBMapper(BackendMapper):
         data = self.get_data(component_type, component_id)
         if index is not None and index.get(property_name, None) == ["bin"]:
             # non-serializable types must go through pickling then be encoded as bson.Binary
+            import bson
+
             new_value = bson.Binary(pickle.dumps(new_value))
         data[property_name] = new_value
         collection = self.get_collection(component_type)
         collection.update_one({"_id": component_id}, {"$set": data})
 
+    def bulk_update_data(
+        self,
+        component_type: str,
+        property_name: str,
+        values: dict,
+        index=None,
+    ):
+        import bson
+        from pymongo import UpdateOne
+
+        is_bin = index is not None and index.get(property_name, None) == ["bin"]
+        operations = [
+            UpdateOne(
+                {"_id": component_id},
+                {
+                    "$set": {
+                        property_name: (
+                            bson.Binary(pickle.dumps(new_value)) if is_bin else new_value
+                        )
+                    }
+                },
+            )
+            for component_id, new_value in values.items()
+        ]
+        if len(operations) > 0:
+            self.get_collection(component_type).bulk_write(operations)
+
     def delete_data(
         self, component_type: str, component_id: str, property_name: Optional[str] = None
     ):
@@ -318,6 +560,13 @@ class DBMapper(BackendMapper):
             # delete only the specified property
             collection.update_one({"_id": component_id}, {"$unset": {property_name: ""}})
 
+    def bulk_delete_data(self, component_type: str, component_ids):
+        collection = self.get_collection(component_type)
+        component_ids = list(component_ids)
+        # delete in batches, to keep each query document well under the BSON size limit
+        for start in range(0, len(component_ids), 10000):
+            collection.delete_many({"_id": {"$in": component_ids[start : start + 10000]}})
+
     def clear_all_data(self):
         for key in self.data:
             self.data[key].drop()
@@ -325,3 +574,230 @@ class DBMapper(BackendMapper):
 
     def count_entries(self, component_type: str):
         return self.get_collection(component_type).estimated_document_count()
+
+
+def _close_and_remove_database(connection, filename):
+    try:
+        connection.close()
+    finally:
+        # remove the files even if the connection could not be closed
+        for path in [filename, filename + "-wal", filename + "-shm"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# types of values that cannot be changed in place, so that DiskMapper can hand them out without writing them back
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+
+class DiskMapper(BackendMapper):
+    """
+    Concrete BackendMapper implementation for disk-backed data storage, for corpora that
+    do not fit in memory and without the need for a database server.
+    Collections are implemented as tables of an SQLite database (in WAL mode) stored in a
+    temporary file, which is deleted along with the DiskMapper; use Corpus.dump() to save
+    the data. Each entry is stored as a pickled dict, so values of any type (including
+    those indexed as "bin") are stored as is.
+
+    The most recently used entries are kept in an in-memory cache, and modified entries
+    are written back to disk in batches. As with MemMapper, a mutable value returned by
+    get_data (e.g., a list in metadata) can be changed in place: its entry is marked as
+    modified when the value is handed out, so that the change is written back even if the
+    entry is evicted from the cache later.
+
+    :param directory: directory to create the database file in; defaults to the system's
+        temporary directory
+    :param name_prefix: prefix of the database file name (e.g., the corpus id)
+    :param cache_size: maximum number of entries to keep in the in-memory cache
+    :param batch_size: number of modified entries to buffer before writing them to disk
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+        cache_size: int = 100000,
+        batch_size: int = 10000,
+    ):
+        super().__init__()
+
+        if directory is not None:
+            directory = os.path.expanduser(directory)
+            os.makedirs(directory, exist_ok=True)
+        fd, self.filename = tempfile.mkstemp(
+            suffix=".sqlite",
+            prefix=(name_prefix + "_") if name_prefix else "convokit_",
+            dir=directory,
+        )
+        os.close(fd)
+        # the finalizer may run on whichever thread garbage-collects the DiskMapper; the connection is never used
+        # concurrently, so it need not be tied to the thread that created it
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # the database is a scratch file that does not outlive the process, so it need not survive crashes
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self._finalizer = weakref.finalize(
+            self, _close_and_remove_database, self.connection, self.filename
+        )
+
+        self.cache_size = max(1, cache_size)
+        self.batch_size = max(1, batch_size)
+        # maps (component_type, component_id) to the entry's data, or to None if it has no entry
+        self._cache = OrderedDict()
+        self._dirty = set()
+
+        # initialize component collections as tables, named after the component types
+        for key in self.data:
+            self.connection.execute(
+                f'CREATE TABLE "{key}" (id TEXT PRIMARY KEY, data BLOB) WITHOUT ROWID'
+            )
+            self.data[key] = key
+        self.connection.commit()
+
+    def _load(self, component_type: str, component_id: str) -> Optional[dict]:
+        key = (component_type, component_id)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        row = self.connection.execute(
+            f'SELECT data FROM "{self.get_collection(component_type)}" WHERE id = ?',
+            (component_id,),
+        ).fetchone()
+        entry = pickle.loads(row[0]) if row is not None else None
+        self._cache[key] = entry
+        self._evict()
+        return entry
+
+    def _store(self, component_type: str, component_id: str, entry: Optional[dict]):
+        """
+        Sets the data of an entry in the cache (None deletes the entry), to be written to disk later.
+        """
+        key = (self.get_collection(component_type), component_id)
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        self._dirty.add(key)
+        if len(self._dirty) >= self.batch_size:
+            self.flush()
+        self._evict()
+
+    def _evict(self):
+        while len(self._cache) > self.cache_size:
+            if next(iter(self._cache)) in self._dirty:
+                self.flush()
+            self._cache.popitem(last=False)
+
+    def flush(self):
+        """
+        Write all modified entries to disk.
+        """
+        if len(self._dirty) == 0:
+            return
+        upserts, deletes = dict(), dict()
+        for component_type, component_id in self._dirty:
+            entry = self._cache[(component_type, component_id)]
+            if entry is None:
+                deletes.setdefault(component_type, []).append((component_id,))
+            else:
+                upserts.setdefault(component_type, []).append(
+                    (component_id, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+                )
+        with self.connection:
+            for component_type, rows in upserts.items():
+                self.connection.executemany(
+                    f'INSERT OR REPLACE INTO "{component_type}" (id, data) VALUES (?, ?)', rows
+                )
+            for component_type, rows in deletes.items():
+                self.connection.executemany(f'DELETE FROM "{component_type}" WHERE id = ?', rows)
+        self._dirty.clear()
+
+    def close(self):
+        """
+        Close the database and delete its file. The DiskMapper can no longer be used afterwards.
+        """
+        self._finalizer()
+
+    def get_collection_ids(self, component_type: str):
+        self.flush()
+        return [
+            row[0]
+            for row in self.connection.execute(
+                f'SELECT id FROM "{self.get_collection(component_type)}"'
+            )
+        ]
+
+    def has_data_for_component(self, component_type: str, component_id: str) -> bool:
+        return self._load(component_type, component_id) is not None
+
+    def initialize_data_for_component(
+        self, component_type: str, component_id: str, overwrite: bool = False, initial_value=None
+    ):
+        if overwrite or not self.has_data_for_component(component_type, component_id):
+            self._store(
+                component_type,
+                component_id,
+                dict(initial_value) if initial_value is not None else {},
+            )
+
+    def _get_entry(self, component_type: str, component_id: str) -> dict:
+        entry = self._load(component_type, component_id)
+        if entry is None:
+            raise KeyError(
+                f"This BackendMapper does not have an entry for the {component_type} with id {component_id}."
+            )
+        return entry
+
+    def get_data(
+        self,
+        component_type: str,
+        component_id: str,
+        property_name: Optional[str] = None,
+        index=None,
+    ):
+        entry = self._get_entry(component_type, component_id)
+        if property_name is None:
+            # return a copy, since changes to the entry must go through update_data to be saved
+            return dict(entry)
+        value = entry[property_name]
+        if not isinstance(value, _IMMUTABLE_TYPES):
+            # the value may be changed in place, so the entry must be written back when it is evicted
+            self._store(component_type, component_id, entry)
+        return value
+
+    def update_data(
+        self,
+        component_type: str,
+        component_id: str,
+        property_name: str,
+        new_value,
+        index=None,
+    ):
+        entry = self._get_entry(component_type, component_id)
+        entry[property_name] = new_value
+        self._store(component_type, component_id, entry)
+
+    def delete_data(
+        self, component_type: str, component_id: str, property_name: Optional[str] = None
+    ):
+        entry = self._get_entry(component_type, component_id)
+        if property_name is None:
+            self._store(component_type, component_id, None)
+        else:
+            del entry[property_name]
+            self._store(component_type, component_id, entry)
+
+    def bulk_delete_data(self, component_type: str, component_ids):
+        for component_id in component_ids:
+            self._store(component_type, component_id, None)
+
+    def clear_all_data(self):
+        self._cache.clear()
+        self._dirty.clear()
+        with self.connection:
+            for key in self.data:
+                self.connection.execute(f'DELETE FROM "{key}"')
+
+    def count_entries(self, component_type: str):
+        self.flush()
+        return self.connection.execute(
+            f'SELECT COUNT(*) FROM "{self.get_collection(component_type)}"'
+        ).fetchone()[0]
@@ -23,6 +23,8 @@ class Conversation(CorpusComponent):
         conversation-level metadata.
     """
 
+    __slots__ = ("_utterance_ids", "_speaker_ids", "tree")
+
     def __init__(
         self,
         owner,
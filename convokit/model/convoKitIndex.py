@@ -102,6 +102,25 @@ class ConvoKitIndex:
 
         self.version = meta_index["version"]
 
+    def merge_from(self, other: "ConvoKitIndex"):
+        """
+        Add the metadata types recorded in another index to this one, as needed when combining the
+        metadata of two corpora. "bin" takes precedence over any other type.
+
+        :param other: ConvoKitIndex to merge into this one
+        :return: None
+        """
+        for obj_type, other_index in other.indices.items():
+            index = self.indices[obj_type]
+            for key, class_types in other_index.items():
+                if key not in index:
+                    index[key] = list(class_types)
+                elif index[key] != ["bin"]:
+                    if class_types == ["bin"]:
+                        index[key] = ["bin"]
+                    else:
+                        index[key].extend(t for t in class_types if t not in index[key])
+
     def to_dict(self, exclude_vectors: List[str] = None, force_version=None):
         retval = dict()
         retval["utterances-index"] = self.utterances_index
@@ -1,9 +1,12 @@
 import pandas as pd
 from typing import Optional, List
+import json
 import pickle
 import os
+import shutil
 import numpy as np
 from convokit.util import warn
+from .nearestNeighborIndex import NearestNeighborIndex
 from scipy.sparse import issparse, csr_matrix, hstack, vstack
 import scipy
 
@@ -24,6 +27,7 @@ class ConvoKitMatrix:
     :ivar columns: names corresponding to columns
     :ivar ids_to_idx: a mapping from id to the row index
     :ivar cols_to_idx: a mapping from column name to the column index
+    :ivar index: nearest-neighbor index over the rows of the matrix, if one was built with `build_index()`
     """
 
     def __init__(
@@ -36,6 +40,7 @@ class ConvoKitMatrix:
         self.columns = np.arange(matrix.shape[1]) if columns is None else columns
         self.ids_to_idx = {id: idx for idx, id in enumerate(self.ids)}
         self.cols_to_idx = {col: idx for idx, col in enumerate(self.columns)}
+        self.index = None
         self._initialization_checks()
 
     @property
@@ -47,6 +52,8 @@ class ConvoKitMatrix:
         if isinstance(value, np.ndarray) or isinstance(value, scipy.sparse.csr.csr_matrix):
             self._matrix = value
             self._sparse = isinstance(value, scipy.sparse.csr.csr_matrix)
+            # an index built over the previous matrix no longer matches it
+            self.index = None
         else:
             raise ValueError("Matrix must be a numpy ndarray or a scipy csr_matrix.")
 
@@ -72,6 +79,80 @@ class ConvoKitMatrix:
                 "length of ids and/or columns".format(self.matrix.shape)
             )
 
+    def __getstate__(self):
+        # lookup indices are rebuilt on demand, so there is no need to store them; nearest-neighbor indices are
+        # stored separately by dump()
+        state = self.__dict__.copy()
+        state.pop("_index_cache", None)
+        state["index"] = None
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("index", None)
+        self.__dict__.update(state)
+
+    def _get_index(self, keys_attr: str):
+        """
+        Gets (building it if needed) a sorted array of the matrix's ids or columns, along with the row or column
+        index of each sorted entry, for vectorized lookups. Returns None if the ids or columns can't be sorted.
+        """
+        keys = getattr(self, keys_attr)
+        cache = self.__dict__.setdefault("_index_cache", {})
+        if keys_attr not in cache or cache[keys_attr][0] is not keys:
+            keys_arr = np.asarray(keys)
+            index = None
+            if keys_arr.ndim == 1 and keys_arr.dtype != object:
+                order = np.argsort(keys_arr, kind="stable")
+                index = (keys_arr[order], order)
+            cache[keys_attr] = (keys, index)
+        return cache[keys_attr][1]
+
+    def _lookup(self, keys_attr: str, query) -> np.ndarray:
+        """
+        Maps a list of ids (if `keys_attr` is "ids") or column names (if `keys_attr` is "columns") to their row or
+        column indices in the matrix.
+        """
+        query_arr = np.asarray(query)
+        if len(query_arr) == 0:
+            return np.zeros(0, dtype=np.int64)
+        index = self._get_index(keys_attr)
+        if index is not None:
+            sorted_keys, order = index
+            try:
+                pos = np.searchsorted(sorted_keys, query_arr)
+            except TypeError:
+                pos = None
+            if pos is not None:
+                pos = np.minimum(pos, len(sorted_keys) - 1)
+                found = sorted_keys[pos] == query_arr
+                if np.all(found):
+                    return order[pos]
+                raise KeyError(query_arr[~found][0].item())
+        lookup = self.ids_to_idx if keys_attr == "ids" else self.cols_to_idx
+        return np.array([lookup[key] for key in query], dtype=np.int64)
+
+    def _submatrix(self, ids: Optional[List[str]] = None, columns: Optional[List[str]] = None):
+        """
+        Gets the rows and columns of the matrix corresponding to `ids` and `columns` (all by default), in the same
+        storage type (dense or sparse) as the matrix.
+        """
+        matrix = self.matrix
+        if ids is None and columns is None:
+            return matrix.copy()
+        row_indices = None if ids is None else self._lookup("ids", ids)
+        col_indices = None if columns is None else self._lookup("columns", columns)
+        if issparse(matrix):
+            if row_indices is not None:
+                matrix = matrix[row_indices]
+            if col_indices is not None:
+                matrix = matrix[:, col_indices]
+            return matrix
+        if row_indices is None:
+            return matrix[:, col_indices]
+        if col_indices is None:
+            return matrix[row_indices]
+        return matrix[np.ix_(row_indices, col_indices)]
+
     def get_vectors(
         self,
         ids: Optional[List[str]] = None,
@@ -86,17 +167,58 @@ class ConvoKitMatrix:
             by default.
         :return: a vector matrix (either np.ndarray or csr_matrix) or a pandas dataframe
         """
-        ids = self.ids if ids is None else ids
-        id_indices = [self.ids_to_idx[id] for id in ids]
+        submatrix = self._submatrix(ids, columns)
+        if not as_dataframe:
+            return submatrix
+        else:
+            mat = submatrix.toarray() if issparse(submatrix) else submatrix
+            return pd.DataFrame(
+                mat,
+                index=self.ids if ids is None else ids,
+                columns=self.columns if columns is None else columns,
+            )
 
-        cols = self.columns if columns is None else columns
-        col_indices = [self.cols_to_idx[col] for col in cols]
+    def build_index(self, metric: str = "cosine", method: str = "exact", **kwargs):
+        """
+        Builds a nearest-neighbor index over the rows of the matrix, for use by `nearest()`. The index is kept up to
+        date when the matrix is extended with `vstack()`, and is written along with the matrix by `dump()`.
+
+        :param metric: "cosine" (cosine similarity), "dot" (dot product) or "euclidean" (euclidean distance)
+        :param method: "exact" for brute-force search, or "lsh" for approximate search with locality-sensitive
+            hashing, which only scores the rows that hash to the same bucket as the query
+        :param kwargs: other parameters of the index (n_bits, n_tables, block_size, random_state); see
+            NearestNeighborIndex
+        :return: the NearestNeighborIndex
+        """
+        self.index = NearestNeighborIndex(self.matrix, metric=metric, method=method, **kwargs)
+        return self.index
 
-        if not as_dataframe:
-            return self.matrix[id_indices][:, col_indices]
+    def nearest(self, id_or_vector, k: int = 10) -> List[tuple]:
+        """
+        Finds the rows of the matrix nearest to a query, using the index built by `build_index()` (an exact cosine
+        index is built if there is none).
+
+        :param id_or_vector: id of a row of the matrix, or a query vector. When a row id is given, the row itself is
+            excluded from the results.
+        :param k: number of neighbors to return
+        :return: list of up to k (id, score) tuples, from nearest to farthest, where the score is the cosine
+            similarity, dot product or euclidean distance of the row to the query, depending on the index's metric
+        """
+        if self.index is None:
+            self.build_index()
+        exclude = None
+        if np.ndim(id_or_vector) == 0:
+            exclude = self._lookup("ids", [id_or_vector])[0]
+            query = self.matrix[exclude]
         else:
-            mat = self.matrix.toarray() if issparse(self.matrix) else self.matrix
-            return pd.DataFrame(mat[id_indices][:, col_indices], index=ids, columns=cols)
+            query = id_or_vector
+        rows, scores = self.index.query(query, k=k if exclude is None else k + 1)
+        neighbors = [
+            (self.ids[row], float(score))
+            for row, score in zip(rows[0], scores[0])
+            if row != exclude
+        ]
+        return neighbors[:k]
 
     def to_dict(self):
         if self.columns is None:
@@ -135,14 +257,25 @@ class ConvoKitMatrix:
             return retval
 
     @staticmethod
-    def from_dir(dirpath, matrix_name):
+    def from_dir(dirpath, matrix_name, mmap_mode: Optional[str] = "c"):
         """
         Initialize a ConvoKitMatrix of the specified `matrix_name` from a specified directory `dirpath`.
 
+        Matrices written by `dump()` are stored as raw arrays in a "vectors.[name]" subdirectory, and are
+        memory-mapped rather than read into memory: only the rows that are accessed get loaded, and processes that
+        load the same matrix share a single page-cached copy. Matrices in the pickle format of earlier versions
+        ("vectors.[name].p") are read fully into memory.
+
         :param dirpath: path to Corpus directory
         :param matrix_name: name of vector matrix
+        :param mmap_mode: mode to memory-map the matrix arrays with (see numpy.load); by default "c" (copy-on-write),
+            so that changes to the matrix are kept in memory and never written back to disk. Set to None to read the
+            full matrix into memory.
         :return: the initialized ConvoKitMatrix
         """
+        array_dir = os.path.join(dirpath, "vectors.{}".format(matrix_name))
+        if os.path.isdir(array_dir):
+            return ConvoKitMatrix._from_array_dir(array_dir, mmap_mode)
         try:
             with open(os.path.join(dirpath, "vectors.{}.p".format(matrix_name)), "rb") as f:
                 retval: ConvoKitMatrix = pickle.load(f)
@@ -153,21 +286,83 @@ class ConvoKitMatrix:
             warn("Could not find vector with name: {} at {}.".format(matrix_name, dirpath))
             return None
 
-    def dump(self, dirpath):
+    @staticmethod
+    def _from_array_dir(array_dir, mmap_mode):
+        with open(os.path.join(array_dir, "info.json"), "r") as f:
+            info = json.load(f)
+        load = lambda name: np.load(os.path.join(array_dir, name + ".npy"), mmap_mode=mmap_mode)
+        if info["sparse"]:
+            matrix = csr_matrix(
+                (load("data"), load("indices"), load("indptr")), shape=tuple(info["shape"])
+            )
+        else:
+            matrix = load("matrix")
+        retval = ConvoKitMatrix(
+            name=info["name"], matrix=matrix, ids=info["ids"], columns=info["columns"]
+        )
+        index_dir = os.path.join(array_dir, "index")
+        if os.path.isdir(index_dir):
+            retval.index = NearestNeighborIndex.load(index_dir, retval.matrix)
+        return retval
+
+    def dump(self, dirpath, as_pickle: bool = False):
         """
-        Dumps the ConvoKitMatrix as a pickle file.
+        Dumps the ConvoKitMatrix to the Corpus directory. By default, the matrix is written as raw arrays (.npy
+        files for the dense matrix, or for the data, indices and indptr arrays of a sparse matrix) in a
+        "vectors.[name]" subdirectory, with its ids and columns in a sidecar info.json file, so that it can be
+        memory-mapped by `from_dir()`. The nearest-neighbor index, if any, is written to an "index" subdirectory.
 
         :param dirpath: directory path to Corpus
+        :param as_pickle: whether to instead write the pickle format of earlier versions ("vectors.[name].p"),
+            which does not include the nearest-neighbor index
         :return: None
         """
+        array_dir = os.path.join(dirpath, "vectors.{}".format(self.name))
+        pickle_path = os.path.join(dirpath, "vectors.{}.p".format(self.name))
+        if as_pickle:
+            self._dump_pickle(pickle_path)
+            if os.path.isdir(array_dir):
+                shutil.rmtree(array_dir)
+            return
+
+        os.makedirs(array_dir, exist_ok=True)
+        if issparse(self.matrix):
+            matrix = csr_matrix(self.matrix)
+            arrays = {"data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr}
+        else:
+            arrays = {"matrix": np.asarray(self.matrix)}
+        for array_name, array in arrays.items():
+            # write to a temporary file and then rename it, so that a matrix that is currently memory-mapped from
+            # the same file keeps its (old) data
+            tmp_path = os.path.join(array_dir, array_name + ".tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, os.path.join(array_dir, array_name + ".npy"))
+        info = {
+            "name": self.name,
+            "shape": list(self.matrix.shape),
+            "sparse": bool(issparse(self.matrix)),
+            "ids": np.asarray(self.ids).tolist(),
+            "columns": np.asarray(self.columns).tolist(),
+        }
+        with open(os.path.join(array_dir, "info.json"), "w") as f:
+            json.dump(info, f)
+        index_dir = os.path.join(array_dir, "index")
+        if self.index is not None:
+            self.index.dump(index_dir)
+        elif os.path.isdir(index_dir):
+            shutil.rmtree(index_dir)
+        if os.path.exists(pickle_path):
+            os.remove(pickle_path)
+
+    def _dump_pickle(self, filepath):
         if not issparse(self.matrix):
-            temp = self.matrix
+            temp, index = self.matrix, self.index
             self.matrix = csr_matrix(self.matrix)
-            with open(os.path.join(dirpath, "vectors.{}.p".format(self.name)), "wb") as f:
+            with open(filepath, "wb") as f:
                 pickle.dump(self, f)
-            self.matrix = temp
+            self.matrix, self.index = temp, index
         else:
-            with open(os.path.join(dirpath, "vectors.{}.p".format(self.name)), "wb") as f:
+            with open(filepath, "wb") as f:
                 pickle.dump(self, f)
 
     def subset(self, ids: Optional[List[str]] = None, columns: Optional[List[str]] = None):
@@ -177,15 +372,12 @@ class ConvoKitMatrix:
         :param columns: list of columns to be included in the subset; all by default
         :return: a new ConvoKitMatrix object with the subset of
         """
-        ids = ids if ids is not None else self.ids
-        columns = columns if columns is not None else self.columns
-
-        submatrix = self.to_dataframe().loc[ids][columns]
+        submatrix = self._submatrix(ids, columns)
         return ConvoKitMatrix(
             name=self.name,
-            matrix=csr_matrix(submatrix.values.astype("float64")),
-            ids=ids,
-            columns=columns,
+            matrix=submatrix,
+            ids=ids if ids is not None else self.ids,
+            columns=columns if columns is not None else self.columns,
         )
 
     @staticmethod
@@ -209,8 +401,9 @@ class ConvoKitMatrix:
     @staticmethod
     def vstack(name: str, matrices: List["ConvoKitMatrix"]):
         """
-        Combines multiple ConvoKitMatrices into a single ConvoKitMatrix by stacking them horizontally (i.e. each
-        constituent matrix must have the same columns).
+        Combines multiple ConvoKitMatrices into a single ConvoKitMatrix by stacking them vertically (i.e. each
+        constituent matrix must have the same columns). If the first matrix has a nearest-neighbor index, the new
+        matrix gets an index extended with the rows of the other matrices.
 
         :param name: name of new matrix
         :param matrices: constituent ConvoKiMatrices
@@ -222,7 +415,10 @@ class ConvoKitMatrix:
         for m in matrices:
             ids.extend(list(m.ids))
 
-        return ConvoKitMatrix(name=name, matrix=stacked, ids=ids, columns=matrices[0].columns)
+        retval = ConvoKitMatrix(name=name, matrix=stacked, ids=ids, columns=matrices[0].columns)
+        if matrices[0].index is not None:
+            retval.index = matrices[0].index.extend(stacked)
+        return retval
 
     def __repr__(self):
         return "ConvoKitMatrix('name': {}, 'matrix': {})".format(self.name, repr(self.matrix))
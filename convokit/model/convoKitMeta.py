@@ -17,6 +17,8 @@ class ConvoKitMeta(MutableMapping, dict):
     ConvoKitMeta is a dictlike object that stores the metadata attributes of a corpus component
     """
 
+    __slots__ = ("owner", "index", "obj_type")
+
     def __init__(self, owner, convokit_index, obj_type, overwrite=False):
         self.owner = owner  # Corpus or CorpusComponent
         self.index: ConvoKitIndex = convokit_index
@@ -25,6 +27,8 @@ class ConvoKitMeta(MutableMapping, dict):
         self._get_backend().initialize_data_for_component(
             "meta", self.backend_key, overwrite=overwrite
         )
+        if overwrite:
+            self._get_backend().record_other_change()
 
     @property
     def backend_key(self) -> str:
@@ -85,6 +89,7 @@ class ConvoKitMeta(MutableMapping, dict):
         self._get_backend().update_data(
             "meta", self.backend_key, key, value, self.index.get_index(self.obj_type)
         )
+        self._get_backend().record_meta_change(self.obj_type, key)
 
     def __delitem__(self, key):
         if self.obj_type == "corpus":
@@ -102,6 +107,7 @@ class ConvoKitMeta(MutableMapping, dict):
                 )
             else:
                 self._get_backend().delete_data("meta", self.backend_key, key)
+                self._get_backend().record_other_change()
 
     def __iter__(self):
         return (
@@ -147,6 +153,7 @@ class ConvoKitMeta(MutableMapping, dict):
         self._get_backend().initialize_data_for_component(
             "meta", self.backend_key, overwrite=True, initial_value=other
         )
+        self._get_backend().record_other_change()
 
 
 _basic_types = {type(0), type(1.0), type("str"), type(True)}  # cannot include lists or dicts
@@ -1,16 +1,39 @@
+import copy
 import random
 import shutil
-from typing import Collection, Callable, Set, Generator, Tuple, ValuesView, Union
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Collection, Callable, Set, Generator, Iterable, Tuple, ValuesView, Union
 
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 from tqdm import tqdm
 
 from convokit.convokitConfig import ConvoKitConfig
-from convokit.util import create_safe_id
+from convokit.util import create_safe_id, parallel_map
 from .convoKitMatrix import ConvoKitMatrix
+from .corpusComponent import CorpusComponent
 from .corpusUtil import *
 from .corpus_helpers import *
 from .backendMapper import BackendMapper
+from .speakerConvoInfo import SpeakerConvoInfo
+
+# maximum number of (text function, cleaning function) pairs whose texts are memoized by Corpus.get_texts
+_MAX_CACHED_TEXT_FUNCS = 4
+
+
+def _rank_values(values: list) -> np.ndarray:
+    """
+    Maps a list of comparable values (e.g., timestamps or ids) to integer ranks that sort in the same order. None
+    values rank before all other values.
+    """
+    is_none = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    ranks = np.zeros(len(values), dtype=np.int64)
+    if not is_none.all():
+        present = np.array([value for value in values if value is not None])
+        ranks[~is_none] = np.unique(present, return_inverse=True)[1].ravel() + 1
+    return ranks
 
 
 class Corpus:
@@ -38,7 +61,9 @@ class Corpus:
         index.json is already accurate and disabling it will allow for a faster corpus load. This parameter is set to
         True by default, i.e. type-checking is not carried out.
 
-    :param backend: specify the backend type, either “mem” or “db”, default to “mem”.
+    :param backend: specify the backend type, either “mem”, “db”, or “disk”, default to “mem”. The “disk” backend
+        keeps the data in a temporary SQLite file (in the `disk_directory` of the ConvoKit configuration, or the
+        system's temporary directory), with only recently used entries cached in memory.
     :param backend_mapper: (advanced usage only) if provided, use this as the BackendMapper instance instead of initializing a new one.
 
     :ivar meta_index: index of Corpus metadata
@@ -85,6 +110,11 @@ class Corpus:
 
         # private backend
         self._vector_matrices = dict()
+        self._text_cache = OrderedDict()
+        self._text_cache_version = self.backend_mapper.version
+        self._speaker_convo_info = None
+        # the Corpus this Corpus is a view of, if any (see view())
+        self._parent = None
 
         convos_data = defaultdict(dict)
         if exclude_utterance_meta is None:
@@ -96,6 +126,10 @@ class Corpus:
         if exclude_overall_meta is None:
             exclude_overall_meta = []
 
+        if filename is not None:
+            # finish committing a dump that crashed while being swapped in
+            recover_dump_dir(filename)
+
         if filename is not None and backend == "db":
             # JSON-to-DB construction mode uses a specialized code branch, which
             # optimizes for this use case by using direct batch insertions into the
@@ -209,6 +243,21 @@ class Corpus:
                 self.meta_index.enable_type_check()
                 self.update_speakers_data()
 
+        # the directory whose files match this Corpus, up to the changes recorded by the backend's change log
+        self._synced_dirpath = None
+        if filename is not None and os.path.isdir(filename):
+            load_incremental_changes(
+                self,
+                filename,
+                {
+                    "utterance": exclude_utterance_meta,
+                    "conversation": exclude_conversation_meta,
+                    "speaker": exclude_speaker_meta,
+                },
+            )
+            self._synced_dirpath = os.path.abspath(filename)
+            self.backend_mapper.change_log = ChangeLog()
+
     @classmethod
     def reconnect_to_db(cls, db_collection_prefix: str, db_host: Optional[str] = None):
         """
@@ -249,11 +298,18 @@ class Corpus:
         force_version: int = None,
         overwrite_existing_corpus: bool = False,
         fields_to_skip=None,
+        compression: Optional[str] = None,
+        n_jobs: int = 1,
+        incremental: bool = False,
     ) -> None:
         """
         Dumps the corpus and its metadata to disk. Optionally, set `force_version` to a desired integer version number,
         otherwise the version number is automatically incremented.
 
+        The corpus is first written to a temporary directory next to the destination, which is then renamed into
+        place, so that an interrupted dump never leaves a half-written corpus behind. Files of an existing corpus at
+        the destination that are not dumped again (e.g., vectors excluded from the dump) are kept.
+
         :param name: name of corpus
         :param base_path: base directory to save corpus in (None to save to a default directory)
         :param exclude_vectors: list of names of vector matrices to exclude from the dumping step. By default; all
@@ -261,9 +317,28 @@ class Corpus:
         :param force_version: version number to set for the dumped corpus
         :param overwrite_existing_corpus: if True, save to the path you loaded the corpus from, overriding the original corpus.
         :param fields_to_skip: a dictionary of {object type: list of metadata attributes to omit when writing to disk}. object types can be one of "speaker", "utterance", "conversation", "corpus".
+        :param compression: if "gzip" or "zstd", compress the utterance, speaker and conversation files with that
+            codec (zstd requires the zstandard package). Compressed corpora are read transparently by the Corpus
+            constructor.
+        :param n_jobs: number of threads encoding and compressing chunks of the utterance, speaker and conversation
+            files
+        :param incremental: if True and the corpus is being dumped to the directory it was loaded from (or last
+            dumped to), only write what changed since then: each metadata field that was set is written to a sidecar
+            file ("incremental-meta.[obj_type].[field].jsonl"), which the Corpus constructor merges on load, along
+            with the lists of vectors of the components if they changed and the vector matrices that were set. The
+            corpus metadata and index are rewritten. If the corpus changed in other ways (e.g., components were added
+            or removed, or metadata fields deleted), or is dumped elsewhere, a full dump is done instead.
         """
         if fields_to_skip is None:
             fields_to_skip = dict()
+        if compression is not None and compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(
+                "compression must be one of {} or None, not {!r}".format(
+                    list(COMPRESSION_EXTENSIONS), compression
+                )
+            )
+        if n_jobs < 1:
+            raise ValueError("n_jobs must be a positive integer")
         dir_name = name
         if base_path is not None and overwrite_existing_corpus:
             raise ValueError("Not allowed to specify both base_path and overwrite_existing_corpus!")
@@ -283,12 +358,63 @@ class Corpus:
         else:
             dir_name = os.path.join(self.corpus_dirpath)
 
-        if not os.path.exists(dir_name):
-            os.mkdir(dir_name)
+        change_log = self.backend_mapper.change_log
+        incremental = (
+            incremental
+            and change_log is not None
+            and not change_log.full_dump_needed
+            and self._synced_dirpath == os.path.abspath(dir_name)
+        )
 
-        # dump speakers, conversations, utterances
+        tmp_dir_name = make_dump_dir(dir_name)
+        try:
+            self._dump_corpus_files(tmp_dir_name, exclude_vectors, force_version, fields_to_skip)
+            if incremental:
+                dump_incremental_changes(
+                    self,
+                    tmp_dir_name,
+                    dir_name,
+                    change_log,
+                    exclude_vectors,
+                    fields_to_skip,
+                    compression,
+                    n_jobs,
+                )
+                self._dump_vectors(
+                    tmp_dir_name, dir_name, exclude_vectors, only=change_log.vector_matrices
+                )
+                commit_incremental_dump(tmp_dir_name, dir_name)
+            else:
+                self._dump_components(
+                    tmp_dir_name, exclude_vectors, fields_to_skip, compression, n_jobs
+                )
+                self._dump_vectors(tmp_dir_name, dir_name, exclude_vectors)
+                commit_dump_dir(tmp_dir_name, dir_name)
+        except BaseException:
+            shutil.rmtree(tmp_dir_name, ignore_errors=True)
+            raise
+
+        if self._parent is None:
+            # views share their backend with their parent, whose change log must be kept
+            self._synced_dirpath = os.path.abspath(dir_name)
+            self.backend_mapper.change_log = ChangeLog()
+
+    def _dump_components(
+        self, dir_name, exclude_vectors, fields_to_skip, compression, n_jobs
+    ) -> None:
+        """
+        Writes the speakers, conversations and utterances files (with their binary metadata) to dir_name.
+        """
         dump_corpus_component(
-            self, dir_name, "speakers.json", "speaker", "speaker", exclude_vectors, fields_to_skip
+            self,
+            dir_name,
+            "speakers.json",
+            "speaker",
+            "speaker",
+            exclude_vectors,
+            fields_to_skip,
+            compression,
+            n_jobs,
         )
         dump_corpus_component(
             self,
@@ -298,10 +424,15 @@ class Corpus:
             "convo",
             exclude_vectors,
             fields_to_skip,
+            compression,
+            n_jobs,
         )
-        dump_utterances(self, dir_name, exclude_vectors, fields_to_skip)
+        dump_utterances(self, dir_name, exclude_vectors, fields_to_skip, compression, n_jobs)
 
-        # dump corpus
+    def _dump_corpus_files(self, dir_name, exclude_vectors, force_version, fields_to_skip) -> None:
+        """
+        Writes the corpus metadata, index and speaker-conversation info to dir_name.
+        """
         with open(os.path.join(dir_name, "corpus.json"), "w") as f:
             d_bin = defaultdict(list)
             meta_up = dump_helper_bin(self.meta, d_bin, fields_to_skip.get("corpus", None))
@@ -311,7 +442,6 @@ class Corpus:
                 with open(os.path.join(dir_name, name + "-overall-bin.p"), "wb") as f_pk:
                     pickle.dump(l_bin, f_pk)
 
-        # dump index
         with open(os.path.join(dir_name, "index.json"), "w") as f:
             json.dump(
                 self.meta_index.to_dict(
@@ -320,18 +450,36 @@ class Corpus:
                 f,
             )
 
-        # dump vectors
+        speaker_convo_info = self._get_speaker_convo_info()
+        if len(speaker_convo_info) > 0:
+            speaker_convo_info.dump(os.path.join(dir_name, SpeakerConvoInfoFile))
+
+    def _dump_vectors(self, dir_name, final_dir_name, exclude_vectors, only=None) -> None:
+        """
+        Writes the vector matrices (or, if `only` is given, those of them named in `only`) to dir_name, a temporary
+        directory that becomes (or gets merged into) final_dir_name once complete.
+        """
         if exclude_vectors is not None:
             vectors_to_dump = [v for v in self.vectors if v not in set(exclude_vectors)]
         else:
             vectors_to_dump = self.vectors
+        if only is not None:
+            vectors_to_dump = [v for v in vectors_to_dump if v in only]
         for vector_name in vectors_to_dump:
             if vector_name in self._vector_matrices:
                 self._vector_matrices[vector_name].dump(dir_name)
             else:
-                src = os.path.join(self.corpus_dirpath, "vectors.{}.p".format(vector_name))
-                dest = os.path.join(dir_name, "vectors.{}.p".format(vector_name))
-                shutil.copy(src, dest)
+                src = os.path.join(self.corpus_dirpath, "vectors.{}".format(vector_name))
+                if os.path.abspath(src) == os.path.abspath(
+                    os.path.join(final_dir_name, "vectors.{}".format(vector_name))
+                ):
+                    # already at the destination, and kept when the dump is committed
+                    continue
+                dest = os.path.join(dir_name, "vectors.{}".format(vector_name))
+                if os.path.isdir(src):
+                    shutil.copytree(src, dest, dirs_exist_ok=True)
+                else:
+                    shutil.copy(src + ".p", dest + ".p")
 
     # with open(os.path.join(dir_name, "processed_text.index.json"), "w") as f:
     #     json.dump(list(self.processed_text.keys()), f)
@@ -596,41 +744,123 @@ class Corpus:
         assert obj_type in ["speaker", "utterance", "conversation"]
         return [obj.id for obj in self.iter_objs(obj_type, selector)]
 
-    def filter_conversations_by(self, selector: Callable[[Conversation], bool]):
+    def filter_conversations_by(
+        self, selector: Callable[[Conversation], bool], rebuild_index: bool = False
+    ):
         """
         Mutate the corpus by filtering for a subset of Conversations within the Corpus.
 
+        Only the removed objects are visited after selection: their entries are dropped from the backend in bulk,
+        and the metadata index is kept as is, since filtering cannot introduce new metadata types.
+
+        If this Corpus is a view (see `view()`), only the view is narrowed; the parent Corpus is not modified.
+
         :param selector: function for selecting which Conversations to keep
+        :param rebuild_index: whether to rebuild the metadata index from scratch after filtering, which drops the
+            entries of attributes that only the removed objects had
         :return: the mutated Corpus
         """
+        kept_convos, removed_convos = dict(), []
+        for convo_id, convo in self.conversations.items():
+            if selector(convo):
+                kept_convos[convo_id] = convo
+            else:
+                removed_convos.append(convo)
+        self.conversations = kept_convos
+        self._remove_conversations(removed_convos, rebuild_index)
+        return self
 
-        self.conversations = {
-            convo_id: convo for convo_id, convo in self.conversations.items() if selector(convo)
+    def _remove_conversations(
+        self, removed_convos: List[Conversation], rebuild_index: bool = False
+    ):
+        """
+        Helper for filter_conversations_by() and ingest(): removes the Utterances and Speakers of Conversations that
+        were just taken out of self.conversations, visiting only the removed objects.
+        """
+        if len(removed_convos) == 0:
+            return
+
+        removed_utts = [
+            self.utterances[utt_id]
+            for convo in removed_convos
+            for utt_id in convo.get_utterance_ids()
+            if utt_id in self.utterances
+        ]
+        for utt in removed_utts:
+            del self.utterances[utt.id]
+
+        # utterances of a Corpus built from an utterance list may each hold their own Speaker object, so look up the
+        # Corpus's Speaker, which is the one that lists the utterances
+        affected_speakers = {
+            utt.speaker.id: self.speakers[utt.speaker.id]
+            for utt in removed_utts
+            if utt.speaker.id in self.speakers
         }
-        utt_ids = set(
-            [utt for convo in self.conversations.values() for utt in convo.get_utterance_ids()]
-        )
-        self.utterances = {utt.id: utt for utt in self.utterances.values() if utt.id in utt_ids}
-        speaker_ids = set([utt.speaker.id for utt in self.utterances.values()])
-        self.speakers = {
-            speaker.id: speaker for speaker in self.speakers.values() if speaker.id in speaker_ids
+        if self._parent is not None:
+            # components are shared with the parent Corpus, so they can't be modified
+            for speaker_id, speaker in affected_speakers.items():
+                if not any(utt_id in self.utterances for utt_id in speaker.utterances):
+                    self.speakers.pop(speaker_id, None)
+            return
+
+        removed_speakers = []
+        for speaker_id, speaker in affected_speakers.items():
+            speaker.utterances = {
+                utt_id: utt
+                for utt_id, utt in speaker.utterances.items()
+                if utt_id in self.utterances
+            }
+            speaker.conversations = {
+                convo_id: convo
+                for convo_id, convo in speaker.conversations.items()
+                if convo_id in self.conversations
+            }
+            if len(speaker.utterances) == 0 and speaker_id in self.speakers:
+                removed_speakers.append(self.speakers.pop(speaker_id))
+
+        if rebuild_index:
+            self.reinitialize_index()
+
+        self.backend_mapper.record_other_change()
+        # clear the backend entries of the filtered-out components
+        for obj_type, objs in [
+            ("utterance", removed_utts),
+            ("conversation", removed_convos),
+            ("speaker", removed_speakers),
+        ]:
+            self.backend_mapper.bulk_delete_data(obj_type, [obj.id for obj in objs])
+            self.backend_mapper.bulk_delete_data("meta", [obj.meta.backend_key for obj in objs])
+
+    def view(self, conversation_ids: Collection[str]) -> "Corpus":
+        """
+        Get a non-destructive view of a subset of the Conversations in this Corpus, along with their Utterances and
+        Speakers. The view is a Corpus that shares its objects, metadata, metadata index and vectors with this Corpus,
+        so creating it does not copy any data; metadata changes made through the view are visible in this Corpus.
+
+        Filtering a view (`filter_conversations_by()`) only narrows the view further. Other structural changes, such
+        as merging or adding utterances, should be made to a copy of the view instead. Vector matrices cannot be set
+        or deleted through a view, since a matrix covering only the view's objects would replace the parent's;
+        transformers that compute vectors should be run on a copy of the view too. Note that the Speakers of
+        the view still list all of their utterances and conversations in this Corpus.
+
+        :param conversation_ids: ids of the Conversations to include in the view
+        :return: a Corpus view
+        """
+        view = copy.copy(self)
+        view._parent = self
+        view._synced_dirpath = None
+        view.clear_text_cache()
+        view.conversations = {
+            convo_id: self.conversations[convo_id] for convo_id in dict.fromkeys(conversation_ids)
         }
-        self.update_speakers_data()
-        self.reinitialize_index()
-
-        # clear all backend entries corresponding to filtered-out components
-        meta_ids = [self.meta.backend_key]
-        for utt in self.iter_utterances():
-            meta_ids.append(utt.meta.backend_key)
-        for convo in self.iter_conversations():
-            meta_ids.append(convo.meta.backend_key)
-        for speaker in self.iter_speakers():
-            meta_ids.append(speaker.meta.backend_key)
-        self.backend_mapper.purge_obsolete_entries(
-            self.get_utterance_ids(), self.get_conversation_ids(), self.get_speaker_ids(), meta_ids
-        )
-
-        return self
+        view.utterances = dict()
+        view.speakers = dict()
+        for convo in view.conversations.values():
+            for utt_id in convo.get_utterance_ids():
+                utt = self.utterances[utt_id]
+                view.utterances[utt_id] = utt
+                view.speakers[utt.speaker.id] = self.speakers[utt.speaker.id]
+        return view
 
     @staticmethod
     def filter_utterances(source_corpus: "Corpus", selector: Callable[[Utterance], bool]):
@@ -831,8 +1061,26 @@ class Corpus:
         for utt in utts1:
             seen_utts[utt.id] = utt
 
+        Corpus._merge_utterances_into(seen_utts, utts2, warnings)
+        return seen_utts.values()
+
+    @staticmethod
+    def _merge_utterances_into(
+        seen_utts: Dict[str, Utterance], utts: Iterable[Utterance], warnings: bool
+    ) -> None:
+        """
+        Helper function for merge() and merge_many().
+
+        Adds a collection of utterances to a dictionary of Utterance id -> Utterance of the utterances merged so far,
+        with the checks and metadata updates described in _merge_utterances().
+
+        :param seen_utts: dictionary of the utterances merged so far; mutated in place
+        :param utts: collection of Utterances to add
+        :param warnings: whether to print warnings when conflicting data is found.
+        :return: None
+        """
         # Add all the utterances from the other corpus, checking for data sameness and updating metadata as appropriate
-        for utt in utts2:
+        for utt in utts:
             if utt.id in seen_utts:
                 prev_utt = seen_utts[utt.id]
                 if prev_utt == utt:
@@ -860,8 +1108,6 @@ class Corpus:
             else:
                 seen_utts[utt.id] = utt
 
-        return seen_utts.values()
-
     @staticmethod
     def _collect_speaker_data(
         utt_sets: Collection[Collection[Utterance]],
@@ -878,20 +1124,37 @@ class Corpus:
         :param utt_sets: Collections of collections of Utterances to extract Speakers from
         :return: speaker metadata and the corresponding tracker
         """
+        return Corpus._collect_speakers_meta(
+            [(utt.speaker for utt in utt_set) for utt_set in utt_sets]
+        )
+
+    @staticmethod
+    def _collect_speakers_meta(
+        speaker_sets: Iterable[Iterable[Speaker]],
+    ) -> Tuple[Dict[str, Speaker], Dict[str, Dict[str, str]], Dict[str, Dict[str, bool]]]:
+        """
+        Helper function for merge_many() and _collect_speaker_data().
+
+        Collects the Speakers, their metadata and the conflicts in their metadata, as described in
+        _collect_speaker_data(), from collections of Speakers.
+
+        :param speaker_sets: Collections of collections of Speakers, in order of precedence (latest wins)
+        :return: speaker data, speaker metadata and the corresponding conflict tracker
+        """
         # Collect SPEAKER data and metadata
         speakers_data = {}
         speakers_meta = defaultdict(lambda: defaultdict(str))
         speakers_meta_conflict = defaultdict(lambda: defaultdict(bool))
-        for utt_set in utt_sets:
-            for utt in utt_set:
-                if utt.speaker.id not in speakers_data:
-                    speakers_data[utt.speaker.id] = utt.speaker
-                for meta_key, meta_val in utt.speaker.meta.items():
-                    curr = speakers_meta[utt.speaker][meta_key]
+        for speaker_set in speaker_sets:
+            for speaker in speaker_set:
+                if speaker.id not in speakers_data:
+                    speakers_data[speaker.id] = speaker
+                for meta_key, meta_val in speaker.meta.items():
+                    curr = speakers_meta[speaker][meta_key]
                     if curr != meta_val:
                         if curr != "":
-                            speakers_meta_conflict[utt.speaker][meta_key] = True
-                        speakers_meta[utt.speaker][meta_key] = meta_val
+                            speakers_meta_conflict[speaker][meta_key] = True
+                        speakers_meta[speaker][meta_key] = meta_val
 
         return speakers_data, speakers_meta, speakers_meta_conflict
 
@@ -974,14 +1237,42 @@ class Corpus:
         :param warnings: print warnings when data conflicts are encountered
         :return: new Corpus constructed from combined lists of utterances
         """
-        utts1 = list(primary.iter_utterances())
-        utts2 = list(secondary.iter_utterances())
-        combined_utts = list(primary._merge_utterances(utts1, utts2, warnings=warnings))
-        # Note that we collect Speakers from the utt sets directly instead of the combined utts, otherwise
+        return Corpus.merge_many([primary, secondary], warnings=warnings)
+
+    @staticmethod
+    def merge_many(corpora: List["Corpus"], warnings: bool = True):
+        """
+        Merges any number of corpora in a single pass, creating a new Corpus with their combined data. This is
+        equivalent to merging them pairwise in order (i.e., merge(merge(corpora[0], corpora[1]), corpora[2]) ...),
+        without copying the data accumulated so far at every step.
+
+        Utterances with the same id must share the same data. In case of conflicts, the Utterance from the earliest
+        Corpus takes precedence and the conflicting Utterances from later corpora are ignored. If metadata of the
+        corpora (or their conversations / utterances / speakers) share a key, the value from the latest Corpus is used.
+        A warning is printed in both cases. Speaker-conversation attributes (see get_speaker_convo_info()) are merged in
+        the same way, without warnings.
+
+        Will invalidate all the input corpora in the process.
+
+        The resulting Corpus will inherit the first Corpus's id and version number.
+
+        :param corpora: the corpora to merge, in order of precedence
+        :param warnings: print warnings when data conflicts are encountered
+        :return: new Corpus constructed from combined lists of utterances
+        """
+        if len(corpora) == 0:
+            raise ValueError("merge_many needs at least one Corpus to merge")
+
+        combined_utts = dict()
+        for corpus in corpora:
+            Corpus._merge_utterances_into(combined_utts, corpus.iter_utterances(), warnings)
+        combined_utts = list(combined_utts.values())
+        # Note that we collect Speakers from each corpus instead of from the combined utts, otherwise
         # differences in Speaker meta will not be registered for duplicate Utterances (because utts would be discarded
-        # during merging)
-        combined_speakers, speakers_meta, speakers_meta_conflict = primary._collect_speaker_data(
-            [utts1, utts2]
+        # during merging). Within a corpus, all utterances of a speaker share its metadata, so it is read once per
+        # speaker rather than once per utterance.
+        combined_speakers, speakers_meta, speakers_meta_conflict = Corpus._collect_speakers_meta(
+            [corpus.iter_speakers() for corpus in corpora]
         )
         # Ensure that all attributions of an Utterance to the same speaker ID actually
         # map to the same Speaker instance. Otherwise, you can end up with two
@@ -993,49 +1284,55 @@ class Corpus:
             if not (utt.speaker is intended_speaker):
                 utt.speaker = intended_speaker
         new_corpus = Corpus(utterances=combined_utts)
+        # the values being merged are already recorded in the indexes of the input corpora, so reuse those rather
+        # than checking the type of every metadata value again
+        for corpus in corpora:
+            new_corpus.meta_index.merge_from(corpus.meta_index)
+        new_corpus.meta_index.version = corpora[0].meta_index.version
         Corpus._update_corpus_speaker_data(
             new_corpus, speakers_meta, speakers_meta_conflict, warnings=warnings
         )
 
         # Merge CORPUS metadata
-        new_corpus.meta.reinitialize_from(primary.meta)
-        for key, val in secondary.meta.items():
-            if key in new_corpus.meta and new_corpus.meta[key] != val:
-                if warnings:
-                    warn(
-                        "Found conflicting values for primary Corpus metadata key: {}. "
-                        "Overwriting with secondary Corpus's metadata.".format(repr(key))
-                    )
-            new_corpus.meta[key] = val
+        new_corpus.meta.reinitialize_from(corpora[0].meta)
+        for corpus in corpora[1:]:
+            for key, val in corpus.meta.items():
+                if key in new_corpus.meta and new_corpus.meta[key] != val:
+                    if warnings:
+                        warn(
+                            "Found conflicting values for primary Corpus metadata key: {}. "
+                            "Overwriting with secondary Corpus's metadata.".format(repr(key))
+                        )
+                new_corpus.meta[key] = val
 
         # Merge CONVERSATION metadata
-        convos1 = primary.iter_conversations()
-        convos2 = secondary.iter_conversations()
-
-        for convo in convos1:
+        for convo in corpora[0].iter_conversations():
             new_corpus.get_conversation(convo.id).meta.reinitialize_from(convo.meta)
 
-        for convo in convos2:
-            for key, val in convo.meta.items():
+        for corpus in corpora[1:]:
+            for convo in corpus.iter_conversations():
                 curr_meta = new_corpus.get_conversation(convo.id).meta
-                if key in curr_meta and curr_meta[key] != val:
-                    if warnings:
-                        warn(
-                            "Found conflicting values for Conversation {} for metadata key: {}. "
-                            "Overwriting with secondary corpus's Conversation metadata.".format(
-                                repr(convo.id), repr(key)
+                for key, val in convo.meta.items():
+                    if key in curr_meta and curr_meta[key] != val:
+                        if warnings:
+                            warn(
+                                "Found conflicting values for Conversation {} for metadata key: {}. "
+                                "Overwriting with secondary corpus's Conversation metadata.".format(
+                                    repr(convo.id), repr(key)
+                                )
                             )
-                        )
-                curr_meta[key] = val
+                    curr_meta[key] = val
 
-        new_corpus.update_speakers_data()
-        new_corpus.reinitialize_index()
+        # Merge SPEAKER-CONVERSATION attributes, with the latest corpus taking precedence
+        new_corpus._speaker_convo_info = SpeakerConvoInfo()
+        for corpus in corpora:
+            new_corpus._speaker_convo_info.update(corpus._get_speaker_convo_info())
 
         # source corpora are now invalidated and all needed data has been copied
         # into the new merged corpus; clear the source corpora's backend mapper to
         # prevent having duplicates in memory
-        primary.backend_mapper.clear_all_data()
-        secondary.backend_mapper.clear_all_data()
+        for corpus in corpora:
+            corpus.backend_mapper.clear_all_data()
 
         return new_corpus
 
@@ -1122,6 +1419,132 @@ class Corpus:
 
         return self
 
+    def ingest(
+        self,
+        utterances: Iterable[Utterance],
+        utterance_transformers: Optional[List] = None,
+        conversation_transformers: Optional[List] = None,
+        batch_size: int = 1,
+        max_conversations: Optional[int] = None,
+    ) -> Generator[IngestEvent, None, None]:
+        """
+        Adds a stream of utterances (e.g., from a live feed) to the Corpus, batch by batch, and yields an IngestEvent
+        for each batch, once it has been added and processed. Unlike add_utterances(), the work done for each batch
+        only depends on the size of the batch and of the conversations it adds to, not on the size of the Corpus.
+
+        For each batch:
+
+        - utterances whose id is already in the Corpus are skipped. Utterances without a conversation id join the
+          conversation of the utterance they reply to (which must have been ingested before them), or start a
+          new conversation. Speakers that are already in the Corpus are reused, updated with the metadata of the
+          incoming Speaker objects.
+        - the transform_utterance() method of each of utterance_transformers is called on each new utterance, which it
+          should annotate in place.
+        - the transform() method of each of conversation_transformers is called on a view (see view()) of the
+          conversations that the batch added to, so that transformers that need conversational context (e.g., a
+          fitted Forecaster) only process the affected conversations. They should annotate metadata, since vector
+          matrices cannot be set through a view.
+        - if max_conversations is set, the conversations that have not received an utterance for the longest time are
+          evicted from the Corpus until it has at most max_conversations conversations (the conversations of the
+          current batch are never evicted), so that memory use stays flat.
+
+        The utterances are only read from the iterable as needed, so ingestion stops when the generator is no longer
+        consumed.
+
+        :param utterances: iterable of Utterances to add, in the order in which they were posted
+        :param utterance_transformers: Transformers (or ConvokitPipelines) to run on each new utterance
+        :param conversation_transformers: Transformers (or ConvokitPipelines) to run on the affected conversations
+        :param batch_size: number of utterances to add at a time
+        :param max_conversations: maximum number of conversations to retain, or None to keep all of them
+        :return: a generator of IngestEvents
+        """
+        if self._parent is not None:
+            raise ValueError("Cannot ingest utterances into a Corpus view")
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        if max_conversations is not None and max_conversations < 1:
+            raise ValueError("max_conversations must be a positive integer or None")
+
+        # conversation ids, from the least to the most recently active
+        activity = dict.fromkeys(self.conversations)
+        utterances = iter(utterances)
+        while True:
+            batch = list(islice(utterances, batch_size))
+            if len(batch) == 0:
+                return
+
+            new_utts, affected_convos, skipped_utt_ids = [], dict(), []
+            for utt in batch:
+                if utt.id in self.utterances:
+                    skipped_utt_ids.append(utt.id)
+                    continue
+                convo = self._add_streamed_utterance(utt)
+                new_utts.append(utt)
+                affected_convos[convo.id] = convo
+                activity.pop(convo.id, None)
+                activity[convo.id] = None
+
+            for transformer in utterance_transformers or []:
+                for utt in new_utts:
+                    transformer.transform_utterance(utt)
+            if len(affected_convos) > 0:
+                for transformer in conversation_transformers or []:
+                    transformer.transform(self.view(affected_convos))
+
+            evicted_convos = []
+            if max_conversations is not None:
+                while len(self.conversations) > max_conversations:
+                    convo_id = next(iter(activity))
+                    if convo_id in affected_convos:
+                        break
+                    del activity[convo_id]
+                    if convo_id in self.conversations:
+                        evicted_convos.append(self.conversations.pop(convo_id))
+                self._remove_conversations(evicted_convos)
+
+            yield IngestEvent(
+                new_utts,
+                list(affected_convos.values()),
+                skipped_utt_ids,
+                [convo.id for convo in evicted_convos],
+            )
+
+    def _add_streamed_utterance(self, utt: Utterance) -> Conversation:
+        """
+        Helper for ingest(): adds a new Utterance to the Corpus, linking it to its Speaker and Conversation.
+
+        :return: the Conversation the Utterance was added to
+        """
+        speaker = self.speakers.get(utt.speaker.id, None)
+        if speaker is None:
+            speaker = utt.speaker
+            speaker.owner = self
+            self.speakers[speaker.id] = speaker
+        elif speaker is not utt.speaker:
+            for key, value in utt.speaker.meta.items():
+                speaker.meta[key] = value
+            utt.speaker = speaker
+
+        if utt.conversation_id is None:
+            parent = self.utterances.get(utt.reply_to, None) if utt.reply_to is not None else None
+            utt.conversation_id = (
+                parent.conversation_id
+                if parent is not None
+                else Conversation.generate_default_conversation_id(utterance_id=utt.id)
+            )
+
+        utt.owner = self
+        self.utterances[utt.id] = utt
+        speaker._add_utterance(utt)
+        convo = self.conversations.get(utt.conversation_id, None)
+        if convo is None:
+            convo = Conversation(owner=self, id=utt.conversation_id, utterances=[utt.id], meta=None)
+            self.conversations[convo.id] = convo
+        else:
+            convo._add_utterance(utt)
+        speaker._add_conversation(convo)
+        return convo
+
     def update_speakers_data(self) -> None:
         """
         Updates the conversation and utterance lists of every Speaker in the Corpus
@@ -1152,6 +1575,40 @@ class Corpus:
         print("Number of Utterances: {}".format(len(self.utterances)))
         print("Number of Conversations: {}".format(len(self.conversations)))
 
+    def bulk_add_meta(self, obj_type: str, attribute: str, values: Dict[str, Any]) -> None:
+        """
+        Adds a metadata attribute to many Corpus components of the specified object type at once; equivalent to
+        calling `add_meta(attribute, value)` on each of them, but with a single write to the backend.
+
+        :param obj_type: 'utterance', 'conversation', 'speaker'
+        :param attribute: name of metadata attribute
+        :param values: dictionary mapping the ids of the objects to annotate to their value of the attribute
+        :return: None
+        """
+        if not isinstance(attribute, str):
+            warn("Metadata attribute keys must be strings. Input key has been casted to a string.")
+            attribute = str(attribute)
+        if self.meta_index.type_check:
+            # the index only needs to see each scalar type once; containers are checked individually, since
+            # their contents determine whether they need to be stored as binary data
+            seen_types = set()
+            for value in values.values():
+                value_type = type(value)
+                if value_type in seen_types:
+                    continue
+                if value is None or value_type in (int, float, str, bool):
+                    seen_types.add(value_type)
+                ConvoKitMeta._check_type_and_update_index(
+                    self.meta_index, obj_type, attribute, value
+                )
+        self.backend_mapper.bulk_update_data(
+            "meta",
+            attribute,
+            {obj_type + "_" + obj_id: value for obj_id, value in values.items()},
+            self.meta_index.get_index(obj_type),
+        )
+        self.backend_mapper.record_meta_change(obj_type, attribute)
+
     def delete_metadata(self, obj_type: str, attribute: str):
         """
         Delete a specified metadata attribute from all Corpus components of the specified object type.
@@ -1185,6 +1642,10 @@ class Corpus:
         :return: None
         """
 
+        if self._parent is not None:
+            raise ValueError(
+                "Cannot set vector matrices of a Corpus view, since they are shared with its parent Corpus"
+            )
         matrix = ConvoKitMatrix(name=name, matrix=matrix, ids=ids, columns=columns)
         if name in self.meta_index.vectors:
             warn(
@@ -1194,6 +1655,7 @@ class Corpus:
             )
         self.meta_index.add_vector(name)
         self._vector_matrices[name] = matrix
+        self.backend_mapper.record_matrix_change(name)
 
     def append_vector_matrix(self, matrix: ConvoKitMatrix):
         """
@@ -1202,6 +1664,10 @@ class Corpus:
         :param matrix: a ConvoKitMatrix object
         :return: None
         """
+        if self._parent is not None:
+            raise ValueError(
+                "Cannot set vector matrices of a Corpus view, since they are shared with its parent Corpus"
+            )
         if matrix.name in self.meta_index.vectors:
             warn(
                 'Vector matrix "{}" already exists. '
@@ -1211,6 +1677,7 @@ class Corpus:
             )
         self.meta_index.add_vector(matrix.name)
         self._vector_matrices[matrix.name] = matrix
+        self.backend_mapper.record_matrix_change(matrix.name)
 
     def get_vector_matrix(self, name):
         """
@@ -1248,6 +1715,19 @@ class Corpus:
             ids=ids, columns=columns, as_dataframe=as_dataframe
         )
 
+    def nearest(self, name, id_or_vector, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Finds the corpus component objects whose vectors in the vector matrix `name` are nearest to a query, using
+        the matrix's nearest-neighbor index (see `ConvoKitMatrix.build_index()`; an exact cosine index is built if
+        the matrix has none).
+
+        :param name: name of the vector matrix
+        :param id_or_vector: id of an object with a vector in the matrix, or a query vector
+        :param k: number of neighbors to return
+        :return: list of up to k (id, score) tuples, from nearest to farthest
+        """
+        return self.get_vector_matrix(name).nearest(id_or_vector, k=k)
+
     def delete_vector_matrix(self, name):
         """
         Deletes the vector matrix stored under `name`.
@@ -1255,6 +1735,10 @@ class Corpus:
         :param name: name of the vector mtrix
         :return: None
         """
+        if self._parent is not None:
+            raise ValueError(
+                "Cannot delete vector matrices of a Corpus view, since they are shared with its parent Corpus"
+            )
         self.meta_index.vectors.remove(name)
         if name in self._vector_matrices:
             del self._vector_matrices[name]
@@ -1267,19 +1751,23 @@ class Corpus:
 
         self.get_vector_matrix(name).dump(dir_name)
 
-    def load_info(self, obj_type, fields=None, dir_name=None):
+    def load_info(self, obj_type, fields=None, dir_name=None, ids=None, n_jobs: int = 1):
         """
         loads attributes of objects in a corpus from disk.
         This function, along with dump_info, supports cases where a particular attribute is to be stored separately from
         the other corpus files, for organization or efficiency. These attributes will not be read when the corpus is
         initialized; rather, they can be loaded on-demand using this function.
 
-        For each attribute with name <NAME>, will read from a file called info.<NAME>.jsonl, and load each attribute
-        value into the respective object's .meta field.
+        For each attribute with name <NAME>, will read from a file called info.<NAME>.jsonl (or info.<NAME>.p /
+        info.<NAME>.npz, if it was dumped with the pickle / columnar encoding), and load each attribute value into
+        the respective object's .meta field. Values of objects that are not in the corpus are skipped.
 
         :param obj_type: type of object the attribute is associated with. can be one of "utterance", "speaker", "conversation".
         :param fields: a list of names of attributes to load. if empty, will load all attributes stored in the specified directory dir_name.
         :param dir_name: the directory to read attributes from. by default, or if set to None, will read from the directory that the Corpus was loaded from.
+        :param ids: if given, only load the attribute values of the objects with these ids.
+        :param n_jobs: number of processes reading the files of different attributes concurrently (in mem and disk
+            modes).
         :return: None
         """
         if fields is None:
@@ -1291,48 +1779,64 @@ class Corpus:
             dir_name = self.corpus_dirpath
 
         if len(fields) == 0:
-            fields = [
-                x.replace("info.", "").replace(".jsonl", "")
-                for x in os.listdir(dir_name)
-                if x.startswith("info")
-            ]
+            fields = list_info_fields(dir_name)
+        if ids is not None:
+            ids = set(ids)
 
+        paths = []
         for field in fields:
-            # self.aux_info[field] = self.load_jsonlist_to_dict(
-            #     os.path.join(dir_name, 'feat.%s.jsonl' % field))
-            if self.backend == "mem":
-                load_info_to_mem(self, dir_name, obj_type, field)
-            elif self.backend == "db":
-                load_info_to_db(self, dir_name, obj_type, field)
+            path = find_info_file(dir_name, field)
+            if path is None:
+                raise FileNotFoundError(
+                    "No file for attribute {} found in {}".format(field, dir_name)
+                )
+            paths.append(path)
+
+        if self.backend == "db":
+            for field, path in zip(fields, paths):
+                load_info_to_db(self, dir_name, obj_type, field, path, ids)
+        else:
+            all_entries = parallel_map(
+                read_info_file_job, [(path, ids) for path in paths], n_jobs=n_jobs
+            )
+            for field, entries in zip(fields, all_entries):
+                load_info_to_mem(self, obj_type, field, entries)
 
-    def dump_info(self, obj_type, fields, dir_name=None):
+    def dump_info(self, obj_type, fields, dir_name=None, encoding: str = "jsonl"):
         """
         writes attributes of objects in a corpus to disk.
         This function, along with load_info, supports cases where a particular attribute is to be stored separately from the other corpus files, for organization or efficiency. These attributes will not be read when the corpus is initialized; rather, they can be loaded on-demand using this function.
 
         For each attribute with name <NAME>, will write to a file called info.<NAME>.jsonl, where rows are json-serialized dictionaries structured as {"id": id of object, "value": value of attribute}.
+        Other encodings load faster: "pickle" writes the mapping from object ids to values to info.<NAME>.p, and
+        "columnar" writes the ids and values as numpy arrays to info.<NAME>.npz, which requires every value to be a
+        number or a list of numbers (objects whose value is None are left out). Any file of the attribute in another
+        encoding is removed.
 
         :param obj_type: type of object the attribute is associated with. can be one of "utterance", "speaker", "conversation".
         :param fields: a list of names of attributes to write to disk.
         :param dir_name: the directory to write attributes to. by default, or if set to None, will read from the directory that the Corpus was loaded from.
+        :param encoding: "jsonl" (default), "pickle" or "columnar"
         :return: None
         """
 
         if (self.corpus_dirpath is None) and (dir_name is None):
             raise ValueError("must specify a directory to write to")
+        if encoding not in INFO_ENCODINGS:
+            raise ValueError(
+                "encoding must be one of {}, not {!r}".format(list(INFO_ENCODINGS), encoding)
+            )
 
         if dir_name is None:
             dir_name = self.corpus_dirpath
-        # if len(fields) == 0:
-        #     fields = self.aux_info.keys()
+        # read each object's metadata once for all the fields
+        entries = {field: {} for field in fields}
+        for obj in self.iter_objs(obj_type):
+            meta = obj.meta.to_dict()
+            for field in fields:
+                entries[field][obj.id] = meta.get(field, None)
         for field in fields:
-            # if field not in self.aux_info:
-            #     raise ValueError("field %s not in index" % field)
-            iterator = self.iter_objs(obj_type)
-            entries = {obj.id: obj.retrieve_meta(field) for obj in iterator}
-            # self.dump_jsonlist_from_dict(self.aux_info[field],
-            #     os.path.join(dir_name, 'feat.%s.jsonl' % field))
-            dump_jsonlist_from_dict(entries, os.path.join(dir_name, "info.%s.jsonl" % field))
+            write_info_file(entries[field], dir_name, field, encoding)
 
     def get_attribute_table(self, obj_type, attrs):
         """
@@ -1353,6 +1857,91 @@ class Corpus:
             table_entries.append(entry)
         return pd.DataFrame(table_entries).set_index("id")
 
+    def get_texts(
+        self,
+        objs: List[CorpusComponent],
+        text_func: Callable[[CorpusComponent], str],
+        clean_func: Optional[Callable[[str], str]] = None,
+        n_jobs: int = 1,
+        cache: bool = False,
+    ) -> List[str]:
+        """
+        Gets the texts of a list of Corpus component objects, as computed by `text_func` and then (optionally) by a
+        string-level cleaning function `clean_func`. Used by transformers such as FightingWords and BoWTransformer to
+        collect the texts they vectorize.
+
+        `text_func` is always called in the current process, since it takes Corpus components as input; `clean_func`
+        takes and returns a string and, if `n_jobs` is not 1, is run over the texts by a pool of processes. In that
+        case `clean_func` must be picklable, i.e., a module-level function or static method rather than a lambda.
+
+        If `cache` is True, texts are memoized in the Corpus, keyed by the object and by the (`text_func`,
+        `clean_func`) pair, so that repeated calls (e.g., refitting a transformer with a different selection of
+        objects) do not recompute them. Only the texts of the 4 most recently used pairs are kept. The cache is
+        cleared whenever the data of the Corpus components (e.g., utterance texts) change or components are added or
+        removed; it is not cleared when metadata changes, so call `clear_text_cache()` if `text_func` depends on
+        metadata that changed.
+
+        :param objs: list of Corpus component objects
+        :param text_func: function for getting text from a Corpus component object
+        :param clean_func: optional function that takes in a string and returns a cleaned version of that string
+        :param n_jobs: number of processes to run `clean_func` with; -1 to use all available CPUs. 1 by default.
+        :param cache: whether to memoize the texts in the Corpus. False by default.
+        :return: list of texts, in the same order as `objs`
+        """
+        if cache:
+            if self._text_cache_version != self.backend_mapper.version:
+                self.clear_text_cache()
+            cached = self._text_cache.setdefault((text_func, clean_func), dict())
+            self._text_cache.move_to_end((text_func, clean_func))
+            if len(self._text_cache) > _MAX_CACHED_TEXT_FUNCS:
+                self._text_cache.popitem(last=False)
+            missing = {}
+            for obj in objs:
+                key = (obj.obj_type, obj.id)
+                if key not in cached and key not in missing:
+                    missing[key] = obj
+            if len(missing) > 0:
+                texts = self.get_texts(list(missing.values()), text_func, clean_func, n_jobs)
+                cached.update(zip(missing.keys(), texts))
+            return [cached[(obj.obj_type, obj.id)] for obj in objs]
+
+        texts = [text_func(obj) for obj in objs]
+        if clean_func is None:
+            return texts
+        return parallel_map(clean_func, texts, n_jobs)
+
+    def clear_text_cache(self) -> None:
+        """
+        Clears the texts memoized by `get_texts()`.
+
+        :return: None
+        """
+        self._text_cache = OrderedDict()
+        self._text_cache_version = self.backend_mapper.version
+
+    def _get_speaker_convo_info(self) -> SpeakerConvoInfo:
+        """
+        Gets the table of speaker-conversation attributes, loading it on first use: from the directory the corpus was
+        loaded from if it has one, or else from the `conversations` metadata of speakers (where earlier versions
+        stored speaker-conversation attributes). That metadata is left as it is; later changes are only made to the
+        table.
+        """
+        if self._speaker_convo_info is None:
+            filepath = (
+                None
+                if self.corpus_dirpath is None
+                else os.path.join(self.corpus_dirpath, SpeakerConvoInfoFile)
+            )
+            if filepath is not None and os.path.exists(filepath):
+                self._speaker_convo_info = SpeakerConvoInfo.load(filepath)
+            else:
+                self._speaker_convo_info = SpeakerConvoInfo()
+                for speaker in self.iter_speakers():
+                    for convo_id, convo_info in speaker.meta.get("conversations", {}).items():
+                        for key, value in convo_info.items():
+                            self._speaker_convo_info.set(speaker.id, convo_id, key, value)
+        return self._speaker_convo_info
+
     def set_speaker_convo_info(self, speaker_id, convo_id, key, value):
         """
         assigns speaker-conversation attribute `key` with `value` to speaker `speaker_id` in conversation `convo_id`.
@@ -1363,13 +1952,20 @@ class Corpus:
         :param value: value of attribute
         :return: None
         """
+        self._get_speaker_convo_info().set(speaker_id, convo_id, key, value)
+
+    def bulk_set_speaker_convo_info(self, key, speaker_ids, convo_ids, values):
+        """
+        assigns speaker-conversation attribute `key` for many speaker-conversation pairs at once: speaker
+        `speaker_ids[i]` in conversation `convo_ids[i]` is assigned `values[i]`.
 
-        speaker = self.get_speaker(speaker_id)
-        speaker_convos = speaker.meta.get("conversations", {})
-        if convo_id not in speaker_convos:
-            speaker_convos[convo_id] = {}
-        speaker_convos[convo_id][key] = value
-        speaker.meta["conversations"] = speaker_convos
+        :param key: name of attribute
+        :param speaker_ids: list of speakers
+        :param convo_ids: list of conversations
+        :param values: list of values of attribute
+        :return: None
+        """
+        self._get_speaker_convo_info().bulk_set(key, speaker_ids, convo_ids, values)
 
     def get_speaker_convo_info(self, speaker_id, convo_id, key=None):
         """
@@ -1380,63 +1976,104 @@ class Corpus:
         :param key: name of attribute. if None, will return all attributes for that speaker-conversation.
         :return: attribute value
         """
+        return self._get_speaker_convo_info().get(speaker_id, convo_id, key)
 
-        speaker = self.get_speaker(speaker_id)
-        if "conversations" not in speaker.meta:
-            return None
-        if key is None:
-            return speaker.meta["conversations"].get(convo_id, {})
-        return speaker.meta["conversations"].get(convo_id, {}).get(key)
+    def bulk_get_speaker_convo_info(self, key, speaker_ids, convo_ids):
+        """
+        retrieves speaker-conversation attribute `key` for many speaker-conversation pairs at once.
+
+        :param key: name of attribute
+        :param speaker_ids: list of speakers
+        :param convo_ids: list of conversations
+        :return: list of attribute values (None where the attribute is not set), with the value for speaker
+            `speaker_ids[i]` in conversation `convo_ids[i]` at position i
+        """
+        return self._get_speaker_convo_info().bulk_get(key, speaker_ids, convo_ids)
+
+    def get_speaker_convos(self, speaker_id):
+        """
+        retrieves all speaker-conversation attributes of `speaker_id`.
+
+        :param speaker_id: speaker
+        :return: a dictionary keyed by conversation id, where entries are dictionaries of the attributes of the
+            speaker in that conversation
+        """
+        return self._get_speaker_convo_info().get_speaker_convos(speaker_id)
 
     def organize_speaker_convo_history(self, utterance_filter=None):
         """
         For each speaker, pre-computes a list of all of their utterances, organized by the conversation they participated in. Annotates speaker with the following:
             * `n_convos`: number of conversations
             * `start_time`: time of first utterance, across all conversations
-            * `conversations`: a dictionary keyed by conversation id, where entries consist of:
-                * `idx`: the index of the conversation, in terms of the time of the first utterance contributed by that particular speaker (i.e., `idx=0` means this is the first conversation the speaker ever participated in)
-                * `n_utterances`: the number of utterances the speaker contributed in the conversation
-                * `start_time`: the timestamp of the speaker's first utterance in the conversation
-                * `utterance_ids`: a list of ids of utterances contributed by the speaker, ordered by timestamp.
-            In case timestamps are not provided with utterances, the present behavior is to sort just by utterance id.
+        and sets the following speaker-conversation attributes (see `get_speaker_convo_info` and `get_speaker_convos`) for each conversation the speaker participated in:
+            * `idx`: the index of the conversation, in terms of the time of the first utterance contributed by that particular speaker (i.e., `idx=0` means this is the first conversation the speaker ever participated in)
+            * `n_utterances`: the number of utterances the speaker contributed in the conversation
+            * `start_time`: the timestamp of the speaker's first utterance in the conversation
+            * `utterance_ids`: a list of ids of utterances contributed by the speaker, ordered by timestamp.
+        In case timestamps are not provided with utterances, the present behavior is to sort just by utterance id.
+
+        The utterances are ordered with a single sort over (speaker, conversation, timestamp, id), and the attributes are computed from the boundaries of each (speaker, conversation) group and written in bulk.
 
         :param utterance_filter: function that returns True for an utterance that counts towards a speaker having participated in that conversation. (e.g., one could filter out conversations where the speaker contributed less than k words per utterance)
         """
 
-        if utterance_filter is None:
-            utterance_filter = lambda x: True
-        else:
-            utterance_filter = utterance_filter
-
-        speaker_to_convo_utts = defaultdict(lambda: defaultdict(list))
+        speaker_ids, convo_ids, utt_ids, timestamps = [], [], [], []
         for utterance in self.iter_utterances():
-            if not utterance_filter(utterance):
+            if utterance_filter is not None and not utterance_filter(utterance):
                 continue
-
-            speaker_to_convo_utts[utterance.speaker.id][utterance.conversation_id].append(
-                (utterance.id, utterance.timestamp)
-            )
-        for speaker, convo_utts in speaker_to_convo_utts.items():
-            for convo, utts in convo_utts.items():
-                sorted_utts = sorted(utts, key=lambda x: (x[1], x[0]))
-                self.set_speaker_convo_info(
-                    speaker, convo, "utterance_ids", [x[0] for x in sorted_utts]
-                )
-                self.set_speaker_convo_info(speaker, convo, "start_time", sorted_utts[0][1])
-                self.set_speaker_convo_info(speaker, convo, "n_utterances", len(sorted_utts))
-        for speaker in self.iter_speakers():
-            try:
-                speaker.add_meta("n_convos", len(speaker.retrieve_meta("conversations")))
-            except:
-                continue
-
-            sorted_convos = sorted(
-                speaker.retrieve_meta("conversations").items(),
-                key=lambda x: (x[1]["start_time"], x[1]["utterance_ids"][0]),
-            )
-            speaker.add_meta("start_time", sorted_convos[0][1]["start_time"])
-            for idx, (convo_id, _) in enumerate(sorted_convos):
-                self.set_speaker_convo_info(speaker.id, convo_id, "idx", idx)
+            speaker_ids.append(utterance.speaker.id)
+            convo_ids.append(utterance.conversation_id)
+            utt_ids.append(utterance.id)
+            timestamps.append(utterance.timestamp)
+        if len(utt_ids) == 0:
+            return
+
+        # sort utterances by speaker, conversation, timestamp and id in a single pass, then find the boundaries of
+        # each (speaker, conversation) group
+        speaker_codes, speaker_uniques = pd.factorize(np.array(speaker_ids, dtype=object))
+        convo_codes, _ = pd.factorize(np.array(convo_ids, dtype=object))
+        timestamp_ranks = _rank_values(timestamps)
+        utt_id_ranks = _rank_values(utt_ids)
+        order = np.lexsort((utt_id_ranks, timestamp_ranks, convo_codes, speaker_codes))
+        sorted_speakers, sorted_convos = speaker_codes[order], convo_codes[order]
+        is_start = np.ones(len(order), dtype=bool)
+        is_start[1:] = (sorted_speakers[1:] != sorted_speakers[:-1]) | (
+            sorted_convos[1:] != sorted_convos[:-1]
+        )
+        starts = np.flatnonzero(is_start)
+        ends = np.append(starts[1:], len(order))
+        first_utts = order[starts]
+
+        group_speaker_ids = [speaker_ids[i] for i in first_utts]
+        group_convo_ids = [convo_ids[i] for i in first_utts]
+        start_times = [timestamps[i] for i in first_utts]
+        sorted_utt_ids = [utt_ids[i] for i in order]
+
+        # order each speaker's conversations by the timestamp and id of the speaker's first utterance in them
+        group_speakers = speaker_codes[first_utts]
+        convo_order = np.lexsort(
+            (utt_id_ranks[first_utts], timestamp_ranks[first_utts], group_speakers)
+        )
+        speaker_starts = np.searchsorted(
+            group_speakers[convo_order], np.arange(len(speaker_uniques))
+        )
+        n_convos = np.bincount(group_speakers, minlength=len(speaker_uniques))
+        idxes = np.empty(len(convo_order), dtype=np.int64)
+        idxes[convo_order] = np.arange(len(convo_order)) - np.repeat(speaker_starts, n_convos)
+        self._get_speaker_convo_info().bulk_set_columns(
+            group_speaker_ids,
+            group_convo_ids,
+            {
+                "utterance_ids": [sorted_utt_ids[start:end] for start, end in zip(starts, ends)],
+                "start_time": start_times,
+                "n_utterances": (ends - starts).tolist(),
+                "idx": idxes.tolist(),
+            },
+        )
+        for speaker_code, speaker_id in enumerate(speaker_uniques):
+            speaker = self.get_speaker(speaker_id)
+            speaker.add_meta("n_convos", int(n_convos[speaker_code]))
+            speaker.add_meta("start_time", start_times[convo_order[speaker_starts[speaker_code]]])
 
     def get_speaker_convo_attribute_table(self, attrs):
         """
@@ -1446,22 +2083,15 @@ class Corpus:
         :return: DataFrame containing all speaker,convo attributes.
         """
 
-        table_entries = []
-        for speaker in self.iter_speakers():
-            if "conversations" not in speaker.meta:
-                continue
-            for convo_id, convo_dict in speaker.meta["conversations"].items():
-                entry = {
-                    "id": "%s__%s" % (speaker.id, convo_id),
-                    "speaker": speaker.id,
-                    "convo_id": convo_id,
-                    "convo_idx": convo_dict["idx"],
-                }
-
-                for attr in attrs:
-                    entry[attr] = convo_dict.get(attr, None)
-                table_entries.append(entry)
-        return pd.DataFrame(table_entries).set_index("id")
+        df = self._get_speaker_convo_info().to_dataframe(
+            ["idx"] + [attr for attr in attrs if attr != "idx"], speaker_ids=self.get_speaker_ids()
+        )
+        df.index = df["speaker"].astype(str) + "__" + df["convo_id"].astype(str)
+        df.index.name = "id"
+        df = df.rename(columns={"idx": "convo_idx"})
+        if "idx" in attrs:
+            df["idx"] = df["convo_idx"]
+        return df[["speaker", "convo_id", "convo_idx"] + list(attrs)]
 
     def get_full_attribute_table(
         self,
@@ -1496,16 +2126,53 @@ class Corpus:
         return uc_df.join(u_df, on="speaker").join(c_df, on="convo_id")
 
     def update_metadata_from_df(self, obj_type, df):
+        """
+        Adds the metadata in the 'meta.<key>' columns of a dataframe to the objects of the given type, one column at a
+        time. The ids of the objects are read from the 'id' column, or from the dataframe index if there is no such
+        column; rows of objects that are not in the Corpus are ignored.
+
+        :param obj_type: "utterance", "speaker" or "conversation"
+        :param df: pandas DataFrame with the metadata
+        :return: the Corpus
+        """
         assert obj_type in ["utterance", "speaker", "conversation"]
-        meta_cols = extract_meta_from_df(df)
-        df.columns = [col.replace("meta.", "") for col in df.columns]
-        df = df.set_index("id")
-        for obj in self.iter_objs(obj_type):
-            obj_meta = df.loc[obj.id][meta_cols].to_dict() if meta_cols else None
-            if obj_meta is not None:
-                obj.meta.update(obj_meta)
+        add_meta_from_df(self, obj_type, df)
         return self
 
+    def to_pandas(self, exclude_meta: bool = False) -> Tuple[DataFrame, DataFrame, DataFrame]:
+        """
+        Exports the utterances, speakers, and conversations of the Corpus to three DataFrames at once, with the
+        same columns as get_utterances_dataframe(), get_speakers_dataframe() and get_conversations_dataframe(). The
+        tables are built one column at a time, which is much faster than those methods on large corpora. As with
+        those methods, all columns have the object dtype, so that values (including None for missing metadata) are
+        kept as they are in the Corpus; use DataFrame.infer_objects() to get numeric columns.
+
+        `Corpus.from_pandas(*corpus.to_pandas())` reconstructs the Corpus (as far as pandas preserves the values of
+        the metadata).
+
+        :param exclude_meta: whether to exclude metadata
+        :return: a tuple of the utterances, speakers and conversations DataFrames
+        """
+        utterances_df = components_to_dataframe(
+            self.iter_utterances(),
+            {
+                "timestamp": lambda utt: utt.timestamp,
+                "text": lambda utt: utt.text,
+                "speaker": lambda utt: utt.speaker.id,
+                "reply_to": lambda utt: utt.reply_to,
+                "conversation_id": lambda utt: utt.conversation_id,
+                "vectors": lambda utt: utt.vectors,
+            },
+            exclude_meta,
+        )
+        speakers_df, conversations_df = [
+            components_to_dataframe(
+                self.iter_objs(obj_type), {"vectors": lambda obj: obj.vectors}, exclude_meta
+            )
+            for obj_type in ["speaker", "conversation"]
+        ]
+        return utterances_df, speakers_df, conversations_df
+
     @staticmethod
     def from_pandas(
         utterances_df: DataFrame,
@@ -1527,62 +2194,66 @@ class Corpus:
         Note that as metadata can be added to the Corpus after it is constructed, there is no need to include all
         metadata keys in the dataframe if it would be inconvenient.
 
+        The dataframes are read one column at a time, and each metadata column is added to the Corpus at once.
+
         :param utterances_df: utterances data in a pandas Dataframe, all primary data fields expected, with metadata optional
         :param speakers_df: (optional) speakers data in a pandas Dataframe
         :param conversations_df: (optional) conversations data in a pandas Dataframe
         :return: Corpus constructed from the dataframe(s)
         """
-        columns = ["speaker", "id", "timestamp", "conversation_id", "reply_to", "text"]
+        columns = ["speaker", "timestamp", "conversation_id", "reply_to", "text"]
 
         for df_type, df in [
             ("utterances", utterances_df),
             ("conversations", conversations_df),
             ("speakers", speakers_df),
         ]:
-            if df is None:
-                continue
-            if "id" not in df.columns:
+            if df is not None and "id" not in df.columns:
                 print(
-                    f"ID column is not present in {df_type} dataframe, generated ID column from dataframe index..."
+                    f"ID column is not present in {df_type} dataframe, using dataframe index as ID..."
                 )
-                df["id"] = df.index
 
         # checking if dataframes contain their respective required columns
         assert (
             pd.Series(columns).isin(utterances_df.columns).all()
         ), "Utterances dataframe must contain all primary data fields"
 
-        utterance_meta_cols = extract_meta_from_df(utterances_df)
-
-        utterance_list = []
-        for index, row in tqdm(utterances_df.iterrows()):
-            if utterance_meta_cols:
-                metadata = {}
-                for meta_col in utterance_meta_cols:
-                    metadata[meta_col] = row["meta." + meta_col]
-            else:
-                metadata = None
-
-            # adding utterance in utterance list
-            reply_to = None if row["reply_to"] == "None" else row["reply_to"]
-            utterance_list.append(
-                Utterance(
-                    id=str(row["id"]),
-                    speaker=Speaker(id=str(row["speaker"])),
-                    conversation_id=str(row["conversation_id"]),
-                    reply_to=reply_to,
-                    timestamp=row["timestamp"],
-                    text=row["text"],
-                    meta=metadata,
-                )
+        utt_ids = get_ids_from_df(utterances_df)
+        # missing reply_to values may have been read from a file as "None", or turned into NaN by pandas
+        reply_tos = utterances_df["reply_to"].astype(object)
+        reply_tos = reply_tos.where(reply_tos.notna() & (reply_tos != "None"), None)
+        speaker_ids = utterances_df["speaker"].astype(str)
+        speakers = {speaker_id: Speaker(id=speaker_id) for speaker_id in pd.unique(speaker_ids)}
+
+        utterance_list = [
+            Utterance(
+                id=utt_id,
+                speaker=speakers[speaker_id],
+                conversation_id=convo_id,
+                reply_to=reply_to,
+                timestamp=timestamp,
+                text=text,
+            )
+            for utt_id, speaker_id, convo_id, reply_to, timestamp, text in tqdm(
+                zip(
+                    utt_ids,
+                    speaker_ids.tolist(),
+                    utterances_df["conversation_id"].astype(str).tolist(),
+                    reply_tos.tolist(),
+                    utterances_df["timestamp"].tolist(),
+                    utterances_df["text"].tolist(),
+                ),
+                total=len(utt_ids),
             )
+        ]
 
         # initializing corpus using utterance_list
         corpus = Corpus(utterances=utterance_list)
+        add_meta_from_df(corpus, "utterance", utterances_df)
         if speakers_df is not None:
-            corpus.update_metadata_from_df("speaker", speakers_df)
+            add_meta_from_df(corpus, "speaker", speakers_df)
         if conversations_df is not None:
-            corpus.update_metadata_from_df("conversation", conversations_df)
+            add_meta_from_df(corpus, "conversation", conversations_df)
 
         return corpus
 
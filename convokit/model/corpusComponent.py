@@ -1,3 +1,4 @@
+import sys
 from typing import List, Optional
 
 from convokit.util import warn
@@ -5,6 +6,9 @@ from .convoKitMeta import ConvoKitMeta
 
 
 class CorpusComponent:
+    # components are created by the million, so they don't get a per-instance __dict__
+    __slots__ = ("obj_type", "_owner", "_id", "_vectors", "_temp_backend", "_meta")
+
     def __init__(
         self,
         obj_type: str,
@@ -16,8 +20,10 @@ class CorpusComponent:
     ):
         self.obj_type = obj_type  # utterance, speaker, conversation
         self._owner = owner
-        self._id = id
-        self.vectors = vectors if vectors is not None else []
+        # ids are interned, so that the id strings held by other objects (e.g., reply_to) are shared
+        self._id = sys.intern(id) if type(id) is str else id
+        # the list of vectors is only created once it is needed, since most components have no vectors
+        self._vectors = vectors
 
         # if the CorpusComponent is initialized with an owner set up an entry
         # in the owner's backend; if it is not initialized with an owner
@@ -30,6 +36,7 @@ class CorpusComponent:
                 self._id,
                 initial_value=(initial_data if initial_data is not None else {}),
             )
+            self.owner.backend_mapper.record_other_change()
 
         if meta is None:
             meta = dict()
@@ -59,6 +66,7 @@ class CorpusComponent:
             self.owner.backend_mapper.initialize_data_for_component(
                 self.obj_type, self.id, initial_value=data_dict
             )
+            self.owner.backend_mapper.record_other_change()
             if previous_owner is not None:
                 previous_owner.backend_mapper.delete_data(self.obj_type, self.id)
                 previous_owner.backend_mapper.delete_data("meta", self.meta.backend_key)
@@ -89,17 +97,29 @@ class CorpusComponent:
 
     def set_id(self, value):
         if not isinstance(value, str) and value is not None:
-            self._id = str(value)
+            self._id = sys.intern(str(value))
             warn(
                 "{} id must be a string. ID input has been casted to a string.".format(
                     self.obj_type
                 )
             )
         else:
-            self._id = value
+            self._id = sys.intern(value) if type(value) is str else value
 
     id = property(get_id, set_id)
 
+    def get_vectors(self):
+        if self._vectors is None:
+            self._vectors = []
+        return self._vectors
+
+    def set_vectors(self, new_vectors):
+        self._vectors = new_vectors
+        if self._owner is not None:
+            self._owner.backend_mapper.record_vectors_change(self.obj_type)
+
+    vectors = property(get_vectors, set_vectors)
+
     def get_meta(self):
         return self._meta
 
@@ -118,6 +138,7 @@ class CorpusComponent:
             self._temp_backend[property_name] = value
         else:
             self.owner.backend_mapper.update_data(self.obj_type, self.id, property_name, value)
+            self.owner.backend_mapper.record_other_change()
 
     # def __eq__(self, other):
     #     if type(self) != type(other): return False
@@ -164,6 +185,39 @@ class CorpusComponent:
             ids=[self.id], as_dataframe=as_dataframe, columns=columns
         )
 
+    @staticmethod
+    def get_vectors_of(
+        components: List["CorpusComponent"],
+        vector_name: str,
+        as_dataframe: bool = False,
+        columns: Optional[List[str]] = None,
+    ):
+        """
+        Batched counterpart of `get_vector()`: gets the vectors stored as `vector_name` for a list of objects (which
+        must belong to the same Corpus) with a single lookup into the vector matrix.
+
+        :param components: list of Corpus component objects
+        :param vector_name: name of vector
+        :param as_dataframe: whether to return the vectors as a dataframe (True) or in their raw array form (False).
+            False by default.
+        :param columns: optional list of named columns of the vector to include. All columns returned otherwise.
+        :return: a numpy / scipy array, with one row per object, in the order of `components`
+        """
+        if len(components) == 0:
+            raise ValueError("No objects to get vectors for.")
+        owner = components[0].owner
+        for obj in components:
+            if vector_name not in obj.vectors:
+                raise ValueError(
+                    "This {} has no vector stored as '{}'.".format(obj.obj_type, vector_name)
+                )
+            if obj.owner is not owner:
+                raise ValueError("All objects must belong to the same Corpus.")
+
+        return owner.get_vector_matrix(vector_name).get_vectors(
+            ids=[obj.id for obj in components], as_dataframe=as_dataframe, columns=columns
+        )
+
     def add_vector(self, vector_name: str):
         """
         Logs in the Corpus component object's internal vectors list that the component object has a vector row
@@ -175,6 +229,8 @@ class CorpusComponent:
         """
         if vector_name not in self.vectors:
             self.vectors.append(vector_name)
+            if self._owner is not None:
+                self._owner.backend_mapper.record_vectors_change(self.obj_type)
 
     def has_vector(self, vector_name: str):
         return vector_name in self.vectors
@@ -186,6 +242,8 @@ class CorpusComponent:
         :return: None
         """
         self.vectors.remove(vector_name)
+        if self._owner is not None:
+            self._owner.backend_mapper.record_vectors_change(self.obj_type)
 
     def to_dict(self):
         return {
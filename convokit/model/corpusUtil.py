@@ -80,3 +80,34 @@ def get_speakers_dataframe(obj, selector=lambda utt: True, exclude_meta: bool =
 
     df = pd.DataFrame(ds).T
     return df.set_index("id")
+
+
+def components_to_dataframe(objs, fields: dict, exclude_meta: bool = False):
+    """
+    Get a DataFrame of the given corpus components, built one column at a time rather than one row at a time.
+    Metadata attributes are given 'meta.<key>' columns, in order of first appearance, and are None for the
+    components that do not have them. All columns have the object dtype, so that the values are kept as they are.
+
+    :param objs: iterable of corpus components
+    :param fields: dictionary mapping the name of each (non-metadata) column to a function that takes a component
+        and returns its value for that column
+    :param exclude_meta: whether to exclude metadata
+    :return: a pandas DataFrame indexed by the ids of the components
+    """
+    ids = []
+    columns = {name: [] for name in fields}
+    metas = []
+    for obj in objs:
+        ids.append(obj.id)
+        for name, get_value in fields.items():
+            columns[name].append(get_value(obj))
+        if not exclude_meta:
+            metas.append(obj.meta.to_dict())
+
+    meta_keys = dict()
+    for meta in metas:
+        meta_keys.update(dict.fromkeys(meta))
+    for key in meta_keys:
+        columns["meta." + key] = [meta.get(key, None) for meta in metas]
+
+    return pd.DataFrame(columns, index=pd.Index(ids, name="id"), dtype=object)
@@ -2,24 +2,36 @@
 Contains functions that help with the construction / dumping of a Corpus
 """
 
+import gzip
+import io
 import json
 import os
 import pickle
-from collections import defaultdict, deque
+import shutil
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
 from typing import Dict, Optional, List, Iterable
 
-import bson
-from pymongo import UpdateOne
+import numpy as np
 
 from convokit.util import warn, create_safe_id
 from .conversation import Conversation
 from .convoKitIndex import ConvoKitIndex
 from .convoKitMeta import ConvoKitMeta
 from .speaker import Speaker
-from .backendMapper import BackendMapper, MemMapper, DBMapper
+from .backendMapper import BackendMapper, ChangeLog, MemMapper, DBMapper, DiskMapper
 from .utterance import Utterance
 
 BIN_DELIM_L, BIN_DELIM_R = "<##bin{", "}&&@**>"
+
+# Yielded by Corpus.ingest() for each batch of utterances: the utterances that were added, the conversations they
+# were added to, the ids of the utterances that were skipped since the corpus already had them, and the ids of the
+# conversations that were evicted to stay within the retention bound.
+IngestEvent = namedtuple(
+    "IngestEvent",
+    ["utterances", "conversations", "skipped_utterance_ids", "evicted_conversation_ids"],
+)
 KeyId = "id"
 KeySpeaker = "speaker"
 KeyConvoId = "conversation_id"
@@ -29,8 +41,71 @@ KeyText = "text"
 DefinedKeys = {KeyId, KeySpeaker, KeyConvoId, KeyReplyTo, KeyTimestamp, KeyText}
 KeyMeta = "meta"
 KeyVectors = "vectors"
+SpeakerConvoInfoFile = "speaker_convo_info.json"
 
 JSONLIST_BUFFER_SIZE = 1000
+# number of threads writing batches of documents when populating a DB from a corpus directory
+DB_WRITER_THREADS = 4
+# error code MongoDB reports for an insertion of an already existing _id
+DUPLICATE_KEY_ERROR = 11000
+# extension of the compressed corpus files, for each compression supported by Corpus.dump
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# number of components serialized (and compressed) together when dumping
+DUMP_CHUNK_SIZE = 10000
+# prefixes of the sidecar files written by incremental dumps: "incremental-meta.[obj_type].[field].jsonl" (or
+# ".p" for binary fields) holds the values of a metadata field, and "incremental-vectors.[obj_type].jsonl" the lists
+# of vectors of the components
+INCREMENTAL_META_PREFIX = "incremental-meta."
+INCREMENTAL_VECTORS_PREFIX = "incremental-vectors."
+# file extension of each encoding supported by Corpus.dump_info, in the order Corpus.load_info looks for them
+INFO_ENCODINGS = {"columnar": ".npz", "pickle": ".p", "jsonl": ".jsonl"}
+# the component files of a corpus directory, which may be compressed
+CORPUS_COMPONENT_FILES = [
+    "utterances.jsonl",
+    "utterances.json",
+    "speakers.json",
+    "users.json",
+    "conversations.json",
+]
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd compression requires the zstandard package. "
+            "Install it with 'pip install zstandard' or 'pip install convokit[zstd]'."
+        )
+    return zstandard
+
+
+def find_corpus_file(dirname: str, name: str) -> Optional[str]:
+    """
+    Returns the path to the file of the given name in the corpus directory, whether it was saved uncompressed or
+    compressed (with an extension from COMPRESSION_EXTENSIONS), or None if there is no such file.
+    """
+    for extension in [""] + list(COMPRESSION_EXTENSIONS.values()):
+        path = os.path.join(dirname, name + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def open_corpus_file(path: str):
+    """
+    Opens a corpus file for reading as text, decompressing it if its extension is one of COMPRESSION_EXTENSIONS.
+    """
+    if path.endswith(COMPRESSION_EXTENSIONS["gzip"]):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(COMPRESSION_EXTENSIONS["zstd"]):
+        reader = (
+            _import_zstandard()
+            .ZstdDecompressor()
+            .stream_reader(open(path, "rb"), read_across_frames=True)
+        )
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r")
 
 
 def get_corpus_id(
@@ -94,9 +169,11 @@ def initialize_backend(
             if db_host is None:
                 db_host = corpus.config.db_host
             return DBMapper(corpus.id, db_host)
+        elif backend == "disk":
+            return DiskMapper(corpus.config.disk_directory, corpus.id)
         else:
             raise ValueError(
-                f"Unrecognized setting '{backend}' for backend type; should be either 'mem' or 'db'."
+                f"Unrecognized setting '{backend}' for backend type; should be one of 'mem', 'db', or 'disk'."
             )
 
 
@@ -111,8 +188,8 @@ def load_utterance_info_from_dir(
     if utterance_end_index is None:
         utterance_end_index = float("inf")
 
-    if os.path.exists(os.path.join(dirname, "utterances.jsonl")):
-        with open(os.path.join(dirname, "utterances.jsonl"), "r") as f:
+    if find_corpus_file(dirname, "utterances.jsonl") is not None:
+        with open_corpus_file(find_corpus_file(dirname, "utterances.jsonl")) as f:
             utterances = []
             idx = 0
             for line in f:
@@ -120,8 +197,8 @@ def load_utterance_info_from_dir(
                     utterances.append(json.loads(line))
                 idx += 1
 
-    elif os.path.exists(os.path.join(dirname, "utterances.json")):
-        with open(os.path.join(dirname, "utterances.json"), "r") as f:
+    elif find_corpus_file(dirname, "utterances.json") is not None:
+        with open_corpus_file(find_corpus_file(dirname, "utterances.json")) as f:
             utterances = json.load(f)
 
     if exclude_utterance_meta:
@@ -133,8 +210,10 @@ def load_utterance_info_from_dir(
 
 
 def load_speakers_data_from_dir(filename, exclude_speaker_meta):
-    speaker_file = "speakers.json" if "speakers.json" in os.listdir(filename) else "users.json"
-    with open(os.path.join(filename, speaker_file), "r") as f:
+    speaker_file = find_corpus_file(filename, "speakers.json") or find_corpus_file(
+        filename, "users.json"
+    )
+    with open_corpus_file(speaker_file) as f:
         id_to_speaker_data = json.load(f)
 
         if (
@@ -162,7 +241,7 @@ def load_convos_data_from_dir(filename, exclude_conversation_meta):
     :param exclude_conversation_meta:
     :return: a mapping from convo id to convo meta
     """
-    with open(os.path.join(filename, "conversations.json"), "r") as f:
+    with open_corpus_file(find_corpus_file(filename, "conversations.json")) as f:
         id_to_convo_data = json.load(f)
 
         if (
@@ -308,11 +387,14 @@ def unpack_all_binary_data(
 
 def load_from_utterance_file(filename, utterance_start_index, utterance_end_index):
     """
-    where filename is "utterances.json" or "utterances.jsonl" for example
+    where filename is "utterances.json" or "utterances.jsonl" for example,
+    possibly compressed (e.g., "utterances.jsonl.gz")
     """
-    with open(filename, "r") as f:
+    with open_corpus_file(filename) as f:
         try:
             ext = filename.split(".")[-1]
+            if "." + ext in COMPRESSION_EXTENSIONS.values():
+                ext = filename.split(".")[-2]
             if ext == "json":
                 utterances = json.load(f)
             elif ext == "jsonl":
@@ -361,7 +443,7 @@ def initialize_speakers_and_utterances_objects(corpus, utterances, speakers_data
                 )
 
         speaker = corpus.speakers[speaker_key]
-        speaker.vectors = speakers_data[u[KeySpeaker]].get(KeyVectors, [])
+        speaker.vectors = speakers_data[u[KeySpeaker]].get(KeyVectors, None)
 
         # temp fix for reddit reply_to
         if "reply_to" in u:
@@ -378,7 +460,7 @@ def initialize_speakers_and_utterances_objects(corpus, utterances, speakers_data
             text=u[KeyText],
             meta=u[KeyMeta],
         )
-        utt.vectors = u.get(KeyVectors, [])
+        utt.vectors = u.get(KeyVectors, None)
         corpus.utterances[utt.id] = utt
 
 
@@ -526,7 +608,8 @@ def dump_helper_bin(d: ConvoKitMeta, d_bin: Dict, fields_to_skip=None) -> Dict:
 
     obj_idx = d.index.get_index(d.obj_type)
     d_out = {}
-    for k, v in d.items():
+    # read the whole entry at once rather than key by key, which copies every value
+    for k, v in d.to_dict().items():
         if k in fields_to_skip:
             continue
         try:
@@ -541,59 +624,379 @@ def dump_helper_bin(d: ConvoKitMeta, d_bin: Dict, fields_to_skip=None) -> Dict:
     return d_out
 
 
+def _compress(text: str, compression: Optional[str]) -> bytes:
+    data = text.encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    elif compression == "zstd":
+        return _import_zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def _encode_jsonlist_chunk(rows, compression):
+    return _compress("".join([json.dumps(row) + "\n" for row in rows]), compression)
+
+
+def _encode_json_object_chunk(items, first, last, compression):
+    """
+    Encode a chunk of the (key, value) items of a JSON object, such that the encoded chunks concatenate into the
+    same text as a json.dump of the whole object.
+    """
+    text = ", ".join([json.dumps(key) + ": " + json.dumps(value) for key, value in items])
+    # chunks other than the first always have items
+    text = ("{" if first else ", ") + text
+    return _compress(text + ("}" if last else ""), compression)
+
+
+class _ChunkedFileWriter:
+    """
+    Writes a corpus file from chunks of data, which are encoded (and compressed) by n_jobs threads and written in
+    order. A compressed file is written as one gzip member or zstd frame per chunk, which together form a valid
+    compressed file. Chunks are encoded with the standard json module rather than a faster third-party encoder
+    (e.g., orjson), which would be a new dependency and does not write the same text as json.dump (e.g., for
+    non-ASCII strings); the threads mostly speed up compression, which releases the GIL, and streaming chunks
+    bounds the memory used.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None, n_jobs: int = 1):
+        self.compression = compression
+        self.file = open(path, "wb")
+        self.pool = _BoundedThreadPool(n_jobs, consume=self.file.write)
+
+    def write(self, encode, *args):
+        self.pool.submit(encode, *args, self.compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.pool.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.file.close()
+
+
+def _vectors_to_dump(vectors, exclude_vectors):
+    return vectors if exclude_vectors is None else list(set(vectors) - set(exclude_vectors))
+
+
 def dump_corpus_component(
-    corpus, dir_name, filename, obj_type, bin_name, exclude_vectors, fields_to_skip
+    corpus,
+    dir_name,
+    filename,
+    obj_type,
+    bin_name,
+    exclude_vectors,
+    fields_to_skip,
+    compression=None,
+    n_jobs=1,
 ):
-    with open(os.path.join(dir_name, filename), "w") as f:
-        d_bin = defaultdict(list)
-        objs = defaultdict(dict)
-        for obj_id in corpus.get_object_ids(obj_type):
-            objs[obj_id][KeyMeta] = dump_helper_bin(
-                corpus.get_object(obj_type, obj_id).meta, d_bin, fields_to_skip.get(obj_type, [])
+    d_bin = defaultdict(list)
+    obj_ids = corpus.get_object_ids(obj_type)
+    path = os.path.join(dir_name, filename + COMPRESSION_EXTENSIONS.get(compression, ""))
+    with _ChunkedFileWriter(path, compression, n_jobs) as writer:
+        # an empty object is still written as a single (empty) chunk
+        for start in range(0, max(len(obj_ids), 1), DUMP_CHUNK_SIZE):
+            items = []
+            for obj_id in obj_ids[start : start + DUMP_CHUNK_SIZE]:
+                obj = corpus.get_object(obj_type, obj_id)
+                items.append(
+                    (
+                        obj_id,
+                        {
+                            KeyMeta: dump_helper_bin(
+                                obj.meta, d_bin, fields_to_skip.get(obj_type, [])
+                            ),
+                            KeyVectors: _vectors_to_dump(obj.vectors, exclude_vectors),
+                        },
+                    )
+                )
+            writer.write(
+                _encode_json_object_chunk,
+                items,
+                start == 0,
+                start + DUMP_CHUNK_SIZE >= len(obj_ids),
             )
-            obj_vectors = corpus.get_object(obj_type, obj_id).vectors
-            objs[obj_id][KeyVectors] = (
-                obj_vectors
-                if exclude_vectors is None
-                else list(set(obj_vectors) - set(exclude_vectors))
+
+    for name, l_bin in d_bin.items():
+        with open(os.path.join(dir_name, name + "-{}-bin.p".format(bin_name)), "wb") as f_pk:
+            pickle.dump(l_bin, f_pk)
+
+
+def dump_utterances(corpus, dir_name, exclude_vectors, fields_to_skip, compression=None, n_jobs=1):
+    d_bin = defaultdict(list)
+    path = os.path.join(dir_name, "utterances.jsonl" + COMPRESSION_EXTENSIONS.get(compression, ""))
+    with _ChunkedFileWriter(path, compression, n_jobs) as writer:
+        rows = []
+        for ut in corpus.iter_utterances():
+            # fetch all the properties at once, rather than one backend lookup per property
+            data = corpus.backend_mapper.get_data("utterance", ut.id)
+            rows.append(
+                {
+                    KeyId: ut.id,
+                    KeyConvoId: data["conversation_id"],
+                    KeyText: data["text"],
+                    KeySpeaker: ut.speaker.id,
+                    KeyMeta: dump_helper_bin(ut.meta, d_bin, fields_to_skip.get("utterance", [])),
+                    KeyReplyTo: data["reply_to"],
+                    KeyTimestamp: data["timestamp"],
+                    KeyVectors: _vectors_to_dump(ut.vectors, exclude_vectors),
+                }
             )
-        json.dump(objs, f)
+            if len(rows) >= DUMP_CHUNK_SIZE:
+                writer.write(_encode_jsonlist_chunk, rows)
+                rows = []
+        writer.write(_encode_jsonlist_chunk, rows)
 
-        for name, l_bin in d_bin.items():
-            with open(os.path.join(dir_name, name + "-{}-bin.p".format(bin_name)), "wb") as f_pk:
-                pickle.dump(l_bin, f_pk)
+    for name, l_bin in d_bin.items():
+        with open(os.path.join(dir_name, name + "-bin.p"), "wb") as f_pk:
+            pickle.dump(l_bin, f_pk)
 
 
-def dump_utterances(corpus, dir_name, exclude_vectors, fields_to_skip):
-    with open(os.path.join(dir_name, "utterances.jsonl"), "w") as f:
-        d_bin = defaultdict(list)
+def _link_or_copy(src, dest):
+    """
+    Hard-link the file src to dest, or copy it if it cannot be linked (e.g., across file systems).
+    """
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
 
-        for ut in corpus.iter_utterances():
-            ut_obj = {
-                KeyId: ut.id,
-                KeyConvoId: ut.conversation_id,
-                KeyText: ut.text,
-                KeySpeaker: ut.speaker.id,
-                KeyMeta: dump_helper_bin(ut.meta, d_bin, fields_to_skip.get("utterance", [])),
-                KeyReplyTo: ut.reply_to,
-                KeyTimestamp: ut.timestamp,
-                KeyVectors: (
-                    ut.vectors
-                    if exclude_vectors is None
-                    else list(set(ut.vectors) - set(exclude_vectors))
-                ),
-            }
-            json.dump(ut_obj, f)
-            f.write("\n")
 
-        for name, l_bin in d_bin.items():
-            with open(os.path.join(dir_name, name + "-bin.p"), "wb") as f_pk:
-                pickle.dump(l_bin, f_pk)
+def _link_or_copy_path(src, dest):
+    if os.path.isdir(src):
+        shutil.copytree(src, dest, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(src, dest)
+
+
+def recover_dump_dir(dir_name: str) -> None:
+    """
+    Finish any swap of commit_dump_dir that was interrupted for the corpus directory dir_name. A leftover
+    ".<name>.<id>.old" directory means that the dump next to it, ".<name>.<id>.tmp", was complete: if dir_name is
+    missing, the crash happened between the two renames, and the complete new corpus is moved into place (or, if it
+    is gone too, the old one is moved back). The old directory is then removed. Temporary directories without an .old
+    counterpart may belong to a dump that is still running, and are left alone.
+    """
+    parent_dir, name = os.path.split(os.path.abspath(dir_name))
+    if not os.path.isdir(parent_dir):
+        return
+    prefix = ".{}.".format(name)
+    for entry in os.listdir(parent_dir):
+        if not (entry.startswith(prefix) and entry.endswith(".old")):
+            continue
+        old_dir_name = os.path.join(parent_dir, entry)
+        tmp_dir_name = old_dir_name[: -len(".old")] + ".tmp"
+        if not os.path.exists(dir_name):
+            if os.path.isdir(tmp_dir_name):
+                os.rename(tmp_dir_name, dir_name)
+            else:
+                os.rename(old_dir_name, dir_name)
+                continue
+        shutil.rmtree(old_dir_name, ignore_errors=True)
+
+
+def make_dump_dir(dir_name: str) -> str:
+    """
+    Create a temporary directory to dump a corpus to, next to its destination dir_name (so that it can be renamed
+    to dir_name by commit_dump_dir). An earlier dump to dir_name that crashed while being committed is recovered first.
+    """
+    recover_dump_dir(dir_name)
+    parent_dir, name = os.path.split(os.path.abspath(dir_name))
+    tmp_dir_name = os.path.join(parent_dir, ".{}.{}.tmp".format(name, uuid4().hex))
+    os.mkdir(tmp_dir_name)
+    return tmp_dir_name
+
+
+def commit_dump_dir(tmp_dir_name: str, dir_name: str) -> None:
+    """
+    Move a completely dumped corpus directory to its destination. If the destination already exists, the files in
+    it that the dump does not replace (e.g., vectors and info files that were not dumped again) are first linked into
+    the new directory, which is then swapped in with two renames. A crash at any point therefore never leaves a
+    half-written corpus: at worst, the crash falls between the two renames, leaving the old and the complete new
+    corpus under their temporary names, and recover_dump_dir moves the new one into place at the next load or dump.
+    """
+    if not os.path.exists(dir_name):
+        os.rename(tmp_dir_name, dir_name)
+        return
+
+    dumped = set(os.listdir(tmp_dir_name))
+    for name in os.listdir(dir_name):
+        if (
+            name in dumped
+            or name == SpeakerConvoInfoFile
+            or name.endswith("-bin.p")
+            or name.startswith(INCREMENTAL_META_PREFIX)
+            or name.startswith(INCREMENTAL_VECTORS_PREFIX)
+            or any(name.startswith(component_file) for component_file in CORPUS_COMPONENT_FILES)
+        ):
+            continue
+        _link_or_copy_path(os.path.join(dir_name, name), os.path.join(tmp_dir_name, name))
+    old_dir_name = tmp_dir_name[: -len(".tmp")] + ".old"
+    os.rename(dir_name, old_dir_name)
+    try:
+        os.rename(tmp_dir_name, dir_name)
+    except BaseException:
+        os.rename(old_dir_name, dir_name)
+        raise
+    shutil.rmtree(old_dir_name)
+
+
+def _incremental_file_key(name: str) -> str:
+    """
+    Strips the compression and format extensions of the name of an incremental dump file.
+    """
+    for extension in COMPRESSION_EXTENSIONS.values():
+        if name.endswith(extension):
+            name = name[: -len(extension)]
+    for extension in [".jsonl", ".p"]:
+        if name.endswith(extension):
+            return name[: -len(extension)]
+    return name
+
+
+# suffix of the binary metadata files of each object type
+BIN_FILE_SUFFIXES = {
+    "utterance": "-bin.p",
+    "speaker": "-speaker-bin.p",
+    "conversation": "-convo-bin.p",
+}
+
+
+def dump_incremental_changes(
+    corpus,
+    dir_name,
+    corpus_dir_name,
+    change_log,
+    exclude_vectors,
+    fields_to_skip,
+    compression=None,
+    n_jobs=1,
+):
+    """
+    Writes the metadata fields and component vector lists recorded in change_log to sidecar files in dir_name (to be
+    committed to corpus_dir_name), each holding the current values of one field for all components of one type.
+    """
+    for obj_type, fields in change_log.meta_fields.items():
+        if obj_type == "corpus":
+            # the corpus metadata is always dumped in full
+            continue
+        fields = [f for f in fields if f not in fields_to_skip.get(obj_type, [])]
+        if len(fields) == 0:
+            continue
+        index = corpus.meta_index.get_index(obj_type)
+        values = {field: {} for field in fields}
+        for obj in corpus.iter_objs(obj_type):
+            meta = obj.meta.to_dict()
+            for field in fields:
+                if field in meta:
+                    values[field][obj.id] = meta[field]
+        for field in fields:
+            name = INCREMENTAL_META_PREFIX + "{}.{}".format(obj_type, field)
+            if index.get(field, None) == ["bin"]:
+                with open(os.path.join(dir_name, name + ".p"), "wb") as f:
+                    pickle.dump(values[field], f)
+                bin_filename = field + BIN_FILE_SUFFIXES[obj_type]
+                if not os.path.exists(os.path.join(corpus_dir_name, bin_filename)):
+                    # the loader expects a file of binary values for each binary field, even though
+                    # the components files don't refer to any for this (new) field
+                    with open(os.path.join(dir_name, bin_filename), "wb") as f:
+                        pickle.dump([], f)
+            else:
+                _dump_jsonlist_chunks(
+                    os.path.join(dir_name, name + ".jsonl"),
+                    values[field].items(),
+                    compression,
+                    n_jobs,
+                )
+
+    for obj_type in change_log.component_vectors:
+        _dump_jsonlist_chunks(
+            os.path.join(dir_name, INCREMENTAL_VECTORS_PREFIX + obj_type + ".jsonl"),
+            (
+                (obj.id, _vectors_to_dump(obj.vectors, exclude_vectors))
+                for obj in corpus.iter_objs(obj_type)
+            ),
+            compression,
+            n_jobs,
+        )
+
+
+def _dump_jsonlist_chunks(path, entries, compression, n_jobs, index_key="id", value_key="value"):
+    with _ChunkedFileWriter(
+        path + COMPRESSION_EXTENSIONS.get(compression, ""), compression, n_jobs
+    ) as writer:
+        rows = []
+        for k, v in entries:
+            rows.append({index_key: k, value_key: v})
+            if len(rows) >= DUMP_CHUNK_SIZE:
+                writer.write(_encode_jsonlist_chunk, rows)
+                rows = []
+        writer.write(_encode_jsonlist_chunk, rows)
+
+
+def commit_incremental_dump(tmp_dir_name: str, dir_name: str) -> None:
+    """
+    Move the files of an incremental dump from tmp_dir_name into the corpus directory dir_name, one rename per file
+    (or directory, for vector matrices), so that each of them is either fully updated or left untouched. Sidecar
+    files of earlier incremental dumps that the new ones supersede (e.g., saved with another compression) are removed.
+    """
+    existing = os.listdir(dir_name)
+    for name in os.listdir(tmp_dir_name):
+        src, dest = os.path.join(tmp_dir_name, name), os.path.join(dir_name, name)
+        if os.path.isdir(src):
+            if os.path.exists(dest):
+                old = os.path.join(tmp_dir_name, name + ".old")
+                os.rename(dest, old)
+                os.rename(src, dest)
+                shutil.rmtree(old)
+            else:
+                os.rename(src, dest)
+            continue
+        os.replace(src, dest)
+        if name.startswith(INCREMENTAL_META_PREFIX) or name.startswith(INCREMENTAL_VECTORS_PREFIX):
+            for other in existing:
+                if other != name and _incremental_file_key(other) == _incremental_file_key(name):
+                    os.remove(os.path.join(dir_name, other))
+    os.rmdir(tmp_dir_name)
+
+
+def load_incremental_changes(corpus, dirname, exclude_meta):
+    """
+    Applies the sidecar files of incremental dumps in dirname to the (just loaded) corpus.
+
+    :param exclude_meta: for each object type, a list of metadata fields to skip
+    """
+    for name in sorted(os.listdir(dirname)):
+        if name.startswith(INCREMENTAL_META_PREFIX):
+            obj_type, field = _incremental_file_key(name)[len(INCREMENTAL_META_PREFIX) :].split(
+                ".", 1
+            )
+            if field in exclude_meta.get(obj_type, []):
+                continue
+            if _incremental_file_key(name) + ".p" == name:
+                with open(os.path.join(dirname, name), "rb") as f:
+                    values = pickle.load(f)
+            else:
+                values = load_jsonlist_to_dict(os.path.join(dirname, name))
+            # skip the components that were not loaded (e.g., with utterance_end_index)
+            loaded_ids = corpus.get_object_ids(obj_type)
+            corpus.bulk_add_meta(
+                obj_type,
+                field,
+                {obj_id: values[obj_id] for obj_id in loaded_ids if obj_id in values},
+            )
+        elif name.startswith(INCREMENTAL_VECTORS_PREFIX):
+            obj_type = _incremental_file_key(name)[len(INCREMENTAL_VECTORS_PREFIX) :]
+            vectors = load_jsonlist_to_dict(os.path.join(dirname, name))
+            for obj in corpus.iter_objs(obj_type):
+                if obj.id in vectors:
+                    obj.vectors = vectors[obj.id]
 
 
 def load_jsonlist_to_dict(filename, index_key="id", value_key="value"):
     entries = {}
-    with open(filename, "r") as f:
+    with open_corpus_file(filename) as f:
         for line in f:
             entry = json.loads(line)
             entries[entry[index_key]] = entry[value_key]
@@ -608,10 +1011,31 @@ def dump_jsonlist_from_dict(entries, filename, index_key="id", value_key="value"
 
 
 def extract_meta_from_df(df):
-    meta_cols = [col.split(".")[1] for col in df if col.startswith("meta")]
+    meta_cols = [col[len("meta.") :] for col in df if col.startswith("meta.")]
     return meta_cols
 
 
+def get_ids_from_df(df) -> List[str]:
+    """
+    Returns the ids of the objects in a dataframe, as strings: the 'id' column if there is one, and the index otherwise.
+    """
+    ids = df["id"] if "id" in df.columns else df.index
+    return ids.astype(str).tolist()
+
+
+def add_meta_from_df(corpus, obj_type, df):
+    """
+    Adds the 'meta.<key>' columns of a dataframe to the metadata of the corpus objects of type obj_type, one column
+    at a time. Rows of objects that are not in the corpus are skipped.
+    """
+    ids = get_ids_from_df(df)
+    obj_ids = set(corpus.get_object_ids(obj_type))
+    positions = [i for i, obj_id in enumerate(ids) if obj_id in obj_ids]
+    for key in extract_meta_from_df(df):
+        values = df["meta." + key].tolist()
+        corpus.bulk_add_meta(obj_type, key, {ids[i]: values[i] for i in positions})
+
+
 def load_binary_metadata(filename, index, exclude_meta=None):
     binary_data = {"utterance": {}, "conversation": {}, "speaker": {}, "corpus": {}}
     for component_type in binary_data:
@@ -642,6 +1066,105 @@ def load_binary_metadata(filename, index, exclude_meta=None):
     return binary_data, exclude_meta
 
 
+def _collection_is_empty(collection, ignored_ids=()) -> bool:
+    return collection.find_one({"_id": {"$nin": list(ignored_ids)}}, projection=["_id"]) is None
+
+
+def _write_docs_to_db(collection, docs, insert=False):
+    """
+    Write a batch of documents (each with its "_id") to the given collection. With insert=True, which should only be
+    used on collections that were empty before the load began, the documents are inserted as is, which is much cheaper
+    than upserting them; documents whose id turns out to be taken are then upserted. Otherwise, all the documents are
+    upserted, i.e., their fields are set on any existing document.
+
+    Batches are written concurrently, so a batch must not repeat an id of another batch of the same load: the callers
+    set aside the repeated occurrences of an id and upsert them in file order once all the batches have been written,
+    so that the last occurrence wins, as with sequential writes.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    if len(docs) == 0:
+        return
+    if insert:
+        try:
+            collection.insert_many(docs, ordered=False)
+            return
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            docs = [docs[error["index"]] for error in sorted(errors, key=lambda e: e["index"])]
+    collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {k: v for k, v in doc.items() if k != "_id"}},
+                upsert=True,
+            )
+            for doc in docs
+        ]
+    )
+
+
+class _BoundedThreadPool:
+    """
+    Runs tasks in a pool of threads, handing their results to `consume` (in the calling thread, in the order the
+    tasks were submitted). At most two tasks per thread are pending at any time, which bounds the memory held by the
+    arguments and results of pending tasks.
+    """
+
+    def __init__(self, n_threads: int, consume=None):
+        self.executor = ThreadPoolExecutor(max_workers=n_threads)
+        self.consume = consume
+        self.max_pending = 2 * n_threads
+        self.pending = deque()
+
+    def submit(self, fn, *args):
+        self.pending.append(self.executor.submit(fn, *args))
+        while len(self.pending) > self.max_pending:
+            self._consume_oldest()
+
+    def _consume_oldest(self):
+        # raises any error encountered by the task
+        result = self.pending.popleft().result()
+        if self.consume is not None:
+            self.consume(result)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                while len(self.pending) > 0:
+                    self._consume_oldest()
+            else:
+                for future in self.pending:
+                    future.cancel()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def _pack_binary_meta(meta, bin_meta):
+    """
+    Replace the binary metadata locators in the given metadata dict with the (pickled) values they point to.
+    """
+    import bson
+
+    if bin_meta is None:
+        return
+    for key, bin_list in bin_meta.items():
+        bin_locator = meta.get(key, None)
+        if (
+            type(bin_locator) == str
+            and bin_locator.startswith(BIN_DELIM_L)
+            and bin_locator.endswith(BIN_DELIM_R)
+        ):
+            bin_idx = int(bin_locator[len(BIN_DELIM_L) : -len(BIN_DELIM_R)])
+            meta[key] = bson.Binary(pickle.dumps(bin_list[bin_idx]))
+
+
 def load_jsonlist_to_db(
     filename,
     db,
@@ -650,18 +1173,29 @@ def load_jsonlist_to_db(
     end_line=None,
     exclude_meta=None,
     bin_meta=None,
+    empty_collections=None,
 ):
     """
     Populate the specified MongoDB database with the utterance data contained in
     the given filename (which should point to an utterances.jsonl file).
+    Batches of JSONLIST_BUFFER_SIZE utterances are written by DB_WRITER_THREADS
+    threads; the collections listed in empty_collections (e.g., "utterance" and
+    "meta"), which must have been empty before the load began, are filled with
+    plain insertions rather than upserts. Utterances whose id was already seen
+    are upserted after all the batches, in file order, so that the last
+    occurrence of an id wins.
     """
+    if empty_collections is None:
+        empty_collections = set()
     utt_collection = db[f"{collection_prefix}_utterance"]
     meta_collection = db[f"{collection_prefix}_meta"]
     inserted_ids = set()
+    repeated_utt_docs = []
+    repeated_meta_docs = []
     speaker_key = None
     convo_key = None
     reply_key = None
-    with open(filename) as f:
+    with open_corpus_file(filename) as f, _BoundedThreadPool(DB_WRITER_THREADS) as pool:
         utt_insertion_buffer = []
         meta_insertion_buffer = []
         for ln, line in enumerate(f):
@@ -680,98 +1214,126 @@ def load_jsonlist_to_db(
                 # fix for misnamed reply_to in subreddit corpora
                 reply_key = "reply-to" if "reply-to" in utt_obj else "reply_to"
             utt_obj = defaultdict(lambda: None, utt_obj)
-            utt_insertion_buffer.append(
-                UpdateOne(
-                    {"_id": utt_obj["id"]},
-                    {
-                        "$set": {
-                            "speaker_id": utt_obj[speaker_key],
-                            "conversation_id": utt_obj[convo_key],
-                            "reply_to": utt_obj[reply_key],
-                            "timestamp": utt_obj["timestamp"],
-                            "text": utt_obj["text"],
-                        }
-                    },
-                    upsert=True,
-                )
-            )
+            utt_doc = {
+                "_id": utt_obj["id"],
+                "speaker_id": utt_obj[speaker_key],
+                "conversation_id": utt_obj[convo_key],
+                "reply_to": utt_obj[reply_key],
+                "timestamp": utt_obj["timestamp"],
+                "text": utt_obj["text"],
+            }
             utt_meta = utt_obj["meta"]
+            if utt_meta is None:
+                utt_meta = {}
             if exclude_meta is not None:
                 for exclude_key in exclude_meta:
                     if exclude_key in utt_meta:
                         del utt_meta[exclude_key]
-            if bin_meta is not None:
-                for key, bin_list in bin_meta.items():
-                    bin_locator = utt_meta.get(key, None)
-                    if (
-                        type(bin_locator) == str
-                        and bin_locator.startswith(BIN_DELIM_L)
-                        and bin_locator.endswith(BIN_DELIM_R)
-                    ):
-                        bin_idx = int(bin_locator[len(BIN_DELIM_L) : -len(BIN_DELIM_R)])
-                        utt_meta[key] = bson.Binary(pickle.dumps(bin_list[bin_idx]))
-            meta_insertion_buffer.append(
-                UpdateOne({"_id": "utterance_" + utt_obj["id"]}, {"$set": utt_meta}, upsert=True)
-            )
+            _pack_binary_meta(utt_meta, bin_meta)
+            utt_meta["_id"] = "utterance_" + utt_obj["id"]
+            if utt_obj["id"] in inserted_ids:
+                # a pending batch may hold an earlier occurrence of this id
+                repeated_utt_docs.append(utt_doc)
+                repeated_meta_docs.append(utt_meta)
+                continue
+            utt_insertion_buffer.append(utt_doc)
+            meta_insertion_buffer.append(utt_meta)
             inserted_ids.add(utt_obj["id"])
             if len(utt_insertion_buffer) >= JSONLIST_BUFFER_SIZE:
-                utt_collection.bulk_write(utt_insertion_buffer)
-                meta_collection.bulk_write(meta_insertion_buffer)
+                pool.submit(
+                    _write_docs_to_db,
+                    utt_collection,
+                    utt_insertion_buffer,
+                    "utterance" in empty_collections,
+                )
+                pool.submit(
+                    _write_docs_to_db,
+                    meta_collection,
+                    meta_insertion_buffer,
+                    "meta" in empty_collections,
+                )
                 utt_insertion_buffer = []
                 meta_insertion_buffer = []
         # after loop termination, insert any remaining items in the buffer
-        if len(utt_insertion_buffer) > 0:
-            utt_collection.bulk_write(utt_insertion_buffer)
-            meta_collection.bulk_write(meta_insertion_buffer)
-            utt_insertion_buffer = []
-            meta_insertion_buffer = []
+        pool.submit(
+            _write_docs_to_db,
+            utt_collection,
+            utt_insertion_buffer,
+            "utterance" in empty_collections,
+        )
+        pool.submit(
+            _write_docs_to_db, meta_collection, meta_insertion_buffer, "meta" in empty_collections
+        )
+    # all batches are written by now, so the repeated ids overwrite their earlier occurrences
+    _write_docs_to_db(utt_collection, repeated_utt_docs)
+    _write_docs_to_db(meta_collection, repeated_meta_docs)
     return inserted_ids
 
 
 def load_json_to_db(
-    filename, db, collection_prefix, component_type, exclude_meta=None, bin_meta=None
+    filename,
+    db,
+    collection_prefix,
+    component_type,
+    exclude_meta=None,
+    bin_meta=None,
+    empty_collections=None,
 ):
     """
     Populate the specified MongoDB database with corpus component data from
     either the speakers.json or conversations.json file located in a directory
     containing valid ConvoKit Corpus data. The component_type parameter controls
-    which JSON file gets used.
+    which JSON file gets used. Writes are batched as in load_jsonlist_to_db.
     """
+    if empty_collections is None:
+        empty_collections = set()
     component_collection = db[f"{collection_prefix}_{component_type}"]
     meta_collection = db[f"{collection_prefix}_meta"]
     if component_type == "speaker":
         json_data = load_speakers_data_from_dir(filename, exclude_meta)
     elif component_type == "conversation":
         json_data = load_convos_data_from_dir(filename, exclude_meta)
-    component_insertion_buffer = []
-    meta_insertion_buffer = []
-    for component_id, component_data in json_data.items():
-        if KeyMeta in component_data:
-            # contains non-metadata entries
-            payload = {k: v for k, v in component_data.items() if k not in {"meta", "vectors"}}
-            meta = component_data[KeyMeta]
-        else:
-            # contains only metadata, with metadata at the top level
-            payload = {}
-            meta = component_data
-        component_insertion_buffer.append(
-            UpdateOne({"_id": component_id}, {"$set": payload}, upsert=True)
+    with _BoundedThreadPool(DB_WRITER_THREADS) as pool:
+        component_insertion_buffer = []
+        meta_insertion_buffer = []
+        for component_id, component_data in json_data.items():
+            if KeyMeta in component_data:
+                # contains non-metadata entries
+                payload = {k: v for k, v in component_data.items() if k not in {"meta", "vectors"}}
+                meta = component_data[KeyMeta]
+            else:
+                # contains only metadata, with metadata at the top level
+                payload = {}
+                meta = component_data
+            payload["_id"] = component_id
+            component_insertion_buffer.append(payload)
+            _pack_binary_meta(meta, bin_meta)
+            meta["_id"] = f"{component_type}_{component_id}"
+            meta_insertion_buffer.append(meta)
+            if len(component_insertion_buffer) >= JSONLIST_BUFFER_SIZE:
+                pool.submit(
+                    _write_docs_to_db,
+                    component_collection,
+                    component_insertion_buffer,
+                    component_type in empty_collections,
+                )
+                pool.submit(
+                    _write_docs_to_db,
+                    meta_collection,
+                    meta_insertion_buffer,
+                    "meta" in empty_collections,
+                )
+                component_insertion_buffer = []
+                meta_insertion_buffer = []
+        pool.submit(
+            _write_docs_to_db,
+            component_collection,
+            component_insertion_buffer,
+            component_type in empty_collections,
         )
-        if bin_meta is not None:
-            for key, bin_list in bin_meta.items():
-                bin_locator = meta.get(key, None)
-                if (
-                    type(bin_locator) == str
-                    and bin_locator.startswith(BIN_DELIM_L)
-                    and bin_locator.endswith(BIN_DELIM_R)
-                ):
-                    bin_idx = int(bin_locator[len(BIN_DELIM_L) : -len(BIN_DELIM_R)])
-                    meta[key] = bson.Binary(pickle.dumps(bin_list[bin_idx]))
-        meta_insertion_buffer.append(
-            UpdateOne({"_id": f"{component_type}_{component_id}"}, {"$set": meta}, upsert=True)
+        pool.submit(
+            _write_docs_to_db, meta_collection, meta_insertion_buffer, "meta" in empty_collections
         )
-    component_collection.bulk_write(component_insertion_buffer)
-    meta_collection.bulk_write(meta_insertion_buffer)
 
 
 def load_corpus_info_to_db(filename, db, collection_prefix, exclude_meta=None, bin_meta=None):
@@ -784,85 +1346,225 @@ def load_corpus_info_to_db(filename, db, collection_prefix, exclude_meta=None, b
     meta_collection = db[f"{collection_prefix}_meta"]
     with open(os.path.join(filename, "corpus.json")) as f:
         corpus_meta = {k: v for k, v in json.load(f).items() if k not in exclude_meta}
-        if bin_meta is not None:
-            for key, bin_list in bin_meta.items():
-                bin_locator = corpus_meta.get(key, None)
-                if (
-                    type(bin_locator) == str
-                    and bin_locator.startswith(BIN_DELIM_L)
-                    and bin_locator.endswith(BIN_DELIM_R)
-                ):
-                    bin_idx = int(bin_locator[len(BIN_DELIM_L) : -len(BIN_DELIM_R)])
-                    corpus_meta[key] = bson.Binary(pickle.dumps(bin_list[bin_idx]))
+        _pack_binary_meta(corpus_meta, bin_meta)
         meta_collection.update_one(
             {"_id": f"corpus_{collection_prefix}"}, {"$set": corpus_meta}, upsert=True
         )
 
 
-def load_info_to_mem(corpus, dir_name, obj_type, field):
+def _info_filename(field: str, encoding: str) -> str:
+    return "info.{}{}".format(field, INFO_ENCODINGS[encoding])
+
+
+def find_info_file(dir_name: str, field: str) -> Optional[str]:
     """
-    Helper for load_info in mem mode that reads the file for the specified extra
-    info field, loads it into memory, and assigns the entries to their
-    corresponding corpus components.
+    Returns the path to the file holding the values of the given info field, in whichever encoding (and, for
+    jsonl, compression) it was dumped, or None if there is no such file.
     """
-    getter = lambda oid: corpus.get_object(obj_type, oid)
-    entries = load_jsonlist_to_dict(os.path.join(dir_name, "info.%s.jsonl" % field))
-    for k, v in entries.items():
-        try:
-            obj = getter(k)
-            obj.add_meta(field, v)
-        except:
+    for encoding in INFO_ENCODINGS:
+        path = find_corpus_file(dir_name, _info_filename(field, encoding))
+        if path is not None:
+            return path
+    return None
+
+
+def list_info_fields(dir_name: str) -> List[str]:
+    """
+    Lists the info fields that have a file in dir_name.
+    """
+    fields = set()
+    for name in os.listdir(dir_name):
+        if not name.startswith("info."):
             continue
+        for extension in COMPRESSION_EXTENSIONS.values():
+            if name.endswith(extension):
+                name = name[: -len(extension)]
+        for extension in INFO_ENCODINGS.values():
+            if name.endswith(extension):
+                fields.add(name[len("info.") : -len(extension)])
+    return sorted(fields)
+
+
+def read_info_file(path: str, ids=None) -> Dict:
+    """
+    Reads the values of an info field from a file written by write_info_file.
+
+    :param path: path to the file
+    :param ids: if given, a set of the ids of the only objects to read the values of
+    :return: a mapping from object id to value
+    """
+    if path.endswith(INFO_ENCODINGS["columnar"]):
+        with np.load(path, allow_pickle=False) as arrays:
+            obj_ids = arrays["ids"].tolist()
+            values = arrays["values"].tolist()
+            if "offsets" in arrays:
+                offsets = arrays["offsets"].tolist()
+                values = [values[offsets[i] : offsets[i + 1]] for i in range(len(obj_ids))]
+        entries = dict(zip(obj_ids, values))
+    elif path.endswith(INFO_ENCODINGS["pickle"]):
+        with open(path, "rb") as f:
+            entries = pickle.load(f)
+    else:
+        if ids is None:
+            return load_jsonlist_to_dict(path)
+        entries = {}
+        with open_corpus_file(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["id"] in ids:
+                    entries[entry["id"]] = entry["value"]
+        return entries
+    if ids is not None:
+        entries = {obj_id: value for obj_id, value in entries.items() if obj_id in ids}
+    return entries
+
 
+def read_info_file_job(args):
+    return read_info_file(*args)
 
-def load_info_to_db(corpus, dir_name, obj_type, field, index_key="id", value_key="value"):
+
+def _encode_columnar(entries: Dict) -> Dict[str, np.ndarray]:
+    """
+    Encodes info values that are all numbers, or all lists of numbers, as numpy arrays: the ids, the values, and (for
+    lists) the offsets of each list in the flattened values. Objects whose value is None are left out.
     """
-    Helper for load_info in DB mode that reads the jsonlist file for the
-    specified extra info field in a batched line-by-line manner, populates
-    its contents into the DB, and updates the Corpus' metadata index
+    obj_ids = [obj_id for obj_id, value in entries.items() if value is not None]
+    values = [entries[obj_id] for obj_id in obj_ids]
+    arrays = {"ids": np.array(obj_ids, dtype=str)}
+    if len(values) > 0 and all(isinstance(value, (list, tuple)) for value in values):
+        arrays["offsets"] = np.cumsum([0] + [len(value) for value in values])
+        arrays["values"] = np.array([x for value in values for x in value])
+    else:
+        arrays["values"] = np.array(values)
+    if arrays["values"].ndim != 1 or (
+        len(arrays["values"]) > 0 and arrays["values"].dtype.kind not in "biuf"
+    ):
+        raise ValueError(
+            "The columnar encoding requires all values to be numbers or lists of numbers (or None)."
+        )
+    return arrays
+
+
+def write_info_file(entries: Dict, dir_name: str, field: str, encoding: str = "jsonl") -> None:
     """
-    filename = os.path.join(dir_name, "info.%s.jsonl" % field)
+    Writes the values of an info field to dir_name, in the given encoding (see INFO_ENCODINGS), replacing any file
+    of the field in another encoding. The file is written under a temporary name, then renamed into place.
+    """
+    if encoding not in INFO_ENCODINGS:
+        raise ValueError(
+            "encoding must be one of {}, not {!r}".format(list(INFO_ENCODINGS), encoding)
+        )
+    filename = _info_filename(field, encoding)
+    tmp_path = os.path.join(dir_name, ".{}.{}.tmp".format(filename, uuid4().hex))
+    try:
+        if encoding == "columnar":
+            arrays = _encode_columnar(entries)
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+        elif encoding == "pickle":
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            _dump_jsonlist_chunks(tmp_path, entries.items(), None, 1)
+        os.replace(tmp_path, os.path.join(dir_name, filename))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    for other_encoding in INFO_ENCODINGS:
+        if other_encoding == encoding:
+            continue
+        other_path = find_corpus_file(dir_name, _info_filename(field, other_encoding))
+        if other_path is not None:
+            os.remove(other_path)
+
+
+def load_info_to_mem(corpus, obj_type, field, entries):
+    """
+    Helper for load_info in mem mode that assigns the loaded entries of the
+    specified extra info field to their corresponding corpus components,
+    skipping the ids of objects that are not in the corpus.
+    """
+    obj_ids = set(corpus.get_object_ids(obj_type))
+    corpus.bulk_add_meta(
+        obj_type, field, {obj_id: value for obj_id, value in entries.items() if obj_id in obj_ids}
+    )
+
+
+def load_info_to_db(corpus, dir_name, obj_type, field, path=None, ids=None):
+    """
+    Helper for load_info in DB mode that reads the file for the specified extra
+    info field, populates its contents into the DB in batches (written by
+    DB_WRITER_THREADS threads), and updates the Corpus' metadata index.
+    Entries of objects that are not in the corpus, or not in ids if given, are skipped;
+    repeated entries of an object are written after all the batches, in file order,
+    so that its last entry wins.
+    """
+    import bson
+
+    if path is None:
+        path = find_info_file(dir_name, field)
     meta_collection = corpus.backend_mapper.get_collection("meta")
+    obj_ids = set(corpus.get_object_ids(obj_type))
+    if ids is not None:
+        obj_ids &= ids
 
-    # attept to use saved type information
+    # attept to use saved type information, if the info files sit next to a dumped corpus
+    index_updated = False
     index_file = os.path.join(dir_name, "index.json")
-    with open(index_file) as f:
-        raw_index = json.load(f)
-        try:
-            field_type = raw_index[f"{obj_type}s-index"][field]
-            corpus.meta_index.get_index(obj_type)[field] = field_type
-            index_updated = True
-        except:
-            # field not recorded in the index file; we will need to infer
-            # types during insertion time
-            index_updated = False
+    if os.path.exists(index_file):
+        with open(index_file) as f:
+            raw_index = json.load(f)
+            try:
+                field_type = raw_index[f"{obj_type}s-index"][field]
+                corpus.meta_index.get_index(obj_type)[field] = field_type
+                index_updated = True
+            except:
+                # field not recorded in the index file; we will need to infer
+                # types during insertion time
+                index_updated = False
+
+    if not path.endswith((INFO_ENCODINGS["columnar"], INFO_ENCODINGS["pickle"])):
+        # stream the lines, rather than holding the whole field in memory
+        f = open_corpus_file(path)
+        entries = ((entry["id"], entry["value"]) for entry in map(json.loads, f))
+    else:
+        f = None
+        entries = read_info_file(path, obj_ids).items()
 
     # iteratively insert the info in the DB in batched fashion
-    with open(filename) as f:
-        info_insertion_buffer = []
-        for line in f:
-            info_json = json.loads(line)
-            obj_id, info_val = info_json[index_key], info_json[value_key]
-            if not index_updated:
-                # we were previously unable to fetch the type info from the
-                # index file, so we must infer it now
-                ConvoKitMeta._check_type_and_update_index(
-                    corpus.meta_index, obj_type, field, info_val
-                )
-            info_insertion_buffer.append(
-                UpdateOne(
-                    {"_id": "{}_{}".format(obj_type, obj_id)},
-                    {"$set": {field: info_val}},
-                    upsert=True,
-                )
-            )
-            if len(info_insertion_buffer) >= JSONLIST_BUFFER_SIZE:
-                meta_collection.bulk_write(info_insertion_buffer)
-                info_insertion_buffer = []
-        # after loop termination, insert any remaining items in the buffer
-        if len(info_insertion_buffer) > 0:
-            meta_collection.bulk_write(info_insertion_buffer)
+    try:
+        written_ids = set()
+        repeated_docs = []
+        with _BoundedThreadPool(DB_WRITER_THREADS) as pool:
             info_insertion_buffer = []
+            for obj_id, info_val in entries:
+                if obj_id not in obj_ids:
+                    continue
+                if not index_updated:
+                    # we were previously unable to fetch the type info from the
+                    # index file, so we must infer it now
+                    ConvoKitMeta._check_type_and_update_index(
+                        corpus.meta_index, obj_type, field, info_val
+                    )
+                if corpus.meta_index.get_index(obj_type).get(field, None) == ["bin"]:
+                    info_val = bson.Binary(pickle.dumps(info_val))
+                doc = {"_id": "{}_{}".format(obj_type, obj_id), field: info_val}
+                if obj_id in written_ids:
+                    # a pending batch may hold an earlier entry of this object
+                    repeated_docs.append(doc)
+                    continue
+                written_ids.add(obj_id)
+                info_insertion_buffer.append(doc)
+                if len(info_insertion_buffer) >= JSONLIST_BUFFER_SIZE:
+                    pool.submit(_write_docs_to_db, meta_collection, info_insertion_buffer)
+                    info_insertion_buffer = []
+            # after loop termination, insert any remaining items in the buffer
+            pool.submit(_write_docs_to_db, meta_collection, info_insertion_buffer)
+        _write_docs_to_db(meta_collection, repeated_docs)
+    finally:
+        if f is not None:
+            f.close()
 
 
 def clean_up_excluded_meta(meta_index, exclude_meta):
@@ -910,15 +1612,26 @@ def populate_db_from_file(
         exclude_speaker_meta = updated_exclude_meta["speaker"]
         exclude_overall_meta = updated_exclude_meta["corpus"]
 
+    # collections that are empty before the load can be filled with plain insertions; the
+    # corpus-level metadata entry is created along with the Corpus, and is written separately
+    empty_collections = {
+        component_type
+        for component_type in ["utterance", "speaker", "conversation", "meta"]
+        if _collection_is_empty(
+            db[f"{collection_prefix}_{component_type}"], [f"corpus_{collection_prefix}"]
+        )
+    }
+
     # first load the utterance data
     inserted_utt_ids = load_jsonlist_to_db(
-        os.path.join(filename, "utterances.jsonl"),
+        find_corpus_file(filename, "utterances.jsonl"),
         db,
         collection_prefix,
         utterance_start_index,
         utterance_end_index,
         exclude_utterance_meta,
         binary_meta["utterance"],
+        empty_collections,
     )
     # next load the speaker and conversation data
     for component_type in ["speaker", "conversation"]:
@@ -929,6 +1642,7 @@ def populate_db_from_file(
             component_type,
             (exclude_speaker_meta if component_type == "speaker" else exclude_conversation_meta),
             binary_meta[component_type],
+            empty_collections,
         )
     # finally, load the corpus metadata
     load_corpus_info_to_db(
@@ -957,33 +1671,33 @@ def init_corpus_from_backend_manager(corpus, utt_ids=None):
     # we will bypass the initialization step when constructing components since
     # we know their necessary data already exists within the db
     corpus.backend_mapper.bypass_init = True
-
-    # fetch object ids from the DB and initialize corpus components for them
-    # create speakers first so we can refer to them when initializing utterances
-    speakers = {}
-    for speaker_doc in corpus.backend_mapper.data["speaker"].find(projection=["_id"]):
-        speaker_id = speaker_doc["_id"]
-        speakers[speaker_id] = Speaker(owner=corpus, id=speaker_id)
-    corpus.speakers = speakers
-
-    # next, create utterances
-    utterances = {}
-    convo_to_utts = defaultdict(list)
-    for utt_doc in corpus.backend_mapper.data["utterance"].find(
-        projection=["_id", "speaker_id", "conversation_id"]
-    ):
-        utt_id = utt_doc["_id"]
-        if utt_ids is None or utt_id in utt_ids:
-            convo_to_utts[utt_doc["conversation_id"]].append(utt_id)
-            utterances[utt_id] = Utterance(
-                owner=corpus, id=utt_id, speaker=speakers[utt_doc["speaker_id"]]
-            )
-    corpus.utterances = utterances
-
-    # run post-construction integrity steps as in regular constructor
-    corpus.conversations = initialize_conversations(corpus, {}, convo_to_utts)
-    corpus.meta_index.enable_type_check()
-    corpus.update_speakers_data()
-
-    # restore the BackendMapper's init behavior to default
-    corpus.backend_mapper.bypass_init = False
+    try:
+        # fetch object ids from the DB and initialize corpus components for them
+        # create speakers first so we can refer to them when initializing utterances
+        speakers = {}
+        for speaker_doc in corpus.backend_mapper.data["speaker"].find(projection=["_id"]):
+            speaker_id = speaker_doc["_id"]
+            speakers[speaker_id] = Speaker(owner=corpus, id=speaker_id)
+        corpus.speakers = speakers
+
+        # next, create utterances
+        utterances = {}
+        convo_to_utts = defaultdict(list)
+        for utt_doc in corpus.backend_mapper.data["utterance"].find(
+            projection=["_id", "speaker_id", "conversation_id"]
+        ):
+            utt_id = utt_doc["_id"]
+            if utt_ids is None or utt_id in utt_ids:
+                convo_to_utts[utt_doc["conversation_id"]].append(utt_id)
+                utterances[utt_id] = Utterance(
+                    owner=corpus, id=utt_id, speaker=speakers[utt_doc["speaker_id"]]
+                )
+        corpus.utterances = utterances
+
+        # run post-construction integrity steps as in regular constructor
+        corpus.conversations = initialize_conversations(corpus, {}, convo_to_utts)
+        corpus.meta_index.enable_type_check()
+        corpus.update_speakers_data()
+    finally:
+        # restore the BackendMapper's init behavior to default
+        corpus.backend_mapper.bypass_init = False
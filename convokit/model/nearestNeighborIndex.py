@@ -0,0 +1,268 @@
+import json
+import os
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import issparse, csr_matrix
+
+
+class NearestNeighborIndex:
+    """
+    Index for finding the nearest neighbors of query vectors among the rows of a matrix (typically the matrix of a
+    ConvoKitMatrix, see `ConvoKitMatrix.build_index()`).
+
+    Two search methods are supported:
+
+    - "exact": brute-force search, which scores the matrix against the queries `block_size` rows at a time (so that
+      memory stays bounded for large matrices) and keeps the running top-k of each block.
+    - "lsh": approximate search with random-projection locality-sensitive hashing. Each row is hashed to a bucket in
+      each of `n_tables` tables, according to the signs of its projections onto `n_bits` random hyperplanes; only the
+      rows that share a bucket with the query in some table are scored. Rows with similar directions tend to share
+      buckets, so this is best suited to the cosine and dot metrics. If fewer than k rows share a bucket with a
+      query, exact search is used for it instead.
+
+    :param matrix: numpy array or scipy sparse matrix whose rows are indexed
+    :param metric: "cosine" (cosine similarity), "dot" (dot product) or "euclidean" (euclidean distance)
+    :param method: "exact" or "lsh"
+    :param n_bits: number of hyperplanes per hash table, for the "lsh" method
+    :param n_tables: number of hash tables, for the "lsh" method
+    :param block_size: number of rows to score at once
+    :param random_state: random seed for the hyperplanes of the "lsh" method
+    """
+
+    METRICS = ["cosine", "dot", "euclidean"]
+    METHODS = ["exact", "lsh"]
+
+    def __init__(
+        self,
+        matrix,
+        metric: str = "cosine",
+        method: str = "exact",
+        n_bits: int = 16,
+        n_tables: int = 8,
+        block_size: int = 65536,
+        random_state=None,
+    ):
+        if metric not in self.METRICS:
+            raise ValueError("metric must be one of {}".format(self.METRICS))
+        if method not in self.METHODS:
+            raise ValueError("method must be one of {}".format(self.METHODS))
+        self.matrix = csr_matrix(matrix) if issparse(matrix) else np.asarray(matrix)
+        self.metric = metric
+        self.method = method
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.block_size = block_size
+
+        self.sq_norms = self._row_sq_norms(self.matrix)
+        self.planes = None
+        self.codes = None
+        if method == "lsh":
+            if isinstance(random_state, np.random.RandomState):
+                rng = random_state
+            else:
+                rng = np.random.RandomState(random_state)
+            self.planes = rng.standard_normal((self.matrix.shape[1], n_tables * n_bits))
+            self.codes = self._hash(self.matrix)
+            self._sort_codes()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def _row_sq_norms(matrix) -> np.ndarray:
+        if issparse(matrix):
+            return np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+        return np.einsum("ij,ij->i", matrix, matrix)
+
+    def _hash(self, matrix) -> np.ndarray:
+        """
+        :return: array of shape (number of rows, n_tables), with the bucket of each row in each table
+        """
+        weights = 1 << np.arange(self.n_bits, dtype=np.int64)
+        codes = np.empty((matrix.shape[0], self.n_tables), dtype=np.int64)
+        for start in range(0, matrix.shape[0], self.block_size):
+            block = matrix[start : start + self.block_size]
+            bits = np.asarray(block @ self.planes) > 0
+            codes[start : start + block.shape[0]] = (
+                bits.reshape(-1, self.n_tables, self.n_bits) @ weights
+            )
+        return codes
+
+    def _sort_codes(self):
+        self._code_order = np.argsort(self.codes, axis=0, kind="stable")
+        self._sorted_codes = np.take_along_axis(self.codes, self._code_order, axis=0)
+
+    def _scores(self, rows, queries: np.ndarray, query_sq_norms: np.ndarray, row_sq_norms):
+        """
+        :return: array of shape (number of rows, number of queries); higher scores are better, so euclidean
+            distances are negated
+        """
+        scores = np.asarray(rows @ queries.T, dtype=np.float64)
+        if self.metric == "cosine":
+            row_norms = np.sqrt(row_sq_norms)
+            query_norms = np.sqrt(query_sq_norms)
+            row_norms[row_norms == 0] = 1
+            query_norms[query_norms == 0] = 1
+            scores /= row_norms[:, np.newaxis]
+            scores /= query_norms[np.newaxis, :]
+        elif self.metric == "euclidean":
+            scores = -np.sqrt(
+                np.maximum(
+                    row_sq_norms[:, np.newaxis] - 2 * scores + query_sq_norms[np.newaxis, :], 0
+                )
+            )
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, row_indices: np.ndarray, k: int):
+        """
+        Selects the k best rows for each query (column) of a score matrix.
+        """
+        if scores.shape[0] > k:
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+            scores = np.take_along_axis(scores, top, axis=0)
+            row_indices = row_indices[top]
+        else:
+            row_indices = np.broadcast_to(row_indices[:, np.newaxis], scores.shape)
+        return scores, row_indices
+
+    def _exact_query(self, queries: np.ndarray, query_sq_norms: np.ndarray, k: int):
+        best_scores, best_rows = [], []
+        for start in range(0, len(self), self.block_size):
+            end = min(start + self.block_size, len(self))
+            scores = self._scores(
+                self.matrix[start:end], queries, query_sq_norms, self.sq_norms[start:end]
+            )
+            scores, rows = self._top_k(scores, np.arange(start, end), k)
+            best_scores.append(scores)
+            best_rows.append(rows)
+        scores = np.concatenate(best_scores, axis=0)
+        rows = np.concatenate(best_rows, axis=0)
+        top = np.argpartition(-scores, min(k, scores.shape[0]) - 1, axis=0)[:k]
+        return np.take_along_axis(rows, top, axis=0), np.take_along_axis(scores, top, axis=0)
+
+    def _candidates(self, query_codes: np.ndarray) -> np.ndarray:
+        """
+        :return: indices of the rows sharing a bucket with the query in at least one table
+        """
+        candidates = []
+        for table in range(self.n_tables):
+            sorted_codes = self._sorted_codes[:, table]
+            start = np.searchsorted(sorted_codes, query_codes[table], side="left")
+            end = np.searchsorted(sorted_codes, query_codes[table], side="right")
+            candidates.append(self._code_order[start:end, table])
+        return np.unique(np.concatenate(candidates))
+
+    def query(self, queries, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k nearest rows to each query vector.
+
+        :param queries: array or sparse matrix of query vectors, one per row (or a single query vector)
+        :param k: number of neighbors to return
+        :return: a tuple of two arrays of shape (number of queries, k): the row indices of the neighbors of each
+            query, ordered from nearest to farthest, and their scores (cosine similarity, dot product or euclidean
+            distance, depending on the metric)
+        """
+        queries = queries.toarray() if issparse(queries) else np.asarray(queries, dtype=np.float64)
+        queries = queries.reshape(-1, self.matrix.shape[1])
+        k = min(k, len(self))
+        query_sq_norms = np.einsum("ij,ij->i", queries, queries)
+
+        if self.method == "exact":
+            rows, scores = self._exact_query(queries, query_sq_norms, k)
+            rows, scores = rows.T, scores.T
+        else:
+            rows = np.empty((queries.shape[0], k), dtype=np.int64)
+            scores = np.empty((queries.shape[0], k))
+            query_codes = self._hash(queries)
+            for i in range(queries.shape[0]):
+                query = queries[i : i + 1]
+                candidates = self._candidates(query_codes[i])
+                if len(candidates) < k:
+                    query_rows, query_scores = self._exact_query(
+                        query, query_sq_norms[i : i + 1], k
+                    )
+                else:
+                    candidate_scores = self._scores(
+                        self.matrix[candidates],
+                        query,
+                        query_sq_norms[i : i + 1],
+                        self.sq_norms[candidates],
+                    )
+                    query_scores, query_rows = self._top_k(candidate_scores, candidates, k)
+                rows[i], scores[i] = query_rows[:, 0], query_scores[:, 0]
+
+        order = np.argsort(-scores, axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        if self.metric == "euclidean":
+            scores = -scores
+        return rows, scores
+
+    def extend(self, matrix) -> "NearestNeighborIndex":
+        """
+        Gets an index over `matrix`, where the first rows of `matrix` are the rows already indexed by this index (e.g.,
+        `matrix` was obtained by vertically stacking new rows under the indexed matrix). Only the new rows are hashed
+        and have their norms computed.
+
+        :param matrix: the extended matrix
+        :return: a new NearestNeighborIndex
+        """
+        n_old = len(self)
+        new_rows = matrix[n_old:]
+        index = NearestNeighborIndex.__new__(NearestNeighborIndex)
+        index.__dict__.update(self.__dict__)
+        index.matrix = csr_matrix(matrix) if issparse(matrix) else np.asarray(matrix)
+        index.sq_norms = np.concatenate([self.sq_norms, self._row_sq_norms(new_rows)])
+        if self.method == "lsh":
+            index.codes = np.concatenate([self.codes, self._hash(new_rows)], axis=0)
+            index._sort_codes()
+        return index
+
+    def dump(self, dirpath: str):
+        """
+        Writes the index to a directory, without the indexed matrix itself.
+
+        :param dirpath: directory to write the index to
+        :return: None
+        """
+        os.makedirs(dirpath, exist_ok=True)
+        with open(os.path.join(dirpath, "params.json"), "w") as f:
+            json.dump(
+                {
+                    "metric": self.metric,
+                    "method": self.method,
+                    "n_bits": self.n_bits,
+                    "n_tables": self.n_tables,
+                    "block_size": self.block_size,
+                },
+                f,
+            )
+        np.save(os.path.join(dirpath, "sq_norms.npy"), self.sq_norms)
+        if self.method == "lsh":
+            np.save(os.path.join(dirpath, "planes.npy"), self.planes)
+            np.save(os.path.join(dirpath, "codes.npy"), self.codes)
+
+    @staticmethod
+    def load(dirpath: str, matrix) -> "NearestNeighborIndex":
+        """
+        Loads an index written by `dump()`.
+
+        :param dirpath: directory the index was written to
+        :param matrix: the indexed matrix
+        :return: the NearestNeighborIndex
+        """
+        with open(os.path.join(dirpath, "params.json"), "r") as f:
+            params = json.load(f)
+        index = NearestNeighborIndex.__new__(NearestNeighborIndex)
+        index.__dict__.update(params)
+        index.matrix = csr_matrix(matrix) if issparse(matrix) else np.asarray(matrix)
+        index.sq_norms = np.load(os.path.join(dirpath, "sq_norms.npy"))
+        index.planes = None
+        index.codes = None
+        if index.method == "lsh":
+            index.planes = np.load(os.path.join(dirpath, "planes.npy"))
+            index.codes = np.load(os.path.join(dirpath, "codes.npy"))
+            index._sort_codes()
+        return index
@@ -0,0 +1,294 @@
+import json
+import os
+import re
+import zlib
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable, Dict, Generator, List, Optional, Union
+
+import pandas as pd
+
+from convokit.util import parallel_map
+from .conversation import Conversation
+from .corpus import Corpus
+from .speaker import Speaker
+from .utterance import Utterance
+
+SHARDS_MANIFEST = "shards.json"
+PARTITION_MODES = ["timestamp", "conversation_id", "meta"]
+TIMESTAMP_PERIODS = {"year": "%Y", "month": "%Y-%m", "day": "%Y-%m-%d"}
+NO_VALUE_SHARD = "none"
+
+
+def _shard_name(value) -> str:
+    """
+    Turns a partition value into a name that can be used as a directory name.
+    """
+    return re.sub(r"[^\w.-]", "_", str(value))
+
+
+def _convo_timestamp(convo: Conversation):
+    """
+    The timestamp of a conversation is that of its earliest utterance (None if no utterance has a timestamp).
+    """
+    timestamps = [utt.timestamp for utt in convo.iter_utterances() if utt.timestamp is not None]
+    return min(timestamps) if len(timestamps) > 0 else None
+
+
+def _timestamp_shard(timestamp, time_format: str) -> str:
+    if timestamp is None:
+        return NO_VALUE_SHARD
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return timestamp.strftime(time_format)
+
+
+def _transform_shard(args):
+    """
+    Helper for ShardedCorpus.transform: runs the transformer on a shard in a worker process and saves the results.
+    """
+    dirpath, transformer, corpus_kwargs, transform_kwargs = args
+    corpus = Corpus(filename=dirpath, **corpus_kwargs)
+    corpus = transformer.transform(corpus, **transform_kwargs)
+    corpus.dump(os.path.basename(dirpath), overwrite_existing_corpus=True, incremental=True)
+
+
+class ShardedCorpus:
+    """
+    A corpus that is split into shards, each saved as a separate Corpus in a subdirectory of a common directory, so
+    that it can be processed one shard at a time, or one shard per process. Shards hold whole Conversations, and
+    are partitioned by time period, by a hash of the conversation ids, or by the value of a conversation metadata
+    attribute; see ShardedCorpus.create().
+
+    The ShardedCorpus is also a lazy union view of its shards: iterating over its utterances, conversations or
+    speakers loads one shard at a time.
+
+    :param dirpath: directory of the shards, as created by ShardedCorpus.create()
+    :param corpus_kwargs: keyword arguments of the Corpus constructor to load each shard with (e.g., backend)
+
+    :ivar dirpath: directory of the shards
+    :ivar shard_names: names of the shards (i.e. of their subdirectories), in sorted order
+    :ivar partition: how the corpus was partitioned: a dictionary with the "by" mode and its parameters
+    """
+
+    def __init__(self, dirpath: str, corpus_kwargs: Optional[Dict] = None):
+        self.dirpath = dirpath
+        self.corpus_kwargs = corpus_kwargs if corpus_kwargs is not None else dict()
+        with open(os.path.join(dirpath, SHARDS_MANIFEST)) as f:
+            manifest = json.load(f)
+        self.shard_names = manifest["shards"]
+        self.partition = manifest["partition"]
+
+    @classmethod
+    def create(
+        cls,
+        corpus: Corpus,
+        dirpath: str,
+        by: str = "timestamp",
+        period: str = "month",
+        n_shards: int = 16,
+        meta_key: Optional[str] = None,
+        compression: Optional[str] = None,
+        corpus_kwargs: Optional[Dict] = None,
+    ) -> "ShardedCorpus":
+        """
+        Splits a Corpus into shards, and saves each of them as a Corpus in a subdirectory of dirpath, named after its
+        partition value. Each Conversation goes to a single shard:
+
+        - by="timestamp": by the time period (`period`: "year", "month" or "day", in UTC) of the Conversation's
+          earliest utterance, with timestamps in seconds since the epoch (or datetime objects). Shards are named
+          e.g. "2019-05".
+        - by="conversation_id": by a stable hash of the Conversation's id, into `n_shards` shards named "0" to
+          "<n_shards - 1>" (empty shards are left out).
+        - by="meta": by the value of the Conversation's `meta_key` metadata attribute. Characters of the values other
+          than letters, digits, "-", "_" and "." are replaced by "_" in the shard names.
+
+        Conversations with no timestamp or no value of meta_key go to a shard named "none".
+
+        :param corpus: the Corpus to split; it is not modified
+        :param dirpath: directory to save the shards in; it is created if it does not exist
+        :param by: "timestamp", "conversation_id" or "meta"
+        :param period: time period of the shards, if by="timestamp"
+        :param n_shards: number of shards, if by="conversation_id"
+        :param meta_key: conversation metadata attribute to partition by, if by="meta"
+        :param compression: compression of the shard files; see Corpus.dump()
+        :param corpus_kwargs: keyword arguments of the Corpus constructor to load each shard with
+        :return: the ShardedCorpus
+        """
+        if by == "timestamp":
+            if period not in TIMESTAMP_PERIODS:
+                raise ValueError(
+                    "period must be one of {}, not {!r}".format(list(TIMESTAMP_PERIODS), period)
+                )
+            partition = {"by": by, "period": period}
+            get_shard = lambda convo: _timestamp_shard(
+                _convo_timestamp(convo), TIMESTAMP_PERIODS[period]
+            )
+        elif by == "conversation_id":
+            if n_shards < 1:
+                raise ValueError("n_shards must be a positive integer")
+            partition = {"by": by, "n_shards": n_shards}
+            # unlike hash(), crc32 is stable across processes, so that shards can be recomputed later
+            get_shard = lambda convo: str(zlib.crc32(convo.id.encode("utf-8")) % n_shards)
+        elif by == "meta":
+            if meta_key is None:
+                raise ValueError("meta_key must be specified to partition by metadata")
+            partition = {"by": by, "meta_key": meta_key}
+            get_shard = lambda convo: (
+                NO_VALUE_SHARD
+                if convo.meta.get(meta_key, None) is None
+                else _shard_name(convo.meta[meta_key])
+            )
+        else:
+            raise ValueError("by must be one of {}, not {!r}".format(PARTITION_MODES, by))
+
+        shards = dict()
+        for convo in corpus.iter_conversations():
+            shards.setdefault(get_shard(convo), []).append(convo.id)
+
+        os.makedirs(dirpath, exist_ok=True)
+        shard_names = sorted(shards)
+        for shard_name in shard_names:
+            print(
+                "Saving shard {} ({} conversations)...".format(shard_name, len(shards[shard_name]))
+            )
+            corpus.view(shards[shard_name]).dump(
+                shard_name, base_path=dirpath, compression=compression
+            )
+        with open(os.path.join(dirpath, SHARDS_MANIFEST), "w") as f:
+            json.dump({"shards": shard_names, "partition": partition}, f)
+
+        return cls(dirpath, corpus_kwargs)
+
+    def __len__(self) -> int:
+        return len(self.shard_names)
+
+    def get_shard_path(self, shard_name: str) -> str:
+        return os.path.join(self.dirpath, shard_name)
+
+    def get_shard(self, shard_name: str) -> Corpus:
+        """
+        Loads a shard.
+
+        :param shard_name: name of the shard
+        :return: the shard, as a Corpus
+        """
+        if shard_name not in self.shard_names:
+            raise KeyError(shard_name)
+        return Corpus(filename=self.get_shard_path(shard_name), **self.corpus_kwargs)
+
+    def iter_shards(self, shard_names: Optional[List[str]] = None) -> Generator[Corpus, None, None]:
+        """
+        Loads the shards one at a time.
+
+        :param shard_names: names of the shards to load; all of them by default
+        :return: a generator of Corpus shards
+        """
+        for shard_name in self.shard_names if shard_names is None else shard_names:
+            yield self.get_shard(shard_name)
+
+    def iter_utterances(
+        self, selector: Optional[Callable[[Utterance], bool]] = lambda utt: True
+    ) -> Generator[Utterance, None, None]:
+        """
+        Get the utterances of all the shards, loading one shard at a time, with an optional selector that filters
+        for utterances that should be included.
+
+        :param selector: a (lambda) function that takes an Utterance and returns True or False (i.e. include /
+            exclude). By default, the selector includes all Utterances.
+        :return: a generator of Utterances
+        """
+        return chain.from_iterable(shard.iter_utterances(selector) for shard in self.iter_shards())
+
+    def iter_conversations(
+        self, selector: Optional[Callable[[Conversation], bool]] = lambda convo: True
+    ) -> Generator[Conversation, None, None]:
+        """
+        Get the conversations of all the shards, loading one shard at a time, with an optional selector that filters
+        for conversations that should be included.
+
+        :param selector: a (lambda) function that takes a Conversation and returns True or False (i.e. include /
+            exclude). By default, the selector includes all Conversations.
+        :return: a generator of Conversations
+        """
+        return chain.from_iterable(
+            shard.iter_conversations(selector) for shard in self.iter_shards()
+        )
+
+    def iter_speakers(
+        self, selector: Optional[Callable[[Speaker], bool]] = lambda speaker: True
+    ) -> Generator[Speaker, None, None]:
+        """
+        Get the speakers of all the shards, loading one shard at a time, with an optional selector that filters for
+        speakers that should be included. A speaker who took part in conversations of several shards is yielded
+        once per shard, with the metadata saved in that shard.
+
+        :param selector: a (lambda) function that takes a Speaker and returns True or False (i.e. include / exclude).
+            By default, the selector includes all Speakers.
+        :return: a generator of Speakers
+        """
+        return chain.from_iterable(shard.iter_speakers(selector) for shard in self.iter_shards())
+
+    def get_attribute_table(self, obj_type: str, attrs: List[str]) -> pd.DataFrame:
+        """
+        Returns a DataFrame of the values of the given metadata attributes of the objects of all the shards, loading
+        one shard at a time; see Corpus.get_attribute_table(). Speakers appear once per shard they took part in.
+
+        :param obj_type: "utterance", "conversation" or "speaker"
+        :param attrs: names of the metadata attributes
+        :return: DataFrame indexed by object id
+        """
+        return pd.concat(
+            [shard.get_attribute_table(obj_type, attrs) for shard in self.iter_shards()]
+        )
+
+    def to_corpus(self) -> Corpus:
+        """
+        Loads all the shards and merges them into a single Corpus, with Corpus.merge_many().
+
+        :return: the merged Corpus
+        """
+        return Corpus.merge_many(list(self.iter_shards()))
+
+    def transform(
+        self,
+        transformer,
+        fit_on: Union[None, str, List[str], Corpus] = None,
+        n_jobs: int = 1,
+        **kwargs,
+    ) -> "ShardedCorpus":
+        """
+        Runs a Transformer (or ConvokitPipeline) on every shard, in a pool of `n_jobs` processes, and saves the
+        transformed shards in place.
+
+        Transformers that need to be fit are fit once, in this process, before any shard is transformed, and the same
+        fitted transformer is then applied to every shard:
+
+        - fit_on=None: the transformer is not fit (e.g., it does not need fitting, or was fit already)
+        - fit_on="all": the transformer is fit on all the shards, merged into a single Corpus
+        - fit_on=[shard names]: the transformer is fit on these shards, merged into a single Corpus
+        - fit_on=a Corpus: the transformer is fit on that Corpus (e.g., a sample of the shards)
+
+        When n_jobs is not 1, the transformer must be picklable.
+
+        :param transformer: the Transformer to run
+        :param fit_on: what to fit the transformer on, if anything
+        :param n_jobs: number of processes to run; -1 to use all available CPUs
+        :param kwargs: keyword arguments to pass to the transform() call of each shard
+        :return: the ShardedCorpus
+        """
+        if isinstance(fit_on, Corpus):
+            transformer.fit(fit_on)
+        elif fit_on is not None:
+            fit_shards = self.shard_names if fit_on == "all" else fit_on
+            transformer.fit(Corpus.merge_many(list(self.iter_shards(fit_shards))))
+
+        parallel_map(
+            _transform_shard,
+            [
+                (self.get_shard_path(shard_name), transformer, self.corpus_kwargs, kwargs)
+                for shard_name in self.shard_names
+            ],
+            n_jobs,
+        )
+        return self
@@ -23,6 +23,8 @@ class Speaker(CorpusComponent):
         speaker-level metadata.
     """
 
+    __slots__ = ("utterances", "conversations")
+
     def __init__(
         self,
         owner=None,
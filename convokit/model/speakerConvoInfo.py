@@ -0,0 +1,199 @@
+import json
+from collections import defaultdict
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# marks entries of an attribute column that have not been set
+_MISSING = object()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+class SpeakerConvoInfo:
+    """
+    Columnar table of (speaker, conversation) attributes, i.e., attributes describing a speaker's activity in a
+    conversation, such as those computed by `Corpus.organize_speaker_convo_history()`. Each (speaker, conversation)
+    pair is a row, and each attribute is a column; setting an attribute for many rows at once (`bulk_set()`) only
+    costs a dictionary lookup per row.
+
+    Use the speaker-convo methods of the Corpus (e.g., `Corpus.get_speaker_convo_info()`) rather than this class
+    directly.
+
+    :ivar speaker_ids: speaker id of each row
+    :ivar convo_ids: conversation id of each row
+    :ivar columns: a dictionary mapping each attribute name to its list of values, one per row
+    """
+
+    def __init__(self):
+        self.speaker_ids = []
+        self.convo_ids = []
+        self.columns = dict()
+        self._rows = dict()
+        self._speaker_rows = defaultdict(list)
+
+    def __len__(self):
+        return len(self.speaker_ids)
+
+    def _get_row(self, speaker_id, convo_id, create: bool = True) -> Optional[int]:
+        row = self._rows.get((speaker_id, convo_id))
+        if row is None and create:
+            row = len(self.speaker_ids)
+            self._rows[(speaker_id, convo_id)] = row
+            self.speaker_ids.append(speaker_id)
+            self.convo_ids.append(convo_id)
+            self._speaker_rows[speaker_id].append(row)
+        return row
+
+    def _get_column(self, key: str) -> list:
+        # columns are padded up to the current number of rows on write, so that adding rows is cheap
+        column = self.columns.setdefault(key, [])
+        if len(column) < len(self.speaker_ids):
+            column.extend([_MISSING] * (len(self.speaker_ids) - len(column)))
+        return column
+
+    @staticmethod
+    def _value(column: list, row: Optional[int]):
+        if row is None or row >= len(column):
+            return _MISSING
+        return column[row]
+
+    def set(self, speaker_id, convo_id, key: str, value) -> None:
+        """
+        Sets attribute `key` of speaker `speaker_id` in conversation `convo_id` to `value`.
+        """
+        row = self._get_row(speaker_id, convo_id)
+        self._get_column(key)[row] = value
+
+    def bulk_set(
+        self, key: str, speaker_ids: List[str], convo_ids: List[str], values: list
+    ) -> None:
+        """
+        Sets attribute `key` of each (speaker_ids[i], convo_ids[i]) pair to values[i].
+        """
+        self.bulk_set_columns(speaker_ids, convo_ids, {key: values})
+
+    def bulk_set_columns(self, speaker_ids: List[str], convo_ids: List[str], columns: dict) -> None:
+        """
+        Sets several attributes at once: for each attribute name `key` in `columns`, sets attribute `key` of each
+        (speaker_ids[i], convo_ids[i]) pair to columns[key][i].
+        """
+        rows = list(map(self._rows.get, zip(speaker_ids, convo_ids)))
+        for i, row in enumerate(rows):
+            if row is None:
+                rows[i] = self._get_row(speaker_ids[i], convo_ids[i])
+        for key, values in columns.items():
+            column = self._get_column(key)
+            for row, value in zip(rows, values):
+                column[row] = value
+
+    def update(self, other: "SpeakerConvoInfo") -> None:
+        """
+        Sets every attribute that is set in another table, overwriting the values of this table where both are set.
+        """
+        for key, column in other.columns.items():
+            rows = [row for row, value in enumerate(column) if value is not _MISSING]
+            self.bulk_set(
+                key,
+                [other.speaker_ids[row] for row in rows],
+                [other.convo_ids[row] for row in rows],
+                [column[row] for row in rows],
+            )
+
+    def get(self, speaker_id, convo_id, key: Optional[str] = None):
+        """
+        Gets attribute `key` of speaker `speaker_id` in conversation `convo_id` (None if it isn't set), or a
+        dictionary of all of its attributes if `key` is None.
+        """
+        row = self._get_row(speaker_id, convo_id, create=False)
+        if key is None:
+            return self._row_dict(row)
+        value = self._value(self.columns.get(key, []), row)
+        return None if value is _MISSING else value
+
+    def bulk_get(self, key: str, speaker_ids: List[str], convo_ids: List[str]) -> list:
+        """
+        Gets attribute `key` of each (speaker_ids[i], convo_ids[i]) pair, with None for unset values.
+        """
+        column = self.columns.get(key, [])
+        values = [
+            self._value(column, self._get_row(speaker_id, convo_id, create=False))
+            for speaker_id, convo_id in zip(speaker_ids, convo_ids)
+        ]
+        return [None if value is _MISSING else value for value in values]
+
+    def _row_dict(self, row: Optional[int]) -> dict:
+        entry = dict()
+        for key, column in self.columns.items():
+            value = self._value(column, row)
+            if value is not _MISSING:
+                entry[key] = value
+        return entry
+
+    def get_speaker_convos(self, speaker_id) -> dict:
+        """
+        Gets the attributes of a speaker in each of their conversations, as a dictionary keyed by conversation id.
+        """
+        return {
+            self.convo_ids[row]: self._row_dict(row)
+            for row in self._speaker_rows.get(speaker_id, [])
+        }
+
+    def to_dataframe(self, attrs: List[str], speaker_ids=None) -> pd.DataFrame:
+        """
+        Gets a DataFrame with a row per (speaker, conversation) pair, with columns `speaker`, `convo_id` and one
+        column per attribute in `attrs` (None for unset values).
+
+        :param attrs: names of attributes to include
+        :param speaker_ids: if given, only include the rows of these speakers
+        """
+        data = {"speaker": self.speaker_ids, "convo_id": self.convo_ids}
+        for attr in attrs:
+            if attr in self.columns:
+                data[attr] = [
+                    None if value is _MISSING else value for value in self._get_column(attr)
+                ]
+            else:
+                data[attr] = [None] * len(self)
+        df = pd.DataFrame(data)
+        if speaker_ids is not None:
+            df = df[df["speaker"].isin(set(speaker_ids))]
+        return df
+
+    def dump(self, filepath: str) -> None:
+        """
+        Writes the table to a JSON file, storing each attribute as the list of rows it is set for and their values.
+        """
+        columns = dict()
+        for key, column in self.columns.items():
+            rows = [row for row, value in enumerate(column) if value is not _MISSING]
+            columns[key] = {"rows": rows, "values": [column[row] for row in rows]}
+        with open(filepath, "w") as f:
+            json.dump(
+                {"speaker_ids": self.speaker_ids, "convo_ids": self.convo_ids, "columns": columns},
+                f,
+                default=_json_default,
+            )
+
+    @staticmethod
+    def load(filepath: str) -> "SpeakerConvoInfo":
+        """
+        Reads a table written by `dump()`.
+        """
+        with open(filepath, "r") as f:
+            data = json.load(f)
+        table = SpeakerConvoInfo()
+        for speaker_id, convo_id in zip(data["speaker_ids"], data["convo_ids"]):
+            table._get_row(speaker_id, convo_id)
+        for key, column in data["columns"].items():
+            values = table._get_column(key)
+            for row, value in zip(column["rows"], column["values"]):
+                values[row] = value
+        return table
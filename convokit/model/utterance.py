@@ -26,6 +26,8 @@ class Utterance(CorpusComponent):
         utterance-level metadata.
     """
 
+    __slots__ = ("speaker_",)
+
     def __init__(
         self,
         owner=None,
@@ -1,6 +1,7 @@
-from collections import defaultdict
-from random import shuffle, choice
-from typing import Callable
+from typing import Callable, Optional
+
+import numpy as np
+from sklearn.utils import check_random_state
 
 from convokit import Transformer, CorpusComponent, Corpus
 
@@ -11,27 +12,35 @@ class Pairer(Transformer):
 
     :param obj_type: type of Corpus object to classify: ‘conversation’, ‘speaker’, or ‘utterance’
     :param pairing_func: the Corpus object characteristic to pair on, e.g. to pair on the first 10 characters of a
-        well-structured id, use lambda obj: obj.id[:10]
+        well-structured id, use lambda obj: obj.id[:10]. May be None if `pairing_key` is given.
     :param pos_label_func: the function to check if the object is a positive instance
     :param neg_label_func: the function to check if the object is a negative instance
     :param pair_mode: 'random': pick a single positive and negative object pair randomly (default), 'maximize': pick the maximum number of positive and negative object pairs possible randomly, or 'first': pick the first positive and negative object pair found.
     :param pair_id_attribute_name: metadata attribute name to use in annotating object with pair id, default: "pair_id". The value is determined by the output of pairing_func. If pair_mode is 'maximize', the value is the output of pairing_func + "_[i]", where i is the ith pair extracted from a given context.
     :param label_attribute_name: metadata attribute name to use in annotating object with whether it is positive or negative, default: "pair_obj_label"
     :param pair_orientation_attribute_name: metadata attribute name to use in annotating object with pair orientation, default: "pair_orientation"
+    :param pairing_key: optional name of a metadata attribute to pair on, instead of the output of pairing_func
+    :param random_state: seed (or numpy RandomState) for the random choices of the 'random' and 'maximize' modes and of the pair orientations; by default, numpy's global random state is used.
     """
 
     def __init__(
         self,
         obj_type: str,
-        pairing_func: Callable[[CorpusComponent], str],
+        pairing_func: Optional[Callable[[CorpusComponent], str]],
         pos_label_func: Callable[[CorpusComponent], bool],
         neg_label_func: Callable[[CorpusComponent], bool],
         pair_mode: str = "random",
         pair_id_attribute_name: str = "pair_id",
         label_attribute_name: str = "pair_obj_label",
         pair_orientation_attribute_name: str = "pair_orientation",
+        pairing_key: Optional[str] = None,
+        random_state=None,
     ):
         assert obj_type in ["speaker", "utterance", "conversation"]
+        if pairing_func is None and pairing_key is None:
+            raise ValueError("One of pairing_func or pairing_key must be specified.")
+        if pair_mode not in ["random", "first", "maximize"]:
+            raise ValueError("Invalid pair_mode setting: use 'random', 'first', or 'maximize'.")
         self.obj_type = obj_type
         self.pairing_func = pairing_func
         self.pos_label_func = pos_label_func
@@ -40,6 +49,8 @@ class Pairer(Transformer):
         self.pair_id_attribute_name = pair_id_attribute_name
         self.label_attribute_name = label_attribute_name
         self.pair_orientation_attribute_name = pair_orientation_attribute_name
+        self.pairing_key = pairing_key
+        self.random_state = random_state
 
     def _get_pos_neg_objects(self, corpus: Corpus, selector):
         """
@@ -57,81 +68,88 @@ class Pairer(Transformer):
                 neg_objects.append(obj)
         return pos_objects, neg_objects
 
-    def _pair_objs(self, pos_objects, neg_objects):
+    def _get_pairing_keys(self, objs) -> list:
+        """
+        Computes the value to pair on for each object, calling pairing_func (or reading the pairing_key metadata
+        attribute) once per object.
+        """
+        if self.pairing_key is not None:
+            keys = [obj.meta.get(self.pairing_key) for obj in objs]
+        else:
+            keys = [self.pairing_func(obj) for obj in objs]
+        if self.pair_mode == "maximize":
+            keys = [str(key) for key in keys]
+        return keys
+
+    def _pair_objs(self, pos_objects, neg_objects, rng=None):
         """
         Generate a dictionary mapping the Corpus object characteristic value (i.e. pairing_func's output) to one positively and negatively labelled object.
 
+        Objects are grouped by pairing value with a single sort: positive and negative objects are each ordered by (pairing value, tie-breaker), where the tie-breaker is the original order in 'first' mode and a random permutation otherwise, so that the i-th positive and i-th negative object of each pairing value can be matched directly.
+
         :param pos_objects: list of positively labelled objects
         :param neg_objects: list of negatively labelled objects
+        :param rng: numpy RandomState to use for random choices
         :return: dictionary indexed by the paired feature instance value,
                  with the value being a tuple (pos_obj, neg_obj)
         """
-        pair_feat_to_pos_objs = defaultdict(list)
-        pair_feat_to_neg_objs = defaultdict(list)
-
-        for obj in pos_objects:
-            if self.pair_mode == "maximize":
-                try:
-                    pair_feat_to_pos_objs[str(self.pairing_func(obj))].append(obj)
-                except Exception as e:
-                    pair_feat_to_pos_objs[self.pairing_func(obj)].append(obj)
-            else:
-                pair_feat_to_pos_objs[self.pairing_func(obj)].append(obj)
-
-        for obj in neg_objects:
-            if self.pair_mode == "maximize":
-                try:
-                    pair_feat_to_neg_objs[str(self.pairing_func(obj))].append(obj)
-                except Exception as e:
-                    pair_feat_to_neg_objs[self.pairing_func(obj)].append(obj)
-            else:
-                pair_feat_to_neg_objs[self.pairing_func(obj)].append(obj)
-
-        valid_pairs = set(pair_feat_to_neg_objs).intersection(set(pair_feat_to_pos_objs))
-
-        if self.pair_mode == "first":
-            return {
-                pair_id: (pair_feat_to_pos_objs[pair_id][0], pair_feat_to_neg_objs[pair_id][0])
-                for pair_id in valid_pairs
-            }
-        elif self.pair_mode == "random":
-            return {
-                pair_id: (
-                    choice(pair_feat_to_pos_objs[pair_id]),
-                    choice(pair_feat_to_neg_objs[pair_id]),
-                )
-                for pair_id in valid_pairs
-            }
-        elif self.pair_mode == "maximize":
-            retval = dict()
-            for pair_id in valid_pairs:
-                pos_objs = pair_feat_to_pos_objs[pair_id]
-                neg_objs = pair_feat_to_neg_objs[pair_id]
-                max_pairs = min(len(pos_objs), len(neg_objs))
-                shuffle(pos_objs)
-                shuffle(neg_objs)
-                for idx in range(max_pairs):
-                    retval[pair_id + "_" + str(idx)] = (pos_objs[idx], neg_objs[idx])
-            return retval
+        rng = check_random_state(rng)
+        objs = pos_objects + neg_objects
+        if len(pos_objects) == 0 or len(neg_objects) == 0:
+            return dict()
+        key_codes = dict()
+        keys = self._get_pairing_keys(objs)
+        codes = np.fromiter(
+            (key_codes.setdefault(key, len(key_codes)) for key in keys),
+            dtype=np.int64,
+            count=len(keys),
+        )
+        unique_keys = list(key_codes)
+        is_pos = np.arange(len(objs)) < len(pos_objects)
+
+        tie_breaker = (
+            np.arange(len(objs)) if self.pair_mode == "first" else rng.permutation(len(objs))
+        )
+        order = np.lexsort((tie_breaker, codes))
+        max_pairs = np.minimum(
+            np.bincount(codes[is_pos], minlength=len(unique_keys)),
+            np.bincount(codes[~is_pos], minlength=len(unique_keys)),
+        )
+        if self.pair_mode != "maximize":
+            max_pairs = np.minimum(max_pairs, 1)
+
+        matched = []
+        for label_mask in [is_pos, ~is_pos]:
+            label_order = order[label_mask[order]]
+            label_codes = codes[label_order]
+            ranks = np.arange(len(label_order)) - np.searchsorted(label_codes, label_codes)
+            keep = ranks < max_pairs[label_codes]
+            matched.append((label_order[keep], label_codes[keep], ranks[keep]))
+
+        (pos_idxes, pair_codes, pair_ranks), (neg_idxes, _, _) = matched
+        if self.pair_mode == "maximize":
+            pair_ids = [
+                unique_keys[code] + "_" + str(rank) for code, rank in zip(pair_codes, pair_ranks)
+            ]
         else:
-            raise ValueError("Invalid pair_mode setting: use 'random', 'first', or 'maximize'.")
+            pair_ids = [unique_keys[code] for code in pair_codes]
+        return {
+            pair_id: (objs[pos_idx], objs[neg_idx])
+            for pair_id, pos_idx, neg_idx in zip(pair_ids, pos_idxes, neg_idxes)
+        }
 
     @staticmethod
-    def _assign_pair_orientations(obj_pairs):
+    def _assign_pair_orientations(obj_pairs, rng=None):
         """
         Assigns the pair orientation (i.e. whether this pair will have a positive or negative label)
 
         :param obj_pairs: dictionary indexed by the paired feature instance value
+        :param rng: numpy RandomState to use for random choices
         :return: dictionary of paired feature instance values to pair orientation value ('pos' or 'neg')
         """
         pair_ids = list(obj_pairs)
-        shuffle(pair_ids)
-        pair_orientations = dict()
-        flip = True
-        for pair_id in pair_ids:
-            pair_orientations[pair_id] = "pos" if flip else "neg"
-            flip = not flip
-        return pair_orientations
+        order = check_random_state(rng).permutation(len(pair_ids))
+        return {pair_ids[idx]: "pos" if i % 2 == 0 else "neg" for i, idx in enumerate(order)}
 
     def transform(
         self, corpus: Corpus, selector: Callable[[CorpusComponent], bool] = lambda x: True
@@ -143,24 +161,25 @@ class Pairer(Transformer):
         :param selector: a (lambda) function that takes a Corpus object and returns a bool (True = include)
         :return: annotated Corpus
         """
+        rng = check_random_state(self.random_state)
         pos_objs, neg_objs = self._get_pos_neg_objects(corpus, selector)
-        obj_pairs = self._pair_objs(pos_objs, neg_objs)
-        pair_orientations = self._assign_pair_orientations(obj_pairs)
+        obj_pairs = self._pair_objs(pos_objs, neg_objs, rng)
+        pair_orientations = self._assign_pair_orientations(obj_pairs, rng)
 
+        labels, pair_ids, orientations = dict(), dict(), dict()
         for pair_id, (pos_obj, neg_obj) in obj_pairs.items():
-            pos_obj.add_meta(self.label_attribute_name, "pos")
-            neg_obj.add_meta(self.label_attribute_name, "neg")
-            pos_obj.add_meta(self.pair_id_attribute_name, pair_id)
-            neg_obj.add_meta(self.pair_id_attribute_name, pair_id)
-            pos_obj.add_meta(self.pair_orientation_attribute_name, pair_orientations[pair_id])
-            neg_obj.add_meta(self.pair_orientation_attribute_name, pair_orientations[pair_id])
+            labels[pos_obj.id], labels[neg_obj.id] = "pos", "neg"
+            pair_ids[pos_obj.id] = pair_ids[neg_obj.id] = pair_id
+            orientations[pos_obj.id] = orientations[neg_obj.id] = pair_orientations[pair_id]
 
         for obj in corpus.iter_objs(self.obj_type):
             # unlabelled objects include both objects that did not pass the selector
             # and objects that were not selected in the pairing step
-            if self.label_attribute_name not in obj.meta:
-                obj.add_meta(self.label_attribute_name, None)
-                obj.add_meta(self.pair_id_attribute_name, None)
-                obj.add_meta(self.pair_orientation_attribute_name, None)
+            if obj.id not in labels and self.label_attribute_name not in obj.meta:
+                labels[obj.id] = pair_ids[obj.id] = orientations[obj.id] = None
+
+        corpus.bulk_add_meta(self.obj_type, self.label_attribute_name, labels)
+        corpus.bulk_add_meta(self.obj_type, self.pair_id_attribute_name, pair_ids)
+        corpus.bulk_add_meta(self.obj_type, self.pair_orientation_attribute_name, orientations)
 
         return corpus
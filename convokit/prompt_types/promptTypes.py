@@ -4,9 +4,10 @@ import os
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import normalize
 from sklearn.decomposition import TruncatedSVD
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 import joblib
 
+from convokit.linalg_helpers import align_signs, safe_inverse, top_eigenvectors
 from convokit.transformer import Transformer
 
 
@@ -31,6 +32,13 @@ class PromptTypes(Transformer):
         * train_results: stores the vector representations of the corpus used to train the model in the fit step
         * train_types: stores the type assignments of the corpus used in the fit step
 
+    The model can also be trained incrementally, via repeated calls to `partial_fit` on successive batches of data (e.g.,
+    a week of new conversations at a time). In this mode, the tf-idf vocabularies and weights are fixed by the first
+    batch, the model accumulates co-occurrence statistics of prompt and response terms across batches, and the latent
+    representations are recomputed from these statistics, at a cost that depends on the vocabulary sizes rather than on
+    the amount of data seen. Prompt types are inferred with mini-batch k-means, whose centroids are updated with each
+    new batch.
+
     The transformer will output several attributes of an utterance (names prefixed with <output_field>__). If the utterance is a prompt (in the default case, if it has a response), then the following will be outputted.
         * prompt_repr: a vector representation of the utterance (stored as a corpus-wide matrix, or in the metadata of an individual utterance if `transform_utterance` is called)
         * prompt_dists.<number of types>: a vector storing the distance between the utterance vector and the centroid of each k-means cluster (stored as a corpus-wide matrix, or in the metadata of an individual utterance if `transform_utterance` is called)
@@ -165,6 +173,75 @@ class PromptTypes(Transformer):
         ) = self._get_embeddings(corpus, prompt_selector, reference_selector)
         self.refit_types(self.default_n_types, self.random_state)
 
+    def partial_fit(
+        self, corpus, y=None, prompt_selector=lambda utt: True, reference_selector=lambda utt: True
+    ):
+        """
+        Updates a PromptTypes model with the prompt-response pairs in a new batch of data, without revisiting batches
+        passed in previous calls. The first call fixes the prompt and response vocabularies; later calls accumulate
+        term co-occurrence statistics over these vocabularies, recompute the latent representations of prompt and
+        response terms, and update the mini-batch k-means type models. Note that calling `fit` discards any statistics
+        accumulated by `partial_fit`.
+
+        After the call, `train_results` and `train_types` store the representations and type assignments of the
+        latest batch.
+
+        :param corpus: Corpus containing the new batch of data
+        :param prompt_selector: a boolean function of signature `filter(utterance)` that determines which
+            utterances will be considered as prompts. defaults to using all utterances which have a response.
+        :param reference_selector: a boolean function of signature `filter(utterance)` that determines which utterances
+            will be considered as responses. defaults to using all utterances which are responses to a prompt.
+
+        :return: None
+        """
+        self.prompt_selector = prompt_selector
+        self.reference_selector = reference_selector
+
+        _, prompt_input, _, reference_input = self._get_pair_input(
+            corpus,
+            self.prompt_field,
+            self.reference_field,
+            self.prompt_selector,
+            self.reference_selector,
+        )
+        self.prompt_embedding_model = partial_fit_prompt_embedding_model(
+            prompt_input,
+            reference_input,
+            self.prompt_embedding_model,
+            self.snip_first_dim,
+            self.prompt__tfidf_min_df,
+            self.prompt__tfidf_max_df,
+            self.reference__tfidf_min_df,
+            self.reference__tfidf_max_df,
+            self.svd__n_components,
+            self.random_state,
+            self.verbosity,
+        )
+        (
+            self.train_results["prompt_ids"],
+            self.train_results["prompt_vects"],
+            self.train_results["reference_ids"],
+            self.train_results["reference_vects"],
+        ) = self._get_embeddings(corpus, prompt_selector, reference_selector)
+
+        if self.default_n_types not in self.type_models:
+            self.type_models[self.default_n_types] = None
+        for key in list(self.type_models.keys()):
+            if self.type_models[key] is None:
+                n_types = self.default_n_types
+            else:
+                n_types = self.type_models[key]["km_model"].n_clusters
+            self.type_models[key] = partial_fit_prompt_type_model(
+                self.prompt_embedding_model,
+                n_types,
+                self.type_models[key],
+                self.random_state,
+                self.max_dist,
+                self.verbosity,
+            )
+            prompt_df, reference_df = self._get_type_assignments(type_key=key)
+            self.train_types[key] = {"prompt_df": prompt_df, "reference_df": reference_df}
+
     def transform(
         self,
         corpus,
@@ -431,6 +508,11 @@ class PromptTypes(Transformer):
 
         for k in ["U_prompt", "U_reference"]:
             np.save(os.path.join(model_dir, k), self.prompt_embedding_model[k])
+        if "incremental_stats" in self.prompt_embedding_model:
+            np.savez(
+                os.path.join(model_dir, "incremental_stats.npz"),
+                **self.prompt_embedding_model["incremental_stats"],
+            )
 
         if dump_train_corpus:
             if self.verbosity > 0:
@@ -464,13 +546,14 @@ class PromptTypes(Transformer):
             * embedding_model: stores information pertaining to the vector representations.
                 * prompt_tfidf_model: sklearn tf-idf model that converts prompt input to term-document matrix
                 * reference_tfidf_model: tf-idf model that converts response input to term-document matrix
-                * svd_model: sklearn TruncatedSVD model that produces a low-dimensional representation of responses and prompts
+                * svd_model: sklearn TruncatedSVD model that produces a low-dimensional representation of responses and prompts (`None` if the model was trained via `partial_fit`)
                 * U_prompt: vector representations of prompt terms
                 * U_reference: vector representations of response terms
             * type_models: a dictionary mapping each type clustering model to:
                 * km_model: a sklearn KMeans model of the learned types
                 * prompt_df: distances to cluster centroids, and type assignments, of prompt terms
                 * reference_df: distances to cluster centroids, and type assignments, of reference terms
+            if the model was trained via `partial_fit`, `embedding_model` also contains `incremental_stats`, the term co-occurrence statistics accumulated so far, and the type models are sklearn MiniBatchKMeans models.
         :param type_keys: if 'default', will return the type clustering model corresponding to the `n_types` the model was initialized with. if 'all', returns all clustering models that have been trained via calls to `refit_types`. can also take a list of clustering models.
         :return: the prompt types model
         """
@@ -501,6 +584,12 @@ class PromptTypes(Transformer):
             self.prompt_embedding_model[k] = joblib.load(os.path.join(model_dir, k + ".joblib"))
         for k in ["U_prompt", "U_reference"]:
             self.prompt_embedding_model[k] = np.load(os.path.join(model_dir, k + ".npy"))
+        stats_file = os.path.join(model_dir, "incremental_stats.npz")
+        if os.path.exists(stats_file):
+            with np.load(stats_file) as stats:
+                self.prompt_embedding_model["incremental_stats"] = {
+                    k: stats[k] for k in stats.files
+                }
 
         if load_train_corpus:
             if self.verbosity > 0:
@@ -667,6 +756,109 @@ def fit_prompt_embedding_model(
     }
 
 
+def partial_fit_prompt_embedding_model(
+    prompt_input,
+    reference_input,
+    model=None,
+    snip_first_dim=True,
+    prompt__tfidf_min_df=100,
+    prompt__tfidf_max_df=0.1,
+    reference__tfidf_min_df=100,
+    reference__tfidf_max_df=0.1,
+    svd__n_components=25,
+    random_state=None,
+    verbosity=0,
+):
+    """
+    Standalone function that updates an embedding model given a new batch of paired prompt and response inputs. See docstring of the `PromptTypes` class for details.
+
+    The tf-idf models are fit on the first batch and then held fixed. Across batches, the function accumulates the response term co-occurrence matrix, the prompt-response term co-occurrence matrix and prompt term norms, which are sufficient to recover the representations that `fit_prompt_embedding_model` would compute over all pairs seen so far (with these fixed tf-idf models).
+
+    :param prompt_input: list of prompts (represented as space-separated strings of terms)
+    :param reference_input: list of responses (represented as space-separated strings of terms). note that each entry of reference_input should be a response to the corresponding entry in prompt_input.
+    :param model: prompt embedding model returned by a previous call to this function; if `None` or empty, a new model is initialized from this batch.
+    :return: updated prompt embedding model
+    """
+
+    if (model is None) or ("incremental_stats" not in model):
+        if verbosity > 0:
+            print("fitting tfidf models on initial batch")
+        reference_tfidf_model = TfidfVectorizer(
+            min_df=reference__tfidf_min_df,
+            max_df=reference__tfidf_max_df,
+            binary=True,
+            token_pattern=r"(?u)(\S+)",
+        ).fit(reference_input)
+        prompt_tfidf_model = TfidfVectorizer(
+            min_df=prompt__tfidf_min_df,
+            max_df=prompt__tfidf_max_df,
+            binary=True,
+            token_pattern=r"(?u)(\S+)",
+        ).fit(prompt_input)
+        n_reference_terms = len(reference_tfidf_model.vocabulary_)
+        n_prompt_terms = len(prompt_tfidf_model.vocabulary_)
+        stats = {
+            "reference_gram": np.zeros((n_reference_terms, n_reference_terms)),
+            "cross_gram": np.zeros((n_prompt_terms, n_reference_terms)),
+            "prompt_sq_norms": np.zeros(n_prompt_terms),
+            "basis": None,
+            "n_pairs": 0,
+        }
+    else:
+        reference_tfidf_model = model["reference_tfidf_model"]
+        prompt_tfidf_model = model["prompt_tfidf_model"]
+        stats = model["incremental_stats"]
+
+    if verbosity > 0:
+        print("updating with %d input pairs" % len(prompt_input))
+    reference_vect = reference_tfidf_model.transform(reference_input)
+    prompt_vect = prompt_tfidf_model.transform(prompt_input)
+    stats["reference_gram"] = (
+        stats["reference_gram"] + (reference_vect.T @ reference_vect).toarray()
+    )
+    stats["cross_gram"] = stats["cross_gram"] + (prompt_vect.T @ reference_vect).toarray()
+    stats["prompt_sq_norms"] = (
+        stats["prompt_sq_norms"] + np.asarray(prompt_vect.multiply(prompt_vect).sum(axis=0)).ravel()
+    )
+    stats["n_pairs"] = stats["n_pairs"] + len(prompt_input)
+
+    if verbosity > 0:
+        print("computing svd")
+    # the term-by-pair matrix factorized in fit_prompt_embedding_model has rows scaled to unit norm;
+    # its left singular vectors and squared singular values are the eigenpairs of the scaled gram matrix,
+    # whose size depends only on the vocabulary and not on the number of pairs seen.
+    reference_inv_norms = safe_inverse(np.sqrt(np.diag(stats["reference_gram"])))
+    prompt_inv_norms = safe_inverse(np.sqrt(stats["prompt_sq_norms"]))
+    U_reference, s_sq = top_eigenvectors(
+        stats["reference_gram"] * reference_inv_norms[:, np.newaxis] * reference_inv_norms,
+        svd__n_components,
+        random_state,
+    )
+    if stats["basis"] is not None:
+        U_reference = align_signs(U_reference, stats["basis"])
+    stats["basis"] = U_reference
+    U_prompt = (
+        (stats["cross_gram"] * prompt_inv_norms[:, np.newaxis] * reference_inv_norms)
+        @ U_reference
+        * safe_inverse(s_sq)
+    )
+
+    if snip_first_dim:
+        U_prompt = U_prompt[:, 1:]
+        U_reference = U_reference[:, 1:]
+    U_prompt_norm = normalize(U_prompt)
+    U_reference_norm = normalize(U_reference)
+
+    return {
+        "prompt_tfidf_model": prompt_tfidf_model,
+        "reference_tfidf_model": reference_tfidf_model,
+        "svd_model": None,
+        "U_prompt": U_prompt_norm,
+        "U_reference": U_reference_norm,
+        "incremental_stats": stats,
+    }
+
+
 def transform_embeddings(model, ids, input, side="prompt", filter_empty=True):
     """
     Standalone function that returns vector representations of input text given a trained PromptTypes prompt_embedding_model. See docstring of `PromptTypes` class for details.
@@ -701,6 +893,43 @@ def fit_prompt_type_model(model, n_types, random_state=None, max_dist=0.9, verbo
         print("fitting %d prompt types" % n_types)
     km = KMeans(n_clusters=n_types, random_state=random_state)
     km.fit(model["U_prompt"])
+    return _get_type_model(model, km, n_types, max_dist)
+
+
+def partial_fit_prompt_type_model(
+    model, n_types, type_model=None, random_state=None, max_dist=0.9, verbosity=0
+):
+    """
+    Standalone function that updates a mini-batch k-means prompt type model given an updated prompt embedding model. See docstring of the `PromptTypes` class for details.
+
+    :param model: prompt embedding model (from `partial_fit_prompt_embedding_model()`)
+    :param n_types: number of prompt types to infer
+    :param type_model: prompt type model returned by a previous call to this function. if `None`, fits a new model; if it contains a (non-mini-batch) KMeans model, the new model is initialized at its centroids.
+    :return: prompt type model
+    """
+
+    if (type_model is not None) and isinstance(type_model["km_model"], MiniBatchKMeans):
+        if verbosity > 0:
+            print("updating %d prompt types" % n_types)
+        km = type_model["km_model"]
+        km.partial_fit(model["U_prompt"])
+    else:
+        if verbosity > 0:
+            print("fitting %d prompt types" % n_types)
+        if type_model is not None:
+            km = MiniBatchKMeans(
+                n_clusters=n_types,
+                init=type_model["km_model"].cluster_centers_,
+                n_init=1,
+                random_state=random_state,
+            )
+        else:
+            km = MiniBatchKMeans(n_clusters=n_types, random_state=random_state)
+        km.fit(model["U_prompt"])
+    return _get_type_model(model, km, n_types, max_dist)
+
+
+def _get_type_model(model, km, n_types, max_dist):
     prompt_dists = km.transform(model["U_prompt"])
     prompt_clusters = km.predict(model["U_prompt"])
     prompt_clusters[prompt_dists.min(axis=1) >= max_dist] = -1
@@ -1,8 +1,73 @@
-from typing import List, Callable, Union
+from numbers import Real
+from typing import List, Callable, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 from convokit import Corpus, Transformer, CorpusComponent
+from convokit.util import parallel_map
+
+# scoring state; set by the initializer of parallel_map, so that (with fork) neither the score function nor the
+# objects need to be picklable
+_worker_score_func = None
+_worker_objs = None
+
+
+def _init_score_worker(score_func, objs):
+    global _worker_score_func, _worker_objs
+    _worker_score_func = score_func
+    _worker_objs = objs
+
+
+def _score_obj(idx):
+    return _worker_score_func(_worker_objs[idx])
+
+
+def _compute_ranks(scores: list, top_k: Optional[int] = None) -> List[Optional[int]]:
+    """
+    Computes the rank of each score, with rank 1 for the highest score; ties are ranked in input order, and NaN
+    (or None) scores are ranked last. If `top_k` is given, only the `top_k` highest scores are ranked (using a partial
+    sort), and the others get a rank of None.
+
+    Numeric scores are ranked with numpy; other scores (e.g., strings or tuples) are ranked with a full sort by their
+    own ordering, and must be comparable with each other.
+    """
+    n = len(scores)
+    ranks = [None] * n
+    if n == 0:
+        return ranks
+    if not all(score is None or isinstance(score, (Real, np.bool_)) for score in scores):
+        order = _sort_scores(scores)
+        if top_k is not None:
+            order = order[:top_k]
+    else:
+        neg_scores = -np.array(scores, dtype=np.float64)
+        if top_k is None or top_k >= n:
+            order = np.argsort(neg_scores, kind="stable")
+        else:
+            # only sort the scores that can make it into the top k, i.e., those at least as high as the k-th highest
+            kth_score = np.partition(neg_scores, top_k - 1)[top_k - 1]
+            candidates = np.flatnonzero(np.isnan(kth_score) | (neg_scores <= kth_score))
+            order = candidates[np.argsort(neg_scores[candidates], kind="stable")[:top_k]]
+        order = order.tolist()
+    for rank, idx in enumerate(order, start=1):
+        ranks[idx] = rank
+    return ranks
+
+
+def _sort_scores(scores: list) -> List[int]:
+    """
+    Sorts the indices of non-numeric scores from highest to lowest score, with ties in input order and None scores
+    last.
+    """
+    idxes = [idx for idx, score in enumerate(scores) if score is not None]
+    try:
+        order = sorted(idxes, key=scores.__getitem__, reverse=True)
+    except TypeError as e:
+        raise ValueError(
+            "Ranker scores must be numbers or mutually comparable values: {}".format(e)
+        ) from e
+    return order + [idx for idx, score in enumerate(scores) if score is None]
 
 
 class Ranker(Transformer):
@@ -10,9 +75,14 @@ class Ranker(Transformer):
     Ranker sorts the objects in the Corpus by a given scoring function and annotates the objects with their rankings.
 
     :param obj_type: type of Corpus object to rank: 'conversation', 'speaker', or 'utterance'
-    :param score_func: function for computing the score of a given object
+    :param score_func: function for computing the score of a given object; scores are usually numbers, but may be any
+        values that can be compared with each other (e.g., strings or tuples)
     :param score_attribute_name: metadata attribute name to use in annotation for score value, default: "score"
     :param rank_attribute_name: metadata attribute name to use in annotation for the rank value, default: "rank"
+    :param top_k: if given, only rank the `top_k` highest-scoring objects (using a partial sort, which is faster than
+        sorting all scores); the other objects are still annotated with their scores, but get a rank of None.
+    :param n_jobs: number of processes to use for computing scores, for expensive score functions; -1 to use all
+        available CPUs. On platforms that do not fork new processes, `score_func` and the objects must be picklable.
     """
 
     def __init__(
@@ -21,11 +91,29 @@ class Ranker(Transformer):
         score_func: Callable[[CorpusComponent], Union[int, float]],
         score_attribute_name: str = "score",
         rank_attribute_name: str = "rank",
+        top_k: Optional[int] = None,
+        n_jobs: int = 1,
     ):
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be a positive integer, got {}".format(top_k))
         self.obj_type = obj_type
         self.score_func = score_func
         self.score_attribute_name = score_attribute_name
         self.rank_attribute_name = rank_attribute_name
+        self.top_k = top_k
+        self.n_jobs = n_jobs
+
+    def _compute_scores(self, objs: List[CorpusComponent]) -> list:
+        try:
+            return parallel_map(
+                _score_obj,
+                list(range(len(objs))),
+                self.n_jobs,
+                initializer=_init_score_worker,
+                initargs=(self.score_func, objs),
+            )
+        finally:
+            _init_score_worker(None, None)
 
     def transform(
         self, corpus: Corpus, y=None, selector: Callable[[CorpusComponent], bool] = lambda obj: True
@@ -37,26 +125,23 @@ class Ranker(Transformer):
         :param selector: (lambda) function taking in a Corpus object and returning True / False; selects for Corpus objects to annotate.
         :return: annotated corpus
         """
-        obj_iters = {
-            "conversation": corpus.iter_conversations,
-            "speaker": corpus.iter_speakers,
-            "utterance": corpus.iter_utterances,
-        }
-        obj_scores = [(obj.id, self.score_func(obj)) for obj in obj_iters[self.obj_type](selector)]
-        df = (
-            pd.DataFrame(obj_scores, columns=["id", self.score_attribute_name])
-            .set_index("id")
-            .sort_values(self.score_attribute_name, ascending=False)
-        )
-        df[self.rank_attribute_name] = [idx + 1 for idx, _ in enumerate(df.index)]
-
-        for obj in corpus.iter_objs(obj_type=self.obj_type):
-            if obj.id in df.index:
-                obj.add_meta(self.score_attribute_name, df.loc[obj.id][self.score_attribute_name])
-                obj.add_meta(self.rank_attribute_name, df.loc[obj.id][self.rank_attribute_name])
-            else:
-                obj.add_meta(self.score_attribute_name, None)
-                obj.add_meta(self.rank_attribute_name, None)
+        all_ids, selected = [], []
+        for obj in corpus.iter_objs(self.obj_type):
+            all_ids.append(obj.id)
+            if selector(obj):
+                selected.append(obj)
+
+        scores = self._compute_scores(selected)
+        ranks = _compute_ranks(scores, self.top_k)
+
+        # objects outside the selector are annotated with None
+        score_values = dict.fromkeys(all_ids)
+        rank_values = dict.fromkeys(all_ids)
+        for obj, score, rank in zip(selected, scores, ranks):
+            score_values[obj.id] = score
+            rank_values[obj.id] = rank
+        corpus.bulk_add_meta(self.obj_type, self.score_attribute_name, score_values)
+        corpus.bulk_add_meta(self.obj_type, self.rank_attribute_name, rank_values)
         return corpus
 
     def transform_objs(self, objs: List[CorpusComponent]):
@@ -66,16 +151,12 @@ class Ranker(Transformer):
         :param objs: target list of Corpus objects
         :return: list of annotated COrpus objects
         """
-        obj_scores = [(obj.id, self.score_func(obj)) for obj in objs]
-        df = (
-            pd.DataFrame(obj_scores, columns=["id", self.score_attribute_name])
-            .set_index("id")
-            .sort_values(self.score_attribute_name, ascending=False)
-        )
-        df[self.rank_attribute_name] = [idx + 1 for idx, _ in enumerate(df.index)]
-        for obj in objs:
-            obj.add_meta(self.score_attribute_name, df.loc[obj.id][self.score_attribute_name])
-            obj.add_meta(self.rank_attribute_name, df.loc[obj.id][self.rank_attribute_name])
+        objs = list(objs)
+        scores = self._compute_scores(objs)
+        ranks = _compute_ranks(scores, self.top_k)
+        for obj, score, rank in zip(objs, scores, ranks):
+            obj.add_meta(self.score_attribute_name, score)
+            obj.add_meta(self.rank_attribute_name, rank)
         return objs
 
     def summarize(
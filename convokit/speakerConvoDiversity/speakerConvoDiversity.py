@@ -1,5 +1,7 @@
 import numpy as np
+import pandas as pd
 from convokit.transformer import Transformer
+from convokit.util import parallel_map
 from convokit.speaker_convo_helpers.speaker_convo_attrs import SpeakerConvoAttrs
 from itertools import chain
 from collections import Counter
@@ -66,6 +68,72 @@ def compute_divergences(
     )
 
 
+def _encode_tokens(token_lists):
+    """
+    integer-encodes a list of token lists with a single vocabulary.
+
+    :return: a list with the array of token codes of each token list
+    """
+    if len(token_lists) == 0:
+        return []
+    lengths = np.fromiter(
+        (len(toks) for toks in token_lists), dtype=np.int64, count=len(token_lists)
+    )
+    codes, _ = pd.factorize(np.fromiter(chain.from_iterable(token_lists), dtype=object))
+    return np.split(codes.astype(np.int64), np.cumsum(lengths)[:-1])
+
+
+def _sampled_perplexity(cmp_codes, ref_codes, ref_offsets, ref_lengths, aux_input, seed):
+    """
+    vectorized counterpart of `compute_divergences` over integer-encoded tokens: computes unigram perplexities of
+    `n_iters` samples of `cmp_codes` against samples of reference texts in one batch, counting the occurrences of
+    each sampled token in its reference sample by binary search over (iteration, token) keys.
+
+    :param cmp_codes: token codes of the text to compute divergence of; must have at least `cmp_sample_size` tokens
+    :param ref_codes: token codes of the reference texts, concatenated; each reference text must have at least
+        `ref_sample_size` tokens
+    :param ref_offsets: offset of each reference text in `ref_codes`
+    :param ref_lengths: length of each reference text
+    :param aux_input: parameters of the divergence computation (see `compute_divergences`)
+    :param seed: random seed for the sampling
+    :return: the mean perplexity over the samples
+    """
+    n_iters, cmp_size, ref_size = (
+        aux_input["n_iters"],
+        aux_input["cmp_sample_size"],
+        aux_input["ref_sample_size"],
+    )
+    rng = np.random.RandomState(seed)
+    cmp_samples = cmp_codes[rng.randint(0, len(cmp_codes), size=(n_iters, cmp_size))]
+    sample_idxes = rng.randint(0, len(ref_lengths), size=n_iters)
+    positions = (
+        rng.random_sample((n_iters, ref_size)) * ref_lengths[sample_idxes, np.newaxis]
+    ).astype(np.int64)
+    ref_samples = ref_codes[ref_offsets[sample_idxes, np.newaxis] + positions]
+
+    # offset the codes of each iteration so that the samples of all iterations can be counted at once
+    n_codes = max(cmp_codes.max(), ref_codes.max()) + 1
+    iter_offsets = np.arange(n_iters, dtype=np.int64)[:, np.newaxis] * n_codes
+    ref_keys = np.sort((ref_samples + iter_offsets).ravel())
+    cmp_keys = cmp_samples + iter_offsets
+    counts = np.searchsorted(ref_keys, cmp_keys, side="right") - np.searchsorted(
+        ref_keys, cmp_keys, side="left"
+    )
+    counts[counts == 0] = 1
+    return np.mean(-np.log(counts / ref_size))
+
+
+def _reference_divergences(args):
+    """
+    computes the divergences of a batch of texts that share the same reference texts.
+    """
+    ref_codes, ref_offsets, ref_lengths, cmp_batch, aux_input = args
+    return [
+        _sampled_perplexity(cmp_codes, ref_codes, ref_offsets, ref_lengths, aux_input, seed)
+        for cmp_codes, seed in cmp_batch
+    ]
+
+
 class SpeakerConvoDiversity(Transformer):
     """
     implements methodology to compute the linguistic divergence between a speaker's activity in each conversation in a corpus (i.e., the language of their utterances) and a reference language model trained over a different set of conversations/speakers.  See `SpeakerConvoDiversityWrapper` for more specific implementation which compares language used by individuals within fixed lifestages, and see the implementation of this wrapper for examples of calls to this transformer.
@@ -97,6 +165,7 @@ class SpeakerConvoDiversity(Transformer):
     :param aux_input: a dictionary of auxiliary input to the selector functions and the divergence computation
     :param recompute_tokens: whether to reprocess tokens by aggregating all tokens across different utterances made by a speaker in a conversation. by default, will cache existing output.
     :param verbosity: frequency of status messages.
+    :param n_jobs: number of processes to compute divergences with (only used with the default `divergence_fn`); -1 to use all available CPUs.
     """
 
     def __init__(
@@ -113,6 +182,7 @@ class SpeakerConvoDiversity(Transformer):
         aux_input={},
         recompute_tokens=False,
         verbosity=0,
+        n_jobs=1,
     ):
         self.output_field = output_field
         self.cmp_select_fn = cmp_select_fn
@@ -125,6 +195,7 @@ class SpeakerConvoDiversity(Transformer):
         self.groupby = groupby
         self.aux_input = aux_input
         self.verbosity = verbosity
+        self.n_jobs = n_jobs
 
         self.agg_tokens = SpeakerConvoAttrs(
             "tokens", agg_fn=_join_all_tokens, recompute=recompute_tokens
@@ -149,11 +220,14 @@ class SpeakerConvoDiversity(Transformer):
             self.groupby,
             self.aux_input,
             self.verbosity,
+            self.n_jobs,
+        )
+        corpus.bulk_set_speaker_convo_info(
+            self.output_field,
+            [entry["speaker"] for entry in results],
+            [entry["convo_id"] for entry in results],
+            [entry["divergence"] for entry in results],
         )
-        for entry in results:
-            corpus.set_speaker_convo_info(
-                entry["speaker"], entry["convo_id"], self.output_field, entry["divergence"]
-            )
         return corpus
 
 
@@ -166,10 +240,13 @@ def compute_speaker_convo_divergence(
     groupby=[],
     aux_input={},
     verbosity=0,
+    n_jobs=1,
 ):
     """
     given a table of speaker-conversation entries, computes linguistic divergences between each speaker-conversation entry and reference text. See `SpeakerConvoDiversity` for further explanation of arguments.
 
+    With the default `divergence_fn`, the computation is vectorized: tokens are integer-encoded once, the reference texts of entries that select the same reference subset are built once and shared, and the perplexity samples of each entry are computed in one batch. The sampling is seeded from numpy's global random state, so results are reproducible with `np.random.seed` regardless of `n_jobs`.
+
     The function operates on a table which has as columns:
             * `speaker`: speaker ID
             * `convo_id`: conversation ID
@@ -184,10 +261,15 @@ def compute_speaker_convo_divergence(
     :param groupby: whether to aggregate the reference texts according to the specified keys (leave empty to avoid aggregation).
     :param aux_input: a dictionary of auxiliary input to the selector functions and the divergence computation
     :param verbosity: frequency of status messages.
+    :param n_jobs: number of processes to compute divergences with (only used with the default `divergence_fn`); -1 to use all available CPUs.
     """
 
     cmp_subset = input_table[cmp_select_fn(input_table, aux_input)]
     ref_subset = input_table[ref_select_fn(input_table, aux_input)]
+    if divergence_fn is compute_divergences:
+        return _compute_encoded_divergences(
+            cmp_subset, ref_subset, select_fn, groupby, aux_input, verbosity, n_jobs
+        )
     entries = []
     for idx, (_, row) in enumerate(cmp_subset.iterrows()):
         if (verbosity > 0) and (idx % verbosity == 0) and (idx > 0):
@@ -233,6 +315,7 @@ class SpeakerConvoDiversityWrapper(Transformer):
     :param n_iters: number of samples to take for perplexity scoring
     :param cohort_delta: timespan between when speakers start for them to be counted as part of the same cohort. defaults to 2 months
     :param verbosity: amount of output to print
+    :param n_jobs: number of processes to compute divergences with; -1 to use all available CPUs.
     """
 
     def __init__(
@@ -245,6 +328,7 @@ class SpeakerConvoDiversityWrapper(Transformer):
         n_iters=50,
         cohort_delta=60 * 60 * 24 * 30 * 2,
         verbosity=100,
+        n_jobs=1,
     ):
         aux_input = {
             "n_iters": n_iters,
@@ -275,6 +359,7 @@ class SpeakerConvoDiversityWrapper(Transformer):
             groupby=[],
             aux_input=aux_input,
             verbosity=verbosity,
+            n_jobs=n_jobs,
         )
 
         # SpeakerConvoDiversity transformer to compute across-diversity
@@ -301,6 +386,7 @@ class SpeakerConvoDiversityWrapper(Transformer):
             groupby=["speaker", "lifestage"],
             aux_input=aux_input,
             verbosity=verbosity,
+            n_jobs=n_jobs,
         )
         self.verbosity = verbosity
 
@@ -326,14 +412,106 @@ class SpeakerConvoDiversityWrapper(Transformer):
         div_table[self.output_field + "__adj"] = (
             div_table[self.output_field + "__other"] - div_table[self.output_field + "__self"]
         )
-        for idx, (_, row) in enumerate(div_table.iterrows()):
-            if (idx > 0) and (self.verbosity > 0) and (idx % self.verbosity == 0):
-                print(idx, "/", len(div_table))
-            if not np.isnan(row[self.output_field + "__adj"]):
-                corpus.set_speaker_convo_info(
-                    row.speaker,
-                    row.convo_id,
-                    self.output_field + "__adj",
-                    row[self.output_field + "__adj"],
-                )
+        div_table = div_table[div_table[self.output_field + "__adj"].notnull()]
+        corpus.bulk_set_speaker_convo_info(
+            self.output_field + "__adj",
+            div_table.speaker.values,
+            div_table.convo_id.values,
+            div_table[self.output_field + "__adj"].values,
+        )
         return corpus
+
+
+# maximum number of reference tokens to hold before computing the pending divergences
+_MAX_PENDING_REF_TOKENS = 10**8
+
+
+def _compute_encoded_divergences(
+    cmp_subset, ref_subset, select_fn, groupby, aux_input, verbosity, n_jobs
+):
+    """
+    computes the divergences of `compute_speaker_convo_divergence` with the default `divergence_fn`, over
+    integer-encoded tokens.
+    """
+    cmp_subset = cmp_subset[cmp_subset.tokens.map(len).values >= aux_input["cmp_sample_size"]]
+    n_cmp = len(cmp_subset)
+    codes = _encode_tokens(list(cmp_subset.tokens.values) + list(ref_subset.tokens.values))
+    cmp_codes, ref_row_codes = codes[:n_cmp], codes[n_cmp:]
+    ref_row_lengths = np.array([len(row_codes) for row_codes in ref_row_codes], dtype=np.int64)
+    if len(groupby) == 0:
+        group_ids = np.zeros(len(ref_subset), dtype=np.int64)
+    else:
+        group_ids = ref_subset.groupby(groupby).ngroup().fillna(-1).values.astype(np.int64)
+    seeds = np.random.randint(0, 2**31 - 1, size=n_cmp)
+
+    divergences = np.full(n_cmp, np.nan)
+    references = {}
+    pending = []
+    pending_size = 0
+
+    def compute_pending():
+        batches = [
+            (
+                ref_codes,
+                ref_offsets,
+                ref_lengths,
+                [(cmp_codes[i], seeds[i]) for i in rows],
+                aux_input,
+            )
+            for (ref_codes, ref_offsets, ref_lengths), rows in pending
+        ]
+        for (_, rows), batch_divergences in zip(
+            pending, parallel_map(_reference_divergences, batches, n_jobs)
+        ):
+            divergences[rows] = batch_divergences
+
+    for idx, (_, row) in enumerate(cmp_subset.iterrows()):
+        if (verbosity > 0) and (idx % verbosity == 0) and (idx > 0):
+            print(idx, "/", n_cmp)
+
+        selected = np.flatnonzero(np.asarray(select_fn(ref_subset, row, aux_input)))
+        key = selected.tobytes()
+        if key not in references:
+            reference = _build_reference(
+                selected, ref_row_codes, ref_row_lengths, group_ids, aux_input["ref_sample_size"]
+            )
+            if reference is not None:
+                if pending_size + len(reference[0]) > _MAX_PENDING_REF_TOKENS:
+                    compute_pending()
+                    references, pending, pending_size = {}, [], 0
+                pending.append((reference, []))
+                pending_size += len(reference[0])
+                reference = len(pending) - 1
+            references[key] = reference
+        if references[key] is not None:
+            pending[references[key]][1].append(idx)
+    compute_pending()
+
+    return [
+        {"speaker": row.speaker, "convo_id": row.convo_id, "divergence": divergence}
+        for row, divergence in zip(cmp_subset.itertuples(), divergences)
+        if not np.isnan(divergence)
+    ]
+
+
+def _build_reference(selected, ref_row_codes, ref_row_lengths, group_ids, ref_sample_size):
+    """
+    concatenates the token codes of the selected reference rows into one reference text per group, keeping only the
+    texts with at least `ref_sample_size` tokens.
+
+    :return: a tuple of the concatenated token codes and the offset and length of each text, or None if no text is
+        long enough
+    """
+    selected = selected[group_ids[selected] >= 0]
+    if len(selected) == 0:
+        return None
+    selected = selected[np.argsort(group_ids[selected], kind="stable")]
+    groups = group_ids[selected]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(groups)) + 1])
+    lengths = np.add.reduceat(ref_row_lengths[selected], starts)
+    offsets = np.cumsum(lengths) - lengths
+    keep = lengths >= ref_sample_size
+    if not keep.any():
+        return None
+    ref_codes = np.concatenate([ref_row_codes[i] for i in selected])
+    return ref_codes, offsets[keep], lengths[keep]
@@ -32,19 +32,16 @@ class SpeakerConvoAttrs(Transformer):
         :type corpus: Corpus
         """
 
+        speaker_ids, convo_ids, values = [], [], []
         for speaker in corpus.iter_speakers():
-            if "conversations" not in speaker.meta:
-                continue
-
-            for convo_id, convo in speaker.meta["conversations"].items():
-                if self.recompute or (
-                    corpus.get_speaker_convo_info(speaker.id, convo_id, self.output_field) is None
-                ):
+            for convo_id, convo in corpus.get_speaker_convos(speaker.id).items():
+                if self.recompute or convo.get(self.output_field) is None:
                     utterance_attrs = [
                         corpus.get_utterance(utt_id).meta[self.attr_name]
                         for utt_id in convo["utterance_ids"]
                     ]
-                    corpus.set_speaker_convo_info(
-                        speaker.id, convo_id, self.output_field, self.agg_fn(utterance_attrs)
-                    )
+                    speaker_ids.append(speaker.id)
+                    convo_ids.append(convo_id)
+                    values.append(self.agg_fn(utterance_attrs))
+        corpus.bulk_set_speaker_convo_info(self.output_field, speaker_ids, convo_ids, values)
         return corpus
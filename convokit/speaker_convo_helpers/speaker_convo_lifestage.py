@@ -16,14 +16,11 @@ class SpeakerConvoLifestage(Transformer):
         self.lifestage_size = lifestage_size
 
     def transform(self, corpus):
+        speaker_ids, convo_ids, lifestages = [], [], []
         for speaker in corpus.iter_speakers():
-            if "conversations" not in speaker.meta:
-                continue
-            for convo_id, convo in speaker.meta["conversations"].items():
-                corpus.set_speaker_convo_info(
-                    speaker.id,
-                    convo_id,
-                    self.output_field,
-                    int(convo["idx"] // self.lifestage_size),
-                )
+            for convo_id, convo in corpus.get_speaker_convos(speaker.id).items():
+                speaker_ids.append(speaker.id)
+                convo_ids.append(convo_id)
+                lifestages.append(int(convo["idx"] // self.lifestage_size))
+        corpus.bulk_set_speaker_convo_info(self.output_field, speaker_ids, convo_ids, lifestages)
         return corpus
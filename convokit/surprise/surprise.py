@@ -2,6 +2,7 @@ import numpy as np
 from collections import defaultdict, Counter
 from convokit import Transformer
 from convokit.model import Corpus, CorpusComponent, Utterance
+from convokit.util import parallel_map
 from itertools import chain
 from nltk.tokenize import word_tokenize
 from sklearn.feature_extraction.text import CountVectorizer
@@ -53,6 +54,10 @@ def sample(tokens: List[Union[np.ndarray, List[str]]], sample_size: int, n_sampl
     return np.array([rng.choice(tokens_list[i], sample_size) for i in sample_idxes])
 
 
+def _utterance_text(utt):
+    return utt.text
+
+
 class Surprise(Transformer):
     """
     Computes how surprising a target (an utterance or group of utterances) is based on some context.
@@ -70,6 +75,10 @@ class Surprise(Transformer):
     :param n_samples: number of samples to take for each target-context pair.
     :param sampling_fn: function for generating samples of tokens.
     :param smooth: whether to use laplace smoothing when calculating surprise.
+    :param n_jobs: number of processes to tokenize texts with; -1 to use all available CPUs. If not 1, `tokenizer`
+        must be picklable (e.g., a module-level function).
+    :param cache_tokens: whether to memoize the tokenized utterance texts in the corpus, so that repeated calls to
+        `transform()` do not tokenize the same utterances again.
     """
 
     def __init__(
@@ -82,6 +91,8 @@ class Surprise(Transformer):
         n_samples=50,
         sampling_fn: Callable[[np.ndarray, int], np.ndarray] = sample,
         smooth: bool = True,
+        n_jobs: int = 1,
+        cache_tokens: bool = False,
     ):
         self.model_key_selector = model_key_selector
         self.tokenizer = tokenizer
@@ -91,6 +102,8 @@ class Surprise(Transformer):
         self.n_samples = n_samples
         self.sampling_fn = sampling_fn
         self.smooth = smooth
+        self.n_jobs = n_jobs
+        self.cache_tokens = cache_tokens
 
     def fit(
         self,
@@ -122,12 +135,31 @@ class Surprise(Transformer):
                     self.model_groups[key] = text_func(utt)
             else:
                 self.model_groups[key].append(utt.text)
+        keys, texts = [], []
         for key in tqdm(self.model_groups, desc="fit2"):
             if not text_func:
                 self.model_groups[key] = [" ".join(self.model_groups[key])]
-            self.model_groups[key] = list(map(lambda x: self.tokenizer(x), self.model_groups[key]))
+            keys.extend([key] * len(self.model_groups[key]))
+            texts.extend(self.model_groups[key])
+        for key in self.model_groups:
+            self.model_groups[key] = []
+        for key, tokens in zip(keys, parallel_map(self.tokenizer, texts, self.n_jobs)):
+            self.model_groups[key].append(tokens)
         return self
 
+    def _get_utt_tokens(self, corpus: Corpus, utts: List[Utterance]):
+        """
+        Tokenizes the texts of a list of utterances, returning a dict from utterance id to list of tokens.
+        """
+        tokens = corpus.get_texts(
+            utts,
+            _utterance_text,
+            clean_func=self.tokenizer,
+            n_jobs=self.n_jobs,
+            cache=self.cache_tokens,
+        )
+        return dict(zip([utt.id for utt in utts], tokens))
+
     def transform(
         self,
         corpus: Corpus,
@@ -166,6 +198,22 @@ class Surprise(Transformer):
         :param target_text_func: optional function to define what the target text corresponding to an utterance should be.
             takes in an utterance and returns a list of string tokens
         """
+        if target_text_func:
+            utt_tokens = None
+        elif obj_type == "corpus":
+            utt_tokens = self._get_utt_tokens(corpus, list(corpus.iter_utterances()))
+        elif obj_type == "utterance":
+            utt_tokens = self._get_utt_tokens(corpus, list(corpus.iter_utterances(selector)))
+        else:
+            utt_tokens = self._get_utt_tokens(
+                corpus,
+                [
+                    utt
+                    for obj in corpus.iter_objs(obj_type, selector=selector)
+                    for utt in obj.iter_utterances()
+                ],
+            )
+
         if obj_type == "corpus":
             utt_groups = defaultdict(list)
             group_models = defaultdict(set)
@@ -179,7 +227,7 @@ class Surprise(Transformer):
                     if group_name not in utt_groups:
                         utt_groups[group_name] = [target_text_func(utt)]
                 else:
-                    utt_groups[group_name].append(self.tokenizer(utt.text))
+                    utt_groups[group_name].append(utt_tokens[utt.id])
                 group_models[group_name].update(models)
             surprise_scores = {}
             for group_name in tqdm(utt_groups, desc="transform"):
@@ -197,9 +245,7 @@ class Surprise(Transformer):
                     surprise_scores = {}
                     for model_key in models:
                         context = self.model_groups[model_key]
-                        target = (
-                            target_text_func(utt) if target_text_func else self.tokenizer(utt.text)
-                        )
+                        target = target_text_func(utt) if target_text_func else utt_tokens[utt.id]
                         surprise_scores[
                             Surprise._format_attr_key(group_name, model_key, group_model_attr_key)
                         ] = self._compute_surprise(target, context)
@@ -207,7 +253,7 @@ class Surprise(Transformer):
                 else:
                     group_name = self.model_key_selector(utt)
                     context = self.model_groups[group_name]
-                    target = target_text_func(utt) if target_text_func else self.tokenizer(utt.text)
+                    target = target_text_func(utt) if target_text_func else utt_tokens[utt.id]
                     utt.add_meta(self.surprise_attr_name, self._compute_surprise(target, context))
         else:
             for obj in tqdm(corpus.iter_objs(obj_type, selector=selector), desc="transform"):
@@ -223,7 +269,7 @@ class Surprise(Transformer):
                         if group_name not in utt_groups:
                             utt_groups[group_name] = [target_text_func(utt)]
                     else:
-                        utt_groups[group_name].append(self.tokenizer(utt.text))
+                        utt_groups[group_name].append(utt_tokens[utt.id])
                     group_models[group_name].update(models)
                 surprise_scores = {}
                 for group_name in utt_groups:
@@ -2,8 +2,10 @@ import unittest
 from unittest import TestCase
 
 from scipy.sparse import coo_matrix
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
 
 from convokit import BoWTransformer
+from convokit.model import Corpus, Speaker, Utterance
 from convokit.tests.test_utils import (
     small_burr_corpus,
     BURR_SIR_TEXT_1,
@@ -25,6 +27,20 @@ def assert_sparse_matrices_equal(matrix1, matrix2):
     assert (matrix1 != matrix2).nnz == 0
 
 
+def many_utterances_corpus():
+    words = BURR_SIR_TEXT_1.split() + BURR_SIR_TEXT_2.split()
+    return Corpus(
+        utterances=[
+            Utterance(
+                id="u%d" % i,
+                text=" ".join(words[i : i + 1 + i % 5]).upper(),
+                speaker=Speaker(id="s%d" % (i % 3)),
+            )
+            for i in range(len(words))
+        ]
+    )
+
+
 class FakeVectorizer:
     def transform(self, texts):
         assert len(texts) == 2
@@ -50,6 +66,70 @@ class TestBoWTransformer(TestCase):
             actual_vector = utterance.get_vector("bow_vector")
             assert_sparse_matrices_equal(expected_vector, actual_vector)
 
+    def transform_utterances_parallel_cached(self):
+        transformer = BoWTransformer(
+            obj_type="utterance",
+            vectorizer=FakeVectorizer(),
+            text_cleaner=str.strip,
+            n_jobs=2,
+            cache_texts=True,
+        )
+        corpus = transformer.fit_transform(self.corpus)
+        self.assertEqual(len(corpus._text_cache[(transformer.text_func, str.strip)]), 2)
+        corpus = transformer.transform(corpus)
+
+        expected_vectors = [burr_sir_sentence_1_vector(), burr_sir_sentence_2_vector()]
+
+        for expected_vector, utterance in zip(expected_vectors, corpus.iter_utterances()):
+            actual_vector = utterance.get_vector("bow_vector")
+            assert_sparse_matrices_equal(expected_vector, actual_vector)
+
+    def transform_utterances_streaming(self):
+        BoWTransformer(
+            obj_type="utterance", vector_name="full", vectorizer=HashingVectorizer(n_features=64)
+        ).fit_transform(self.corpus)
+        corpus = BoWTransformer(
+            obj_type="utterance",
+            vector_name="streamed",
+            vectorizer=HashingVectorizer(n_features=64),
+            chunk_size=1,
+        ).fit_transform(self.corpus)
+
+        full = corpus.get_vector_matrix("full")
+        streamed = corpus.get_vector_matrix("streamed")
+        self.assertEqual(list(full.ids), list(streamed.ids))
+        assert_sparse_matrices_equal(full.matrix, streamed.matrix)
+        for utterance in corpus.iter_utterances():
+            self.assertIn("streamed", utterance.vectors)
+
+    def transform_utterances_streaming_parallel(self):
+        for vectorizer_class, kwargs in [
+            (CountVectorizer, {}),
+            (HashingVectorizer, {"n_features": 64}),
+        ]:
+            corpus = BoWTransformer(
+                obj_type="utterance",
+                vector_name="full",
+                vectorizer=vectorizer_class(lowercase=False, **kwargs),
+                text_cleaner=str.lower,
+            ).fit_transform(self.corpus)
+            for n_jobs in [2, -1]:
+                corpus = BoWTransformer(
+                    obj_type="utterance",
+                    vector_name="streamed",
+                    vectorizer=vectorizer_class(lowercase=False, **kwargs),
+                    text_cleaner=str.lower,
+                    chunk_size=3,
+                    n_jobs=n_jobs,
+                ).fit_transform(corpus)
+
+                full = corpus.get_vector_matrix("full")
+                streamed = corpus.get_vector_matrix("streamed")
+                self.assertEqual(list(full.ids), list(streamed.ids))
+                self.assertEqual(list(full.columns), list(streamed.columns))
+                self.assertGreater(full.matrix.nnz, 0)
+                assert_sparse_matrices_equal(full.matrix, streamed.matrix)
+
 
 class TestWithDB(TestBoWTransformer):
     def setUp(self) -> None:
@@ -58,6 +138,16 @@ class TestWithDB(TestBoWTransformer):
     def test_transform_utterances(self):
         self.transform_utterances()
 
+    def test_transform_utterances_parallel_cached(self):
+        self.transform_utterances_parallel_cached()
+
+    def test_transform_utterances_streaming(self):
+        self.transform_utterances_streaming()
+
+    def test_transform_utterances_streaming_parallel(self):
+        self.corpus = reload_corpus_in_db_mode(many_utterances_corpus())
+        self.transform_utterances_streaming_parallel()
+
 
 class TestWithMem(TestBoWTransformer):
     def setUp(self) -> None:
@@ -66,6 +156,16 @@ class TestWithMem(TestBoWTransformer):
     def test_transform_utterances(self):
         self.transform_utterances()
 
+    def test_transform_utterances_parallel_cached(self):
+        self.transform_utterances_parallel_cached()
+
+    def test_transform_utterances_streaming(self):
+        self.transform_utterances_streaming()
+
+    def test_transform_utterances_streaming_parallel(self):
+        self.corpus = many_utterances_corpus()
+        self.transform_utterances_streaming_parallel()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,199 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from convokit.expected_context_framework import DualContextWrapper, ExpectedContextModelTransformer
+from convokit.model import Corpus, Speaker, Utterance
+
+TOPICS = [["t%dw%d" % (topic, i) for i in range(6)] for topic in range(4)]
+VOCAB = sorted(term for topic in TOPICS for term in topic)
+UTTS_PER_CONVO = 4
+MODEL_PARAMS = dict(n_svd_dims=4, n_clusters=2, random_state=0, cluster_random_state=0)
+
+
+def generate_convos(n_convos, seed=0):
+    """
+    Generates the texts of conversations in which each utterance mostly uses the terms of one topic, and replies move
+    on to the next topic; topics are of unequal frequency, so that the singular values of the data are distinct.
+    """
+    rng = np.random.RandomState(seed)
+    convos = []
+    for _ in range(n_convos):
+        topic = rng.choice(len(TOPICS), p=[0.55, 0.25, 0.15, 0.05])
+        convos.append(
+            [
+                " ".join(
+                    list(rng.choice(TOPICS[(topic + i) % len(TOPICS)], 4))
+                    + list(rng.choice(VOCAB, 1))
+                )
+                for i in range(UTTS_PER_CONVO)
+            ]
+        )
+    return convos
+
+
+def make_corpus(convos, first_convo_idx=0):
+    utts = []
+    for convo_idx, texts in enumerate(convos, first_convo_idx):
+        for i, text in enumerate(texts):
+            utts.append(
+                Utterance(
+                    id="c%du%d" % (convo_idx, i),
+                    text=text,
+                    speaker=Speaker(id="s%d" % (i % 3)),
+                    conversation_id="c%d" % convo_idx,
+                    reply_to=None if i == 0 else "c%du%d" % (convo_idx, i - 1),
+                    meta={"next_id": "c%du%d" % (convo_idx, i + 1) if i < len(texts) - 1 else None},
+                )
+            )
+    corpus = Corpus(utterances=utts)
+    # a fixed vocabulary, so that batches share the same columns
+    ids = [utt.id for utt in corpus.iter_utterances()]
+    vects = CountVectorizer(token_pattern=r"\S+", vocabulary=VOCAB).transform(
+        [corpus.get_utterance(id).text for id in ids]
+    )
+    corpus.set_vector_matrix("tfidf", matrix=normalize(vects), ids=ids, columns=VOCAB)
+    for id in ids:
+        corpus.get_utterance(id).add_vector("tfidf")
+    return corpus
+
+
+def assert_allclose_up_to_sign(expected, actual, atol):
+    # representations are only determined up to the sign of each dimension
+    expected, actual = np.asarray(expected), np.asarray(actual)
+    signs = np.sign(np.sum(expected * actual, axis=0))
+    np.testing.assert_allclose(actual * signs, expected, atol=atol)
+
+
+class TestExpectedContextModelPartialFit(unittest.TestCase):
+    def setUp(self) -> None:
+        convos = generate_convos(60)
+        self.corpus = make_corpus(convos)
+        self.batches = [make_corpus(convos[:30]), make_corpus(convos[30:], 30)]
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def test_single_batch_matches_fit(self):
+        fit_model = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        fit_model.fit(self.corpus)
+        partial_model = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        partial_model.partial_fit(self.corpus)
+
+        # fit computes a randomized SVD, and partial_fit an exact one
+        assert_allclose_up_to_sign(
+            fit_model.get_term_reprs(), partial_model.get_term_reprs(), atol=1e-2
+        )
+        assert_allclose_up_to_sign(
+            fit_model.get_context_term_reprs(), partial_model.get_context_term_reprs(), atol=1e-2
+        )
+        np.testing.assert_allclose(
+            partial_model.get_term_ranges(), fit_model.get_term_ranges(), atol=1e-2
+        )
+        self.assertEqual(
+            set(partial_model.get_clustering()["utts"].index), set(self.corpus.get_utterance_ids())
+        )
+
+    def test_batches_match_fit_on_all(self):
+        fit_model = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        fit_model.fit(self.corpus)
+        partial_model = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        first_term_reprs = None
+        for batch in self.batches:
+            partial_model.partial_fit(batch)
+            if first_term_reprs is None:
+                first_term_reprs = np.array(partial_model.get_term_reprs())
+
+        self.assertFalse(np.allclose(first_term_reprs, partial_model.get_term_reprs()))
+        assert_allclose_up_to_sign(
+            fit_model.get_term_reprs(), partial_model.get_term_reprs(), atol=1e-2
+        )
+        assert_allclose_up_to_sign(
+            fit_model.get_context_term_reprs(), partial_model.get_context_term_reprs(), atol=1e-2
+        )
+        # the representations of training utterances are those of the latest batch
+        self.assertEqual(
+            set(partial_model.get_clustering()["utts"].index),
+            set(self.batches[1].get_utterance_ids()),
+        )
+
+    def test_dump_load_then_partial_fit(self):
+        model = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        model.partial_fit(self.batches[0])
+        model.dump(self.dirpath)
+
+        loaded = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        loaded.load(self.dirpath)
+        model.partial_fit(self.batches[1])
+        loaded.partial_fit(self.batches[1])
+
+        np.testing.assert_allclose(loaded.get_term_reprs(), model.get_term_reprs())
+        np.testing.assert_allclose(loaded.get_context_term_reprs(), model.get_context_term_reprs())
+        np.testing.assert_allclose(loaded.get_term_ranges(), model.get_term_ranges())
+        np.testing.assert_array_equal(
+            loaded.get_clustering()["utts"].cluster_id_, model.get_clustering()["utts"].cluster_id_
+        )
+
+    def test_partial_fit_without_context_model(self):
+        model = ExpectedContextModelTransformer("reply_to", "fw", "tfidf", **MODEL_PARAMS)
+        with self.assertRaises(ValueError):
+            model.partial_fit(self.corpus, refit_context=False)
+
+
+class TestDualContextWrapperPartialFit(unittest.TestCase):
+    def setUp(self) -> None:
+        convos = generate_convos(60)
+        self.corpus = make_corpus(convos)
+        self.batches = [make_corpus(convos[:30]), make_corpus(convos[30:], 30)]
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def get_wrapper(self):
+        return DualContextWrapper(["reply_to", "next_id"], ["bk", "fw"], "tfidf", **MODEL_PARAMS)
+
+    def test_single_batch_matches_fit(self):
+        fit_wrapper = self.get_wrapper()
+        fit_wrapper.fit(self.corpus)
+        partial_wrapper = self.get_wrapper()
+        partial_wrapper.partial_fit(self.corpus)
+
+        fit_df, partial_df = fit_wrapper.get_term_df(), partial_wrapper.get_term_df()
+        self.assertEqual(list(partial_df.index), list(fit_df.index))
+        np.testing.assert_allclose(partial_df.values, fit_df.values, atol=1e-2)
+
+    def test_batches(self):
+        fit_wrapper = self.get_wrapper()
+        fit_wrapper.fit(self.corpus)
+        partial_wrapper = self.get_wrapper()
+        for batch in self.batches:
+            partial_wrapper.partial_fit(batch)
+
+        # both models share the representation of context-utterances
+        np.testing.assert_array_equal(
+            partial_wrapper.ec_models[0].get_context_term_reprs(),
+            partial_wrapper.ec_models[1].get_context_term_reprs(),
+        )
+        np.testing.assert_allclose(partial_wrapper.term_shifts, fit_wrapper.term_shifts, atol=1e-2)
+
+    def test_dump_load_then_partial_fit(self):
+        wrapper = self.get_wrapper()
+        wrapper.partial_fit(self.batches[0])
+        wrapper.dump(self.dirpath)
+
+        loaded = self.get_wrapper()
+        loaded.load(self.dirpath)
+        wrapper.partial_fit(self.batches[1])
+        loaded.partial_fit(self.batches[1])
+
+        np.testing.assert_allclose(loaded.get_term_df().values, wrapper.get_term_df().values)
+
+
+if __name__ == "__main__":
+    unittest.main()
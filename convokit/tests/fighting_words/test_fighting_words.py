@@ -0,0 +1,130 @@
+import unittest
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from convokit.fighting_words import FightingWords
+from convokit.model import Corpus, Speaker, Utterance
+
+CLASS1_WORDS = ["apple", "banana", "cherry", "fruit", "sweet"]
+CLASS2_WORDS = ["carrot", "potato", "onion", "vegetable", "salty"]
+SHARED_WORDS = ["the", "is", "a", "very", "food"]
+
+
+def make_corpus(n_utts=40, seed=0):
+    """
+    Makes a corpus of utterances of two classes (in the `class` metadata of each utterance), which share some words
+    and favor others.
+    """
+    rng = np.random.RandomState(seed)
+    utts = []
+    for i in range(n_utts):
+        label = "fruit" if i % 2 == 0 else "vegetable"
+        class_words = CLASS1_WORDS if label == "fruit" else CLASS2_WORDS
+        words = list(rng.choice(class_words, 3)) + list(
+            rng.choice(SHARED_WORDS + CLASS1_WORDS + CLASS2_WORDS, 3)
+        )
+        utts.append(
+            Utterance(
+                id="u%d" % i,
+                text=" ".join(words),
+                speaker=Speaker(id="s%d" % (i % 4)),
+                conversation_id="c%d" % (i // 4),
+                meta={"class": label},
+            )
+        )
+    return Corpus(utterances=utts)
+
+
+def per_ngram_zscores(counts1, counts2, terms, prior):
+    """
+    Computes the z-scores of each ngram one at a time, as in Monroe et al.
+    """
+    priors = [prior] * len(terms) if type(prior) is float else prior
+    a0 = sum(priors)
+    n1, n2 = float(sum(counts1)), float(sum(counts2))
+    z_scores = {}
+    for i, term in enumerate(terms):
+        term1 = np.log((counts1[i] + priors[i]) / (n1 + a0 - counts1[i] - priors[i]))
+        term2 = np.log((counts2[i] + priors[i]) / (n2 + a0 - counts2[i] - priors[i]))
+        var = 1.0 / (counts1[i] + priors[i]) + 1.0 / (counts2[i] + priors[i])
+        z_scores[term] = (term1 - term2) / np.sqrt(var)
+    return z_scores
+
+
+class NumpyStrVectorizer(CountVectorizer):
+    # a vectorizer whose feature names are numpy strings rather than python strings
+    def get_feature_names_out(self, input_features=None):
+        return super().get_feature_names_out(input_features).astype(str)
+
+
+def is_fruit(utt):
+    return utt.meta["class"] == "fruit"
+
+
+def is_vegetable(utt):
+    return utt.meta["class"] == "vegetable"
+
+
+class TestFightingWords(unittest.TestCase):
+    def setUp(self) -> None:
+        self.corpus = make_corpus()
+        self.vocab = sorted(set(SHARED_WORDS + CLASS1_WORDS + CLASS2_WORDS))
+
+    def get_transformer(self, prior=0.1, vectorizer_class=CountVectorizer):
+        return FightingWords(
+            cv=vectorizer_class(vocabulary=self.vocab), prior=prior, text_cleaner=str.lower
+        )
+
+    def test_zscores_match_per_ngram_computation(self):
+        for prior in [0.1, list(np.linspace(0.05, 0.5, len(self.vocab)))]:
+            fw = self.get_transformer(prior, vectorizer_class=NumpyStrVectorizer)
+            fw.fit(self.corpus, class1_func=is_fruit, class2_func=is_vegetable)
+
+            cv = CountVectorizer(vocabulary=self.vocab)
+            counts1 = cv.transform(
+                [utt.text for utt in self.corpus.iter_utterances(is_fruit)]
+            ).toarray()
+            counts2 = cv.transform(
+                [utt.text for utt in self.corpus.iter_utterances(is_vegetable)]
+            ).toarray()
+            expected = per_ngram_zscores(
+                counts1.sum(axis=0), counts2.sum(axis=0), self.vocab, prior
+            )
+
+            zscores = fw.ngram_zscores
+            self.assertEqual(set(zscores), set(expected))
+            for ngram, zscore in zscores.items():
+                self.assertIs(type(ngram), str)
+                self.assertAlmostEqual(zscore, expected[ngram], places=5)
+            self.assertEqual(list(zscores.values()), sorted(zscores.values()))
+
+        class1_ngrams, class2_ngrams = fw.get_top_k_ngrams(top_k=3)
+        self.assertTrue(set(class1_ngrams) <= set(CLASS1_WORDS))
+        self.assertTrue(set(class2_ngrams) <= set(CLASS2_WORDS))
+
+    def test_chunked_partial_fit_matches_fit(self):
+        fw = self.get_transformer()
+        fw.fit(self.corpus, class1_func=is_fruit, class2_func=is_vegetable)
+
+        chunked_fw = self.get_transformer()
+        for chunk in range(4):
+            chunked_fw.partial_fit(
+                self.corpus,
+                class1_func=is_fruit,
+                class2_func=is_vegetable,
+                selector=lambda utt: int(utt.id[1:]) % 4 == chunk,
+            )
+
+        self.assertEqual(list(chunked_fw.ngram_zscores), list(fw.ngram_zscores))
+        np.testing.assert_allclose(
+            list(chunked_fw.ngram_zscores.values()), list(fw.ngram_zscores.values())
+        )
+        self.assertEqual(
+            chunked_fw.get_ngrams_past_threshold(threshold=1.0),
+            fw.get_ngrams_past_threshold(threshold=1.0),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@ import unittest
 
 from convokit import Corpus
 from convokit.tests.general.binary_data.binary_data_helpers import construct_corpus_with_binary_data
-from convokit.tests.test_utils import reload_corpus_in_db_mode
+from convokit.tests.test_utils import reload_corpus_in_db_mode, reload_corpus_in_disk_mode
 
 DUMPED_CORPUS_NAME = "binary_corpus_test"
 
@@ -113,5 +113,28 @@ class TestWithMem(CorpusBinaryData):
         self.partial_load_invalid_end_index()
 
 
+class TestWithDisk(CorpusBinaryData):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_disk_mode(construct_corpus_with_binary_data())
+
+    def test_dump_and_load_with_binary(self):
+        self.dump_and_load_with_binary()
+
+    def test_partial_load_corpus(self):
+        self.partial_load_corpus()
+
+    def test_partial_load_start_idx_specified_only(self):
+        self.partial_load_start_idx_specified_only()
+
+    def test_partial_load_end_idx_specified_only(self):
+        self.partial_load_end_idx_specified_only()
+
+    def test_partial_load_invalid_start_index(self):
+        self.partial_load_invalid_start_index()
+
+    def test_partial_load_invalid_end_index(self):
+        self.partial_load_invalid_end_index()
+
+
 if __name__ == "__main__":
     unittest.main()
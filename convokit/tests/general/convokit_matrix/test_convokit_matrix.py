@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from convokit.model import Corpus, ConvoKitMatrix, CorpusComponent
+from convokit.tests.test_utils import small_burr_corpus
+
+
+class TestConvoKitMatrixStorage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+        self.dense = np.arange(12, dtype=np.float64).reshape(4, 3)
+        self.ids = ["a", "b", "c", "d"]
+        self.columns = ["x", "y", "z"]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def test_dense_round_trip_is_memory_mapped(self):
+        ConvoKitMatrix("dense", self.dense, ids=self.ids, columns=self.columns).dump(self.dirpath)
+        self.assertTrue(os.path.isdir(os.path.join(self.dirpath, "vectors.dense")))
+
+        loaded = ConvoKitMatrix.from_dir(self.dirpath, "dense")
+        self.assertIsInstance(loaded.matrix, np.memmap)
+        self.assertEqual(list(loaded.ids), self.ids)
+        self.assertEqual(list(loaded.columns), self.columns)
+        np.testing.assert_array_equal(loaded.get_vectors(ids=["c", "a"]), self.dense[[2, 0]])
+
+    def test_sparse_round_trip(self):
+        matrix = csr_matrix(self.dense)
+        ConvoKitMatrix("sparse", matrix, ids=self.ids, columns=self.columns).dump(self.dirpath)
+
+        loaded = ConvoKitMatrix.from_dir(self.dirpath, "sparse")
+        self.assertIsInstance(loaded.matrix, csr_matrix)
+        self.assertEqual((loaded.matrix != matrix).nnz, 0)
+
+    def test_copy_on_write_does_not_modify_file(self):
+        ConvoKitMatrix("dense", self.dense, ids=self.ids, columns=self.columns).dump(self.dirpath)
+        loaded = ConvoKitMatrix.from_dir(self.dirpath, "dense")
+        loaded.matrix[0, 0] = -1
+
+        reloaded = ConvoKitMatrix.from_dir(self.dirpath, "dense", mmap_mode=None)
+        self.assertEqual(reloaded.matrix[0, 0], 0)
+
+    def test_load_pickle_format(self):
+        ConvoKitMatrix("dense", self.dense, ids=self.ids, columns=self.columns).dump(
+            self.dirpath, as_pickle=True
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.dirpath, "vectors.dense.p")))
+
+        loaded = ConvoKitMatrix.from_dir(self.dirpath, "dense")
+        np.testing.assert_array_equal(loaded.to_dataframe().values, self.dense)
+
+    def test_get_vectors_by_id(self):
+        matrix = ConvoKitMatrix("dense", self.dense, ids=self.ids, columns=self.columns)
+        np.testing.assert_array_equal(matrix.get_vectors(ids=["d", "b"]), self.dense[[3, 1]])
+        np.testing.assert_array_equal(
+            matrix.get_vectors(ids=["a"], columns=["z", "x"]), self.dense[[0]][:, [2, 0]]
+        )
+        with self.assertRaises(KeyError):
+            matrix.get_vectors(ids=["e"])
+
+    def test_subset_preserves_storage_type(self):
+        dense_subset = ConvoKitMatrix(
+            "dense", self.dense, ids=self.ids, columns=self.columns
+        ).subset(ids=["c", "a"], columns=["y"])
+        self.assertIsInstance(dense_subset.matrix, np.ndarray)
+        np.testing.assert_array_equal(dense_subset.matrix, self.dense[[2, 0]][:, [1]])
+        self.assertEqual(dense_subset.ids, ["c", "a"])
+
+        sparse_subset = ConvoKitMatrix(
+            "sparse", csr_matrix(self.dense), ids=self.ids, columns=self.columns
+        ).subset(ids=["c", "a"])
+        self.assertIsInstance(sparse_subset.matrix, csr_matrix)
+        np.testing.assert_array_equal(sparse_subset.matrix.toarray(), self.dense[[2, 0]])
+
+    def test_get_vectors_of_components(self):
+        corpus = small_burr_corpus()
+        ids = corpus.get_utterance_ids()
+        corpus.set_vector_matrix("vec", self.dense[: len(ids)], ids=ids, columns=self.columns)
+        utts = list(corpus.iter_utterances())[::-1]
+        for utt in utts:
+            utt.add_vector("vec")
+        vectors = CorpusComponent.get_vectors_of(utts, "vec")
+        for utt, vector in zip(utts, vectors):
+            np.testing.assert_array_equal(utt.get_vector("vec"), vector[np.newaxis])
+
+    def test_corpus_lazy_load(self):
+        corpus = small_burr_corpus()
+        ids = corpus.get_utterance_ids()
+        corpus.set_vector_matrix("vec", self.dense[: len(ids)], ids=ids, columns=self.columns)
+        corpus.dump("corpus", base_path=self.dirpath)
+
+        corpus2 = Corpus(filename=os.path.join(self.dirpath, "corpus"))
+        np.testing.assert_array_equal(corpus2.get_vectors("vec"), self.dense[: len(ids)])
+        self.assertIsInstance(corpus2.get_vector_matrix("vec").matrix, np.memmap)
+
+
+class TestNearestNeighborIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        # 20 tight clusters of 10 points each
+        centers = rng.normal(size=(20, 16))
+        self.vectors = np.repeat(centers, 10, axis=0) + 0.01 * rng.normal(size=(200, 16))
+        self.ids = ["v{}".format(i) for i in range(200)]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def brute_force(self, query, metric, k):
+        if metric == "cosine":
+            normed = self.vectors / np.linalg.norm(self.vectors, axis=1)[:, np.newaxis]
+            scores = normed @ (query / np.linalg.norm(query))
+        elif metric == "dot":
+            scores = self.vectors @ query
+        else:
+            scores = -np.linalg.norm(self.vectors - query, axis=1)
+        return [self.ids[i] for i in np.argsort(-scores)[:k]]
+
+    def test_exact_matches_brute_force(self):
+        query = self.vectors[3] + 0.5
+        for metric in ["cosine", "dot", "euclidean"]:
+            for matrix in [self.vectors, csr_matrix(self.vectors)]:
+                vectors = ConvoKitMatrix("vec", matrix, ids=self.ids)
+                vectors.build_index(metric=metric, block_size=64)
+                neighbors = vectors.nearest(query, k=5)
+                self.assertEqual([id_ for id_, _ in neighbors], self.brute_force(query, metric, 5))
+
+    def test_nearest_by_id_excludes_itself(self):
+        vectors = ConvoKitMatrix("vec", self.vectors, ids=self.ids)
+        neighbors = vectors.nearest("v12", k=9)
+        self.assertEqual(len(neighbors), 9)
+        self.assertEqual({id_ for id_, _ in neighbors}, set(self.ids[10:20]) - {"v12"})
+
+    def test_lsh_finds_cluster(self):
+        vectors = ConvoKitMatrix("vec", self.vectors, ids=self.ids)
+        vectors.build_index(method="lsh", n_bits=8, n_tables=8, random_state=0)
+        neighbors = vectors.nearest("v45", k=9)
+        self.assertEqual({id_ for id_, _ in neighbors}, set(self.ids[40:50]) - {"v45"})
+
+    def test_vstack_extends_index(self):
+        first = ConvoKitMatrix("vec", self.vectors[:120], ids=self.ids[:120])
+        first.build_index(method="lsh", random_state=0)
+        second = ConvoKitMatrix("vec", self.vectors[120:], ids=self.ids[120:])
+        stacked = ConvoKitMatrix.vstack("vec", [first, second])
+
+        rebuilt = ConvoKitMatrix("vec", csr_matrix(self.vectors), ids=self.ids)
+        rebuilt.build_index(method="lsh", random_state=0)
+        np.testing.assert_array_equal(stacked.index.codes, rebuilt.index.codes)
+        self.assertEqual(
+            [id_ for id_, _ in stacked.nearest("v150", k=9)],
+            [id_ for id_, _ in rebuilt.nearest("v150", k=9)],
+        )
+
+    def test_index_round_trip(self):
+        vectors = ConvoKitMatrix("vec", self.vectors, ids=self.ids)
+        vectors.build_index(metric="euclidean", method="lsh", random_state=0)
+        vectors.dump(self.dirpath)
+
+        loaded = ConvoKitMatrix.from_dir(self.dirpath, "vec")
+        self.assertEqual(loaded.index.metric, "euclidean")
+        self.assertEqual(loaded.nearest("v7", k=5), vectors.nearest("v7", k=5))
+
+    def test_corpus_nearest(self):
+        corpus = small_burr_corpus()
+        ids = corpus.get_utterance_ids()
+        corpus.set_vector_matrix("vec", self.vectors[: len(ids)], ids=ids)
+        neighbors = corpus.nearest("vec", ids[0], k=5)
+        self.assertEqual([id_ for id_, _ in neighbors], ids[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import unittest
+from uuid import uuid4
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.model.corpus_helpers import JSONLIST_BUFFER_SIZE
+
+# enough utterances for several batches to be written concurrently
+N_UTTERANCES = 5 * JSONLIST_BUFFER_SIZE + 17
+
+
+def get_large_corpus():
+    speakers = [Speaker(id="speaker_{}".format(i), meta={"n": i}) for i in range(50)]
+    corpus = Corpus(
+        utterances=[
+            Utterance(
+                id=str(i),
+                text="utt {}".format(i),
+                speaker=speakers[i % 50],
+                conversation_id=str(i - i % 10),
+                reply_to=None if i % 10 == 0 else str(i - 1),
+                timestamp=i,
+                meta={"length": i, "set": {i}},
+            )
+            for i in range(N_UTTERANCES)
+        ]
+    )
+    for convo in corpus.iter_conversations():
+        convo.meta["first"] = convo.id
+    return corpus
+
+
+class TestDBIngestion(unittest.TestCase):
+    def setUp(self) -> None:
+        self.corpus_id = "_" + uuid4().hex
+        get_large_corpus().dump(self.corpus_id, base_path=".")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.corpus_id)
+
+    def test_ingestion(self):
+        mem_corpus = Corpus(self.corpus_id)
+        db_corpus = Corpus(self.corpus_id, backend="db")
+
+        self.assertEqual(
+            sorted(db_corpus.get_utterance_ids()), sorted(mem_corpus.get_utterance_ids())
+        )
+        self.assertEqual(db_corpus.backend_mapper.count_entries("utterance"), N_UTTERANCES)
+        utt = db_corpus.get_utterance("4321")
+        self.assertEqual(utt.text, "utt 4321")
+        self.assertEqual(utt.reply_to, "4320")
+        self.assertEqual(utt.speaker.id, "speaker_21")
+        self.assertEqual(utt.meta["length"], 4321)
+        self.assertEqual(utt.meta["set"], {4321})
+        self.assertEqual(db_corpus.get_speaker("speaker_21").meta["n"], 21)
+        self.assertEqual(len(db_corpus.get_speaker("speaker_21").utterances), N_UTTERANCES // 50)
+        self.assertEqual(db_corpus.get_conversation("4320").meta["first"], "4320")
+
+    def test_ingestion_into_existing_collections(self):
+        # loading the same corpus twice into the same collections upserts the documents
+        prefix = "ingestion" + uuid4().hex
+        Corpus(self.corpus_id, backend="db", db_collection_prefix=prefix)
+        db_corpus = Corpus(self.corpus_id, backend="db", db_collection_prefix=prefix)
+        self.assertEqual(db_corpus.backend_mapper.count_entries("utterance"), N_UTTERANCES)
+        self.assertEqual(db_corpus.get_utterance("7").meta["length"], 7)
+
+    def test_repeated_ids_keep_last_occurrence(self):
+        # repeated ids are spread over batches that are written concurrently; as with sequential writes,
+        # the last occurrence of an id should win
+        utterances_file = os.path.join(self.corpus_id, "utterances.jsonl")
+        with open(utterances_file) as f:
+            lines = f.readlines()
+        repeats = []
+        for i, text in enumerate(["first repeat", "second repeat", "last repeat"]):
+            utt_obj = json.loads(lines[7])
+            utt_obj["text"] = text
+            utt_obj["meta"]["length"] = -i
+            repeats.append(json.dumps(utt_obj) + "\n")
+        # put the repeats in different batches
+        lines.insert(2 * JSONLIST_BUFFER_SIZE, repeats[0])
+        lines.insert(4 * JSONLIST_BUFFER_SIZE, repeats[1])
+        lines.append(repeats[2])
+        with open(utterances_file, "w") as f:
+            f.writelines(lines)
+
+        db_corpus = Corpus(self.corpus_id, backend="db")
+        self.assertEqual(db_corpus.backend_mapper.count_entries("utterance"), N_UTTERANCES)
+        utt = db_corpus.get_utterance("7")
+        self.assertEqual(utt.text, "last repeat")
+        self.assertEqual(utt.meta["length"], -2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import gc
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.model.backendMapper import DiskMapper
+
+
+class TestDiskMapper(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+        # a tiny cache and batch size, so that entries are evicted and written back all the time
+        self.mapper = DiskMapper(self.dirpath, "test", cache_size=2, batch_size=3)
+
+    def tearDown(self) -> None:
+        self.mapper.close()
+        shutil.rmtree(self.dirpath)
+
+    def test_entries_survive_eviction(self):
+        for i in range(10):
+            self.mapper.initialize_data_for_component("utterance", str(i))
+            self.mapper.update_data("utterance", str(i), "text", "utt {}".format(i))
+        self.mapper.update_data("utterance", "0", "set", {1, 2})
+
+        self.assertEqual(self.mapper.count_entries("utterance"), 10)
+        self.assertEqual(self.mapper.get_data("utterance", "3", "text"), "utt 3")
+        self.assertEqual(self.mapper.get_data("utterance", "0"), {"text": "utt 0", "set": {1, 2}})
+        self.assertEqual(
+            sorted(self.mapper.get_collection_ids("utterance")), sorted(str(i) for i in range(10))
+        )
+
+    def test_delete(self):
+        for i in range(5):
+            self.mapper.initialize_data_for_component("speaker", str(i), initial_value={"a": i})
+        self.mapper.delete_data("speaker", "1", "a")
+        self.mapper.delete_data("speaker", "2")
+        self.mapper.bulk_delete_data("speaker", ["3", "4", "5"])
+
+        self.assertEqual(self.mapper.get_collection_ids("speaker"), ["0", "1"])
+        self.assertEqual(self.mapper.get_data("speaker", "1"), {})
+        self.assertFalse(self.mapper.has_data_for_component("speaker", "2"))
+        with self.assertRaises(KeyError):
+            self.mapper.get_data("speaker", "3")
+
+    def test_close_removes_file(self):
+        filename = self.mapper.filename
+        self.assertTrue(os.path.exists(filename))
+        self.mapper.close()
+        self.assertFalse(os.path.exists(filename))
+
+    def test_in_place_changes_survive_eviction(self):
+        self.mapper.initialize_data_for_component("meta", "0", initial_value={"l": [1]})
+        self.mapper.flush()
+        self.mapper.get_data("meta", "0", "l").append(2)
+        self.assertEqual(self.mapper.get_data("meta", "0", "l"), [1, 2])
+        for i in range(1, 10):
+            self.mapper.initialize_data_for_component("meta", str(i))
+        self.assertEqual(self.mapper.get_data("meta", "0", "l"), [1, 2])
+
+    def test_drop_corpus_in_other_thread_removes_file(self):
+        corpora = [
+            Corpus(
+                utterances=[Utterance(id="0", text="a", speaker=Speaker(id="alice"))],
+                backend="disk",
+            )
+        ]
+        filename = corpora[0].backend_mapper.filename
+        self.assertTrue(os.path.exists(filename))
+
+        def drop():
+            corpora.clear()
+            gc.collect()
+
+        thread = threading.Thread(target=drop)
+        thread.start()
+        thread.join()
+        for path in [filename, filename + "-wal", filename + "-shm"]:
+            self.assertFalse(os.path.exists(path))
+
+    def test_corpus_with_disk_backend(self):
+        corpus = Corpus(
+            utterances=[
+                Utterance(id=str(i), text="utt {}".format(i), speaker=Speaker(id="alice"))
+                for i in range(20)
+            ],
+            backend="disk",
+        )
+        self.assertIsInstance(corpus.backend_mapper, DiskMapper)
+        corpus.bulk_add_meta("utterance", "length", {str(i): i for i in range(20)})
+        self.assertEqual(corpus.get_utterance("7").meta["length"], 7)
+        self.assertEqual(corpus.get_utterance("7").text, "utt 7")
+
+
+if __name__ == "__main__":
+    unittest.main()
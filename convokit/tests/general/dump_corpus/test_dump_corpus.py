@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from convokit.model import Corpus, Speaker, Utterance, corpus_helpers
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+N_UTTERANCES = 50
+
+
+def get_corpus(n_utterances=N_UTTERANCES):
+    speakers = [Speaker(id="speaker_{}".format(i), meta={"n": i}) for i in range(7)]
+    corpus = Corpus(
+        utterances=[
+            Utterance(
+                id=str(i),
+                text="utt {} é".format(i),
+                speaker=speakers[i % 7],
+                conversation_id=str(i - i % 5),
+                reply_to=None if i % 5 == 0 else str(i - 1),
+                timestamp=i,
+                meta={"length": i, "set": {i}},
+            )
+            for i in range(n_utterances)
+        ]
+    )
+    corpus.meta["name"] = "test"
+    for convo in corpus.iter_conversations():
+        convo.meta["first"] = convo.id
+    return corpus
+
+
+class TestDumpCorpus(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_path = tempfile.mkdtemp()
+        self.corpus = get_corpus()
+        # small chunks, so that every file is written in several chunks
+        self.chunk_size = corpus_helpers.DUMP_CHUNK_SIZE
+        corpus_helpers.DUMP_CHUNK_SIZE = 3
+
+    def tearDown(self) -> None:
+        corpus_helpers.DUMP_CHUNK_SIZE = self.chunk_size
+        shutil.rmtree(self.base_path)
+
+    def assert_same_corpus(self, corpus):
+        self.assertEqual(corpus.get_utterance_ids(), self.corpus.get_utterance_ids())
+        for utt in self.corpus.iter_utterances():
+            utt2 = corpus.get_utterance(utt.id)
+            self.assertEqual(utt2, utt)
+            self.assertEqual(utt2.meta.to_dict(), utt.meta.to_dict())
+        self.assertEqual(corpus.get_speaker("speaker_3").meta["n"], 3)
+        self.assertEqual(corpus.get_conversation("10").meta["first"], "10")
+        self.assertEqual(corpus.meta["name"], "test")
+
+    def dump_and_load(self, **kwargs):
+        self.corpus.dump("corpus", base_path=self.base_path, **kwargs)
+        return Corpus(os.path.join(self.base_path, "corpus"))
+
+    def test_dump_format(self):
+        corpus = self.dump_and_load(n_jobs=3)
+        self.assert_same_corpus(corpus)
+        # chunks are joined into the same text as a json.dump of the whole object
+        with open(os.path.join(self.base_path, "corpus", "speakers.json")) as f:
+            text = f.read()
+        self.assertEqual(text, json.dumps(json.loads(text)))
+        self.assertEqual(
+            sorted(os.listdir(self.base_path)), ["corpus"], "no temporary directory is left"
+        )
+
+    def test_dump_empty_components(self):
+        corpus = Corpus(utterances=[])
+        corpus.dump("empty", base_path=self.base_path)
+        with open(os.path.join(self.base_path, "empty", "speakers.json")) as f:
+            self.assertEqual(json.load(f), {})
+
+    def test_gzip(self):
+        corpus = self.dump_and_load(compression="gzip", n_jobs=2)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.base_path, "corpus", "utterances.jsonl.gz"))
+        )
+        self.assert_same_corpus(corpus)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        corpus = self.dump_and_load(compression="zstd", n_jobs=2)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.base_path, "corpus", "conversations.json.zst"))
+        )
+        self.assert_same_corpus(corpus)
+
+    def test_invalid_compression(self):
+        with self.assertRaises(ValueError):
+            self.corpus.dump("corpus", base_path=self.base_path, compression="lz4")
+
+    def test_overwrite_keeps_other_files(self):
+        self.corpus.dump("corpus", base_path=self.base_path)
+        dirpath = os.path.join(self.base_path, "corpus")
+        with open(os.path.join(dirpath, "info.extra.jsonl"), "w") as f:
+            f.write('{"id": "0", "value": 1}\n')
+
+        # switching to a compressed dump replaces the uncompressed files
+        self.corpus.dump("corpus", base_path=self.base_path, compression="gzip")
+        files = os.listdir(dirpath)
+        self.assertIn("info.extra.jsonl", files)
+        self.assertIn("utterances.jsonl.gz", files)
+        self.assertNotIn("utterances.jsonl", files)
+        self.assert_same_corpus(Corpus(dirpath))
+
+    def test_failed_dump_leaves_corpus_intact(self):
+        self.corpus.dump("corpus", base_path=self.base_path)
+        dirpath = os.path.join(self.base_path, "corpus")
+        with open(os.path.join(dirpath, "utterances.jsonl")) as f:
+            utterances_text = f.read()
+
+        # the dump fails after the component files are written, since this vector matrix doesn't exist
+        self.corpus.get_utterance("0").text = "changed"
+        self.corpus.vectors = ["missing"]
+        with self.assertRaises(Exception):
+            self.corpus.dump("corpus", base_path=self.base_path)
+
+        self.assertEqual(sorted(os.listdir(self.base_path)), ["corpus"])
+        with open(os.path.join(dirpath, "utterances.jsonl")) as f:
+            self.assertEqual(f.read(), utterances_text)
+
+    def test_failed_swap_restores_corpus(self):
+        self.corpus.dump("corpus", base_path=self.base_path)
+        dirpath = os.path.join(self.base_path, "corpus")
+        rename = os.rename
+
+        def fail_to_swap_in(src, dst):
+            if dst == dirpath and src.endswith(".tmp"):
+                raise OSError("rename failed")
+            rename(src, dst)
+
+        self.corpus.get_utterance("0").text = "changed"
+        with mock.patch("os.rename", fail_to_swap_in):
+            with self.assertRaises(OSError):
+                self.corpus.dump("corpus", base_path=self.base_path)
+
+        self.assertEqual(sorted(os.listdir(self.base_path)), ["corpus"])
+        self.assertEqual(Corpus(dirpath).get_utterance("0").text, "utt 0 é")
+
+    def crash_between_renames(self):
+        # leave the state of a dump of the changed corpus that crashed between the two renames of its commit
+        self.corpus.dump("corpus", base_path=self.base_path)
+        self.corpus.get_utterance("0").text = "changed"
+        self.corpus.dump("new", base_path=self.base_path)
+        prefix = os.path.join(self.base_path, ".corpus.0123")
+        os.rename(os.path.join(self.base_path, "corpus"), prefix + ".old")
+        os.rename(os.path.join(self.base_path, "new"), prefix + ".tmp")
+        return os.path.join(self.base_path, "corpus")
+
+    def test_load_recovers_crashed_swap(self):
+        dirpath = self.crash_between_renames()
+        corpus = Corpus(dirpath)
+        self.assertEqual(corpus.get_utterance("0").text, "changed")
+        self.assertEqual(sorted(os.listdir(self.base_path)), ["corpus"])
+
+    def test_dump_recovers_crashed_swap(self):
+        dirpath = self.crash_between_renames()
+        with open(os.path.join(self.base_path, ".corpus.0123.tmp", "info.extra.jsonl"), "w") as f:
+            f.write('{"id": "0", "value": 1}\n')
+        self.corpus.get_utterance("1").text = "changed too"
+        self.corpus.dump("corpus", base_path=self.base_path)
+
+        self.assertEqual(sorted(os.listdir(self.base_path)), ["corpus"])
+        self.assertIn("info.extra.jsonl", os.listdir(dirpath))
+        self.assertEqual(Corpus(dirpath).get_utterance("1").text, "changed too")
+
+    def test_incremental_dump(self):
+        self.corpus.dump("corpus", base_path=self.base_path)
+        dirpath = os.path.join(self.base_path, "corpus")
+        utterances_stat = os.stat(os.path.join(dirpath, "utterances.jsonl"))
+
+        corpus = Corpus(dirpath)
+        corpus.bulk_add_meta(
+            "utterance", "score", {utt.id: 0.5 for utt in corpus.iter_utterances()}
+        )
+        corpus.get_speaker("speaker_1").meta["object"] = {1}
+        corpus.get_utterance("3").add_vector("bow")
+        corpus.dump("corpus", base_path=self.base_path, incremental=True)
+
+        # the components files are left as they are
+        self.assertEqual(os.stat(os.path.join(dirpath, "utterances.jsonl")), utterances_stat)
+        files = os.listdir(dirpath)
+        self.assertIn("incremental-meta.utterance.score.jsonl", files)
+        self.assertIn("incremental-meta.speaker.object.p", files)
+
+        corpus2 = Corpus(dirpath)
+        self.assertEqual(corpus2.get_utterance("7").meta["score"], 0.5)
+        self.assertEqual(corpus2.get_speaker("speaker_1").meta["object"], {1})
+        self.assertEqual(corpus2.get_utterance("3").vectors, ["bow"])
+        self.assertEqual(corpus2.get_utterance("7").meta["set"], {7})
+
+        # a later incremental dump of the same field replaces its sidecar file
+        corpus2.get_utterance("7").meta["score"] = 1.0
+        corpus2.dump("corpus", base_path=self.base_path, incremental=True, compression="gzip")
+        files = os.listdir(dirpath)
+        self.assertIn("incremental-meta.utterance.score.jsonl.gz", files)
+        self.assertNotIn("incremental-meta.utterance.score.jsonl", files)
+        corpus3 = Corpus(dirpath, exclude_speaker_meta=["object"])
+        self.assertEqual(corpus3.get_utterance("7").meta["score"], 1.0)
+        self.assertEqual(corpus3.get_utterance("8").meta["score"], 0.5)
+        self.assertNotIn("object", corpus3.get_speaker("speaker_1").meta)
+
+    def test_incremental_dump_falls_back_to_full_dump(self):
+        self.corpus.dump("corpus", base_path=self.base_path)
+        dirpath = os.path.join(self.base_path, "corpus")
+        corpus = Corpus(dirpath)
+        corpus.get_utterance("7").meta["score"] = 0.5
+        corpus.get_utterance("7").text = "changed"
+        corpus.dump("corpus", base_path=self.base_path, incremental=True)
+
+        # the sidecar files are folded into the full dump
+        self.assertFalse(any(name.startswith("incremental") for name in os.listdir(dirpath)))
+        corpus2 = Corpus(dirpath)
+        self.assertEqual(corpus2.get_utterance("7").text, "changed")
+        self.assertEqual(corpus2.get_utterance("7").meta["score"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+
+import numpy as np
+
+from convokit.model import Utterance, Speaker, Corpus
+from convokit.tests.test_utils import reload_corpus_in_db_mode, reload_corpus_in_disk_mode
+
+
+def get_two_convo_corpus():
+    alice, bob, charlie = Speaker(id="alice"), Speaker(id="bob"), Speaker(id="charlie")
+    corpus = Corpus(
+        utterances=[
+            Utterance(id="0", text="hi", conversation_id="0", speaker=alice),
+            Utterance(id="1", reply_to="0", text="hey", conversation_id="0", speaker=bob),
+            Utterance(id="2", text="hello", conversation_id="2", speaker=bob),
+            Utterance(id="3", reply_to="2", text="yo", conversation_id="2", speaker=charlie),
+        ]
+    )
+    corpus.get_conversation("0").meta["keep"] = True
+    corpus.get_conversation("2").meta["keep"] = False
+    corpus.get_utterance("3").meta["only_in_removed"] = 3
+    return corpus
+
+
+def get_per_utterance_speakers_corpus():
+    # built the usual way: every utterance gets its own Speaker object
+    utterances = []
+    for c in range(4):
+        for i in range(3):
+            utterances.append(
+                Utterance(
+                    id="c{}u{}".format(c, i),
+                    conversation_id="c{}u0".format(c),
+                    reply_to=None if i == 0 else "c{}u{}".format(c, i - 1),
+                    text="hi",
+                    speaker=Speaker(id="s{}".format(i), meta={"age": 30 + i}),
+                )
+            )
+    return Corpus(utterances=utterances)
+
+
+class FilterConversations(unittest.TestCase):
+    def filter_conversations(self):
+        self.corpus.filter_conversations_by(lambda convo: convo.meta["keep"])
+
+        self.assertEqual(self.corpus.get_conversation_ids(), ["0"])
+        self.assertEqual(self.corpus.get_utterance_ids(), ["0", "1"])
+        self.assertEqual(sorted(self.corpus.get_speaker_ids()), ["alice", "bob"])
+        self.assertEqual(list(self.corpus.get_speaker("bob").utterances), ["1"])
+        self.assertEqual(list(self.corpus.get_speaker("bob").conversations), ["0"])
+
+        backend = self.corpus.backend_mapper
+        self.assertEqual(backend.count_entries("utterance"), 2)
+        self.assertEqual(backend.count_entries("conversation"), 1)
+        self.assertEqual(backend.count_entries("speaker"), 2)
+        self.assertFalse(backend.has_data_for_component("meta", "utterance_3"))
+        # the index is kept as is
+        self.assertIn("only_in_removed", self.corpus.meta_index.utterances_index)
+
+    def filter_conversations_rebuild_index(self):
+        self.corpus.filter_conversations_by(lambda convo: convo.meta["keep"], rebuild_index=True)
+        self.assertNotIn("only_in_removed", self.corpus.meta_index.utterances_index)
+
+    def view(self):
+        view = self.corpus.view(["2"])
+        self.assertEqual(view.get_utterance_ids(), ["2", "3"])
+        self.assertEqual(sorted(view.get_speaker_ids()), ["bob", "charlie"])
+        self.assertEqual(len(list(self.corpus.iter_utterances())), 4)
+
+        # metadata is shared with the parent
+        view.get_utterance("2").meta["seen"] = True
+        self.assertTrue(self.corpus.get_utterance("2").meta["seen"])
+
+        # vector matrices cannot be replaced through the view
+        self.corpus.set_vector_matrix("m", matrix=np.eye(4), ids=["0", "1", "2", "3"])
+        with self.assertRaises(ValueError):
+            view.set_vector_matrix("m", matrix=np.eye(2), ids=["2", "3"])
+        with self.assertRaises(ValueError):
+            view.delete_vector_matrix("m")
+        self.assertEqual(self.corpus.vectors, {"m"})
+        self.assertEqual(self.corpus.get_vector_matrix("m").matrix.shape, (4, 4))
+        self.assertEqual(view.get_vectors("m", ids=["3"]).tolist(), [[0, 0, 0, 1]])
+
+        # filtering the view does not modify the parent
+        view.filter_conversations_by(lambda convo: False)
+        self.assertEqual(view.get_utterance_ids(), [])
+        self.assertEqual(view.get_speaker_ids(), [])
+        self.assertEqual(self.corpus.get_utterance_ids(), ["0", "1", "2", "3"])
+        self.assertEqual(list(self.corpus.get_speaker("bob").utterances), ["1", "2"])
+        self.assertEqual(self.corpus.get_utterance("3").meta["only_in_removed"], 3)
+
+    def filter_per_utterance_speakers(self):
+        self.corpus = get_per_utterance_speakers_corpus()
+        self.corpus.filter_conversations_by(lambda convo: convo.id != "c1u0")
+        self.assertEqual(len(self.corpus.get_utterance_ids()), 9)
+        self.assertEqual(sorted(self.corpus.get_speaker_ids()), ["s0", "s1", "s2"])
+        self.assertEqual(sorted(self.corpus.get_speaker("s0").utterances), ["c0u0", "c2u0", "c3u0"])
+        self.assertEqual(
+            sorted(self.corpus.get_speaker("s1").conversations), ["c0u0", "c2u0", "c3u0"]
+        )
+
+    def view_per_utterance_speakers(self):
+        self.corpus = get_per_utterance_speakers_corpus()
+        view = self.corpus.view(["c0u0", "c1u0"])
+        self.assertEqual(view.get_speaker("s1").meta["age"], 31)
+        view.filter_conversations_by(lambda convo: convo.id == "c0u0")
+        self.assertEqual(sorted(view.get_speaker_ids()), ["s0", "s1", "s2"])
+        self.assertEqual(view.get_utterance_ids(), ["c0u0", "c0u1", "c0u2"])
+
+
+class TestWithMem(FilterConversations):
+    def setUp(self) -> None:
+        self.corpus = get_two_convo_corpus()
+
+    def test_filter_conversations(self):
+        self.filter_conversations()
+
+    def test_filter_conversations_rebuild_index(self):
+        self.filter_conversations_rebuild_index()
+
+    def test_view(self):
+        self.view()
+
+    def test_filter_per_utterance_speakers(self):
+        self.filter_per_utterance_speakers()
+
+    def test_view_per_utterance_speakers(self):
+        self.view_per_utterance_speakers()
+
+
+class TestWithDB(FilterConversations):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_db_mode(get_two_convo_corpus())
+
+    def test_filter_conversations(self):
+        self.filter_conversations()
+
+    def test_filter_conversations_rebuild_index(self):
+        self.filter_conversations_rebuild_index()
+
+    def test_view(self):
+        self.view()
+
+    def test_filter_per_utterance_speakers(self):
+        self.filter_per_utterance_speakers()
+
+    def test_view_per_utterance_speakers(self):
+        self.view_per_utterance_speakers()
+
+
+class TestWithDisk(FilterConversations):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_disk_mode(get_two_convo_corpus())
+
+    def test_filter_conversations(self):
+        self.filter_conversations()
+
+    def test_filter_conversations_rebuild_index(self):
+        self.filter_conversations_rebuild_index()
+
+    def test_view(self):
+        self.view()
+
+    def test_filter_per_utterance_speakers(self):
+        self.filter_per_utterance_speakers()
+
+    def test_view_per_utterance_speakers(self):
+        self.view_per_utterance_speakers()
+
+
+if __name__ == "__main__":
+    unittest.main()
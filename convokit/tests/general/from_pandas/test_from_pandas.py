@@ -1,7 +1,9 @@
 import unittest
 
+import pandas as pd
+
 from convokit import download
-from convokit.model import Corpus
+from convokit.model import Corpus, Speaker, Utterance
 from convokit.tests.test_utils import reload_corpus_in_db_mode
 
 
@@ -96,5 +98,85 @@ class TestWithDB(CorpusFromPandas):
         self.no_speaker_convo_dfs()
 
 
+def get_small_corpus():
+    alice, bob = Speaker(id="alice", meta={"age": 30}), Speaker(id="bob", meta={"age": 25})
+    corpus = Corpus(
+        utterances=[
+            Utterance(id="0", text="hi", conversation_id="0", speaker=alice, timestamp=0),
+            Utterance(
+                id="1", reply_to="0", text="hey", conversation_id="0", speaker=bob, timestamp=1
+            ),
+            Utterance(id="2", text="hello", conversation_id="2", speaker=bob, timestamp=2),
+        ]
+    )
+    corpus.get_utterance("1").meta["score"] = 0.5
+    corpus.get_conversation("2").meta["topic"] = "greetings"
+    return corpus
+
+
+class CorpusToPandas(unittest.TestCase):
+    def to_pandas(self):
+        utt_df, speaker_df, convo_df = self.corpus.to_pandas()
+        self.assertEqual(list(utt_df.index), ["0", "1", "2"])
+        self.assertEqual(list(utt_df["speaker"]), ["alice", "bob", "bob"])
+        self.assertEqual(utt_df.loc["1", "meta.score"], 0.5)
+        self.assertIsNone(utt_df.loc["0", "meta.score"])
+        self.assertEqual(speaker_df.loc["bob", "meta.age"], 25)
+        self.assertEqual(convo_df.loc["2", "meta.topic"], "greetings")
+
+        self.assertEqual(set(utt_df.columns), set(self.corpus.get_utterances_dataframe().columns))
+        self.assertEqual(set(speaker_df.columns), set(self.corpus.get_speakers_dataframe().columns))
+
+        self.assertTrue(self.corpus.to_pandas(exclude_meta=True)[0].filter(like="meta.").empty)
+
+    def round_trip(self):
+        new_corpus = Corpus.from_pandas(*self.corpus.to_pandas())
+        self.assertEqual(new_corpus.get_utterance_ids(), ["0", "1", "2"])
+        self.assertEqual(new_corpus.get_utterance("1").reply_to, "0")
+        self.assertIsNone(new_corpus.get_utterance("0").reply_to)
+        self.assertEqual(new_corpus.get_utterance("2").timestamp, 2)
+        self.assertEqual(new_corpus.get_utterance("1").meta["score"], 0.5)
+        self.assertEqual(new_corpus.get_speaker("alice").meta["age"], 30)
+        self.assertEqual(new_corpus.get_conversation("2").meta["topic"], "greetings")
+        self.assertEqual(list(new_corpus.get_speaker("bob").utterances), ["1", "2"])
+        for convo in new_corpus.iter_conversations():
+            self.assertTrue(convo.check_integrity(verbose=False))
+
+    def metadata_from_partial_df(self):
+        speaker_df = pd.DataFrame({"meta.height": [180, 170]}, index=["alice", "carol"])
+        self.corpus.update_metadata_from_df("speaker", speaker_df)
+        self.assertEqual(self.corpus.get_speaker("alice").meta["height"], 180)
+        self.assertNotIn("height", self.corpus.get_speaker("bob").meta)
+        self.assertEqual(list(speaker_df.columns), ["meta.height"])
+
+
+class TestToPandasWithMem(CorpusToPandas):
+    def setUp(self) -> None:
+        self.corpus = get_small_corpus()
+
+    def test_to_pandas(self):
+        self.to_pandas()
+
+    def test_round_trip(self):
+        self.round_trip()
+
+    def test_metadata_from_partial_df(self):
+        self.metadata_from_partial_df()
+
+
+class TestToPandasWithDB(CorpusToPandas):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_db_mode(get_small_corpus())
+
+    def test_to_pandas(self):
+        self.to_pandas()
+
+    def test_round_trip(self):
+        self.round_trip()
+
+    def test_metadata_from_partial_df(self):
+        self.metadata_from_partial_df()
+
+
 if __name__ == "__main__":
     unittest.main()
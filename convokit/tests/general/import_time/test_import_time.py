@@ -0,0 +1,88 @@
+import importlib
+import inspect
+import json
+import subprocess
+import sys
+import unittest
+
+import convokit
+
+# modules that `import convokit` should not load, since only some transformers need them
+HEAVY_MODULES = ["spacy", "nltk", "sklearn", "matplotlib", "pymongo", "torch", "cleantext"]
+
+
+def run_in_subprocess(code: str) -> dict:
+    """
+    Runs `code` in a fresh interpreter, and returns which of HEAVY_MODULES, and which convokit subpackages that are
+    imported lazily, it loaded.
+    """
+    script = (
+        "import json, sys\n"
+        + code
+        + "\nprint(json.dumps({{'loaded': [m for m in {} if m in sys.modules], "
+        "'subpackages': sorted(s for s in {} if 'convokit.' + s in sys.modules)}}))".format(
+            HEAVY_MODULES, list(convokit._LAZY_SUBPACKAGES)
+        )
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def defined_in(value, module) -> bool:
+    # constants have no __module__ of their own, and are attributed to the module that provides them
+    module_name = getattr(value, "__module__", None) or module.__name__
+    return module_name == module.__name__ or module_name.startswith(module.__name__ + ".")
+
+
+class TestImportTime(unittest.TestCase):
+    def test_import_does_not_load_subsystems(self):
+        result = run_in_subprocess("import convokit")
+        self.assertEqual(result["loaded"], [])
+        self.assertEqual(result["subpackages"], [])
+
+    def test_name_access_loads_its_subpackage_only(self):
+        result = run_in_subprocess("import convokit\nconvokit.Ranker")
+        self.assertEqual(result["subpackages"], ["ranker"])
+
+    def test_import_star_loads_all_subpackages(self):
+        result = run_in_subprocess("from convokit import *")
+        self.assertEqual(
+            result["subpackages"],
+            sorted(s for s in convokit._LAZY_SUBPACKAGES if s != "forecaster.CRAFTModel"),
+        )
+
+    def test_lazy_names_resolve(self):
+        import convokit
+        from convokit import Ranker, TextParser
+        from convokit.ranker import Ranker as RankerFromSubpackage
+
+        self.assertIs(Ranker, RankerFromSubpackage)
+        self.assertIs(convokit.TextParser, TextParser)
+        self.assertIn("PolitenessStrategies", dir(convokit))
+        with self.assertRaises(AttributeError):
+            convokit.NotAConvoKitName
+
+    def test_lazy_names_match_subpackages(self):
+        # each subpackage provides the names listed for it, and lists every class, function or constant it defines
+        for subpackage, names in convokit._LAZY_SUBPACKAGES.items():
+            try:
+                module = importlib.import_module("convokit." + subpackage)
+            except ImportError:
+                # optional dependencies, e.g. torch for the CRAFT model
+                continue
+            for name in names:
+                self.assertTrue(hasattr(module, name), "{}.{}".format(subpackage, name))
+            defined = [
+                name
+                for name, value in vars(module).items()
+                if not name.startswith("_")
+                and not inspect.ismodule(value)
+                and defined_in(value, module)
+            ]
+            self.assertEqual(sorted(set(defined) - set(names)), [], subpackage)
+
+
+if __name__ == "__main__":
+    unittest.main()
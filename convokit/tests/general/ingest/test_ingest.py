@@ -0,0 +1,179 @@
+import unittest
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.tests.test_utils import reload_corpus_in_db_mode, reload_corpus_in_disk_mode
+from convokit.transformer import Transformer
+
+
+def get_corpus():
+    return Corpus(
+        utterances=[
+            Utterance(id="0", text="hi there", conversation_id="0", speaker=Speaker(id="alice")),
+            Utterance(
+                id="1", reply_to="0", text="hey", conversation_id="0", speaker=Speaker(id="bob")
+            ),
+        ]
+    )
+
+
+def utterance_stream():
+    yield Utterance(id="2", reply_to="1", text="how are you", speaker=Speaker(id="alice"))
+    yield Utterance(id="3", text="new thread", speaker=Speaker(id="charlie", meta={"new": True}))
+    yield Utterance(id="0", text="hi there", conversation_id="0", speaker=Speaker(id="alice"))
+    yield Utterance(id="4", reply_to="3", text="welcome to it", speaker=Speaker(id="bob"))
+
+
+class WordCount(Transformer):
+    def transform(self, corpus, **kwargs):
+        for utt in corpus.iter_utterances():
+            self.transform_utterance(utt)
+        return corpus
+
+    def transform_utterance(self, utt, **kwargs):
+        utt.meta["n_words"] = len(utt.text.split())
+        return utt
+
+
+class ConversationLength(Transformer):
+    def __init__(self):
+        self.seen = []
+
+    def transform(self, corpus, **kwargs):
+        for convo in corpus.iter_conversations():
+            self.seen.append(convo.id)
+            convo.meta["length"] = len(convo.get_utterance_ids())
+        return corpus
+
+
+def get_per_utterance_speakers_corpus():
+    # built the usual way: every utterance gets its own Speaker object
+    return Corpus(
+        utterances=[
+            Utterance(
+                id="c{}u{}".format(c, i),
+                conversation_id="c{}u0".format(c),
+                reply_to=None if i == 0 else "c{}u{}".format(c, i - 1),
+                text="hi",
+                speaker=Speaker(id="s{}".format(i)),
+            )
+            for c in range(4)
+            for i in range(3)
+        ]
+    )
+
+
+class Ingest(unittest.TestCase):
+    def ingest(self):
+        convo_transformer = ConversationLength()
+        events = list(
+            self.corpus.ingest(
+                utterance_stream(),
+                utterance_transformers=[WordCount()],
+                conversation_transformers=[convo_transformer],
+            )
+        )
+        self.assertEqual(len(events), 4)
+        self.assertEqual([utt.id for utt in events[0].utterances], ["2"])
+        self.assertEqual(events[2].utterances, [])
+        self.assertEqual(events[2].skipped_utterance_ids, ["0"])
+
+        # replies join the conversation of their parent; other utterances start a new one
+        self.assertEqual(self.corpus.get_utterance("2").conversation_id, "0")
+        new_convo_id = self.corpus.get_utterance("3").conversation_id
+        self.assertEqual(self.corpus.get_utterance("4").conversation_id, new_convo_id)
+        self.assertEqual(
+            sorted(self.corpus.get_conversation("0").get_utterance_ids()), ["0", "1", "2"]
+        )
+        self.assertTrue(self.corpus.get_conversation("0").check_integrity(verbose=False))
+
+        # speakers are shared, and linked to their utterances and conversations
+        self.assertEqual(sorted(self.corpus.get_speaker_ids()), ["alice", "bob", "charlie"])
+        self.assertIs(self.corpus.get_utterance("2").speaker, self.corpus.get_speaker("alice"))
+        self.assertEqual(sorted(self.corpus.get_speaker("bob").utterances), ["1", "4"])
+        self.assertEqual(
+            sorted(self.corpus.get_speaker("bob").conversations), sorted(["0", new_convo_id])
+        )
+        self.assertTrue(self.corpus.get_speaker("charlie").meta["new"])
+
+        # transformers only ran on the new utterances and the affected conversations
+        self.assertEqual(self.corpus.get_utterance("4").meta["n_words"], 3)
+        self.assertNotIn("n_words", self.corpus.get_utterance("0").meta)
+        self.assertEqual(convo_transformer.seen, ["0", new_convo_id, new_convo_id])
+        self.assertEqual(self.corpus.get_conversation("0").meta["length"], 3)
+
+    def bounded_retention(self):
+        events = list(self.corpus.ingest(utterance_stream(), batch_size=2, max_conversations=1))
+        self.assertEqual(len(events), 2)
+        # the batch of utterances 2 and 3 adds to both conversations, so none can be evicted
+        self.assertEqual(events[0].evicted_conversation_ids, [])
+        self.assertEqual(events[1].evicted_conversation_ids, ["0"])
+        self.assertEqual(sorted(self.corpus.get_utterance_ids()), ["3", "4"])
+        self.assertEqual(sorted(self.corpus.get_speaker_ids()), ["bob", "charlie"])
+        self.assertEqual(list(self.corpus.get_speaker("bob").utterances), ["4"])
+        self.assertEqual(self.corpus.backend_mapper.count_entries("utterance"), 2)
+        # eviction happens at the end of a batch, so utterance 0 was still there when it was streamed again
+        self.assertEqual(events[1].skipped_utterance_ids, ["0"])
+
+    def eviction_keeps_speakers(self):
+        self.corpus = get_per_utterance_speakers_corpus()
+        events = list(
+            self.corpus.ingest(
+                [Utterance(id="new", text="hello", speaker=Speaker(id="s9"))], max_conversations=3
+            )
+        )
+        self.assertEqual(events[0].evicted_conversation_ids, ["c0u0", "c1u0"])
+        self.assertEqual(len(self.corpus.get_utterance_ids()), 7)
+        self.assertEqual(sorted(self.corpus.get_speaker_ids()), ["s0", "s1", "s2", "s9"])
+        self.assertEqual(sorted(self.corpus.get_speaker("s0").utterances), ["c2u0", "c3u0"])
+
+
+class TestWithMem(Ingest):
+    def setUp(self) -> None:
+        self.corpus = get_corpus()
+
+    def test_ingest(self):
+        self.ingest()
+
+    def test_bounded_retention(self):
+        self.bounded_retention()
+
+    def test_eviction_keeps_speakers(self):
+        self.eviction_keeps_speakers()
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            next(self.corpus.ingest(utterance_stream(), batch_size=0))
+        with self.assertRaises(ValueError):
+            next(self.corpus.view(["0"]).ingest(utterance_stream()))
+
+
+class TestWithDB(Ingest):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_db_mode(get_corpus())
+
+    def test_ingest(self):
+        self.ingest()
+
+    def test_bounded_retention(self):
+        self.bounded_retention()
+
+    def test_eviction_keeps_speakers(self):
+        self.eviction_keeps_speakers()
+
+
+class TestWithDisk(Ingest):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_disk_mode(get_corpus())
+
+    def test_ingest(self):
+        self.ingest()
+
+    def test_bounded_retention(self):
+        self.bounded_retention()
+
+    def test_eviction_keeps_speakers(self):
+        self.eviction_keeps_speakers()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.tests.test_utils import reload_corpus_in_db_mode, reload_corpus_in_disk_mode
+
+
+def get_corpus():
+    speakers = [Speaker(id="alice"), Speaker(id="bob")]
+    return Corpus(
+        utterances=[
+            Utterance(id=str(i), text="utt {}".format(i), speaker=speakers[i % 2])
+            for i in range(10)
+        ]
+    )
+
+
+def get_corpus_with_info():
+    corpus = get_corpus()
+    for utt in corpus.iter_utterances():
+        utt.meta["length"] = int(utt.id)
+        utt.meta["embedding"] = [float(utt.id), 0.5]
+        utt.meta["tags"] = {"id": utt.id}
+    return corpus
+
+
+class LoadInfo(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+        get_corpus_with_info().dump_info(
+            "utterance", ["length", "embedding"], dir_name=self.dirpath, encoding=self.encoding
+        )
+        get_corpus_with_info().dump_info("utterance", ["tags"], dir_name=self.dirpath)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def load_all_fields(self):
+        self.corpus.load_info("utterance", dir_name=self.dirpath)
+        utt = self.corpus.get_utterance("3")
+        self.assertEqual(utt.meta["length"], 3)
+        self.assertEqual(utt.meta["embedding"], [3.0, 0.5])
+        self.assertEqual(utt.meta["tags"], {"id": "3"})
+
+    def load_ids_subset(self):
+        self.corpus.load_info("utterance", ["length"], dir_name=self.dirpath, ids=["1", "2"])
+        self.assertEqual(self.corpus.get_utterance("2").meta["length"], 2)
+        self.assertNotIn("length", self.corpus.get_utterance("3").meta)
+
+    def load_in_parallel(self):
+        self.corpus.load_info(
+            "utterance", ["length", "embedding", "tags"], dir_name=self.dirpath, n_jobs=2
+        )
+        self.assertEqual(self.corpus.get_utterance("9").meta["length"], 9)
+        self.assertEqual(self.corpus.get_utterance("9").meta["tags"], {"id": "9"})
+
+    def load_missing_field(self):
+        with self.assertRaises(FileNotFoundError):
+            self.corpus.load_info("utterance", ["missing"], dir_name=self.dirpath)
+
+
+class TestEncodings(unittest.TestCase):
+    def test_dump_replaces_other_encodings(self):
+        dirpath = tempfile.mkdtemp()
+        try:
+            corpus = get_corpus_with_info()
+            corpus.dump_info("utterance", ["length"], dir_name=dirpath)
+            corpus.dump_info("utterance", ["length"], dir_name=dirpath, encoding="columnar")
+            self.assertEqual(os.listdir(dirpath), ["info.length.npz"])
+        finally:
+            shutil.rmtree(dirpath)
+
+    def test_columnar_requires_numbers(self):
+        dirpath = tempfile.mkdtemp()
+        try:
+            with self.assertRaises(ValueError):
+                get_corpus_with_info().dump_info(
+                    "utterance", ["tags"], dir_name=dirpath, encoding="columnar"
+                )
+            with self.assertRaises(ValueError):
+                get_corpus().dump_info("utterance", ["length"], dir_name=dirpath, encoding="csv")
+        finally:
+            shutil.rmtree(dirpath)
+
+
+def make_test_classes(encoding):
+    class TestWithMem(LoadInfo):
+        def setUp(self) -> None:
+            self.encoding = encoding
+            super().setUp()
+            self.corpus = get_corpus()
+
+        def test_load_all_fields(self):
+            self.load_all_fields()
+
+        def test_load_ids_subset(self):
+            self.load_ids_subset()
+
+        def test_load_in_parallel(self):
+            self.load_in_parallel()
+
+        def test_load_missing_field(self):
+            self.load_missing_field()
+
+    class TestWithDB(LoadInfo):
+        def setUp(self) -> None:
+            self.encoding = encoding
+            super().setUp()
+            self.corpus = reload_corpus_in_db_mode(get_corpus())
+
+        def test_load_all_fields(self):
+            self.load_all_fields()
+
+        def test_load_ids_subset(self):
+            self.load_ids_subset()
+
+    class TestWithDisk(LoadInfo):
+        def setUp(self) -> None:
+            self.encoding = encoding
+            super().setUp()
+            self.corpus = reload_corpus_in_disk_mode(get_corpus())
+
+        def test_load_all_fields(self):
+            self.load_all_fields()
+
+        def test_load_ids_subset(self):
+            self.load_ids_subset()
+
+    return TestWithMem, TestWithDB, TestWithDisk
+
+
+TestJsonlWithMem, TestJsonlWithDB, TestJsonlWithDisk = make_test_classes("jsonl")
+TestPickleWithMem, TestPickleWithDB, TestPickleWithDisk = make_test_classes("pickle")
+TestColumnarWithMem, TestColumnarWithDB, TestColumnarWithDisk = make_test_classes("columnar")
+
+
+if __name__ == "__main__":
+    unittest.main()
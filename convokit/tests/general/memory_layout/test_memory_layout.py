@@ -0,0 +1,109 @@
+import json
+import unittest
+
+from convokit.model import Corpus, Utterance, Speaker
+from convokit.model.backendMapper import MemMapper
+
+N_UTTERANCES = 2000
+
+
+def utterance_rows(n: int):
+    # round-trip through JSON, so that (as when loading a corpus) every row has its own copy of each id string
+    return json.loads(
+        json.dumps(
+            [
+                {
+                    "id": "utt_{}".format(i),
+                    "speaker": "speaker_{}".format(i % 500),
+                    "conversation_id": "utt_{}".format(i - i % 10),
+                    "reply_to": None if i % 10 == 0 else "utt_{}".format(i - 1),
+                    "timestamp": i,
+                    "text": "hello",
+                }
+                for i in range(n)
+            ]
+        )
+    )
+
+
+class TestMemoryLayout(unittest.TestCase):
+    def test_components_have_no_instance_dict(self):
+        speaker = Speaker(id="alice")
+        utt = Utterance(id="0", speaker=speaker, conversation_id="0", text="hi")
+        corpus = Corpus(utterances=[utt])
+        for obj in [utt, speaker, corpus.get_conversation("0"), utt.meta]:
+            self.assertFalse(hasattr(obj, "__dict__"))
+
+    def test_columnar_collection(self):
+        mapper = MemMapper()
+        mapper.initialize_data_for_component("utterance", "0", initial_value={"text": "a"})
+        mapper.initialize_data_for_component("utterance", "1", initial_value={"text": "b"})
+        mapper.update_data("utterance", "1", "reply_to", "0")
+        self.assertEqual(mapper.get_data("utterance", "1"), {"text": "b", "reply_to": "0"})
+        with self.assertRaises(KeyError):
+            mapper.get_data("utterance", "0", "reply_to")
+
+        mapper.delete_data("utterance", "0")
+        mapper.initialize_data_for_component("utterance", "2", initial_value={"text": "c"})
+        self.assertEqual(mapper.get_data("utterance", "2"), {"text": "c"})
+        self.assertEqual(sorted(mapper.get_collection_ids("utterance")), ["1", "2"])
+        self.assertEqual(mapper.count_entries("utterance"), 2)
+
+    def test_get_data_returns_copy_of_columnar_entry(self):
+        mapper = MemMapper()
+        mapper.initialize_data_for_component("utterance", "0", initial_value={"text": "a"})
+        entry = mapper.get_data("utterance", "0")
+        entry["text"] = "b"
+        self.assertEqual(mapper.get_data("utterance", "0", "text"), "a")
+
+        # the components write their properties through update_data
+        utt = Utterance(id="0", speaker=Speaker(id="alice"), conversation_id="0", text="a")
+        corpus = Corpus(utterances=[utt])
+        utt.text = "b"
+        self.assertEqual(corpus.backend_mapper.get_data("utterance", "0")["text"], "b")
+        self.assertEqual(corpus.get_utterance("0").text, "b")
+
+    def test_columnar_corpus_storage(self):
+        rows = utterance_rows(N_UTTERANCES)
+        speakers = dict()
+        utts = []
+        for row in rows:
+            speaker = speakers.setdefault(row["speaker"], Speaker(id=row["speaker"]))
+            utts.append(
+                Utterance(
+                    id=row["id"],
+                    speaker=speaker,
+                    conversation_id=row["conversation_id"],
+                    reply_to=row["reply_to"],
+                    timestamp=row["timestamp"],
+                    text=row["text"],
+                )
+            )
+        corpus = Corpus(utterances=utts)
+
+        # utterances are rows of a column per property, rather than a dict each
+        collection = corpus.backend_mapper.get_collection("utterance")
+        self.assertEqual(len(collection), N_UTTERANCES)
+        self.assertEqual(
+            set(collection.columns),
+            {"speaker_id", "conversation_id", "reply_to", "timestamp", "text"},
+        )
+        for column in collection.columns.values():
+            self.assertEqual(len(column), N_UTTERANCES)
+
+        # each distinct id is stored once, even though every row came with its own copy of it
+        for property_name, n_distinct in [
+            ("speaker_id", 500),
+            ("conversation_id", N_UTTERANCES // 10),
+        ]:
+            column = collection.columns[property_name]
+            self.assertEqual(len(set(column)), n_distinct)
+            self.assertEqual(len({id(value) for value in column}), n_distinct)
+        reply_tos = [value for value in collection.columns["reply_to"] if value is not None]
+        self.assertTrue(
+            all(reply_to is collection.ids[collection.rows[reply_to]] for reply_to in reply_tos)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
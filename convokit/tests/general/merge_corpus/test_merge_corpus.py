@@ -212,6 +212,42 @@ class CorpusMerge(unittest.TestCase):
         self.assertEqual(len(merged.meta), 3)
         self.assertEqual(merged.meta["toxicity"], 0.9)
 
+    def merge_many(self):
+        """
+        Merging several corpora at once gives the same result as merging them pairwise
+        """
+        self.base_corpus.get_utterance("2").meta["score"] = 1
+        self.overlapping_corpus.get_utterance("2").meta["score"] = 2.5
+        self.non_overlapping_corpus.get_speaker("delta").meta["age"] = 30
+        self.overlapping_corpus.get_speaker("echo").meta["age"] = "unknown"
+        self.non_overlapping_corpus.meta["source"] = "second"
+        self.overlapping_corpus.meta["source"] = "third"
+
+        merged = Corpus.merge_many(
+            [self.base_corpus, self.non_overlapping_corpus, self.overlapping_corpus]
+        )
+        self.assertEqual(merged.get_utterance_ids(), ["0", "1", "2", "3", "4", "5"])
+        self.assertEqual(len(list(merged.iter_speakers())), 6)
+        self.assertEqual(merged.get_utterance("2").meta["score"], 2.5)
+        self.assertEqual(merged.get_speaker("delta").meta["age"], 30)
+        self.assertEqual(merged.get_speaker("echo").meta["age"], "unknown")
+        self.assertEqual(merged.meta["source"], "third")
+        self.assertEqual(list(merged.get_speaker("charlie").utterances), ["2"])
+
+        # the type indexes of the merged corpora are combined
+        self.assertCountEqual(
+            merged.meta_index.utterances_index["score"], [str(type(1)), str(type(2.5))]
+        )
+        self.assertCountEqual(
+            merged.meta_index.speakers_index["age"], [str(type(30)), str(type("unknown"))]
+        )
+
+        for corpus in [self.base_corpus, self.non_overlapping_corpus, self.overlapping_corpus]:
+            self.assertEqual(corpus.backend_mapper.count_entries("utterance"), 0)
+
+        with self.assertRaises(ValueError):
+            Corpus.merge_many([])
+
     def add_utterance(self):
         self.base_corpus.get_utterance("2").add_meta("hey", "jude")
         self.base_corpus.get_utterance("2").add_meta("hello", "world")
@@ -273,6 +309,9 @@ class TestWithMem(CorpusMerge):
     def test_add_utterance(self):
         self.add_utterance()
 
+    def test_merge_many(self):
+        self.merge_many()
+
 
 class TestWithDB(CorpusMerge):
     def setUp(self) -> None:
@@ -307,6 +346,9 @@ class TestWithDB(CorpusMerge):
     def test_add_utterance(self):
         self.add_utterance()
 
+    def test_merge_many(self):
+        self.merge_many()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,7 @@ import unittest
 
 from convokit.model import Utterance, Speaker, Corpus
 from convokit.tests.general.metadata_operations.corpus_index_meta_helpers import get_basic_corpus
-from convokit.tests.test_utils import reload_corpus_in_db_mode
+from convokit.tests.test_utils import reload_corpus_in_db_mode, reload_corpus_in_disk_mode
 
 
 class CorpusIndexMeta(unittest.TestCase):
@@ -91,6 +91,15 @@ class CorpusIndexMeta(unittest.TestCase):
             self.corpus.meta_index.utterances_index["hey"], [str(type(5)), str(type("five"))]
         )
 
+    def bulk_add_meta(self):
+        self.corpus.bulk_add_meta("utterance", "bulk", {"0": 5, "1": None, "2": "five"})
+        self.assertEqual(self.corpus.get_utterance("0").meta["bulk"], 5)
+        self.assertIsNone(self.corpus.get_utterance("1").meta["bulk"])
+        self.assertEqual(self.corpus.get_utterance("2").meta["bulk"], "five")
+        self.assertEqual(
+            self.corpus.meta_index.utterances_index["bulk"], [str(type(5)), str(type("five"))]
+        )
+
 
 class TestWithMem(CorpusIndexMeta):
     def setUp(self) -> None:
@@ -111,6 +120,9 @@ class TestWithMem(CorpusIndexMeta):
     def test_multiple_types(self):
         self.multiple_types()
 
+    def test_bulk_add_meta(self):
+        self.bulk_add_meta()
+
 
 class TestWithDB(CorpusIndexMeta):
     def setUp(self) -> None:
@@ -131,6 +143,32 @@ class TestWithDB(CorpusIndexMeta):
     def test_multiple_types(self):
         self.multiple_types()
 
+    def test_bulk_add_meta(self):
+        self.bulk_add_meta()
+
+
+class TestWithDisk(CorpusIndexMeta):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_disk_mode(get_basic_corpus())
+
+    def test_basic_functions(self):
+        self.basic_functions()
+
+    def test_key_insertion_deletion(self):
+        self.key_insertion_deletion()
+
+    def test_corpus_merge_add(self):
+        self.corpus_merge_add()
+
+    def test_corpus_dump(self):
+        self.corpus_dump()
+
+    def test_multiple_types(self):
+        self.multiple_types()
+
+    def test_bulk_add_meta(self):
+        self.bulk_add_meta()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from convokit.model import Corpus, Utterance, Speaker
+from convokit.ranker import Ranker
+
+
+def length_corpus():
+    speaker = Speaker(id="alice")
+    texts = ["aaa", "a", "aaaaa", "aa", "aaa", "aaaa"]
+    return Corpus(
+        utterances=[
+            Utterance(id=str(i), text=text, speaker=speaker, conversation_id="0", reply_to=None)
+            for i, text in enumerate(texts)
+        ]
+    )
+
+
+class TestRanker(unittest.TestCase):
+    def test_transform_ranks_by_score(self):
+        corpus = Ranker("utterance", score_func=lambda utt: len(utt.text)).transform(
+            length_corpus()
+        )
+        ranks = {utt.id: utt.meta["rank"] for utt in corpus.iter_utterances()}
+        # ties are ranked in corpus order
+        self.assertEqual(ranks, {"2": 1, "5": 2, "0": 3, "4": 4, "3": 5, "1": 6})
+        self.assertEqual(corpus.get_utterance("5").meta["score"], 4)
+
+    def test_transform_top_k_and_selector(self):
+        ranker = Ranker("utterance", score_func=lambda utt: len(utt.text), top_k=2)
+        corpus = ranker.transform(length_corpus(), selector=lambda utt: utt.id != "2")
+        ranks = {utt.id: utt.meta["rank"] for utt in corpus.iter_utterances()}
+        self.assertEqual(ranks, {"2": None, "5": 1, "0": 2, "4": None, "3": None, "1": None})
+        self.assertIsNone(corpus.get_utterance("2").meta["score"])
+        self.assertEqual(corpus.get_utterance("4").meta["score"], 3)
+
+        df = ranker.summarize(corpus, selector=lambda utt: utt.meta["rank"] is not None)
+        self.assertEqual(list(df.index), ["5", "0"])
+
+    def test_top_k_matches_full_ranking(self):
+        full = Ranker("utterance", score_func=lambda utt: len(utt.text))
+        top = Ranker("utterance", score_func=lambda utt: len(utt.text), top_k=4)
+        full_ranks = {
+            utt.id: utt.meta["rank"]
+            for utt in full.transform_objs(length_corpus().iter_utterances())
+        }
+        top_ranks = {
+            utt.id: utt.meta["rank"]
+            for utt in top.transform_objs(length_corpus().iter_utterances())
+        }
+        for utt_id, rank in full_ranks.items():
+            self.assertEqual(top_ranks[utt_id], rank if rank <= 4 else None)
+
+    def test_parallel_scores(self):
+        ranker = Ranker("utterance", score_func=lambda utt: len(utt.text), n_jobs=2)
+        corpus = ranker.transform(length_corpus())
+        self.assertEqual(
+            [utt.meta["score"] for utt in corpus.iter_utterances()], [3, 1, 5, 2, 3, 4]
+        )
+
+    def test_non_numeric_scores(self):
+        ranker = Ranker("utterance", score_func=lambda utt: (len(utt.text), utt.id), top_k=3)
+        corpus = ranker.transform(length_corpus())
+        ranks = {utt.id: utt.meta["rank"] for utt in corpus.iter_utterances()}
+        self.assertEqual(ranks, {"2": 1, "5": 2, "4": 3, "0": None, "3": None, "1": None})
+        self.assertEqual(corpus.get_utterance("2").meta["score"], (5, "2"))
+
+        objs = Ranker("utterance", score_func=lambda utt: utt.text, n_jobs=2).transform_objs(
+            length_corpus().iter_utterances()
+        )
+        self.assertEqual([obj.meta["rank"] for obj in objs], [3, 6, 1, 5, 4, 2])
+
+    def test_incomparable_scores(self):
+        ranker = Ranker("utterance", score_func=lambda utt: utt.text if utt.id == "0" else 1)
+        with self.assertRaises(ValueError):
+            ranker.transform(length_corpus())
+
+    def test_invalid_top_k(self):
+        with self.assertRaises(ValueError):
+            Ranker("utterance", score_func=lambda utt: 0, top_k=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import shutil
+import tempfile
+import unittest
+
+from convokit.model import Corpus, ShardedCorpus, Speaker, Utterance
+from convokit.transformer import Transformer
+
+# 2019-01-15, 2019-02-15 and 2019-03-15, UTC
+TIMESTAMPS = [1547510400, 1550188800, 1552608000]
+
+
+def get_corpus():
+    speakers = [Speaker(id="alice"), Speaker(id="bob")]
+    utterances = []
+    for i in range(6):
+        convo_id = "convo_{}".format(i)
+        utterances.append(
+            Utterance(
+                id=convo_id,
+                conversation_id=convo_id,
+                text="x" * (i + 1),
+                speaker=speakers[0],
+                timestamp=TIMESTAMPS[i % 3],
+            )
+        )
+        utterances.append(
+            Utterance(
+                id=convo_id + "_reply",
+                conversation_id=convo_id,
+                reply_to=convo_id,
+                text="y",
+                speaker=speakers[1],
+                timestamp=TIMESTAMPS[i % 3] + 60,
+            )
+        )
+    corpus = Corpus(utterances=utterances)
+    for i, convo in enumerate(corpus.iter_conversations()):
+        if i < 5:
+            convo.meta["community"] = "r/{}".format(i % 2)
+    return corpus
+
+
+def get_per_utterance_speakers_corpus():
+    # every utterance gets its own Speaker object, as when building a corpus from raw data
+    return Corpus(
+        utterances=[
+            Utterance(
+                id="utt_{}".format(i),
+                conversation_id="utt_{}".format(i - i % 2),
+                reply_to=None if i % 2 == 0 else "utt_{}".format(i - 1),
+                text="hello",
+                speaker=Speaker(id="speaker_{}".format(i % 2), meta={"age": 20 + i % 2}),
+                timestamp=TIMESTAMPS[(i // 2) % 3],
+            )
+            for i in range(6)
+        ]
+    )
+
+
+class TextLength(Transformer):
+    """
+    Annotates each utterance with its length, relative to the mean length of the utterances it was fit on.
+    """
+
+    def __init__(self):
+        self.mean_length = None
+
+    def fit(self, corpus, y=None, **kwargs):
+        lengths = [len(utt.text) for utt in corpus.iter_utterances()]
+        self.mean_length = sum(lengths) / len(lengths)
+        return self
+
+    def transform(self, corpus, **kwargs):
+        for utt in corpus.iter_utterances():
+            utt.meta["length"] = len(utt.text)
+            if self.mean_length is not None:
+                utt.meta["relative_length"] = len(utt.text) / self.mean_length
+        return corpus
+
+
+class TestShardedCorpus(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def test_partition_by_timestamp(self):
+        sharded = ShardedCorpus.create(get_corpus(), self.dirpath, by="timestamp")
+        self.assertEqual(sharded.shard_names, ["2019-01", "2019-02", "2019-03"])
+        self.assertEqual(
+            sorted(sharded.get_shard("2019-02").get_conversation_ids()), ["convo_1", "convo_4"]
+        )
+
+        # the partition is saved along with the shards
+        reloaded = ShardedCorpus(self.dirpath)
+        self.assertEqual(reloaded.shard_names, sharded.shard_names)
+        self.assertEqual(reloaded.partition, {"by": "timestamp", "period": "month"})
+
+    def test_create_from_per_utterance_speakers(self):
+        ShardedCorpus.create(get_per_utterance_speakers_corpus(), self.dirpath)
+        sharded = ShardedCorpus(self.dirpath)
+        self.assertEqual(sharded.shard_names, ["2019-01", "2019-02", "2019-03"])
+        shard = sharded.get_shard("2019-02")
+        self.assertEqual(shard.get_utterance_ids(), ["utt_2", "utt_3"])
+        self.assertEqual(shard.get_speaker("speaker_1").meta["age"], 21)
+        self.assertEqual(list(shard.get_speaker("speaker_1").utterances), ["utt_3"])
+
+    def test_partition_by_conversation_id(self):
+        sharded = ShardedCorpus.create(get_corpus(), self.dirpath, by="conversation_id", n_shards=2)
+        self.assertLessEqual(len(sharded), 2)
+        convo_ids = [convo.id for convo in sharded.iter_conversations()]
+        self.assertEqual(sorted(convo_ids), ["convo_{}".format(i) for i in range(6)])
+
+    def test_partition_by_meta(self):
+        sharded = ShardedCorpus.create(get_corpus(), self.dirpath, by="meta", meta_key="community")
+        self.assertEqual(sharded.shard_names, ["none", "r_0", "r_1"])
+        self.assertEqual(sharded.get_shard("none").get_conversation_ids(), ["convo_5"])
+        self.assertEqual(sharded.get_shard("r_0").random_conversation().meta["community"], "r/0")
+
+    def test_invalid_partition(self):
+        with self.assertRaises(ValueError):
+            ShardedCorpus.create(get_corpus(), self.dirpath, by="speaker")
+        with self.assertRaises(ValueError):
+            ShardedCorpus.create(get_corpus(), self.dirpath, by="meta")
+        with self.assertRaises(ValueError):
+            ShardedCorpus.create(get_corpus(), self.dirpath, period="week")
+
+    def test_union_view(self):
+        sharded = ShardedCorpus.create(get_corpus(), self.dirpath)
+        self.assertEqual(len(list(sharded.iter_utterances())), 12)
+        self.assertEqual(
+            len(list(sharded.iter_utterances(lambda utt: utt.speaker.id == "alice"))), 6
+        )
+        # speakers are yielded once per shard
+        self.assertEqual(len(list(sharded.iter_speakers())), 6)
+        table = sharded.get_attribute_table("conversation", ["community"])
+        self.assertEqual(table.loc["convo_3", "community"], "r/1")
+
+        merged = sharded.to_corpus()
+        self.assertEqual(len(merged.utterances), 12)
+        self.assertEqual(sorted(merged.get_speaker_ids()), ["alice", "bob"])
+
+    def test_transform(self):
+        sharded = ShardedCorpus.create(get_corpus(), self.dirpath)
+        sharded.transform(TextLength(), n_jobs=2)
+        self.assertEqual(
+            {utt.id: utt.meta["length"] for utt in sharded.iter_utterances()}["convo_2"], 3
+        )
+
+    def test_fit_once_transform_many(self):
+        sharded = ShardedCorpus.create(get_corpus(), self.dirpath)
+        transformer = TextLength()
+        sharded.transform(transformer, fit_on="all", n_jobs=2)
+        # fit on all the utterances: lengths 1 to 6, and 6 replies of length 1
+        self.assertEqual(transformer.mean_length, 27 / 12)
+        relative_lengths = {
+            utt.id: utt.meta["relative_length"] for utt in sharded.iter_utterances()
+        }
+        self.assertEqual(relative_lengths["convo_5"], 6 / (27 / 12))
+
+        transformer = TextLength()
+        sharded.transform(transformer, fit_on=["2019-01"])
+        # fit on convo_0 and convo_3 only: lengths 1, 4 and two replies of length 1
+        self.assertEqual(transformer.mean_length, 7 / 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from convokit.model import Corpus, Speaker, Utterance
+
+
+def speaker_history_corpus():
+    alice, bob = Speaker(id="alice"), Speaker(id="bob")
+    return Corpus(
+        utterances=[
+            Utterance(id="0", text="hi", speaker=alice, conversation_id="c1", timestamp=5),
+            Utterance(id="1", text="hey", speaker=bob, conversation_id="c1", timestamp=6),
+            Utterance(id="2", text="bye", speaker=alice, conversation_id="c1", timestamp=7),
+            Utterance(id="3", text="yo", speaker=alice, conversation_id="c2", timestamp=1),
+        ]
+    )
+
+
+class TestSpeakerConvoInfo(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+        self.corpus = speaker_history_corpus()
+        self.corpus.organize_speaker_convo_history()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def test_organize_speaker_convo_history(self):
+        self.assertEqual(
+            self.corpus.get_speaker_convo_info("alice", "c1"),
+            {"utterance_ids": ["0", "2"], "start_time": 5, "n_utterances": 2, "idx": 1},
+        )
+        self.assertEqual(self.corpus.get_speaker_convo_info("alice", "c2", "idx"), 0)
+        self.assertEqual(self.corpus.get_speaker("alice").meta["n_convos"], 2)
+        self.assertEqual(self.corpus.get_speaker("alice").meta["start_time"], 1)
+        self.assertNotIn("conversations", self.corpus.get_speaker("alice").meta)
+
+    def test_organize_without_timestamps(self):
+        alice = Speaker(id="alice")
+        corpus = Corpus(
+            utterances=[
+                Utterance(id="b", text="hi", speaker=alice, conversation_id="c1"),
+                Utterance(id="a", text="hey", speaker=alice, conversation_id="c2"),
+                Utterance(id="c", text="hello", speaker=alice, conversation_id="c1"),
+                Utterance(id="d", text="", speaker=alice, conversation_id="c3"),
+            ]
+        )
+        corpus.organize_speaker_convo_history(utterance_filter=lambda utt: len(utt.text) > 0)
+        self.assertEqual(corpus.get_speaker_convo_info("alice", "c1", "utterance_ids"), ["b", "c"])
+        self.assertEqual(corpus.get_speaker_convo_info("alice", "c1", "idx"), 1)
+        self.assertEqual(corpus.get_speaker_convo_info("alice", "c2", "idx"), 0)
+        self.assertEqual(corpus.get_speaker_convos("alice").keys(), {"c1", "c2"})
+        self.assertEqual(corpus.get_speaker("alice").meta["n_convos"], 2)
+
+    def test_bulk_set_and_get(self):
+        self.corpus.bulk_set_speaker_convo_info("score", ["alice", "bob"], ["c2", "c1"], [0.5, 2])
+        self.assertEqual(
+            self.corpus.bulk_get_speaker_convo_info(
+                "score", ["bob", "alice", "alice"], ["c1", "c1", "c2"]
+            ),
+            [2, None, 0.5],
+        )
+        self.assertEqual(set(self.corpus.get_speaker_convos("alice")), {"c1", "c2"})
+
+    def test_attribute_table(self):
+        self.corpus.set_speaker_convo_info("bob", "c1", "score", 3)
+        table = self.corpus.get_speaker_convo_attribute_table(["n_utterances", "score"])
+        self.assertEqual(table.loc["alice__c1", "n_utterances"], 2)
+        self.assertEqual(table.loc["bob__c1", "score"], 3)
+        self.assertTrue(pd.isnull(table.loc["alice__c2", "score"]))
+        self.assertEqual(table.loc["alice__c2", "convo_idx"], 0)
+
+    def test_dump_and_load(self):
+        self.corpus.set_speaker_convo_info("bob", "c1", "score", 3)
+        self.corpus.dump("corpus", base_path=self.dirpath)
+
+        corpus2 = Corpus(filename=os.path.join(self.dirpath, "corpus"))
+        self.assertEqual(corpus2.get_speaker_convo_info("bob", "c1", "score"), 3)
+        self.assertEqual(corpus2.get_speaker_convo_info("alice", "c1", "utterance_ids"), ["0", "2"])
+
+    def test_import_from_speaker_meta(self):
+        corpus = speaker_history_corpus()
+        corpus.get_speaker("bob").meta["conversations"] = {"c1": {"idx": 0, "score": 1}}
+        self.assertEqual(corpus.get_speaker_convo_info("bob", "c1", "score"), 1)
+        self.assertEqual(
+            corpus.get_speaker("bob").meta["conversations"], {"c1": {"idx": 0, "score": 1}}
+        )
+
+        corpus.set_speaker_convo_info("bob", "c1", "score", 2)
+        corpus.dump("corpus", base_path=self.dirpath)
+        corpus2 = Corpus(filename=os.path.join(self.dirpath, "corpus"))
+        self.assertEqual(corpus2.get_speaker_convo_info("bob", "c1", "score"), 2)
+        self.assertEqual(
+            corpus2.get_speaker("bob").meta["conversations"], {"c1": {"idx": 0, "score": 1}}
+        )
+
+    def test_merge(self):
+        carol = Speaker(id="carol")
+        other = Corpus(
+            utterances=[
+                Utterance(id="4", text="hi", speaker=carol, conversation_id="c3", timestamp=2),
+                Utterance(id="5", text="oi", speaker=Speaker(id="alice"), conversation_id="c3"),
+            ]
+        )
+        other.organize_speaker_convo_history()
+        other.set_speaker_convo_info("alice", "c1", "score", 4)
+        self.corpus.set_speaker_convo_info("alice", "c1", "score", 3)
+        self.corpus.set_speaker_convo_info("bob", "c1", "score", 1)
+
+        merged = Corpus.merge(self.corpus, other, warnings=False)
+        self.assertEqual(
+            merged.get_speaker_convo_info("alice", "c1"),
+            {"utterance_ids": ["0", "2"], "start_time": 5, "n_utterances": 2, "idx": 1, "score": 4},
+        )
+        self.assertEqual(merged.get_speaker_convo_info("bob", "c1", "score"), 1)
+        self.assertEqual(merged.get_speaker_convo_info("carol", "c3", "utterance_ids"), ["4"])
+        self.assertEqual(set(merged.get_speaker_convos("alice")), {"c1", "c2", "c3"})
+
+    def test_merge_many_with_speaker_meta(self):
+        corpus = speaker_history_corpus()
+        corpus.get_speaker("bob").meta["conversations"] = {"c1": {"score": 1}}
+        other = Corpus(
+            utterances=[
+                Utterance(id="4", text="hi", speaker=Speaker(id="bob"), conversation_id="c3")
+            ]
+        )
+        other.set_speaker_convo_info("bob", "c3", "score", 2)
+
+        merged = Corpus.merge_many([corpus, other], warnings=False)
+        self.assertEqual(merged.get_speaker_convo_info("bob", "c1", "score"), 1)
+        self.assertEqual(merged.get_speaker_convo_info("bob", "c3", "score"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
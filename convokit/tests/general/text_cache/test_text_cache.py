@@ -0,0 +1,136 @@
+import unittest
+
+from convokit.model import Utterance, Speaker
+from convokit.tests.test_utils import (
+    small_burr_corpus,
+    reload_corpus_in_db_mode,
+    reload_corpus_in_disk_mode,
+)
+
+
+class CountingTextFunc:
+    # counts the objects it computes the text of
+    def __init__(self):
+        self.n_calls = 0
+
+    def __call__(self, obj):
+        self.n_calls += 1
+        return obj.text if obj.obj_type == "utterance" else obj.id
+
+
+def joined_speaker_texts(speaker):
+    return " ".join(utt.text for utt in speaker.iter_utterances())
+
+
+class CorpusTextCache(unittest.TestCase):
+    def get_texts_cached(self):
+        text_func = CountingTextFunc()
+        utts = list(self.corpus.iter_utterances())
+        texts = self.corpus.get_texts(utts, text_func, str.upper, cache=True)
+        self.assertEqual(texts, [utt.text.upper() for utt in utts])
+        self.assertEqual(
+            self.corpus.get_texts(utts[::-1], text_func, str.upper, cache=True), texts[::-1]
+        )
+        self.assertEqual(text_func.n_calls, 2)
+
+        # metadata changes do not invalidate the cache
+        utts[0].meta["tag"] = "x"
+        self.corpus.get_texts(utts, text_func, str.upper, cache=True)
+        self.assertEqual(text_func.n_calls, 2)
+
+        self.corpus.clear_text_cache()
+        self.corpus.get_texts(utts, text_func, str.upper, cache=True)
+        self.assertEqual(text_func.n_calls, 4)
+
+    def text_change_invalidates_cache(self):
+        utt = self.corpus.get_utterance("0")
+        speaker = utt.speaker
+        self.corpus.get_texts([utt], CountingTextFunc(), cache=True)
+        self.corpus.get_texts([speaker], joined_speaker_texts, cache=True)
+
+        utt.text = "new text"
+        self.assertEqual(self.corpus.get_texts([utt], CountingTextFunc(), cache=True), ["new text"])
+        self.assertEqual(
+            self.corpus.get_texts([speaker], joined_speaker_texts, cache=True), ["new text"]
+        )
+
+    def added_utterances_invalidate_cache(self):
+        speaker = self.corpus.get_speaker("burr")
+        before = self.corpus.get_texts([speaker], joined_speaker_texts, cache=True)[0]
+        self.corpus = self.corpus.add_utterances(
+            [Utterance(id="2", text="more", speaker=Speaker(id="burr"))]
+        )
+        speaker = self.corpus.get_speaker("burr")
+        self.assertEqual(
+            self.corpus.get_texts([speaker], joined_speaker_texts, cache=True),
+            [before + " more"],
+        )
+
+    def cache_is_bounded(self):
+        utts = list(self.corpus.iter_utterances())
+        text_funcs = [CountingTextFunc() for _ in range(6)]
+        for text_func in text_funcs:
+            self.corpus.get_texts(utts, text_func, cache=True)
+        self.assertEqual(len(self.corpus._text_cache), 4)
+
+        # only the least recently used functions were evicted
+        for text_func in text_funcs[2:]:
+            self.corpus.get_texts(utts, text_func, cache=True)
+            self.assertEqual(text_func.n_calls, len(utts))
+        self.corpus.get_texts(utts, text_funcs[0], cache=True)
+        self.assertEqual(text_funcs[0].n_calls, 2 * len(utts))
+
+
+class TestWithMem(CorpusTextCache):
+    def setUp(self) -> None:
+        self.corpus = small_burr_corpus()
+
+    def test_get_texts_cached(self):
+        self.get_texts_cached()
+
+    def test_text_change_invalidates_cache(self):
+        self.text_change_invalidates_cache()
+
+    def test_added_utterances_invalidate_cache(self):
+        self.added_utterances_invalidate_cache()
+
+    def test_cache_is_bounded(self):
+        self.cache_is_bounded()
+
+
+class TestWithDB(CorpusTextCache):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_db_mode(small_burr_corpus())
+
+    def test_get_texts_cached(self):
+        self.get_texts_cached()
+
+    def test_text_change_invalidates_cache(self):
+        self.text_change_invalidates_cache()
+
+    def test_added_utterances_invalidate_cache(self):
+        self.added_utterances_invalidate_cache()
+
+    def test_cache_is_bounded(self):
+        self.cache_is_bounded()
+
+
+class TestWithDisk(CorpusTextCache):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_disk_mode(small_burr_corpus())
+
+    def test_get_texts_cached(self):
+        self.get_texts_cached()
+
+    def test_text_change_invalidates_cache(self):
+        self.text_change_invalidates_cache()
+
+    def test_added_utterances_invalidate_cache(self):
+        self.added_utterances_invalidate_cache()
+
+    def test_cache_is_bounded(self):
+        self.cache_is_bounded()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,7 @@ from convokit.tests.general.traverse_convo.traverse_convo_helpers import (
     construct_nonexistent_reply_to_corpus,
     construct_multiple_convo_id_corpus,
 )
-from convokit.tests.test_utils import reload_corpus_in_db_mode
+from convokit.tests.test_utils import reload_corpus_in_db_mode, reload_corpus_in_disk_mode
 
 
 class CorpusTraversal(unittest.TestCase):
@@ -180,5 +180,46 @@ class TestWithMem(CorpusTraversal):
         self.reindex_corpus_2()
 
 
+class TestWithDisk(CorpusTraversal):
+    def setUp(self) -> None:
+        self.corpus = reload_corpus_in_disk_mode(construct_tree_corpus())
+        self.multiple_convo_id_corpus = reload_corpus_in_disk_mode(
+            construct_multiple_convo_id_corpus()
+        )
+        self.nonexistent_reply_to_corpus = reload_corpus_in_disk_mode(
+            construct_nonexistent_reply_to_corpus()
+        )
+
+    def test_broken_convos(self):
+        self.broken_convos()
+
+    def test_bfs_traversal(self):
+        self.bfs_traversal()
+
+    def test_dfs_traversal(self):
+        self.dfs_traversal()
+
+    def test_postorder_traversal(self):
+        self.postorder_traversal()
+
+    def test_preorder_traversal(self):
+        self.preorder_traversal()
+
+    def test_subtree(self):
+        self.subtree()
+
+    def test_conversation_id_to_leaf_paths(self):
+        self.conversation_id_to_leaf_paths()
+
+    def test_one_utt_convo(self):
+        self.one_utt_convo()
+
+    def test_reindex_corpus(self):
+        self.reindex_corpus()
+
+    def test_reindex_corpus_2(self):
+        self.reindex_corpus_2()
+
+
 if __name__ == "__main__":
     unittest.main()
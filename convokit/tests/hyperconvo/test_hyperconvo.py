@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+from convokit.hyperconvo import HyperConvo
+from convokit.hyperconvo.hypergraph import Hypergraph
+from convokit.model import Corpus, Speaker, Utterance
+
+
+def make_corpus(n_convos=6, convo_len=12, n_speakers=4, seed=0):
+    """
+    Makes a corpus of threads in which each utterance replies to a random earlier utterance of its thread, so that
+    speakers reply to each other repeatedly and all the motifs occur.
+    """
+    rng = np.random.RandomState(seed)
+    utts = []
+    for convo_idx in range(n_convos):
+        for i in range(convo_len):
+            utts.append(
+                Utterance(
+                    id="c%du%d" % (convo_idx, i),
+                    text="",
+                    speaker=Speaker(id="s%d" % rng.randint(n_speakers)),
+                    conversation_id="c%du0" % convo_idx,
+                    reply_to=None if i == 0 else "c%du%d" % (convo_idx, rng.randint(i)),
+                    timestamp=i,
+                )
+            )
+    return Corpus(utterances=utts)
+
+
+def hypergraph_feats(hc, corpus):
+    """
+    Computes the features of each thread from the dictionary-based Hypergraph.
+    """
+    threads_stats = {}
+    for convo in corpus.iter_conversations():
+        utts = convo.get_chronological_utterance_list()[: hc.prefix_len]
+        G = Hypergraph.init_from_utterances(utterances=utts)
+        G_mid = Hypergraph.init_from_utterances(utterances=utts[1:])
+        stats = {}
+        stats.update(hc._degree_feats(graph=G))
+        stats.update(HyperConvo._motif_feats(graph=G))
+        stats.update(hc._degree_feats(graph=G_mid, name_ext="mid-thread "))
+        stats.update(HyperConvo._motif_feats(graph=G_mid, name_ext=" over mid-thread"))
+        threads_stats[convo.id] = stats
+    return threads_stats
+
+
+class TestHyperConvo(unittest.TestCase):
+    def setUp(self) -> None:
+        self.corpus = make_corpus()
+        self.hc = HyperConvo(prefix_len=10, min_convo_len=10)
+
+    def assert_feats_equal(self, expected, actual):
+        self.assertEqual(list(actual), list(expected))
+        for convo_id in expected:
+            self.assertEqual(list(actual[convo_id]), list(expected[convo_id]))
+            for feat, value in expected[convo_id].items():
+                np.testing.assert_allclose(actual[convo_id][feat], value, err_msg=feat)
+
+    def test_matches_hypergraph_feats(self):
+        expected = hypergraph_feats(self.hc, self.corpus)
+        feats = self.hc.retrieve_feats(self.corpus)
+        self.assert_feats_equal(expected, feats)
+        # the corpus is rich enough to exercise every motif
+        for motif in [
+            "reciprocity motif",
+            "external reciprocity motif",
+            "dyadic interaction motif",
+            "incoming triads",
+            "outgoing triads",
+        ]:
+            self.assertTrue(any(f["is-present[%s]" % motif] for f in feats.values()), motif)
+
+    def test_parallel_matches_serial(self):
+        serial = self.hc.retrieve_feats(self.corpus, n_jobs=1)
+        self.assert_feats_equal(serial, self.hc.retrieve_feats(self.corpus, n_jobs=2))
+
+        parallel_matrix = (
+            HyperConvo(prefix_len=10, min_convo_len=10, n_jobs=2)
+            .transform(make_corpus())
+            .get_vector_matrix("hyperconvo")
+        )
+        serial_matrix = self.hc.transform(make_corpus()).get_vector_matrix("hyperconvo")
+        self.assertEqual(parallel_matrix.ids, serial_matrix.ids)
+        np.testing.assert_allclose(parallel_matrix.matrix.toarray(), serial_matrix.matrix.toarray())
+
+
+if __name__ == "__main__":
+    unittest.main()
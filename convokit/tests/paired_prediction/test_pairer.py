@@ -0,0 +1,162 @@
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.paired_prediction import Pairer
+
+# (utterance id, group, label); group "d" only has positive utterances, and "e" only negative ones
+UTTS = [
+    ("u0", "a", "pos"),
+    ("u1", "a", "neg"),
+    ("u2", "a", "pos"),
+    ("u3", "b", "neg"),
+    ("u4", "a", "neg"),
+    ("u5", "b", "pos"),
+    ("u6", "c", "pos"),
+    ("u7", "b", "neg"),
+    ("u8", "a", "pos"),
+    ("u9", "c", "neg"),
+    ("u10", "d", "pos"),
+    ("u11", "b", "neg"),
+    ("u12", "e", "neg"),
+    ("u13", "c", "pos"),
+]
+N_PAIRS = {"a": 2, "b": 1, "c": 1}
+
+
+def make_corpus():
+    return Corpus(
+        utterances=[
+            Utterance(
+                id=utt_id,
+                text=utt_id,
+                speaker=Speaker(id="s" + group),
+                meta={"group": group, "label": label},
+            )
+            for utt_id, group, label in UTTS
+        ]
+    )
+
+
+def get_pairer(pair_mode, **kwargs):
+    kwargs.setdefault("pairing_func", lambda utt: utt.meta["group"])
+    return Pairer(
+        obj_type="utterance",
+        pos_label_func=lambda utt: utt.meta["label"] == "pos",
+        neg_label_func=lambda utt: utt.meta["label"] == "neg",
+        pair_mode=pair_mode,
+        **kwargs
+    )
+
+
+def get_annotations(corpus):
+    return {
+        utt.id: (utt.meta["pair_obj_label"], utt.meta["pair_id"], utt.meta["pair_orientation"])
+        for utt in corpus.iter_utterances()
+    }
+
+
+def get_pairs(corpus):
+    """
+    :return: dictionary from pair id to the (positive utterance id, negative utterance id) pair
+    """
+    pairs = dict()
+    for utt in corpus.iter_utterances():
+        if utt.meta["pair_id"] is not None:
+            pair = pairs.setdefault(utt.meta["pair_id"], [None, None])
+            pair[0 if utt.meta["pair_obj_label"] == "pos" else 1] = utt.id
+    return {pair_id: tuple(pair) for pair_id, pair in pairs.items()}
+
+
+class TestPairer(unittest.TestCase):
+    def assert_valid_pairs(self, corpus, pairs):
+        for pair_id, (pos_id, neg_id) in pairs.items():
+            pos_utt, neg_utt = corpus.get_utterance(pos_id), corpus.get_utterance(neg_id)
+            self.assertEqual(pos_utt.meta["label"], "pos")
+            self.assertEqual(neg_utt.meta["label"], "neg")
+            self.assertEqual(pos_utt.meta["group"], neg_utt.meta["group"])
+            self.assertTrue(pair_id.startswith(pos_utt.meta["group"]))
+            self.assertEqual(pos_utt.meta["pair_orientation"], neg_utt.meta["pair_orientation"])
+        orientations = Counter(
+            corpus.get_utterance(pos_id).meta["pair_orientation"] for pos_id, _ in pairs.values()
+        )
+        self.assertLessEqual(abs(orientations["pos"] - orientations["neg"]), 1)
+        for utt in corpus.iter_utterances():
+            if utt.meta["pair_id"] is None:
+                self.assertIsNone(utt.meta["pair_obj_label"])
+                self.assertIsNone(utt.meta["pair_orientation"])
+
+    def test_first(self):
+        corpus = get_pairer("first", random_state=0).transform(make_corpus())
+        pairs = get_pairs(corpus)
+        self.assertEqual(pairs, {"a": ("u0", "u1"), "b": ("u5", "u3"), "c": ("u6", "u9")})
+        self.assert_valid_pairs(corpus, pairs)
+
+    def test_random(self):
+        pairings = []
+        for seed in range(10):
+            corpus = get_pairer("random", random_state=seed).transform(make_corpus())
+            pairs = get_pairs(corpus)
+            self.assertEqual(set(pairs), {"a", "b", "c"})
+            self.assert_valid_pairs(corpus, pairs)
+            pairings.append(pairs)
+        # the pair of a group is picked among all its positive and negative utterances
+        self.assertEqual({pairs["a"][0] for pairs in pairings}, {"u0", "u2", "u8"})
+        self.assertEqual({pairs["b"][1] for pairs in pairings}, {"u3", "u7", "u11"})
+
+    def test_maximize(self):
+        corpus = get_pairer("maximize", random_state=0).transform(make_corpus())
+        pairs = get_pairs(corpus)
+        self.assertEqual(
+            set(pairs),
+            {"%s_%d" % (group, i) for group, n_pairs in N_PAIRS.items() for i in range(n_pairs)},
+        )
+        self.assert_valid_pairs(corpus, pairs)
+        paired_ids = [utt_id for pair in pairs.values() for utt_id in pair]
+        self.assertEqual(len(paired_ids), len(set(paired_ids)))
+
+    def test_pairing_key(self):
+        for pair_mode in ["first", "random", "maximize"]:
+            func_corpus = get_pairer(pair_mode, random_state=0).transform(make_corpus())
+            key_corpus = get_pairer(
+                pair_mode, pairing_func=None, pairing_key="group", random_state=0
+            ).transform(make_corpus())
+            self.assertEqual(get_annotations(key_corpus), get_annotations(func_corpus))
+
+    def test_random_state(self):
+        for pair_mode in ["random", "maximize"]:
+            annotations = get_annotations(
+                get_pairer(pair_mode, random_state=1).transform(make_corpus())
+            )
+            self.assertEqual(
+                get_annotations(get_pairer(pair_mode, random_state=1).transform(make_corpus())),
+                annotations,
+            )
+            self.assertEqual(
+                get_annotations(
+                    get_pairer(pair_mode, random_state=np.random.RandomState(1)).transform(
+                        make_corpus()
+                    )
+                ),
+                annotations,
+            )
+            # without a random_state, results are reproducible by seeding numpy's global random state
+            global_annotations = []
+            for _ in range(2):
+                np.random.seed(1)
+                global_annotations.append(
+                    get_annotations(get_pairer(pair_mode).transform(make_corpus()))
+                )
+            self.assertEqual(global_annotations[0], global_annotations[1])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            get_pairer("all")
+        with self.assertRaises(ValueError):
+            get_pairer("first", pairing_func=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
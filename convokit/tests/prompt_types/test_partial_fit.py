@@ -0,0 +1,134 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from convokit.model import Corpus, Speaker, Utterance
+from convokit.prompt_types import PromptTypes
+
+TOPICS = [["t%dw%d" % (topic, i) for i in range(6)] for topic in range(4)]
+VOCAB = sorted(term for topic in TOPICS for term in topic)
+MODEL_PARAMS = dict(
+    n_types=2,
+    prompt__tfidf_min_df=1,
+    prompt__tfidf_max_df=1.0,
+    reference__tfidf_min_df=1,
+    reference__tfidf_max_df=1.0,
+    svd__n_components=4,
+    random_state=0,
+)
+
+
+def make_corpus(n_convos, first_convo_idx=0, seed=0):
+    """
+    Makes a corpus of conversations in which each utterance mostly uses the terms of one topic, and replies move on
+    to the next topic. The terms of each utterance are stored in its `tokens` metadata.
+    """
+    rng = np.random.RandomState(seed)
+    utts = []
+    for convo_idx in range(first_convo_idx, first_convo_idx + n_convos):
+        topic = rng.choice(len(TOPICS), p=[0.55, 0.25, 0.15, 0.05])
+        for i in range(4):
+            tokens = " ".join(
+                list(rng.choice(TOPICS[(topic + i) % len(TOPICS)], 4)) + list(rng.choice(VOCAB, 1))
+            )
+            utts.append(
+                Utterance(
+                    id="c%du%d" % (convo_idx, i),
+                    text=tokens,
+                    speaker=Speaker(id="s%d" % (i % 3)),
+                    conversation_id="c%d" % convo_idx,
+                    reply_to=None if i == 0 else "c%du%d" % (convo_idx, i - 1),
+                    meta={"tokens": tokens},
+                )
+            )
+    return Corpus(utterances=utts)
+
+
+def assert_allclose_up_to_sign(expected, actual, atol=1e-8):
+    # representations are only determined up to the sign of each dimension
+    expected, actual = np.asarray(expected), np.asarray(actual)
+    signs = np.sign(np.sum(expected * actual, axis=0))
+    np.testing.assert_allclose(actual * signs, expected, atol=atol)
+
+
+class TestPromptTypesPartialFit(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dirpath)
+
+    def test_single_batch_matches_fit(self):
+        corpus = make_corpus(60)
+        fit_model = PromptTypes("tokens", "tokens", "pt", **MODEL_PARAMS)
+        fit_model.fit(corpus)
+        partial_model = PromptTypes("tokens", "tokens", "pt", **MODEL_PARAMS)
+        partial_model.partial_fit(corpus)
+
+        for key in ["U_prompt", "U_reference"]:
+            assert_allclose_up_to_sign(
+                fit_model.prompt_embedding_model[key], partial_model.prompt_embedding_model[key]
+            )
+        self.assertEqual(
+            list(partial_model.train_results["prompt_ids"]),
+            list(fit_model.train_results["prompt_ids"]),
+        )
+        assert_allclose_up_to_sign(
+            fit_model.train_results["prompt_vects"], partial_model.train_results["prompt_vects"]
+        )
+        self.assertEqual(
+            list(partial_model.train_types[2]["prompt_df"].index), corpus.get_utterance_ids()
+        )
+
+    def test_batches(self):
+        first_batch = make_corpus(30)
+        second_batch = make_corpus(30, first_convo_idx=30, seed=1)
+        model = PromptTypes("tokens", "tokens", "pt", **MODEL_PARAMS)
+        model.partial_fit(first_batch)
+        first_U_prompt = model.prompt_embedding_model["U_prompt"]
+        model.partial_fit(second_batch)
+
+        # the statistics only depend on the pairs seen so far, not on how they are split into batches
+        split_model = PromptTypes("tokens", "tokens", "pt", **MODEL_PARAMS)
+        split_model.partial_fit(first_batch)
+        for in_first_half in [True, False]:
+            split_model.partial_fit(
+                second_batch,
+                reference_selector=lambda utt: (int(utt.conversation_id[1:]) < 45) == in_first_half,
+            )
+
+        stats = model.prompt_embedding_model["incremental_stats"]
+        self.assertEqual(stats["n_pairs"], 180)
+        self.assertFalse(np.allclose(first_U_prompt, model.prompt_embedding_model["U_prompt"]))
+        assert_allclose_up_to_sign(
+            model.prompt_embedding_model["U_prompt"], split_model.prompt_embedding_model["U_prompt"]
+        )
+        # representations and types of the training data are those of the latest batch
+        self.assertEqual(
+            list(model.train_types[2]["prompt_df"].index), second_batch.get_utterance_ids()
+        )
+
+    def test_dump_load_then_partial_fit(self):
+        model = PromptTypes("tokens", "tokens", "pt", **MODEL_PARAMS)
+        model.partial_fit(make_corpus(30))
+        model.dump_model(self.dirpath)
+
+        loaded = PromptTypes("tokens", "tokens", "pt", **MODEL_PARAMS)
+        loaded.load_model(self.dirpath)
+        model.partial_fit(make_corpus(30, first_convo_idx=30, seed=1))
+        loaded.partial_fit(make_corpus(30, first_convo_idx=30, seed=1))
+
+        for key in ["U_prompt", "U_reference"]:
+            np.testing.assert_allclose(
+                loaded.prompt_embedding_model[key], model.prompt_embedding_model[key]
+            )
+        np.testing.assert_allclose(
+            loaded.type_models[2]["km_model"].cluster_centers_,
+            model.type_models[2]["km_model"].cluster_centers_,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from convokit.speakerConvoDiversity.speakerConvoDiversity import (
+    _encode_tokens,
+    _nan_mean,
+    _perplexity,
+    _sampled_perplexity,
+    compute_divergences,
+    compute_speaker_convo_divergence,
+)
+
+VOCAB = ["w%d" % i for i in range(30)]
+AUX_INPUT = {"cmp_sample_size": 20, "ref_sample_size": 50, "n_iters": 20}
+
+
+def make_input_table(n_speakers=4, n_convos=6, seed=0):
+    """
+    Makes a table of speaker-conversation entries, in which each speaker favors different words and some entries are
+    too short to be scored.
+    """
+    rng = np.random.RandomState(seed)
+    rows = []
+    for speaker_idx in range(n_speakers):
+        probs = rng.dirichlet(np.ones(len(VOCAB)) * (speaker_idx + 1) / 2)
+        for convo_idx in range(n_convos):
+            n_tokens = 10 if convo_idx == 0 else rng.randint(25, 60)
+            rows.append(
+                {
+                    "speaker": "s%d" % speaker_idx,
+                    "convo_id": "c%d" % convo_idx,
+                    "convo_idx": convo_idx,
+                    "tokens": list(rng.choice(VOCAB, n_tokens, p=probs)),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def other_speakers(df, row, aux):
+    return (df.speaker != row.speaker).values
+
+
+def per_pair_divergences(cmp_tokens, ref_token_list, aux_input):
+    # a distinct function object, so that compute_speaker_convo_divergence uses its per-pair loop
+    return compute_divergences(cmp_tokens, ref_token_list, aux_input)
+
+
+def divergences(input_table, **kwargs):
+    return {
+        (entry["speaker"], entry["convo_id"]): entry["divergence"]
+        for entry in compute_speaker_convo_divergence(
+            input_table, select_fn=other_speakers, **kwargs
+        )
+    }
+
+
+class TestSpeakerConvoDiversity(unittest.TestCase):
+    def setUp(self) -> None:
+        self.input_table = make_input_table()
+
+    def test_sampled_perplexity_matches_per_sample_perplexity(self):
+        cmp_codes, ref_codes_1, ref_codes_2 = _encode_tokens(list(self.input_table.tokens[1:4]))
+        ref_codes = np.concatenate([ref_codes_1, ref_codes_2])
+        ref_lengths = np.array([len(ref_codes_1), len(ref_codes_2)])
+        ref_offsets = np.array([0, len(ref_codes_1)])
+        aux_input = dict(AUX_INPUT, ref_sample_size=20)
+
+        # draw the same samples as _sampled_perplexity, and score each of them on its own
+        rng = np.random.RandomState(0)
+        n_iters, cmp_size, ref_size = 20, aux_input["cmp_sample_size"], 20
+        cmp_samples = cmp_codes[rng.randint(0, len(cmp_codes), size=(n_iters, cmp_size))]
+        sample_idxes = rng.randint(0, len(ref_lengths), size=n_iters)
+        positions = (
+            rng.random_sample((n_iters, ref_size)) * ref_lengths[sample_idxes, np.newaxis]
+        ).astype(np.int64)
+        ref_samples = ref_codes[ref_offsets[sample_idxes, np.newaxis] + positions]
+        expected = _nan_mean(
+            [
+                _perplexity(list(cmp_sample), list(ref_sample))
+                for cmp_sample, ref_sample in zip(cmp_samples, ref_samples)
+            ]
+        )
+
+        self.assertAlmostEqual(
+            _sampled_perplexity(cmp_codes, ref_codes, ref_offsets, ref_lengths, aux_input, 0),
+            expected,
+            places=10,
+        )
+
+    def test_matches_per_pair_divergences(self):
+        aux_input = dict(AUX_INPUT, n_iters=1000)
+        for groupby in [[], ["speaker"]]:
+            np.random.seed(0)
+            expected = divergences(
+                self.input_table,
+                divergence_fn=per_pair_divergences,
+                groupby=groupby,
+                aux_input=aux_input,
+            )
+            np.random.seed(0)
+            actual = divergences(self.input_table, groupby=groupby, aux_input=aux_input)
+
+            # the same entries are scored, and their divergences agree up to sampling noise
+            self.assertEqual(list(actual), list(expected))
+            self.assertEqual(len(actual), 4 * 5)
+            for key, divergence in expected.items():
+                self.assertAlmostEqual(actual[key], divergence, delta=0.02 * divergence)
+
+    def test_deterministic_across_n_jobs(self):
+        for groupby in [[], ["speaker"]]:
+            results = []
+            for n_jobs in [1, 2, 1]:
+                np.random.seed(0)
+                results.append(
+                    divergences(
+                        self.input_table, groupby=groupby, aux_input=AUX_INPUT, n_jobs=n_jobs
+                    )
+                )
+            self.assertEqual(results[1], results[0])
+            self.assertEqual(results[2], results[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -272,3 +272,14 @@ def reload_corpus_in_db_mode(corpus):
     finally:
         if os.path.exists(corpus_id):
             shutil.rmtree(corpus_id)
+
+
+def reload_corpus_in_disk_mode(corpus):
+    corpus_id = "_" + uuid4().hex
+    try:
+        corpus.dump(corpus_id, base_path=".")
+        disk_corpus = Corpus(corpus_id, backend="disk")
+        return disk_corpus
+    finally:
+        if os.path.exists(corpus_id):
+            shutil.rmtree(corpus_id)
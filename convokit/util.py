@@ -5,9 +5,9 @@ import urllib.request
 import uuid
 import warnings
 import zipfile
+from multiprocessing import Pool
 from typing import Dict
 from .convokitConfig import ConvoKitConfig
-import requests
 
 
 # returns a path to the dataset file
@@ -81,6 +81,8 @@ def download(
     if use_local:
         return download_local(name, data_dir)
 
+    import requests
+
     dataset_config = requests.get(
         "https://raw.githubusercontent.com/CornellNLP/ConvoKit/master/download_config.json"
     ).json()
@@ -388,3 +390,35 @@ def deprecation(prev_name: str, new_name: str, stacklevel: int = 3):
 
 def create_safe_id():
     return "_" + uuid.uuid4().hex
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """
+    Returns the number of processes to use for a given `n_jobs` setting, where -1 means all available CPUs.
+    """
+    return (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+
+
+def parallel_map(
+    func, items: list, n_jobs: int = 1, initializer=None, initargs: tuple = ()
+) -> list:
+    """
+    Applies `func` to each of `items`, using a pool of `n_jobs` processes if `n_jobs` is not 1.
+    `func` and the items must be picklable when running in parallel.
+
+    :param func: function to apply
+    :param items: list of inputs to `func`
+    :param n_jobs: number of processes to use; -1 to use all available CPUs.
+    :param initializer: optional function to call with `initargs` before applying `func`, once in each worker process
+        (or once in the current process when running serially); e.g., to set up state shared by all items. With the
+        fork start method, `initargs` need not be picklable.
+    :param initargs: arguments of `initializer`
+    :return: list of outputs, in the same order as `items`
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    if n_jobs == 1 or len(items) < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        return [func(item) for item in items]
+    with Pool(n_jobs, initializer, initargs) as pool:
+        return pool.map(func, items, chunksize=max(1, len(items) // (4 * n_jobs)))
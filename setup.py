@@ -65,6 +65,7 @@ setup(
     ],
     extras_require={
         "craft": ["torch>=0.12"],
+        "zstd": ["zstandard>=0.20"],
     },
     classifiers=[
         "Programming Language :: Python",